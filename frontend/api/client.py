@@ -1,13 +1,18 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Optional, Tuple
 import uuid
 import json
 from datetime import datetime
 from .db_manager import DatabaseManager
+from .query_executor import QueryExecutor, QueryHandle
 
 
 class DDOSDatabaseClient:
     def __init__(self):
         self.db = DatabaseManager()
+        config = self.db.config
+        self.queries = QueryExecutor(self.db, workers=config.query_workers,
+                                     timeout=config.query_timeout or None,
+                                     max_rows=config.query_max_rows)
 
     def check_database_status(self) -> Dict[str, Any]:
         """Проверка статуса БД"""
@@ -21,6 +26,39 @@ class DDOSDatabaseClient:
         """Получение всех атак"""
         return self.db.get_all_attacks()
 
+    def get_attacks_page(self, filters: Optional[Dict[str, List[str]]] = None, page_size: int = 100,
+                         after: Optional[Tuple[str, str]] = None) -> List[Dict[str, Any]]:
+        """Страница атак после ключа (created_at, id)"""
+        return self.db.get_attacks_page(filters, page_size, after)
+
+    def count_attacks(self, filters: Optional[Dict[str, List[str]]] = None) -> int:
+        """Количество атак под фильтрами"""
+        return self.db.count_attacks(filters)
+
+    def get_attack_key_at(self, filters: Optional[Dict[str, List[str]]] = None,
+                          position: int = 0) -> Optional[Tuple[str, str]]:
+        """Ключ страницы для атаки на заданной позиции"""
+        return self.db.get_attack_key_at(filters, position)
+
+    def get_attack_versions(self, filters: Optional[Dict[str, List[str]]] = None) -> List[Tuple[str, str]]:
+        """Версии атак (id, updated_at) для инкрементального обновления"""
+        return self.db.get_attack_versions(filters)
+
+    def get_attacks_by_ids(self, attack_ids: List[str],
+                           filters: Optional[Dict[str, List[str]]] = None) -> Dict[str, Dict[str, Any]]:
+        """Атаки по списку ID (с filters - только подходящие под фильтры)"""
+        return self.db.get_attacks_by_ids(attack_ids, filters)
+
+    def iter_attack_pages(self, filters: Optional[Dict[str, List[str]]] = None, page_size: int = 500,
+                          after: Optional[Tuple[str, str]] = None) -> Iterator[List[Dict[str, Any]]]:
+        """Постраничный обход атак"""
+        return self.db.iter_attack_pages(filters, page_size, after)
+
+    def iter_attacks(self, filters: Optional[Dict[str, List[str]]] = None, page_size: int = 500,
+                     after: Optional[Tuple[str, str]] = None) -> Iterator[Dict[str, Any]]:
+        """Потоковый обход атак без загрузки всей таблицы в память"""
+        return self.db.iter_attacks(filters, page_size, after)
+
     def get_attack(self, attack_id: str) -> Dict[str, Any]:
         """Получение конкретной атаки"""
         result = self.db.get_attack(attack_id)
@@ -32,6 +70,11 @@ class DDOSDatabaseClient:
         """Создание новой атаки"""
         return self.db.create_attack(attack_data)
 
+    def bulk_create_attacks(self, attacks: Iterable[Dict[str, Any]], batch_size: int = 5000,
+                            progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """Массовая вставка атак пачками (без повторного чтения записанного)"""
+        return self.db.bulk_create_attacks(attacks, batch_size, progress)
+
     def update_attack(self, attack_id: str, attack_data: Dict[str, Any]) -> Dict[str, Any]:
         """Обновление атаки"""
         return self.db.update_attack(attack_id, attack_data)
@@ -99,15 +142,51 @@ class DDOSDatabaseClient:
     def filter_attacks_by_multiple(self, frequencies: Optional[List[str]] = None,
                                    danger_levels: Optional[List[str]] = None,
                                    attack_types: Optional[List[str]] = None,
-                                   protocols: Optional[List[str]] = None) -> List[Dict[str, Any]]:
-        """Фильтрация атак по нескольким параметрам"""
+                                   protocols: Optional[List[str]] = None,
+                                   date_from=None, date_to=None, min_danger: Optional[str] = None,
+                                   min_frequency: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Фильтрация атак по нескольким параметрам и периоду created_at.
+
+        date_from/date_to - datetime, ISO-строка или секунды эпохи, границы включительно;
+        min_danger/min_frequency - значения не ниже заданного по рангу справочника.
+        """
         return self.db.filter_attacks(
             frequencies=frequencies,
             danger_levels=danger_levels,
             attack_types=attack_types,
-            protocols=protocols
+            protocols=protocols,
+            date_from=date_from,
+            date_to=date_to,
+            min_danger=min_danger,
+            min_frequency=min_frequency
         )
 
+    def find_attacks_by_source_ip(self, ip: str) -> List[Dict[str, Any]]:
+        """Атаки с указанным IP источника"""
+        return self.db.find_attacks_by_source_ip(ip)
+
+    def find_attacks_by_port(self, port: int) -> List[Dict[str, Any]]:
+        """Атаки, затронувшие порт"""
+        return self.db.find_attacks_by_port(port)
+
+    def find_attacks_by_cidr(self, cidr: str, side: str = "source") -> List[Dict[str, Any]]:
+        """Атаки с IP источника или цели (side="source"|"target") внутри сети cidr"""
+        return self.db.find_attacks_by_cidr(cidr, side)
+
+    # Полнотекстовый поиск
+    def count_search(self, text: str, prefix: bool = False) -> int:
+        """Число атак, найденных полнотекстовым поиском"""
+        return self.db.count_search(text, prefix)
+
+    def iter_search_pages(self, text: str, prefix: bool = False, page_size: int = 200,
+                          should_stop: Optional[Callable[[], bool]] = None) -> Iterator[List[Dict[str, Any]]]:
+        """Полнотекстовый поиск страницами от лучших совпадений; should_stop() прерывает обход"""
+        return self.db.iter_search_pages(text, prefix, page_size, should_stop)
+
+    def trigram_prefilter(self, table: str, column: str, match_query: str) -> Optional[Dict[str, Any]]:
+        """Кандидаты триграммного индекса для поиска подстроки или regex"""
+        return self.db.trigram_prefilter(table, column, match_query)
+
     def _extract_attacks_data(self, data: Any) -> List[Dict[str, Any]]:
         """Совместимость со старым API клиентом"""
         if isinstance(data, dict) and 'data' in data:
@@ -118,20 +197,81 @@ class DDOSDatabaseClient:
             return []
 
 
+    # Статистика
+    def get_stats(self) -> Dict[str, Any]:
+        """Сводная статистика атак (счётчики поддерживаются триггерами)"""
+        return self.db.get_stats()
+
+    def rebuild_stats(self) -> Dict[str, Any]:
+        """Пересчёт сводной статистики"""
+        return self.db.rebuild_stats()
+
+    def rebuild_rollups(self) -> Dict[str, Any]:
+        """Пересчёт почасовых и посуточных сводок"""
+        return self.db.rebuild_rollups()
+
+    def get_attack_trend(self, period: str = "month", dimension: Optional[str] = None,
+                         date_from: Optional[str] = None, date_to: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Число атак по периодам (hour/day/month/year) из сводок"""
+        return self.db.get_attack_trend(period, dimension, date_from, date_to)
+
+    def analytics_available(self) -> bool:
+        """Доступна ли векторная аналитика в памяти (нужен NumPy)"""
+        return self.db.analytics_available()
+
+    def get_categories(self) -> Dict[str, List[str]]:
+        """Допустимые значения frequency/danger/attack_type/protocol из справочников"""
+        return self.db.get_categories()
+
+    def get_values_at_least(self, kind: str, threshold: str) -> List[str]:
+        """Значения категории kind с рангом не ниже threshold"""
+        return self.db.get_values_at_least(kind, threshold)
+
+    def add_lookup_value(self, kind: str, value: str, rank: Optional[int] = None) -> Dict[str, Any]:
+        """Новое значение справочника категории kind; rank - место в порядке значений"""
+        return self.db.add_lookup_value(kind, value, rank)
+
+    def get_analytics_snapshot(self):
+        """Колоночный снимок атак для векторной аналитики (None без NumPy)"""
+        return self.db.get_analytics_snapshot()
+
+    # Журнал изменений
+    def get_change_version(self) -> int:
+        """Текущая версия журнала изменений"""
+        return self.db.get_change_version()
+
+    def get_changes_since(self, version: int, limit: int = 1000) -> Dict[str, Any]:
+        """Изменения после версии version (для периодического опроса)"""
+        return self.db.get_changes_since(version, limit)
+
+    def compact_change_log(self, retention: Optional[int] = None,
+                           max_age_days: Optional[float] = None) -> Dict[str, Any]:
+        """Очистка старых записей журнала изменений"""
+        return self.db.compact_change_log(retention, max_age_days)
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Статистика пула соединений (hits/misses и т.д.)"""
+        return self.db.get_pool_stats()
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Статистика кэша результатов запросов (hits/misses/evictions и т.д.)"""
+        return self.db.get_cache_stats()
+
     def create_custom_type(self, name: str, type_class: str, values: Any) -> Dict[str, Any]:
         """Создание пользовательского типа"""
         try:
             print(f"Creating custom type: {name}, {type_class}, {values}")
-            conn = self.db.get_connection()
-            cursor = conn.cursor()
-            
-            query = "INSERT INTO custom_types (id, name, type, enum_values, created_at) VALUES (?, ?, ?, ?, ?)"
-            type_id = str(uuid.uuid4())
-            created_at = datetime.now().isoformat()
-            
-            cursor.execute(query, (type_id, name, type_class, json.dumps(values), created_at))
-            conn.commit()
-            cursor.close()
+            with self.db.connection() as conn:
+                cursor = conn.cursor()
+
+                query = "INSERT INTO custom_types (id, name, type, enum_values, created_at) VALUES (?, ?, ?, ?, ?)"
+                type_id = str(uuid.uuid4())
+                created_at = datetime.now().isoformat()
+
+                cursor.execute(query, (type_id, name, type_class, json.dumps(values), created_at))
+                conn.commit()
+                self.db.invalidate_cache(("custom_types",), conn)
+                cursor.close()
             print(f"Type {name} created successfully") 
             return {"success": True, "message": f"Type {name} created successfully"}
         except Exception as e:
@@ -140,24 +280,24 @@ class DDOSDatabaseClient:
     def get_custom_types(self) -> List[Dict[str, Any]]:
         """Получение всех пользовательских типов"""
         try:
-            conn = self.db.get_connection()
-            cursor = conn.cursor()
-            
-            query = "SELECT * FROM custom_types ORDER BY created_at DESC"
-            cursor.execute(query)
-            results = cursor.fetchall()
-            
-            types = []
-            for row in results:
-                types.append({
-                    'id': row[0],
-                    'name': row[1],
-                    'type': row[2],
-                    'values': json.loads(row[3]),
-                    'created_at': row[4]
-                })
-            
-            cursor.close()
+            with self.db.connection() as conn:
+                cursor = conn.cursor()
+
+                query = "SELECT * FROM custom_types ORDER BY created_at DESC"
+                cursor.execute(query)
+                results = cursor.fetchall()
+
+                types = []
+                for row in results:
+                    types.append({
+                        'id': row[0],
+                        'name': row[1],
+                        'type': row[2],
+                        'values': json.loads(row[3]),
+                        'created_at': row[4]
+                    })
+
+                cursor.close()
             return types
         except Exception as e:
             print(f"Error getting custom types: {e}")
@@ -166,14 +306,15 @@ class DDOSDatabaseClient:
     def delete_custom_type(self, type_id: str) -> Dict[str, Any]:
         """Удаление пользовательского типа"""
         try:
-            conn = self.db.get_connection()
-            cursor = conn.cursor()
-            
-            query = "DELETE FROM custom_types WHERE id = ?"
-            cursor.execute(query, (type_id,))
-            conn.commit()
-            cursor.close()
-            
+            with self.db.connection() as conn:
+                cursor = conn.cursor()
+
+                query = "DELETE FROM custom_types WHERE id = ?"
+                cursor.execute(query, (type_id,))
+                conn.commit()
+                self.db.invalidate_cache(("custom_types",), conn)
+                cursor.close()
+
             return {"success": True, "message": "Type deleted successfully"}
         except Exception as e:
             return {"success": False, "error": str(e)}
@@ -181,69 +322,70 @@ class DDOSDatabaseClient:
     def execute_custom_query(self, query: str, params: tuple = ()) -> List[Dict[str, Any]]:
         """Выполнение произвольного SQL запроса"""
         try:
-            conn = self.db.get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute(query, params)
-            
-            if query.strip().upper().startswith('SELECT'):
-                results = cursor.fetchall()
-                # Получаем названия колонок
-                column_names = [description[0] for description in cursor.description]
-                # Конвертируем в список словарей
-                formatted_results = []
-                for row in results:
-                    formatted_results.append(dict(zip(column_names, row)))
-                cursor.close()
-                return formatted_results
-            else:
-                conn.commit()
-                cursor.close()
-                return [{"message": "Query executed successfully", "rows_affected": cursor.rowcount}]
-                
+            with self.db.connection() as conn:
+                if query.strip().upper().startswith('SELECT'):
+                    def run():
+                        cursor = conn.cursor()
+                        cursor.execute(query, params)
+                        results = cursor.fetchall()
+                        # Получаем названия колонок
+                        column_names = [description[0] for description in cursor.description]
+                        cursor.close()
+                        # Конвертируем в список словарей
+                        return [dict(zip(column_names, row)) for row in results]
+
+                    results, _ = self.db.cached_query(conn, query, params, run, variant="dicts")
+                    # Копии строк: результат в кэше общий
+                    return [dict(row) for row in results]
+                else:
+                    cursor = conn.cursor()
+                    cursor.execute(query, params)
+                    self.db.flush_index_queue(conn)
+                    conn.commit()
+                    cursor.close()
+                    self.db.invalidate_cache_for(query, conn)
+                    return [{"message": "Query executed successfully", "rows_affected": cursor.rowcount}]
+
         except Exception as e:
             print(f"Error executing custom query: {e}")
             return [{"error": str(e)}]
 
+    def submit_query(self, query: str, params: tuple = (), timeout: Optional[float] = None,
+                     max_rows: Optional[int] = None,
+                     on_done: Optional[Callable[[QueryHandle], None]] = None) -> QueryHandle:
+        """Запуск произвольного запроса в рабочем потоке с отменой, таймаутом и лимитом строк"""
+        return self.queries.submit(query, params, timeout, max_rows, on_done)
+
     def get_table_schema(self, table_name: str) -> List[Dict[str, Any]]:
         """Получение схемы таблицы"""
         try:
-            conn = self.db.get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute(f"PRAGMA table_info({table_name})")
-            results = cursor.fetchall()
-            
-            schema = []
-            for row in results:
-                schema.append({
-                    'cid': row[0],
-                    'name': row[1],
-                    'type': row[2],
-                    'notnull': row[3],
-                    'dflt_value': row[4],
-                    'pk': row[5]
-                })
-            
-            cursor.close()
+            with self.db.connection() as conn:
+                cursor = conn.cursor()
+
+                cursor.execute(f"PRAGMA table_info({table_name})")
+                results = cursor.fetchall()
+
+                schema = []
+                for row in results:
+                    schema.append({
+                        'cid': row[0],
+                        'name': row[1],
+                        'type': row[2],
+                        'notnull': row[3],
+                        'dflt_value': row[4],
+                        'pk': row[5]
+                    })
+
+                cursor.close()
             return schema
         except Exception as e:
             print(f"Error getting table schema: {e}")
             return []
 
     def get_all_tables(self) -> List[str]:
-        """Получение списка всех таблиц в БД"""
+        """Получение списка пользовательских таблиц и представлений в БД (без служебных)"""
         try:
-            conn = self.db.get_connection()
-            cursor = conn.cursor()
-            
-            query = "SELECT name FROM sqlite_master WHERE type='table'"
-            cursor.execute(query)
-            results = cursor.fetchall()
-            
-            tables = [row[0] for row in results]
-            cursor.close()
-            return tables
+            return self.db.get_user_tables()
         except Exception as e:
             print(f"Error getting tables: {e}")
-            return []
\ No newline at end of file
+            return []
@@ -0,0 +1,409 @@
+"""Колоночный снимок attacks/targets в памяти для аналитики без SQL.
+
+Снимок хранит по колонке на массив NumPy: время создания (created_ts),
+словарно закодированные danger, frequency, attack_type и protocol (код
+int32 + словарь значений) и порт цели; цель ссылается на строку своей
+атаки. Фильтры, группировки и гистограммы по времени считаются
+векторно по массивам, без обхода списков словарей и без запросов к БД.
+
+refresh() догружает изменения по журналу change_log: атаки из изменений
+перечитываются по id, их цели заменяются целиком. Удалённые строки
+помечаются мёртвыми и вычищаются, когда их доля превышает COMPACT_RATIO.
+Если нужная часть журнала уже очищена, снимок перечитывается полностью.
+
+Коды значений из справочников (миграция 12) идут в порядке их ранга;
+строки хранят id справочника (миграция 17), значение берётся по нему.
+Требует NumPy (requirements-analytics.txt); db_manager импортирует модуль
+только при его наличии.
+"""
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .migrations import CATEGORY_LOOKUPS
+
+# Категориальные колонки (словарное кодирование) по таблицам снимка
+ATTACK_DIMENSIONS = ("danger", "frequency", "attack_type")
+TARGET_DIMENSIONS = ("protocol",)
+DIMENSIONS = {"attacks": ATTACK_DIMENSIONS, "targets": TARGET_DIMENSIONS}
+
+# Корзина гистограммы -> единица datetime64 (подпись совпадает с префиксом created_at)
+HISTOGRAM_UNITS = {"hour": "h", "day": "D", "month": "M", "year": "Y"}
+
+# Фильтры filter_attacks, которые снимок умеет проверять
+SUPPORTED_FILTERS = ("frequencies", "danger_levels", "attack_types", "protocols", "date_from", "date_to",
+                     "min_danger", "min_frequency")
+
+# Доля мёртвых строк, после которой массивы уплотняются
+COMPACT_RATIO = 0.25
+
+# created_ts для created_at, который strftime не разобрал (NULL): такие атаки
+# считаются, но, как и в SQL, не проходят фильтр по периоду и не попадают в корзины
+NO_TIMESTAMP = np.iinfo(np.int64).min
+
+_READ_BATCH = 50000
+_ID_CHUNK = 500
+
+
+class Dictionary:
+    """Словарь категориальной колонки: значение <-> код int32 (NULL - обычное значение None)"""
+
+    def __init__(self):
+        self.values: List[Any] = []
+        self.codes: Dict[Any, int] = {}
+
+    def __len__(self):
+        return len(self.values)
+
+    def encode(self, values: Sequence[Any]) -> np.ndarray:
+        """Коды значений; новые значения добавляются в словарь"""
+        codes = self.codes
+        for value in set(values).difference(codes):
+            codes[value] = len(self.values)
+            self.values.append(value)
+        return np.fromiter((codes[value] for value in values), dtype=np.int32, count=len(values))
+
+    def lookup(self, values: Iterable[Any]) -> np.ndarray:
+        """Коды известных значений (неизвестные ни с чем не совпадают)"""
+        return np.array([self.codes[value] for value in values if value in self.codes], dtype=np.int32)
+
+
+class ColumnarSnapshot:
+    """Колоночная копия attacks/targets с векторными запросами.
+
+    Запросы и refresh() потокобезопасны: они выполняются под одной
+    блокировкой, векторные операции по миллиону строк занимают
+    миллисекунды.
+    """
+
+    def __init__(self, manager):
+        self.manager = manager
+        self.version: Optional[int] = None
+        self.loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._clear()
+
+    def _clear(self):
+        self.dictionaries = {column: Dictionary() for column in ATTACK_DIMENSIONS + TARGET_DIMENSIONS}
+        # Ранги значений из справочников (для порогов min_danger/min_frequency)
+        self.ranks: Dict[str, Dict[str, int]] = {column: {} for column in self.dictionaries}
+        # id справочника -> значение
+        self.lookup_values: Dict[str, Dict[int, str]] = {column: {} for column in self.dictionaries}
+        # Атаки: строка i - атака self._attack_ids[i]
+        self._attack_ids: List[Optional[str]] = []
+        self._attack_rows: Dict[str, int] = {}
+        self.attack_ts = np.empty(0, dtype=np.int64)
+        self.attack_codes = {column: np.empty(0, dtype=np.int32) for column in ATTACK_DIMENSIONS}
+        self.attack_alive = np.empty(0, dtype=bool)
+        # Цели: строка атаки, порт (-1 - нет порта) и протокол
+        self.target_attack = np.empty(0, dtype=np.int64)
+        self.target_port = np.empty(0, dtype=np.int64)
+        self.target_codes = {column: np.empty(0, dtype=np.int32) for column in TARGET_DIMENSIONS}
+        self.target_alive = np.empty(0, dtype=bool)
+
+    # Загрузка и обновление
+
+    def refresh(self) -> Dict[str, Any]:
+        """Догрузка изменений из журнала (при первом вызове - полная загрузка)"""
+        with self._lock:
+            if self.version is None:
+                return self._reload()
+            with self.manager.connection() as conn:
+                self._load_lookups(conn)
+            changed = set()
+            while True:
+                result = self.manager.get_changes_since(self.version, limit=10000)
+                if not result["success"]:
+                    raise RuntimeError(result["error"])
+                data = result["data"]
+                if data["reset"]:
+                    return self._reload()
+                changed.update(change["attack_id"] for change in data["changes"])
+                self.version = data["version"]
+                if not data["has_more"]:
+                    break
+            if changed:
+                self._apply(changed)
+                self.loaded_at = time.time()
+            return {"reloaded": False, "changed": len(changed), "version": self.version}
+
+    def _reload(self) -> Dict[str, Any]:
+        self._clear()
+        with self.manager.connection() as conn:
+            # Версия журнала и данные из одной транзакции чтения
+            conn.execute("BEGIN")
+            try:
+                self.version = self.manager._latest_change_version(conn)
+                self._load_lookups(conn)
+                attacks = conn.execute("SELECT id, created_ts, danger_id, frequency_id, attack_type_id FROM attacks")
+                while True:
+                    rows = attacks.fetchmany(_READ_BATCH)
+                    if not rows:
+                        break
+                    self._append_attacks(rows)
+                targets = conn.execute("SELECT attack_id, port, protocol_id FROM targets")
+                while True:
+                    rows = targets.fetchmany(_READ_BATCH)
+                    if not rows:
+                        break
+                    self._append_targets(rows)
+            finally:
+                conn.rollback()
+        self.loaded_at = time.time()
+        return {"reloaded": True, "changed": len(self._attack_rows), "version": self.version}
+
+    def _load_lookups(self, conn):
+        """Ранги из справочников; значения справочника получают коды словаря в порядке ранга"""
+        for column in self.dictionaries:
+            lookup = CATEGORY_LOOKUPS[column][1]
+            rows = conn.execute(f"SELECT value, rank, id FROM {lookup} ORDER BY rank, id").fetchall()
+            self.dictionaries[column].encode([row[0] for row in rows])
+            self.ranks[column] = {row[0]: row[1] for row in rows}
+            self.lookup_values[column] = {row[2]: row[0] for row in rows}
+
+    def _values(self, column: str, ids: Sequence[Optional[int]]) -> List[Optional[str]]:
+        """Значения категории по id справочника"""
+        names = self.lookup_values[column]
+        return [names.get(lookup_id) for lookup_id in ids]
+
+    def _append_attacks(self, rows):
+        ids, timestamps, danger, frequency, attack_type = zip(*rows)
+        start = len(self._attack_ids)
+        self._attack_ids.extend(ids)
+        self._attack_rows.update(zip(ids, range(start, start + len(ids))))
+        self.attack_ts = np.concatenate([self.attack_ts, np.fromiter(
+            (NO_TIMESTAMP if ts is None else ts for ts in timestamps), dtype=np.int64, count=len(ids))])
+        for column, values in zip(ATTACK_DIMENSIONS, (danger, frequency, attack_type)):
+            self.attack_codes[column] = np.concatenate([self.attack_codes[column],
+                                                        self.dictionaries[column].encode(self._values(column, values))])
+        self.attack_alive = np.concatenate([self.attack_alive, np.ones(len(ids), dtype=bool)])
+
+    def _append_targets(self, rows):
+        # Цели без атаки в снимке (записанные соединением с выключенными FK) в нём не участвуют
+        rows = [row for row in rows if row[0] in self._attack_rows]
+        if not rows:
+            return
+        attack_ids, ports, protocols = zip(*rows)
+        self.target_attack = np.concatenate([self.target_attack, np.fromiter(
+            (self._attack_rows[attack_id] for attack_id in attack_ids), dtype=np.int64, count=len(rows))])
+        self.target_port = np.concatenate([self.target_port, np.fromiter(
+            (-1 if port is None else port for port in ports), dtype=np.int64, count=len(rows))])
+        self.target_codes["protocol"] = np.concatenate([self.target_codes["protocol"],
+                                                        self.dictionaries["protocol"].encode(
+                                                            self._values("protocol", protocols))])
+        self.target_alive = np.concatenate([self.target_alive, np.ones(len(rows), dtype=bool)])
+
+    def _apply(self, attack_ids: Iterable[str]):
+        """Перечитывание изменённых атак и их целей"""
+        attack_ids = list(attack_ids)
+        attacks, targets = [], []
+        with self.manager.connection() as conn:
+            for start in range(0, len(attack_ids), _ID_CHUNK):
+                chunk = attack_ids[start:start + _ID_CHUNK]
+                placeholders = ",".join(["?"] * len(chunk))
+                attacks += conn.execute(f"SELECT id, created_ts, danger_id, frequency_id, attack_type_id FROM attacks "
+                                        f"WHERE id IN ({placeholders})", chunk).fetchall()
+                targets += conn.execute(f"SELECT attack_id, port, protocol_id FROM targets "
+                                        f"WHERE attack_id IN ({placeholders})", chunk).fetchall()
+
+        # Прежние цели изменённых атак заменяются прочитанными
+        known_rows = [self._attack_rows[attack_id] for attack_id in attack_ids if attack_id in self._attack_rows]
+        if known_rows:
+            self.target_alive &= ~np.isin(self.target_attack, known_rows)
+
+        present = {row[0] for row in attacks}
+        for attack_id in attack_ids:
+            if attack_id not in present and attack_id in self._attack_rows:
+                row = self._attack_rows.pop(attack_id)
+                self._attack_ids[row] = None
+                self.attack_alive[row] = False
+
+        new_rows = []
+        for attack_id, created_ts, danger, frequency, attack_type in attacks:
+            row = self._attack_rows.get(attack_id)
+            if row is None:
+                new_rows.append((attack_id, created_ts, danger, frequency, attack_type))
+                continue
+            self.attack_ts[row] = NO_TIMESTAMP if created_ts is None else created_ts
+            for column, value in zip(ATTACK_DIMENSIONS, (danger, frequency, attack_type)):
+                self.attack_codes[column][row] = self.dictionaries[column].encode(self._values(column, [value]))[0]
+        if new_rows:
+            self._append_attacks(new_rows)
+        if targets:
+            self._append_targets(targets)
+
+        dead = len(self.attack_alive) - int(self.attack_alive.sum()) + \
+            len(self.target_alive) - int(self.target_alive.sum())
+        if dead > COMPACT_RATIO * (len(self.attack_alive) + len(self.target_alive)):
+            self._compact()
+
+    def _compact(self):
+        """Удаление мёртвых строк с перенумерацией ссылок целей на атаки"""
+        keep = self.attack_alive
+        new_positions = np.cumsum(keep) - 1
+        self._attack_ids = [attack_id for attack_id in self._attack_ids if attack_id is not None]
+        self._attack_rows = {attack_id: row for row, attack_id in enumerate(self._attack_ids)}
+        self.attack_ts = self.attack_ts[keep]
+        for column in ATTACK_DIMENSIONS:
+            self.attack_codes[column] = self.attack_codes[column][keep]
+        self.attack_alive = np.ones(len(self._attack_ids), dtype=bool)
+
+        targets = self.target_alive & keep[self.target_attack]
+        self.target_attack = new_positions[self.target_attack[targets]]
+        self.target_port = self.target_port[targets]
+        for column in TARGET_DIMENSIONS:
+            self.target_codes[column] = self.target_codes[column][targets]
+        self.target_alive = np.ones(len(self.target_attack), dtype=bool)
+
+    # Запросы
+
+    def _at_least(self, column: str, threshold: str) -> List[str]:
+        """Значения колонки с рангом не ниже, чем у threshold"""
+        ranks = self.ranks[column]
+        if threshold not in ranks:
+            return []
+        return [value for value, rank in ranks.items() if rank >= ranks[threshold]]
+
+    def _attack_mask(self, frequencies=None, danger_levels=None, attack_types=None, protocols=None,
+                     date_from=None, date_to=None, min_danger=None, min_frequency=None,
+                     **unsupported) -> np.ndarray:
+        """Маска атак по фильтрам filter_attacks (protocols - есть цель с таким протоколом)"""
+        if any(unsupported.values()):
+            raise ValueError(f"Unsupported snapshot filters: {', '.join(k for k, v in unsupported.items() if v)}")
+        mask = self.attack_alive.copy()
+        for column, values in (("frequency", frequencies), ("danger", danger_levels),
+                               ("attack_type", attack_types)):
+            if values:
+                mask &= np.isin(self.attack_codes[column], self.dictionaries[column].lookup(values))
+        for column, threshold in (("danger", min_danger), ("frequency", min_frequency)):
+            if threshold:
+                mask &= np.isin(self.attack_codes[column],
+                                self.dictionaries[column].lookup(self._at_least(column, threshold)))
+        if protocols:
+            matched = self.target_alive & np.isin(self.target_codes["protocol"],
+                                                  self.dictionaries["protocol"].lookup(protocols))
+            with_protocol = np.zeros(len(mask), dtype=bool)
+            with_protocol[self.target_attack[matched]] = True
+            mask &= with_protocol
+        start, end = self.manager._date_bounds(date_from, date_to)
+        if start is not None or end is not None:
+            mask &= self.attack_ts != NO_TIMESTAMP
+        if start is not None:
+            mask &= self.attack_ts >= start
+        if end is not None:
+            mask &= self.attack_ts < end
+        return mask
+
+    def count(self, **filters) -> int:
+        """Число атак под фильтрами (аргументы filter_attacks из SUPPORTED_FILTERS)"""
+        with self._lock:
+            return int(self._attack_mask(**filters).sum())
+
+    def group_by(self, table: str = "attacks", dimensions: Sequence[str] = (), bucket: Optional[str] = None,
+                 **filters) -> List[Dict[str, Any]]:
+        """Число строк по группам: [{измерения..., bucket, "count"}], по возрастанию ключа.
+
+        table="targets" считает цели: фильтры атак применяются к атаке
+        цели, protocols и группировка по protocol - к самой цели, а
+        измерения атаки (danger и т.д.) берутся у её атаки. bucket - ключ
+        HISTOGRAM_UNITS, подпись корзины - префикс created_at атаки.
+        """
+        if table not in DIMENSIONS:
+            raise ValueError(f"Unknown table '{table}', expected one of: {', '.join(DIMENSIONS)}")
+        allowed = ATTACK_DIMENSIONS + (TARGET_DIMENSIONS if table == "targets" else ())
+        unknown = [column for column in dimensions if column not in allowed]
+        if unknown:
+            raise ValueError(f"Unknown {table} dimensions: {', '.join(unknown)}")
+        if bucket is not None and bucket not in HISTOGRAM_UNITS:
+            raise ValueError(f"Unknown bucket '{bucket}', expected one of: {', '.join(HISTOGRAM_UNITS)}")
+
+        with self._lock:
+            if table == "attacks":
+                selected = np.flatnonzero(self._attack_mask(**filters))
+                columns = {column: self.attack_codes[column][selected] for column in dimensions}
+                timestamps = self.attack_ts[selected]
+            else:
+                protocols = filters.pop("protocols", None)
+                mask = self.target_alive & self._attack_mask(**filters)[self.target_attack]
+                if protocols:
+                    mask &= np.isin(self.target_codes["protocol"], self.dictionaries["protocol"].lookup(protocols))
+                selected = np.flatnonzero(mask)
+                attack_rows = self.target_attack[selected]
+                columns = {column: (self.target_codes[column][selected] if column in TARGET_DIMENSIONS
+                                    else self.attack_codes[column][attack_rows]) for column in dimensions}
+                timestamps = self.attack_ts[attack_rows]
+
+            if bucket:
+                # Атаки без времени создания в корзины не попадают
+                dated = timestamps != NO_TIMESTAMP
+                columns = {column: codes[dated] for column, codes in columns.items()}
+                timestamps = timestamps[dated]
+
+            keys: List[Tuple[str, np.ndarray, int]] = [(column, codes, len(self.dictionaries[column]))
+                                                       for column, codes in columns.items()]
+            total = len(timestamps)
+            base = 0
+            if bucket and not total:
+                return []
+            if bucket:
+                values = timestamps.astype("datetime64[s]").astype(f"datetime64[{HISTOGRAM_UNITS[bucket]}]")
+                values = values.astype(np.int64)
+                base = int(values.min())
+                keys.insert(0, ("bucket", values - base, int(values.max()) - base + 1))
+
+            result = []
+            for combined, count in self._count_groups(keys, total):
+                row: Dict[str, Any] = {}
+                for column, _, size in reversed(keys):
+                    combined, code = divmod(combined, size)
+                    row[column] = (str(np.datetime64(code + base, HISTOGRAM_UNITS[bucket])) if column == "bucket"
+                                   else self.dictionaries[column].values[code])
+                result.append({**{column: row[column] for column, _, _ in keys}, "count": count})
+
+        order = (["bucket"] if bucket else []) + list(dimensions)
+        # NULL идёт первым, как в ORDER BY SQLite
+        result.sort(key=lambda item: [(item[column] is not None, item[column] or "") for column in order])
+        return result
+
+    @staticmethod
+    def _count_groups(keys, total: int) -> List[Tuple[int, int]]:
+        """(составной ключ, число строк) для непустых групп; ключ - смешанная система счисления по keys"""
+        # Без группировки - одна строка, как у агрегата SQL по пустой выборке
+        if not keys:
+            return [(0, total)]
+        combined = np.zeros(total, dtype=np.int64)
+        cardinality = 1
+        for _, codes, size in keys:
+            combined = combined * size + codes
+            cardinality *= size
+        # Небольшое число возможных ключей - bincount, иначе сортировка
+        if cardinality <= max(4 * total, 1 << 16):
+            counts = np.bincount(combined, minlength=cardinality)
+            present = np.flatnonzero(counts)
+            return list(zip(present.tolist(), counts[present].tolist()))
+        values, counts = np.unique(combined, return_counts=True)
+        return list(zip(values.tolist(), counts.tolist()))
+
+    def histogram(self, period: str = "day", dimension: Optional[str] = None, **filters) -> List[Dict[str, Any]]:
+        """Ряд по периодам в формате get_attack_trend: (bucket[, dimension], count).
+
+        Для dimension="protocol" считаются цели (NULL-протокол - None).
+        """
+        table = "targets" if dimension in TARGET_DIMENSIONS else "attacks"
+        return self.group_by(table, [dimension] if dimension else [], bucket=period, **filters)
+
+    def stats(self) -> Dict[str, Any]:
+        """Размер снимка: строки, словари, память массивов"""
+        with self._lock:
+            arrays = [self.attack_ts, self.attack_alive, self.target_attack, self.target_port, self.target_alive,
+                      *self.attack_codes.values(), *self.target_codes.values()]
+            return {
+                "attacks": int(self.attack_alive.sum()),
+                "targets": int(self.target_alive.sum()),
+                "version": self.version,
+                "loaded_at": self.loaded_at,
+                "dictionaries": {column: len(dictionary) for column, dictionary in self.dictionaries.items()},
+                "bytes": sum(array.nbytes for array in arrays),
+            }
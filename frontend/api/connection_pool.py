@@ -0,0 +1,194 @@
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+
+class PoolTimeoutError(Exception):
+    """Все соединения пула заняты дольше допустимого времени ожидания"""
+
+
+class PooledConnection:
+    """Обёртка над соединением из пула.
+
+    Повторяет интерфейс sqlite3.Connection, но close() возвращает соединение
+    в пул вместо закрытия, поэтому существующий код вида
+    conn = get_connection() ... conn.close() продолжает работать без изменений.
+    """
+
+    def __init__(self, pool: "ConnectionPool", conn: sqlite3.Connection):
+        self._pool = pool
+        self._conn = conn
+        self._released = False
+
+    @property
+    def raw(self) -> sqlite3.Connection:
+        return self._conn
+
+    def close(self):
+        """Возврат соединения в пул"""
+        if not self._released:
+            self._released = True
+            self._pool.release(self._conn)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __enter__(self):
+        return self._conn.__enter__()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return self._conn.__exit__(exc_type, exc_value, traceback)
+
+
+class ConnectionPool:
+    """Потокобезопасный пул SQLite соединений.
+
+    - внутри одного потока вложенные запросы получают то же соединение;
+    - общее число открытых соединений ограничено max_size;
+    - соединение из пула проверяется перед выдачей (health check);
+    - счётчики hits/misses доступны через stats().
+    """
+
+    def __init__(self, database: str, max_size: int = 5, timeout: float = 30.0,
+                 on_connect: Optional[Callable[[sqlite3.Connection], None]] = None):
+        self.database = database
+        self.max_size = max_size
+        self.timeout = timeout
+        self.on_connect = on_connect
+
+        self._lock = threading.Condition()
+        self._idle: List[sqlite3.Connection] = []
+        self._total = 0
+        self._local = threading.local()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "reused_in_thread": 0,
+            "health_check_failures": 0,
+            "waits": 0,
+            "timeouts": 0,
+        }
+
+    def _create_connection(self) -> sqlite3.Connection:
+        """Открытие нового соединения"""
+        conn = sqlite3.connect(self.database, timeout=self.timeout, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        if self.on_connect is not None:
+            self.on_connect(conn)
+        return conn
+
+    @staticmethod
+    def _is_healthy(conn: sqlite3.Connection) -> bool:
+        """Проверка, что соединение пригодно к работе"""
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    @staticmethod
+    def _discard(conn: sqlite3.Connection):
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    def _checkout(self) -> sqlite3.Connection:
+        """Получение соединения из пула или создание нового"""
+        deadline = time.monotonic() + self.timeout
+        with self._lock:
+            while True:
+                while self._idle:
+                    conn = self._idle.pop()
+                    if self._is_healthy(conn):
+                        self._stats["hits"] += 1
+                        return conn
+                    self._stats["health_check_failures"] += 1
+                    self._total -= 1
+                    self._discard(conn)
+
+                if self._total < self.max_size:
+                    self._total += 1
+                    self._stats["misses"] += 1
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise PoolTimeoutError(
+                        f"No free database connection after {self.timeout:.1f}s (pool size {self.max_size})")
+                self._stats["waits"] += 1
+                self._lock.wait(remaining)
+
+        try:
+            return self._create_connection()
+        except Exception:
+            with self._lock:
+                self._total -= 1
+                self._lock.notify()
+            raise
+
+    def acquire(self) -> sqlite3.Connection:
+        """Выдача соединения текущему потоку (с повторным использованием внутри потока)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            self._local.depth += 1
+            with self._lock:
+                self._stats["reused_in_thread"] += 1
+            return conn
+
+        conn = self._checkout()
+        self._local.conn = conn
+        self._local.depth = 1
+        return conn
+
+    def release(self, conn: sqlite3.Connection):
+        """Возврат соединения; в пул оно попадает после последнего release в потоке"""
+        if getattr(self._local, "conn", None) is conn:
+            self._local.depth -= 1
+            if self._local.depth > 0:
+                return
+            self._local.conn = None
+
+        if conn.in_transaction:
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                pass
+
+        with self._lock:
+            self._idle.append(conn)
+            self._lock.notify()
+
+    def get(self) -> PooledConnection:
+        """Соединение в обёртке, у которой close() возвращает его в пул"""
+        return PooledConnection(self, self.acquire())
+
+    @contextmanager
+    def connection(self):
+        """Контекстный менеджер: выдаёт соединение и возвращает его в пул"""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close_all(self):
+        """Закрытие всех свободных соединений"""
+        with self._lock:
+            while self._idle:
+                self._discard(self._idle.pop())
+                self._total -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Счётчики пула"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["open"] = self._total
+            stats["idle"] = len(self._idle)
+            stats["max_size"] = self.max_size
+        requests = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = stats["hits"] / requests if requests else 0.0
+        return stats
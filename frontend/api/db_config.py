@@ -1,14 +1,108 @@
 import os
 from dataclasses import dataclass
 from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Профили PRAGMA, применяемые к каждому новому соединению пула
+# (foreign_keys в них нет: каскадное удаление целей нужно при любом профиле)
+PRAGMA_PROFILES: Dict[str, Dict[str, Any]] = {
+    # Поведение SQLite по умолчанию (rollback journal)
+    "default": {
+        "journal_mode": "DELETE",
+        "synchronous": "FULL",
+        "cache_size": -2000,
+        "mmap_size": 0,
+        "temp_store": "DEFAULT",
+        "busy_timeout": 5000,
+    },
+    # WAL: читатели не блокируются писателем, fsync только на checkpoint
+    "wal": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -64000,
+        "mmap_size": 268435456,
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+    },
+    # WAL с fsync на каждый commit
+    "durable": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "cache_size": -16000,
+        "mmap_size": 0,
+        "temp_store": "DEFAULT",
+        "busy_timeout": 10000,
+    },
+}
+
+LIST_STORAGES = ("json", "normalized")
+
+
+def _env_int(name: str) -> Optional[int]:
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else None
+
 
 @dataclass
 class DatabaseConfig:
     database: str = os.getenv("DB_NAME", "cybersecurity.db")
-    
+    pool_size: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    pool_timeout: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+    # Профиль производительности и точечные переопределения его PRAGMA
+    profile: str = os.getenv("DB_PROFILE", "wal")
+    journal_mode: Optional[str] = os.getenv("DB_JOURNAL_MODE")
+    synchronous: Optional[str] = os.getenv("DB_SYNCHRONOUS")
+    cache_size: Optional[int] = _env_int("DB_CACHE_SIZE")
+    mmap_size: Optional[int] = _env_int("DB_MMAP_SIZE")
+    temp_store: Optional[str] = os.getenv("DB_TEMP_STORE")
+    busy_timeout: Optional[int] = _env_int("DB_BUSY_TIMEOUT")
+
+    # Хранение журнала изменений: не больше N записей и не старше N дней
+    change_log_retention: int = int(os.getenv("DB_CHANGE_LOG_RETENTION", "50000"))
+    change_log_max_age_days: float = float(os.getenv("DB_CHANGE_LOG_MAX_AGE_DAYS", "7"))
+
+    # Откуда читаются списки атак: "json" - из JSON-колонок attacks,
+    # "normalized" - из дочерних таблиц attack_source_ips/attack_ports/attack_mitigations
+    list_storage: str = os.getenv("DB_LIST_STORAGE", "json")
+
+    # Произвольные запросы инструментов SQL (api/query_executor.py): рабочие
+    # потоки, лимит времени в секундах (0 - без лимита) и строк результата
+    query_workers: int = int(os.getenv("DB_QUERY_WORKERS", "2"))
+    query_timeout: float = float(os.getenv("DB_QUERY_TIMEOUT", "30"))
+    query_max_rows: int = int(os.getenv("DB_QUERY_MAX_ROWS", "10000"))
+    # Кэш результатов читающих запросов (api/result_cache.py), байт; 0 - выключен
+    result_cache_bytes: int = int(os.getenv("DB_RESULT_CACHE_BYTES", str(32 * 1024 * 1024)))
+
     @property
     def connection_string(self):
         db_path = Path(__file__).parent.parent / self.database
         return f"sqlite:///{db_path}"
 
-db_config = DatabaseConfig()
\ No newline at end of file
+    @property
+    def pragmas(self) -> Dict[str, Any]:
+        """Итоговые значения PRAGMA: профиль плюс переопределения"""
+        if self.profile not in PRAGMA_PROFILES:
+            raise ValueError(f"Unknown database profile '{self.profile}', "
+                             f"expected one of: {', '.join(PRAGMA_PROFILES)}")
+
+        settings = dict(PRAGMA_PROFILES[self.profile])
+        for name in settings:
+            override = getattr(self, name)
+            if override is not None:
+                settings[name] = override
+        return settings
+
+    @property
+    def normalized_lists(self) -> bool:
+        if self.list_storage not in LIST_STORAGES:
+            raise ValueError(f"Unknown list storage '{self.list_storage}', "
+                             f"expected one of: {', '.join(LIST_STORAGES)}")
+        return self.list_storage == "normalized"
+
+    def pragma_statements(self) -> List[str]:
+        """PRAGMA для выполнения на новом соединении; внешние ключи включены всегда"""
+        return [f"PRAGMA {name} = {value}" for name, value in self.pragmas.items()] + ["PRAGMA foreign_keys = ON"]
+
+
+db_config = DatabaseConfig()
@@ -1,82 +1,214 @@
 import sqlite3
 import json
-from typing import List, Dict, Any, Optional
-from datetime import datetime
+import logging
+import re
+import threading
+import uuid
+from collections.abc import Mapping
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Optional, Tuple
+from datetime import date, datetime
 from pathlib import Path
 from .db_config import db_config
+from .connection_pool import ConnectionPool
+from .migrations import (CATEGORY_LOOKUPS, DETAIL_VIEWS, LIST_TABLES, SERVICE_TABLES, TRIGRAM_INDEXES, apply_migrations,
+                         DEFERRED_INSERT_TRIGGERS, MigrationError, get_schema_version, list_rebuild_statements,
+                         rollup_rebuild_statements, search_rebuild_statements, search_refresh_statements,
+                         stats_rebuild_statements)
+from .rollups import trend_query
+from .result_cache import ResultCache, TableDependencies, is_cacheable, is_schema_change, normalize_sql, sql_identifiers
+from .sql_functions import epoch_seconds, ip_bounds, register_functions
+from models.attack import Attack, Target, parse_json_list
+
+logger = logging.getLogger(__name__)
+
+# Теневые таблицы виртуальной таблицы FTS5 <имя>: <имя>_<суффикс>
+FTS5_SHADOW_SUFFIXES = ("data", "idx", "content", "docsize", "config")
+
+# Порядок страниц и списков атак: по индексам (..., created_at, id) без сортировки
+ATTACK_ORDER = "ORDER BY a.created_at DESC, a.id DESC"
+# Записи читаются из представлений с текстовыми значениями категорий
+ATTACK_BY_ID_SQL = "SELECT * FROM attack_details WHERE id = ?"
+TARGETS_BY_ATTACK_SQL = "SELECT * FROM target_details WHERE attack_id = ? ORDER BY id"
+
+
+def _where(attack_filter: str) -> str:
+    return f"WHERE {attack_filter}" if attack_filter else ""
+
+
+def attacks_sql(attack_filter: str = "") -> str:
+    """Атаки под условием attack_filter (алиас a) в порядке страниц"""
+    return f"SELECT a.* FROM attack_details a {_where(attack_filter)} {ATTACK_ORDER}"
+
+
+def targets_sql(attack_filter: str = "") -> str:
+    """Цели атак под условием attack_filter; пустое условие - все цели"""
+    if not attack_filter:
+        return "SELECT * FROM target_details ORDER BY id"
+    return (f"SELECT t.* FROM target_details t WHERE t.attack_id IN (SELECT a.id FROM attacks a WHERE {attack_filter}) "
+            f"ORDER BY t.id")
+
+
+def targets_in_sql(count: int) -> str:
+    """Цели атак из списка count ID"""
+    return f"SELECT * FROM target_details WHERE attack_id IN ({','.join(['?'] * count)}) ORDER BY id"
+
+
+def page_sql(attack_filter: str, after: bool = False) -> str:
+    """Страница атак (параметры: фильтр, [created_at, id после after], LIMIT)"""
+    conditions = [attack_filter or "1=1"]
+    if after:
+        conditions.append("(a.created_at, a.id) < (?, ?)")
+    return f"SELECT a.* FROM attack_details a WHERE {' AND '.join(conditions)} {ATTACK_ORDER} LIMIT ?"
+
+
+def count_sql(attack_filter: str) -> str:
+    return f"SELECT COUNT(*) FROM attacks a {_where(attack_filter)}"
+
+
+def key_at_sql(attack_filter: str) -> str:
+    """Ключ (created_at, id) атаки на позиции OFFSET ?"""
+    return f"SELECT a.created_at, a.id FROM attacks a {_where(attack_filter)} {ATTACK_ORDER} LIMIT 1 OFFSET ?"
+
+
+def versions_sql(attack_filter: str) -> str:
+    return f"SELECT a.id, a.updated_at FROM attacks a {_where(attack_filter)} {ATTACK_ORDER}"
+
+
+def list_values_sql(table: str, value_column: str, count: int) -> str:
+    """Элементы списков count атак из дочерней таблицы (режим normalized)"""
+    return (f"SELECT attack_id, {value_column} FROM {table} WHERE attack_id IN ({','.join(['?'] * count)}) "
+            f"ORDER BY attack_id, position")
+
+
+try:
+    from .columnar import ColumnarSnapshot
+except ImportError:  # без NumPy аналитика считается только через SQL
+    ColumnarSnapshot = None
 
 class DatabaseManager:
     def __init__(self, config=None):
         self.config = config or db_config
         self.db_path = Path(__file__).parent.parent / self.config.database
+        self.pool = ConnectionPool(str(self.db_path),
+                                   max_size=self.config.pool_size,
+                                   timeout=self.config.pool_timeout,
+                                   on_connect=self._configure_connection)
+        self.normalized_lists = self.config.normalized_lists
+        self.result_cache = ResultCache(self.config.result_cache_bytes)
+        # Зависимости таблиц для кэша и версии схемы/журнала, при которых они прочитаны
+        self._cache_lock = threading.Lock()
+        self._cache_dependencies: Optional[TableDependencies] = None
+        self._cache_schema_version: Optional[int] = None
+        self._cache_change_version: Optional[int] = None
+        self._snapshot = None
+        self.upgrade_schema()
+
+    def _configure_connection(self, conn):
+        """Настройка нового соединения пула: PRAGMA профиля производительности и функции SQL"""
+        for statement in self.config.pragma_statements():
+            conn.execute(statement)
+        register_functions(conn)
 
     def get_connection(self):
-        """Получение соединения с SQLite"""
-        conn = sqlite3.connect(str(self.db_path))
-        conn.row_factory = sqlite3.Row
-        return conn
+        """Получение соединения с SQLite из пула (close() возвращает его в пул)"""
+        return self.pool.get()
+
+    def connection(self):
+        """Контекстный менеджер для работы с соединением из пула"""
+        return self.pool.connection()
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Статистика пула соединений"""
+        return self.pool.stats()
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Статистика кэша результатов (hits/misses/evictions и т.д.)"""
+        return self.result_cache.stats()
+
+    def cached_query(self, conn, sql: str, params, compute: Callable[[], Any],
+                     variant: Any = None) -> Tuple[Any, bool]:
+        """Результат читающего запроса из кэша или compute() с сохранением в кэш.
+
+        Ключ - нормализованный SQL, параметры и variant (разные формы одного
+        запроса, например лимит строк). Пишущие и недетерминированные
+        запросы не кэшируются. Возвращает (результат, взят ли он из кэша);
+        результат из кэша общий - вызывающий код не должен его менять.
+        """
+        if not self.result_cache.enabled or not is_cacheable(sql):
+            return compute(), False
+
+        dependencies = self._table_dependencies(conn)
+        params = tuple(sorted(params.items())) if isinstance(params, dict) else tuple(params)
+        key = (normalize_sql(sql), params, variant)
+        # Поколение - до чтения: запись, сбросившая кэш во время compute(),
+        # не даст сохранить результат, прочитанный до неё
+        generation = self.result_cache.generation
+        hit, value = self.result_cache.get(key)
+        if hit:
+            return value, True
+        value = compute()
+        self.result_cache.put(key, value, dependencies.read_tables(sql), generation)
+        return value, False
+
+    def invalidate_cache(self, tables: Optional[Iterable[str]] = None, conn=None):
+        """Сброс кэша результатов после записи в tables (None - весь кэш, например после DDL).
+
+        Сбрасываются и результаты по таблицам, которые обновляют триггеры tables.
+        """
+        if tables is None or not self.result_cache.enabled:
+            self.result_cache.invalidate()
+            return
+        if conn is None:
+            with self.connection() as conn:
+                dependencies = self._table_dependencies(conn)
+        else:
+            dependencies = self._table_dependencies(conn)
+        self.result_cache.invalidate(dependencies.written_tables(tables))
+
+    def invalidate_cache_for(self, sql: str, conn=None):
+        """Сброс кэша после произвольного пишущего SQL: DDL - весь кэш, иначе по упомянутым таблицам"""
+        if is_schema_change(sql):
+            self.invalidate_cache()
+        else:
+            self.invalidate_cache(sql_identifiers(sql), conn)
+
+    def _table_dependencies(self, conn) -> TableDependencies:
+        """Зависимости таблиц по текущей схеме.
+
+        Смена схемы (PRAGMA schema_version) сбрасывает весь кэш. Новая версия
+        журнала изменений - запись в attacks/targets, в том числе мимо
+        DatabaseManager - сбрасывает зависящие от них результаты.
+        """
+        schema_version = conn.execute("PRAGMA schema_version").fetchone()[0]
+        try:
+            change_version = self._latest_change_version(conn)
+        except sqlite3.OperationalError:
+            # Схема ещё не создана (нет sqlite_sequence)
+            change_version = 0
+        with self._cache_lock:
+            if schema_version != self._cache_schema_version:
+                rows = conn.execute("SELECT type, name, tbl_name, sql FROM sqlite_master").fetchall()
+                self._cache_dependencies = TableDependencies(rows)
+                self._cache_schema_version = schema_version
+                self.result_cache.invalidate()
+            elif change_version != self._cache_change_version:
+                self.result_cache.invalidate(self._cache_dependencies.written_tables(("attacks", "targets")))
+            self._cache_change_version = change_version
+            return self._cache_dependencies
 
     def _parse_json_field(self, field_value):
         """Парсинг JSON полей из БД"""
-        if isinstance(field_value, (list, dict)):
-            return field_value
-        elif field_value:
-            try:
-                return json.loads(field_value)
-            except (json.JSONDecodeError, TypeError):
-                return []
-        else:
-            return []
+        return parse_json_list(field_value)
 
     def initialize_database(self) -> Dict[str, Any]:
         """Создание таблиц в SQLite"""
         conn = None
         try:
             conn = self.get_connection()
-            cursor = conn.cursor()
+            applied = apply_migrations(conn)
+            if applied:
+                logger.info("Applied schema migrations: %s", applied)
 
-            # Таблица атак
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS attacks (
-                    id TEXT PRIMARY KEY,
-                    name TEXT NOT NULL,
-                    frequency TEXT NOT NULL,
-                    danger TEXT NOT NULL,
-                    attack_type TEXT NOT NULL,
-                    source_ips TEXT NOT NULL,
-                    affected_ports TEXT NOT NULL,
-                    mitigation_strategies TEXT NOT NULL,
-                    created_at TEXT NOT NULL,
-                    updated_at TEXT NOT NULL
-                )
-            """)
-
-            # Таблица целей
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS targets (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    attack_id TEXT NOT NULL,
-                    target_ip TEXT,
-                    target_domain TEXT,
-                    port INTEGER DEFAULT 80,
-                    protocol TEXT DEFAULT 'tcp',
-                    tags TEXT,
-                    FOREIGN KEY (attack_id) REFERENCES attacks (id) ON DELETE CASCADE
-                )
-            """)
-            
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS custom_types (
-                    id TEXT PRIMARY KEY,
-                    name TEXT UNIQUE,
-                    type TEXT,
-                    enum_values TEXT,
-                    created_at TEXT
-                )
-            """)
-
-
-            conn.commit()
             return {"success": True, "message": "Database tables created successfully"}
 
         except Exception as e:
@@ -85,6 +217,31 @@ class DatabaseManager:
             if conn is not None:
                 conn.close()
 
+    def upgrade_schema(self):
+        """Обновление схемы существующей БД на месте (новую БД создаёт initialize_database).
+
+        Ошибка миграции пробрасывается (MigrationError): работа со схемой
+        старой версии ломает фильтры и поиск, которые рассчитаны на последнюю.
+        """
+        with self.connection() as conn:
+            exists = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type='table' AND name='attacks'"
+            ).fetchone()
+            if exists:
+                try:
+                    applied = apply_migrations(conn)
+                except MigrationError as e:
+                    logger.error("Error upgrading database schema: %s", e)
+                    raise
+                if applied:
+                    logger.info("Applied schema migrations: %s", applied)
+                # Атаки, записанные другими соединениями, пока приложение не работало
+                self.flush_index_queue(conn)
+                conn.commit()
+                # Прерванный массовый импорт: триггеры не вернулись, индексы неполные
+                if self.restore_deferred_indexes(conn):
+                    logger.info("Restored index triggers deferred by an interrupted bulk import")
+
     def check_database_status(self) -> Dict[str, Any]:
         """Проверка статуса БД и существования таблиц"""
         conn = None
@@ -105,7 +262,8 @@ class DatabaseManager:
                 "data": {
                     "tablesExist": tables_exist,
                     "database": str(self.db_path),
-                    "tables": [table[0] for table in tables]
+                    "tables": [table[0] for table in tables],
+                    "schemaVersion": get_schema_version(conn)
                 }
             }
         except Exception as e:
@@ -118,116 +276,291 @@ class DatabaseManager:
             if conn is not None:
                 conn.close()
 
-    def get_all_attacks(self) -> List[Dict[str, Any]]:
-        """Получение всех атак с целями"""
+    def get_user_tables(self) -> List[str]:
+        """Таблицы и представления для инструментов SQL, по имени.
+
+        Не показываются таблицы SQLite (sqlite_*), виртуальные таблицы FTS5
+        с их теневыми таблицами и служебные таблицы миграций (SERVICE_TABLES).
+        """
+        with self.connection() as conn:
+            rows = conn.execute("SELECT name, sql FROM sqlite_master WHERE type IN ('table', 'view') "
+                                "AND name NOT LIKE 'sqlite\\_%' ESCAPE '\\' ORDER BY name").fetchall()
+        virtual = [name for name, sql in rows if (sql or "").upper().startswith("CREATE VIRTUAL TABLE")]
+        return [name for name, _ in rows
+                if name not in SERVICE_TABLES and name not in virtual
+                and not any(name.startswith(f"{table}_") and name[len(table) + 1:] in FTS5_SHADOW_SUFFIXES
+                            for table in virtual)]
+
+    @staticmethod
+    def _record_cursor(cursor, record_class) -> sqlite3.Cursor:
+        """Курсор того же соединения, строки которого сразу собираются в записи record_class"""
+        record_cursor = cursor.connection.cursor()
+        record_cursor.row_factory = record_class.row_factory()
+        return record_cursor
+
+    def _prepare_attack(self, attack: Attack) -> Attack:
+        """Атака из БД; в режиме normalized списки заполнит _attach_lists"""
+        if self.normalized_lists:
+            for column in LIST_TABLES:
+                attack[column] = []
+        return attack
+
+    def _attack_from_row(self, attack_row) -> Attack:
+        """Преобразование строки attacks (sqlite3.Row) в запись атаки"""
+        return self._prepare_attack(Attack.from_row(attack_row))
+
+    def _attach_lists(self, cursor, attacks: List[Attack]):
+        """Сборка списков атак из дочерних таблиц (режим list_storage = "normalized")"""
+        if not self.normalized_lists or not attacks:
+            return
+        attacks_by_id = {attack["id"]: attack for attack in attacks}
+        attack_ids = list(attacks_by_id)
+        # Пачками, чтобы не упереться в лимит параметров SQLite
+        for start in range(0, len(attack_ids), 500):
+            chunk = attack_ids[start:start + 500]
+            for column, (table, value_column, _) in LIST_TABLES.items():
+                cursor.execute(list_values_sql(table, value_column, len(chunk)), chunk)
+                for attack_id, value in cursor:
+                    attacks_by_id[attack_id][column].append(value)
+
+    def _target_from_row(self, target_row) -> Target:
+        """Преобразование строки targets (sqlite3.Row) в запись цели (без внутренних ID)"""
+        return Target.from_row(target_row)
+
+    def _group_targets(self, cursor) -> Dict[str, List[Target]]:
+        """Цели из выполненного запроса, сгруппированные по attack_id"""
+        targets_by_attack: Dict[str, List[Target]] = {}
+        for target in cursor:
+            targets_by_attack.setdefault(target.attack_id, []).append(target)
+        return targets_by_attack
+
+    def _fetch_targets(self, cursor, attack_filter: str = "", params=()) -> Dict[str, List[Target]]:
+        """Загрузка целей одним запросом с группировкой по attack_id.
+
+        attack_filter - условие WHERE по таблице attacks (алиас a), которым
+        ограничивается набор атак; пустая строка означает все цели.
+        """
+        cursor = self._record_cursor(cursor, Target)
+        cursor.execute(targets_sql(attack_filter), params if attack_filter else ())
+        return self._group_targets(cursor)
+
+    def _load_attacks(self, cursor, attack_filter: str = "", params=()) -> List[Attack]:
+        """Пакетная загрузка атак с целями за постоянное число запросов"""
+        attack_cursor = self._record_cursor(cursor, Attack)
+        attack_cursor.execute(attacks_sql(attack_filter), params)
+        attacks = attack_cursor.fetchall()
+        if not attacks:
+            return []
+
+        targets_by_attack = self._fetch_targets(cursor, attack_filter, params)
+
+        for attack in attacks:
+            self._prepare_attack(attack)
+            attack.targets = targets_by_attack.get(attack.id, [])
+        self._attach_lists(cursor, attacks)
+        return attacks
+
+    def _fetch_attacks_page(self, cursor, attack_filter: str, params, page_size: int,
+                            after: Optional[Tuple[str, str]] = None) -> List[Attack]:
+        """Одна страница атак с целями (keyset-пагинация, ошибки не перехватываются).
+
+        Порядок - created_at DESC, id DESC; after - ключ (created_at, id)
+        последней атаки предыдущей страницы. Страница читается диапазоном по
+        индексу, поэтому её стоимость не зависит от того, насколько далеко
+        продвинулся обход.
+        """
+        page_params = list(params)
+        if after is not None:
+            page_params.extend(after)
+        page_params.append(page_size)
+
+        attack_cursor = self._record_cursor(cursor, Attack)
+        attack_cursor.execute(page_sql(attack_filter, after is not None), page_params)
+        attacks = attack_cursor.fetchall()
+        if not attacks:
+            return []
+
+        # Цели только для атак этой страницы
+        attack_ids = [attack.id for attack in attacks]
+        target_cursor = self._record_cursor(cursor, Target)
+        target_cursor.execute(targets_in_sql(len(attack_ids)), attack_ids)
+        targets_by_attack = self._group_targets(target_cursor)
+
+        for attack in attacks:
+            self._prepare_attack(attack)
+            attack.targets = targets_by_attack.get(attack.id, [])
+        self._attach_lists(cursor, attacks)
+        return attacks
+
+    def get_attacks_page(self, filters: Optional[Dict[str, List[str]]] = None, page_size: int = 100,
+                         after: Optional[Tuple[str, str]] = None) -> List[Dict[str, Any]]:
+        """Страница атак после ключа after = (created_at, id).
+
+        filters - аргументы filter_attacks (frequencies, danger_levels,
+        attack_types, protocols, date_from, date_to и т.д.). Ключ следующей страницы - created_at и id
+        последней атаки в результате; страница короче page_size - последняя.
+        """
         conn = None
         try:
-            print("🔍 DEBUG: Connecting to database...")
             conn = self.get_connection()
-            cursor = conn.cursor()
+            attack_filter, params = self._build_attack_filter(**(filters or {}))
+            return self._fetch_attacks_page(conn.cursor(), attack_filter, params, page_size, after)
 
-            # Получаем все атаки
-            cursor.execute("SELECT * FROM attacks ORDER BY created_at DESC")
-            attacks_data = cursor.fetchall()
-            print(f"🔍 DEBUG: Found {len(attacks_data)} attacks")
+        except Exception as e:
+            logger.error("Error fetching attacks page: %s", e)
+            return []
+        finally:
+            if conn is not None:
+                conn.close()
 
-            attacks = []
-            for i, attack_row in enumerate(attacks_data):
-                print(f"🔍 DEBUG: Processing attack {i+1}")
-                try:
-                    attack = dict(attack_row)
-                    print(f"🔍 DEBUG: Attack keys: {list(attack.keys())}")
-
-                    # Детально отлаживаем каждое поле
-                    for key, value in attack.items():
-                        print(f"🔍 DEBUG: Field {key}: type={type(value)}, value={repr(value)}")
-
-                    # Парсим JSON поля
-                    print("🔍 DEBUG: Parsing source_ips...")
-                    attack["source_ips"] = self._parse_json_field(attack["source_ips"])
-                    print("🔍 DEBUG: Parsing affected_ports...")
-                    attack["affected_ports"] = self._parse_json_field(attack["affected_ports"])
-                    print("🔍 DEBUG: Parsing mitigation_strategies...")
-                    attack["mitigation_strategies"] = self._parse_json_field(attack["mitigation_strategies"])
-
-                    # Получаем цели для этой атаки
-                    cursor.execute("SELECT * FROM targets WHERE attack_id = ?", (attack["id"],))
-                    targets_data = cursor.fetchall()
-                    print(f"🔍 DEBUG: Found {len(targets_data)} targets for attack")
-
-                    targets = []
-                    for j, target_row in enumerate(targets_data):
-                        print(f"🔍 DEBUG: Processing target {j+1}")
-                        target = dict(target_row)
-                        
-                        target["tags"] = self._parse_json_field(target["tags"])
-                        # Удаляем внутренний ID
-                        if "id" in target:
-                            del target["id"]
-                        if "attack_id" in target:
-                            del target["attack_id"]
-                        targets.append(target)
-
-                    attack["targets"] = targets
-                    attacks.append(attack)
-                    print(f"🔍 DEBUG: Successfully processed attack {i+1}")
-                    
-                except Exception as e:
-                    print(f"❌ DEBUG: Error processing attack {i+1}: {e}")
-                    import traceback
-                    traceback.print_exc()
-                    continue
+    def count_attacks(self, filters: Optional[Dict[str, List[str]]] = None) -> int:
+        """Количество атак, подходящих под фильтры"""
+        conn = None
+        try:
+            conn = self.get_connection()
+            attack_filter, params = self._build_attack_filter(**(filters or {}))
+            row = conn.execute(count_sql(attack_filter), params).fetchone()
+            return row[0]
+
+        except Exception as e:
+            logger.error("Error counting attacks: %s", e)
+            return 0
+        finally:
+            if conn is not None:
+                conn.close()
 
-            print(f"🔍 DEBUG: Successfully processed {len(attacks)} attacks")
+    def get_attack_key_at(self, filters: Optional[Dict[str, List[str]]] = None,
+                          position: int = 0) -> Optional[Tuple[str, str]]:
+        """Ключ (created_at, id) атаки на позиции position в порядке страниц.
+
+        Нужен для перехода к произвольной странице без чтения предыдущих:
+        ключ берётся из индекса, строки атак при этом не читаются.
+        """
+        conn = None
+        try:
+            conn = self.get_connection()
+            attack_filter, params = self._build_attack_filter(**(filters or {}))
+            row = conn.execute(key_at_sql(attack_filter), list(params) + [position]).fetchone()
+            return (row["created_at"], row["id"]) if row else None
+
+        except Exception as e:
+            logger.error("Error fetching attack key at %s: %s", position, e)
+            return None
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def get_attack_versions(self, filters: Optional[Dict[str, List[str]]] = None) -> List[Tuple[str, str]]:
+        """Пары (id, updated_at) атак в порядке страниц - без JSON полей и целей.
+
+        Используется для инкрементального обновления: сравнение версий
+        показывает, какие атаки добавлены, изменены или удалены.
+        """
+        conn = None
+        try:
+            conn = self.get_connection()
+            attack_filter, params = self._build_attack_filter(**(filters or {}))
+            rows = conn.execute(versions_sql(attack_filter), params).fetchall()
+            return [(row["id"], row["updated_at"]) for row in rows]
+
+        except Exception as e:
+            logger.error("Error fetching attack versions: %s", e)
+            return []
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def get_attacks_by_ids(self, attack_ids: List[str],
+                           filters: Optional[Dict[str, List[str]]] = None) -> Dict[str, Dict[str, Any]]:
+        """Атаки с целями по списку ID (словарь id -> атака).
+
+        С filters возвращаются только атаки, подходящие под фильтры.
+        """
+        conn = None
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            attack_filter, filter_params = self._build_attack_filter(**(filters or {}))
+            attacks: Dict[str, Dict[str, Any]] = {}
+            # Пачками, чтобы не упереться в лимит параметров SQLite
+            for start in range(0, len(attack_ids), 500):
+                chunk = list(attack_ids[start:start + 500])
+                placeholders = ",".join(["?"] * len(chunk))
+                condition = f"({attack_filter}) AND a.id IN ({placeholders})"
+                for attack in self._load_attacks(cursor, condition, filter_params + chunk):
+                    attacks[attack["id"]] = attack
             return attacks
 
         except Exception as e:
-            print(f"❌ DEBUG: Error in get_all_attacks: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.error("Error fetching attacks by ids: %s", e)
+            return {}
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def iter_attack_pages(self, filters: Optional[Dict[str, List[str]]] = None, page_size: int = 500,
+                          after: Optional[Tuple[str, str]] = None) -> Iterator[List[Dict[str, Any]]]:
+        """Постраничный обход атак; в памяти одновременно только одна страница.
+
+        Соединение берётся из пула на время чтения одной страницы и не
+        удерживается между итерациями. Ошибки БД пробрасываются вызывающему.
+        """
+        attack_filter, params = self._build_attack_filter(**(filters or {}))
+        while True:
+            with self.connection() as conn:
+                page = self._fetch_attacks_page(conn.cursor(), attack_filter, params, page_size, after)
+            if page:
+                yield page
+            if len(page) < page_size:
+                return
+            after = (page[-1]["created_at"], page[-1]["id"])
+
+    def iter_attacks(self, filters: Optional[Dict[str, List[str]]] = None, page_size: int = 500,
+                     after: Optional[Tuple[str, str]] = None) -> Iterator[Dict[str, Any]]:
+        """Потоковый обход атак по одной (см. iter_attack_pages)"""
+        for page in self.iter_attack_pages(filters, page_size, after):
+            yield from page
+
+    def get_all_attacks(self) -> List[Dict[str, Any]]:
+        """Получение всех атак с целями"""
+        conn = None
+        try:
+            conn = self.get_connection()
+            return self._load_attacks(conn.cursor())
+
+        except Exception as e:
+            logger.error("Error in get_all_attacks: %s", e)
             return []
         finally:
             if conn is not None:
                 conn.close()
-            
+
     def get_attack(self, attack_id: str) -> Optional[Dict[str, Any]]:
-        """Получение конкретной атаки по ID"""
+        """Получение конкретной атаки по ID (обычный словарь, сериализуемый в JSON)"""
         conn = None
         try:
             conn = self.get_connection()
             cursor = conn.cursor()
 
             # Получаем атаку
-            cursor.execute("SELECT * FROM attacks WHERE id = ?", (attack_id,))
-            attack_row = cursor.fetchone()
+            attack_cursor = self._record_cursor(cursor, Attack)
+            attack_cursor.execute(ATTACK_BY_ID_SQL, (attack_id,))
+            attack = attack_cursor.fetchone()
 
-            if not attack_row:
+            if attack is None:
                 return None
 
-            attack = dict(attack_row)
-
-            # Парсим JSON поля
-            attack["source_ips"] = self._parse_json_field(attack["source_ips"])
-            attack["affected_ports"] = self._parse_json_field(attack["affected_ports"])
-            attack["mitigation_strategies"] = self._parse_json_field(attack["mitigation_strategies"])
+            self._prepare_attack(attack)
+            self._attach_lists(cursor, [attack])
 
             # Получаем цели
-            cursor.execute("SELECT * FROM targets WHERE attack_id = ?", (attack_id,))
-            targets_data = cursor.fetchall()
-
-            targets = []
-            for target_row in targets_data:
-                target = dict(target_row)
-                target["tags"] = self._parse_json_field(target["tags"])
-                del target["id"]
-                del target["attack_id"]
-                targets.append(target)
-
-            attack["targets"] = targets
-            return attack
+            target_cursor = self._record_cursor(cursor, Target)
+            target_cursor.execute(TARGETS_BY_ATTACK_SQL, (attack_id,))
+            attack.targets = target_cursor.fetchall()
+            return attack.to_dict()
 
         except Exception as e:
-            print(f"Error fetching attack {attack_id}: {e}")
+            logger.error("Error fetching attack %s: %s", attack_id, e)
             return None
         finally:
             if conn is not None:
@@ -243,22 +576,22 @@ class DatabaseManager:
             # Подготавливаем данные для вставки
             attack_id = attack_data.get("id")
             if not attack_id:
-                import uuid
                 attack_id = str(uuid.uuid4())
 
             current_time = datetime.now().isoformat()
+            resolve = self._category_resolver(conn)
 
             # Вставляем атаку
             cursor.execute("""
                 INSERT INTO attacks 
-                (id, name, frequency, danger, attack_type, source_ips, affected_ports, mitigation_strategies, created_at, updated_at)
+                (id, name, frequency_id, danger_id, attack_type_id, source_ips, affected_ports, mitigation_strategies, created_at, updated_at)
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """, (
                 attack_id,
                 attack_data["name"],
-                attack_data["frequency"],
-                attack_data["danger"],
-                attack_data["attack_type"],
+                resolve("frequency", attack_data["frequency"]),
+                resolve("danger", attack_data["danger"]),
+                resolve("attack_type", attack_data["attack_type"]),
                 json.dumps(attack_data["source_ips"]),
                 json.dumps(attack_data["affected_ports"]),
                 json.dumps(attack_data["mitigation_strategies"]),
@@ -270,18 +603,20 @@ class DatabaseManager:
             for target_data in attack_data.get("targets", []):
                 cursor.execute("""
                     INSERT INTO targets 
-                    (attack_id, target_ip, target_domain, port, protocol, tags)
+                    (attack_id, target_ip, target_domain, port, protocol_id, tags)
                     VALUES (?, ?, ?, ?, ?, ?)
                 """, (
                     attack_id,
                     target_data.get("target_ip", ""),
                     target_data.get("target_domain", ""),
                     target_data.get("port", 80),
-                    target_data.get("protocol", "tcp"),
+                    resolve("protocol", target_data.get("protocol", "tcp")),
                     json.dumps(target_data.get("tags", []))
                 ))
 
+            self.flush_index_queue(conn)
             conn.commit()
+            self.invalidate_cache(("attacks", "targets"), conn)
 
             return {
                 "success": True,
@@ -298,6 +633,246 @@ class DatabaseManager:
             if conn is not None:
                 conn.close()
 
+    @staticmethod
+    def _category_resolver(conn) -> Callable[[str, Any], Optional[int]]:
+        """resolve(column, value) - id значения категории в справочнике.
+
+        Неизвестное значение добавляется в справочник последним по рангу в
+        транзакции записи. Найденные id запоминаются, поэтому после отката
+        транзакции нужен новый resolve.
+        """
+        ids: Dict[Tuple[str, Any], int] = {}
+
+        def resolve(column: str, value: Any) -> Optional[int]:
+            if value is None:
+                return None
+            key = (column, value)
+            if key not in ids:
+                lookup = CATEGORY_LOOKUPS[column][1]
+                row = conn.execute(f"SELECT id FROM {lookup} WHERE value = ?", (value,)).fetchone()
+                if row is None:
+                    row = conn.execute(f"INSERT INTO {lookup} (value, rank) "
+                                       f"SELECT ?, COALESCE(MAX(rank), 0) + 1 FROM {lookup} RETURNING id",
+                                       (value,)).fetchone()
+                ids[key] = row[0]
+            return ids[key]
+
+        return resolve
+
+    # Максимум ошибок в отчёте bulk_create_attacks (счётчики при этом полные)
+    MAX_REPORTED_ERRORS = 100
+
+    def _attack_rows(self, attack_data: Dict[str, Any], current_time: str, resolve):
+        """Строки attacks и targets для вставки одной атаки (resolve - из _category_resolver)"""
+        attack_id = attack_data.get("id") or str(uuid.uuid4())
+        created_at = attack_data.get("created_at") or current_time
+        attack_row = (
+            attack_id,
+            attack_data["name"],
+            resolve("frequency", attack_data["frequency"]),
+            resolve("danger", attack_data["danger"]),
+            resolve("attack_type", attack_data["attack_type"]),
+            json.dumps(attack_data["source_ips"]),
+            json.dumps(attack_data["affected_ports"]),
+            json.dumps(attack_data["mitigation_strategies"]),
+            created_at,
+            attack_data.get("updated_at") or created_at
+        )
+        target_rows = [(
+            attack_id,
+            target_data.get("target_ip", ""),
+            target_data.get("target_domain", ""),
+            target_data.get("port", 80),
+            resolve("protocol", target_data.get("protocol", "tcp")),
+            json.dumps(target_data.get("tags", []))
+        ) for target_data in attack_data.get("targets", [])]
+        return attack_row, target_rows
+
+    def _insert_rows(self, cursor, attack_rows, target_rows):
+        cursor.executemany("""
+            INSERT INTO attacks 
+            (id, name, frequency_id, danger_id, attack_type_id, source_ips, affected_ports, mitigation_strategies, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, attack_rows)
+        cursor.executemany("""
+            INSERT INTO targets 
+            (attack_id, target_ip, target_domain, port, protocol_id, tags)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, target_rows)
+
+    # Импорт снимает триггеры производных индексов, как только число
+    # вставляемых атак достигает этой доли уже имеющихся: полная пересборка
+    # в конце тогда стоит не больше O(импорта), а построчные триггеры - дороже
+    DEFER_INDEXES_SHARE = 0.2
+
+    def _defer_index_triggers(self, conn):
+        """Снятие DEFERRED_INSERT_TRIGGERS; их SQL сохраняется в deferred_triggers в той же транзакции"""
+        conn.execute("BEGIN IMMEDIATE")
+        placeholders = ",".join(["?"] * len(DEFERRED_INSERT_TRIGGERS))
+        rows = conn.execute(f"SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND name IN ({placeholders})",
+                            DEFERRED_INSERT_TRIGGERS).fetchall()
+        conn.executemany("INSERT OR REPLACE INTO deferred_triggers (name, sql) VALUES (?, ?)",
+                         [tuple(row) for row in rows])
+        for name, _ in rows:
+            conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+        conn.commit()
+
+    def restore_deferred_indexes(self, conn) -> bool:
+        """Возврат триггеров из deferred_triggers и пересборка производных индексов.
+
+        Выполняется одной транзакцией в конце массового импорта, а при запуске -
+        если импорт был прерван. Индексы пересобираются по всем данным, так что
+        записи других соединений за время импорта тоже учитываются. Возвращает
+        False, если отложенных триггеров нет.
+        """
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute("SELECT name, sql FROM deferred_triggers").fetchall()
+            if not rows:
+                conn.rollback()
+                return False
+            existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+            for name, sql in rows:
+                if name not in existing:
+                    conn.execute(sql)
+            conn.execute("DELETE FROM deferred_triggers")
+            for statement in list_rebuild_statements() + stats_rebuild_statements() + rollup_rebuild_statements():
+                conn.execute(statement)
+            self._rebuild_ip_ranges(conn)
+            for statement in search_rebuild_statements():
+                conn.execute(statement)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        self.invalidate_cache()
+        return True
+
+    def bulk_create_attacks(self, attacks: Iterable[Dict[str, Any]], batch_size: int = 5000,
+                            progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+                            defer_indexes: Optional[bool] = None) -> Dict[str, Any]:
+        """Потоковая массовая вставка атак.
+
+        Вход читается по batch_size записей; каждая пачка вставляется через
+        executemany в одной транзакции, без повторного чтения записанных
+        строк. Если пачка не вставилась целиком, она откатывается и
+        повторяется по одной записи (SAVEPOINT на запись), чтобы сохранить
+        корректные записи и указать ошибочные. Ошибка не прерывает загрузку.
+        progress(counters) вызывается после каждой пачки.
+
+        defer_indexes - снять триггеры производных индексов на время импорта и
+        пересобрать индексы один раз в конце (restore_deferred_indexes); None -
+        как только импорт достигает DEFER_INDEXES_SHARE от числа атак в БД.
+        Пока импорт идёт, поиск, фильтры по спискам и сводки не видят новых атак.
+        """
+        counters = {"processed": 0, "inserted": 0, "failed": 0, "batches": 0}
+        errors: List[Dict[str, Any]] = []
+        deferred = False
+
+        def report(index, attack_data, error):
+            counters["failed"] += 1
+            if len(errors) < self.MAX_REPORTED_ERRORS:
+                attack_id = attack_data.get("id") if isinstance(attack_data, Mapping) else None
+                errors.append({"batch": counters["batches"], "index": index, "id": attack_id, "error": str(error)})
+
+        def flush(batch):
+            current_time = datetime.now().isoformat()
+            resolve = self._category_resolver(conn)
+            prepared = []
+            for index, attack_data in batch:
+                try:
+                    prepared.append((index, attack_data, self._attack_rows(attack_data, current_time, resolve)))
+                except sqlite3.Error:
+                    raise
+                except Exception as e:
+                    report(index, attack_data, f"Invalid record: {e!r}")
+
+            try:
+                attack_rows = [rows[0] for _, _, rows in prepared]
+                target_rows = [target for _, _, rows in prepared for target in rows[1]]
+                self._insert_rows(cursor, attack_rows, target_rows)
+                self.flush_index_queue(conn)
+                conn.commit()
+                counters["inserted"] += len(prepared)
+            except sqlite3.Error:
+                conn.rollback()
+                # Поиск ошибочных записей: по одной, каждая в своём SAVEPOINT.
+                # Добавленные в справочники значения откатились - id считаются заново
+                cursor.execute("BEGIN")
+                resolve = self._category_resolver(conn)
+                for index, attack_data, _ in prepared:
+                    cursor.execute("SAVEPOINT bulk_record")
+                    try:
+                        attack_row, target_rows = self._attack_rows(attack_data, current_time, resolve)
+                        self._insert_rows(cursor, [attack_row], target_rows)
+                        cursor.execute("RELEASE bulk_record")
+                        counters["inserted"] += 1
+                    except sqlite3.Error as e:
+                        cursor.execute("ROLLBACK TO bulk_record")
+                        cursor.execute("RELEASE bulk_record")
+                        resolve = self._category_resolver(conn)
+                        report(index, attack_data, e)
+                self.flush_index_queue(conn)
+                conn.commit()
+
+            self.invalidate_cache(("attacks", "targets"), conn)
+            counters["processed"] += len(batch)
+            counters["batches"] += 1
+            if progress is not None:
+                progress(dict(counters))
+
+        def maybe_defer(batch):
+            nonlocal deferred
+            if deferred or defer_indexes is False:
+                return
+            if defer_indexes or counters["inserted"] + len(batch) >= self.DEFER_INDEXES_SHARE * existing:
+                self._defer_index_triggers(conn)
+                deferred = True
+
+        conn = None
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            row = conn.execute("SELECT count FROM attack_stats WHERE dimension = 'total'").fetchone()
+            existing = row[0] if row else 0
+
+            batch = []
+            for index, attack_data in enumerate(attacks):
+                batch.append((index, attack_data))
+                if len(batch) >= batch_size:
+                    maybe_defer(batch)
+                    flush(batch)
+                    batch = []
+            if batch:
+                maybe_defer(batch)
+                flush(batch)
+
+            if deferred:
+                self.restore_deferred_indexes(conn)
+            return {
+                "success": counters["failed"] == 0,
+                "data": {**counters, "errors": errors, "deferred_indexes": deferred},
+                "message": f"Imported {counters['inserted']} of {counters['processed']} attacks "
+                           f"in {counters['batches']} batches"
+            }
+
+        except Exception as e:
+            if deferred:
+                try:
+                    conn.rollback()
+                    self.restore_deferred_indexes(conn)
+                except Exception as restore_error:
+                    # Триггеры вернёт upgrade_schema при следующем запуске
+                    logger.error("Error restoring deferred indexes: %s", restore_error)
+            return {
+                "success": False,
+                "data": {**counters, "errors": errors, "deferred_indexes": deferred},
+                "error": f"Bulk import aborted after {counters['processed']} records: {e}"
+            }
+        finally:
+            if conn is not None:
+                conn.close()
+
     def update_attack(self, attack_id: str, attack_data: Dict[str, Any]) -> Dict[str, Any]:
         """Обновление атаки"""
         conn = None
@@ -314,18 +889,19 @@ class DatabaseManager:
                 }
 
             current_time = datetime.now().isoformat()
+            resolve = self._category_resolver(conn)
 
             # Обновляем атаку
             cursor.execute("""
                 UPDATE attacks 
-                SET name = ?, frequency = ?, danger = ?, attack_type = ?, 
+                SET name = ?, frequency_id = ?, danger_id = ?, attack_type_id = ?, 
                     source_ips = ?, affected_ports = ?, mitigation_strategies = ?, updated_at = ?
                 WHERE id = ?
             """, (
                 attack_data["name"],
-                attack_data["frequency"],
-                attack_data["danger"],
-                attack_data["attack_type"],
+                resolve("frequency", attack_data["frequency"]),
+                resolve("danger", attack_data["danger"]),
+                resolve("attack_type", attack_data["attack_type"]),
                 json.dumps(attack_data["source_ips"]),
                 json.dumps(attack_data["affected_ports"]),
                 json.dumps(attack_data["mitigation_strategies"]),
@@ -333,7 +909,9 @@ class DatabaseManager:
                 attack_id
             ))
 
+            self.flush_index_queue(conn)
             conn.commit()
+            self.invalidate_cache(("attacks",), conn)
 
             return {
                 "success": True,
@@ -366,18 +944,19 @@ class DatabaseManager:
                 }
 
             current_time = datetime.now().isoformat()
+            resolve = self._category_resolver(conn)
 
             # Обновляем атаку
             cursor.execute("""
                 UPDATE attacks 
-                SET name = ?, frequency = ?, danger = ?, attack_type = ?, 
+                SET name = ?, frequency_id = ?, danger_id = ?, attack_type_id = ?, 
                     source_ips = ?, affected_ports = ?, mitigation_strategies = ?, updated_at = ?
                 WHERE id = ?
             """, (
                 data["name"],
-                data["frequency"],
-                data["danger"],
-                data["attack_type"],
+                resolve("frequency", data["frequency"]),
+                resolve("danger", data["danger"]),
+                resolve("attack_type", data["attack_type"]),
                 json.dumps(data["source_ips"]),
                 json.dumps(data["affected_ports"]),
                 json.dumps(data["mitigation_strategies"]),
@@ -392,18 +971,20 @@ class DatabaseManager:
             for target_data in data.get("targets", []):
                 cursor.execute("""
                     INSERT INTO targets 
-                    (attack_id, target_ip, target_domain, port, protocol, tags)
+                    (attack_id, target_ip, target_domain, port, protocol_id, tags)
                     VALUES (?, ?, ?, ?, ?, ?)
                 """, (
                     attack_id,
                     target_data.get("target_ip", ""),
                     target_data.get("target_domain", ""),
                     target_data.get("port", 80),
-                    target_data.get("protocol", "tcp"),
+                    resolve("protocol", target_data.get("protocol", "tcp")),
                     json.dumps(target_data.get("tags", []))
                 ))
 
+            self.flush_index_queue(conn)
             conn.commit()
+            self.invalidate_cache(("attacks", "targets"), conn)
 
             return {
                 "success": True,
@@ -437,7 +1018,9 @@ class DatabaseManager:
 
             # Удаляем атаку (цели удалятся каскадно)
             cursor.execute("DELETE FROM attacks WHERE id = ?", (attack_id,))
+            self.flush_index_queue(conn)
             conn.commit()
+            self.invalidate_cache(("attacks", "targets"), conn)
 
             return {
                 "success": True,
@@ -453,68 +1036,188 @@ class DatabaseManager:
             if conn is not None:
                 conn.close()
 
+    @staticmethod
+    def _lookup_ids_sql(column: str, count: int) -> str:
+        """Условие на id справочника по count значениям.
+
+        Одно значение - равенство: с ним индекс (..., created_at, id) отдаёт
+        строки уже в порядке страниц, IN по подзапросу требует сортировки.
+        """
+        lookup = CATEGORY_LOOKUPS[column][1]
+        if count == 1:
+            return f"= (SELECT id FROM {lookup} WHERE value = ?)"
+        return f"IN (SELECT id FROM {lookup} WHERE value IN ({','.join(['?'] * count)}))"
+
+    def _build_attack_filter(self, frequencies: List[str] = None, danger_levels: List[str] = None,
+                             attack_types: List[str] = None, protocols: List[str] = None,
+                             source_ips: List[str] = None, ports: List[int] = None,
+                             mitigations: List[str] = None, source_cidrs: List[str] = None,
+                             target_cidrs: List[str] = None, date_from=None, date_to=None,
+                             min_danger: str = None, min_frequency: str = None):
+        """Условие WHERE (по алиасу a таблицы attacks) и параметры для фильтров.
+
+        min_danger/min_frequency - порог по рангу справочника (danger_levels,
+        frequency_levels): значения не ниже заданного.
+
+        Некорректный CIDR в source_cidrs/target_cidrs или дата в
+        date_from/date_to вызывает ValueError.
+        """
+        conditions = []
+        params = []
+
+        # Значения категорий - через справочник: подзапрос даёт id, дальше IN по индексу колонки
+        for column, values in (("frequency", frequencies), ("danger", danger_levels),
+                               ("attack_type", attack_types)):
+            if values:
+                conditions.append(f"a.{column}_id {self._lookup_ids_sql(column, len(values))}")
+                params.extend(values)
+
+        # Порог по рангу: id значений не ниже заданного
+        for column, threshold in (("danger", min_danger), ("frequency", min_frequency)):
+            if threshold:
+                lookup = CATEGORY_LOOKUPS[column][1]
+                conditions.append(f"a.{column}_id IN (SELECT id FROM {lookup} "
+                                  f"WHERE rank >= (SELECT rank FROM {lookup} WHERE value = ?))")
+                params.append(threshold)
+
+        # Фильтр по протоколу: подзапрос читается из покрывающего индекса idx_targets_protocol
+        if protocols:
+            conditions.append(f"a.id IN (SELECT t.attack_id FROM targets t "
+                              f"WHERE t.protocol_id {self._lookup_ids_sql('protocol', len(protocols))})")
+            params.extend(protocols)
+
+        # Фильтры по элементам списков: подзапрос по индексу дочерней таблицы
+        for column, values in (("source_ips", source_ips), ("affected_ports", ports),
+                               ("mitigation_strategies", mitigations)):
+            if values:
+                table, value_column, _ = LIST_TABLES[column]
+                placeholders = ",".join(["?"] * len(values))
+                conditions.append(f"a.id IN (SELECT l.attack_id FROM {table} l "
+                                  f"WHERE l.{value_column} IN ({placeholders}))")
+                params.extend(values)
+
+        # Фильтры по сетям: адреса и сети, целиком входящие в CIDR
+        for table, cidrs in (("source_ip_ranges", source_cidrs), ("target_ip_ranges", target_cidrs)):
+            if cidrs:
+                condition, cidr_params = self._cidr_condition(table, cidrs)
+                conditions.append(condition)
+                params.extend(cidr_params)
+
+        # Период: диапазон по индексу idx_attacks_created_ts. Открытая граница
+        # заменяется крайним значением - с односторонним условием планировщик
+        # предпочитает обход индекса сортировки с проверкой каждой строки
+        start, end = self._date_bounds(date_from, date_to)
+        if start is not None or end is not None:
+            conditions.append("a.created_ts >= ? AND a.created_ts < ?")
+            params.extend([self.MIN_EPOCH if start is None else start,
+                           self.MAX_EPOCH if end is None else end])
+
+        return " AND ".join(conditions) or "1=1", params
+
+    # Границы открытого периода (секунды эпохи, за пределами дат SQLite)
+    MIN_EPOCH = -(2 ** 62)
+    MAX_EPOCH = 2 ** 62
+
+    def _date_bounds(self, date_from, date_to) -> Tuple[Optional[int], Optional[int]]:
+        """Границы периода в секундах эпохи: [начало, конец), обе включают указанные моменты.
+
+        date_from/date_to - datetime, date, ISO-строка или секунды эпохи;
+        дата без времени в date_to означает весь этот день.
+        """
+        start = epoch_seconds(date_from)
+        end = epoch_seconds(date_to)
+        if end is not None:
+            # "YYYY-MM-DD" той же длины, что и секунды эпохи "1710115200" - отличаем по цифрам
+            whole_day = (isinstance(date_to, str) and len(date_to.strip()) == 10 and not date_to.strip().isdigit()
+                         or isinstance(date_to, date) and not isinstance(date_to, datetime))
+            end += 86400 if whole_day else 1
+        return start, end
+
+    # Доля атак, начиная с которой сеть в фильтре по CIDR считается широкой
+    WIDE_NETWORK_SHARE = 0.25
+
+    def _cidr_condition(self, table: str, cidrs: List[str]) -> Tuple[str, List[Any]]:
+        """Условие по сетям для таблицы диапазонов IP и его параметры.
+
+        Узкие сети отбираются подзапросом IN по индексу ip_start - его
+        стоимость пропорциональна числу совпадений. Если совпадений не меньше
+        WIDE_NETWORK_SHARE от числа атак, дешевле проверять каждую атаку через
+        EXISTS по attack_id: страница набирается из первых строк индекса
+        сортировки, а COUNT - за один проход по attacks.
+        """
+        ranges, range_params = [], []
+        for cidr in cidrs:
+            bounds = ip_bounds(cidr)
+            if bounds is None:
+                raise ValueError(f"Invalid CIDR: {cidr}")
+            ranges.append("(r.ip_start BETWEEN ? AND ? AND r.ip_end <= ?)")
+            range_params.extend([bounds[0], bounds[1], bounds[1]])
+        ranges_sql = " OR ".join(ranges)
+
+        # Оценка числа совпадений: счёт по индексу останавливается на пороге
+        with self.connection() as conn:
+            row = conn.execute("SELECT count FROM attack_stats WHERE dimension = 'total'").fetchone()
+            threshold = int((row[0] if row else 0) * self.WIDE_NETWORK_SHARE)
+            matched = conn.execute(f"SELECT COUNT(*) FROM (SELECT 1 FROM {table} r WHERE {ranges_sql} LIMIT ?)",
+                                   range_params + [threshold]).fetchone()[0] if threshold else 0
+
+        if threshold and matched >= threshold:
+            return f"EXISTS (SELECT 1 FROM {table} r WHERE r.attack_id = a.id AND ({ranges_sql}))", range_params
+        return f"a.id IN (SELECT r.attack_id FROM {table} r WHERE {ranges_sql})", range_params
+
     def filter_attacks(self, frequencies: List[str] = None, danger_levels: List[str] = None,
-                       attack_types: List[str] = None, protocols: List[str] = None) -> List[Dict[str, Any]]:
-        """Фильтрация атак по параметрам"""
+                       attack_types: List[str] = None, protocols: List[str] = None,
+                       source_ips: List[str] = None, ports: List[int] = None,
+                       mitigations: List[str] = None, source_cidrs: List[str] = None,
+                       target_cidrs: List[str] = None, date_from=None, date_to=None,
+                       min_danger: str = None, min_frequency: str = None) -> List[Dict[str, Any]]:
+        """Фильтрация атак по параметрам; date_from/date_to - период created_at (см. _date_bounds),
+        min_danger/min_frequency - порог по рангу значения"""
         conn = None
         try:
             conn = self.get_connection()
             cursor = conn.cursor()
 
-            # Базовый запрос
-            query = """
-                SELECT DISTINCT a.* FROM attacks a
-                WHERE 1=1
-            """
-            params = []
-
-            # Добавляем условия фильтрации
-            if frequencies:
-                placeholders = ",".join(["?"] * len(frequencies))
-                query += f" AND a.frequency IN ({placeholders})"
-                params.extend(frequencies)
-
-            if danger_levels:
-                placeholders = ",".join(["?"] * len(danger_levels))
-                query += f" AND a.danger IN ({placeholders})"
-                params.extend(danger_levels)
-
-            if attack_types:
-                placeholders = ",".join(["?"] * len(attack_types))
-                query += f" AND a.attack_type IN ({placeholders})"
-                params.extend(attack_types)
-
-            # Фильтрация по протоколу требует JOIN с targets
-            if protocols:
-                query += """
-                    AND EXISTS (
-                        SELECT 1 FROM targets t 
-                        WHERE t.attack_id = a.id AND t.protocol IN ({})
-                    )
-                """.format(",".join(["?"] * len(protocols)))
-                params.extend(protocols)
-
-            query += " ORDER BY a.created_at DESC"
-
-            cursor.execute(query, params)
-            attacks_data = cursor.fetchall()
-
-            # Получаем полные данные для отфильтрованных атак
-            attacks = []
-            for attack_row in attacks_data:
-                attack = self.get_attack(attack_row["id"])
-                if attack:
-                    attacks.append(attack)
-
-            return attacks
+            attack_filter, params = self._build_attack_filter(
+                frequencies=frequencies,
+                danger_levels=danger_levels,
+                attack_types=attack_types,
+                protocols=protocols,
+                source_ips=source_ips,
+                ports=ports,
+                mitigations=mitigations,
+                source_cidrs=source_cidrs,
+                target_cidrs=target_cidrs,
+                date_from=date_from,
+                date_to=date_to,
+                min_danger=min_danger,
+                min_frequency=min_frequency
+            )
+            return self._load_attacks(cursor, attack_filter, params)
 
         except Exception as e:
-            print(f"Error filtering attacks: {e}")
+            logger.error("Error filtering attacks: %s", e)
             return []
         finally:
             if conn is not None:
                 conn.close()
 
+    def find_attacks_by_source_ip(self, ip: str) -> List[Dict[str, Any]]:
+        """Атаки, среди source_ips которых есть ip (поиск по индексу attack_source_ips)"""
+        return self.filter_attacks(source_ips=[ip])
+
+    def find_attacks_by_port(self, port: int) -> List[Dict[str, Any]]:
+        """Атаки, затронувшие порт (поиск по индексу attack_ports)"""
+        return self.filter_attacks(ports=[int(port)])
+
+    def find_attacks_by_cidr(self, cidr: str, side: str = "source") -> List[Dict[str, Any]]:
+        """Атаки с IP источника (side="source") или IP цели (side="target") внутри сети cidr"""
+        if side not in ("source", "target"):
+            raise ValueError(f"Unknown side '{side}', expected 'source' or 'target'")
+        if ip_bounds(cidr) is None:
+            raise ValueError(f"Invalid CIDR: {cidr}")
+        return self.filter_attacks(**{f"{side}_cidrs": [cidr]})
+
     def reset_database(self) -> Dict[str, Any]:
         """Сброс базы данных (удаление всех данных)"""
         conn = None
@@ -522,11 +1225,34 @@ class DatabaseManager:
             conn = self.get_connection()
             cursor = conn.cursor()
 
+            for view in DETAIL_VIEWS.values():
+                cursor.execute(f"DROP VIEW IF EXISTS {view}")
             # Удаляем таблицы
             cursor.execute("DROP TABLE IF EXISTS targets")
             cursor.execute("DROP TABLE IF EXISTS attacks")
+            # Журнал изменений начинается заново: потребители увидят reset
+            cursor.execute("DROP TABLE IF EXISTS change_log")
+            cursor.execute("DROP TABLE IF EXISTS change_log_state")
+            cursor.execute("DROP TABLE IF EXISTS attack_stats")
+            cursor.execute("DROP TABLE IF EXISTS attack_rollups")
+            cursor.execute("DROP TABLE IF EXISTS target_rollups")
+            for table, _, _ in LIST_TABLES.values():
+                cursor.execute(f"DROP TABLE IF EXISTS {table}")
+            cursor.execute("DROP TABLE IF EXISTS source_ip_ranges")
+            cursor.execute("DROP TABLE IF EXISTS target_ip_ranges")
+            cursor.execute("DROP TABLE IF EXISTS attack_index_queue")
+            cursor.execute("DROP TABLE IF EXISTS deferred_triggers")
+            for _, lookup, _ in CATEGORY_LOOKUPS.values():
+                cursor.execute(f"DROP TABLE IF EXISTS {lookup}")
+            cursor.execute("DROP TABLE IF EXISTS attacks_fts")
+            cursor.execute("DROP TABLE IF EXISTS attack_search_docs")
+            for index_table in TRIGRAM_INDEXES.values():
+                cursor.execute(f"DROP TABLE IF EXISTS {index_table}")
+            # Индексы удалены вместе с таблицами - миграции нужно прогнать заново
+            cursor.execute("DROP TABLE IF EXISTS schema_migrations")
 
             conn.commit()
+            self.invalidate_cache()
 
             # Создаем заново
             return self.initialize_database()
@@ -538,4 +1264,475 @@ class DatabaseManager:
             }
         finally:
             if conn is not None:
-                conn.close()
\ No newline at end of file
+                conn.close()
+
+    def get_change_version(self) -> int:
+        """Последняя версия журнала изменений (0 - изменений не было)"""
+        conn = None
+        try:
+            conn = self.get_connection()
+            return self._latest_change_version(conn)
+
+        except Exception as e:
+            logger.error("Error fetching change version: %s", e)
+            return 0
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def _latest_change_version(self, conn) -> int:
+        # sqlite_sequence хранит последнюю выданную версию даже после очистки журнала
+        row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'change_log'").fetchone()
+        return row[0] if row else 0
+
+    def get_changes_since(self, version: int, limit: int = 1000) -> Dict[str, Any]:
+        """Изменения attacks/targets с версией больше version.
+
+        reset=True означает, что нужные изменения уже удалены очисткой журнала
+        (или БД была сброшена) - потребитель должен перечитать данные целиком
+        и продолжить с latest_version.
+        """
+        conn = None
+        try:
+            conn = self.get_connection()
+            # Чтение в одной транзакции: версия и записи согласованы
+            conn.execute("BEGIN")
+            latest_version = self._latest_change_version(conn)
+            compacted_through = conn.execute(
+                "SELECT compacted_through FROM change_log_state WHERE id = 1"
+            ).fetchone()[0]
+
+            if version > latest_version or version < compacted_through:
+                return {
+                    "success": True,
+                    "data": {"changes": [], "version": latest_version, "latest_version": latest_version,
+                             "reset": True, "has_more": False}
+                }
+
+            rows = conn.execute("""
+                SELECT version, table_name, operation, row_id, attack_id, changed_at
+                FROM change_log WHERE version > ? ORDER BY version LIMIT ?
+            """, (version, limit)).fetchall()
+            changes = [dict(row) for row in rows]
+            next_version = changes[-1]["version"] if changes else latest_version
+
+            return {
+                "success": True,
+                "data": {
+                    "changes": changes,
+                    "version": next_version,
+                    "latest_version": latest_version,
+                    "reset": False,
+                    "has_more": next_version < latest_version
+                }
+            }
+
+        except Exception as e:
+            return {"success": False, "error": f"Failed to read change log: {e}"}
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def compact_change_log(self, retention: Optional[int] = None,
+                           max_age_days: Optional[float] = None) -> Dict[str, Any]:
+        """Очистка журнала изменений: остаются последние retention записей не старше max_age_days"""
+        retention = self.config.change_log_retention if retention is None else retention
+        max_age_days = self.config.change_log_max_age_days if max_age_days is None else max_age_days
+        conn = None
+        try:
+            conn = self.get_connection()
+            conn.execute("BEGIN IMMEDIATE")
+            latest_version = self._latest_change_version(conn)
+
+            # Граница по количеству и по возрасту; удаляется всё до большей из них
+            boundary = max(0, latest_version - retention)
+            if max_age_days is not None:
+                row = conn.execute("""
+                    SELECT MAX(version) FROM change_log
+                    WHERE changed_at < strftime('%Y-%m-%dT%H:%M:%f', 'now', ?)
+                """, (f"-{max_age_days} days",)).fetchone()
+                boundary = max(boundary, row[0] or 0)
+
+            removed = conn.execute("DELETE FROM change_log WHERE version <= ?", (boundary,)).rowcount
+            conn.execute("""
+                UPDATE change_log_state SET compacted_through = MAX(compacted_through, ?) WHERE id = 1
+            """, (boundary,))
+            conn.commit()
+            self.invalidate_cache(("change_log", "change_log_state"), conn)
+
+            return {
+                "success": True,
+                "data": {"removed": removed, "compacted_through": boundary},
+                "message": f"Removed {removed} change log entries"
+            }
+
+        except Exception as e:
+            return {"success": False, "error": f"Change log compaction failed: {e}"}
+        finally:
+            if conn is not None:
+                conn.close()
+
+    # Веса полей attacks_fts в bm25: name, mitigation_strategies, target_domains, tags
+    SEARCH_WEIGHTS = (10.0, 2.0, 4.0, 1.0)
+
+    def _build_fts_query(self, text: str, prefix: bool = False) -> str:
+        """Запрос FTS5 из пользовательского ввода: все слова обязательны.
+
+        Слова берутся в кавычки, поэтому спецсимволы и операторы FTS5 во
+        вводе не ломают запрос. "слово*" ищет по префиксу, prefix=True - по
+        префиксу для всех слов.
+        """
+        terms = [f'"{word}"' + ("*" if star or prefix else "")
+                 for word, star in re.findall(r"(\w+)(\*?)", text)]
+        if not terms:
+            raise ValueError("Search query contains no words")
+        return " ".join(terms)
+
+    def count_search(self, text: str, prefix: bool = False) -> int:
+        """Число атак, найденных полнотекстовым поиском"""
+        conn = None
+        try:
+            conn = self.get_connection()
+            return conn.execute("SELECT COUNT(*) FROM attacks_fts WHERE attacks_fts MATCH ?",
+                                (self._build_fts_query(text, prefix),)).fetchone()[0]
+
+        except Exception as e:
+            logger.error("Error counting search results: %s", e)
+            return 0
+        finally:
+            if conn is not None:
+                conn.close()
+
+    # Как часто (в инструкциях VM) поиск проверяет should_stop
+    SEARCH_PROGRESS_STEPS = 1000
+
+    def iter_search_pages(self, text: str, prefix: bool = False, page_size: int = 200,
+                          should_stop: Optional[Callable[[], bool]] = None) -> Iterator[List[Dict[str, Any]]]:
+        """Полнотекстовый поиск по attacks_fts, страницами от лучших совпадений.
+
+        Запрос выполняется один раз, страницы читаются из его курсора, поэтому
+        соединение занято до конца обхода. snippet - фрагмент лучшего поля
+        с совпадениями в [скобках]. should_stop() == True прерывает запрос
+        в SQLite (в том числе сортировку до первой страницы), и обход
+        заканчивается без ошибки. Остальные ошибки пробрасываются вызывающему
+        (ValueError - если во вводе нет слов).
+        """
+        query = self._build_fts_query(text, prefix)
+        weights = ", ".join(str(weight) for weight in self.SEARCH_WEIGHTS)
+        with self.connection() as conn:
+            if should_stop is not None:
+                conn.set_progress_handler(should_stop, self.SEARCH_PROGRESS_STEPS)
+            try:
+                cursor = conn.execute(f"""
+                    SELECT a.id, a.name, a.attack_type, a.danger, a.created_at,
+                           snippet(attacks_fts, -1, '[', ']', '…', 12) AS snippet,
+                           bm25(attacks_fts, {weights}) AS score
+                    FROM attacks_fts
+                    JOIN attack_search_docs d ON d.docid = attacks_fts.rowid
+                    JOIN attack_details a ON a.id = d.attack_id
+                    WHERE attacks_fts MATCH ?
+                    ORDER BY score
+                """, (query,))
+                while should_stop is None or not should_stop():
+                    rows = cursor.fetchmany(page_size)
+                    if not rows:
+                        return
+                    yield [dict(row) for row in rows]
+            except sqlite3.OperationalError:
+                if should_stop is None or not should_stop():
+                    raise
+            finally:
+                if should_stop is not None:
+                    conn.set_progress_handler(None, 0)
+
+    # Выше этой доли кандидатов проверка IN по индексу дороже полного скана
+    TRIGRAM_MAX_CANDIDATE_RATIO = 0.5
+
+    def trigram_prefilter(self, table: str, column: str, match_query: str) -> Optional[Dict[str, Any]]:
+        """Кандидаты триграммного индекса для поиска по table.column.
+
+        match_query строится api.trigram.like_query/regex_query. Возвращает
+        None, если столбец не индексирован, иначе candidates и total (число
+        строк) и condition - условие WHERE по table с одним параметром
+        match_query. condition равно None, если кандидатов больше
+        TRIGRAM_MAX_CANDIDATE_RATIO от всех строк и дешевле полный скан.
+        """
+        # Представления attack_details/target_details ищутся по индексам своих таблиц
+        base_table = {view: name for name, view in DETAIL_VIEWS.items()}.get(table, table)
+        index_table = TRIGRAM_INDEXES.get((base_table, column))
+        if index_table is None:
+            return None
+        if base_table == "attacks":
+            condition = (f"{table}.id IN (SELECT d.attack_id FROM {index_table} t "
+                         f"JOIN attack_search_docs d ON d.docid = t.rowid WHERE {index_table} MATCH ?)")
+        else:
+            condition = f"{table}.id IN (SELECT rowid FROM {index_table} WHERE {index_table} MATCH ?)"
+
+        with self.connection() as conn:
+            candidates = conn.execute(f"SELECT COUNT(*) FROM {index_table} WHERE {index_table} MATCH ?",
+                                      (match_query,)).fetchone()[0]
+            total = conn.execute(f"SELECT COUNT(*) FROM {base_table}").fetchone()[0]
+
+        if candidates > total * self.TRIGRAM_MAX_CANDIDATE_RATIO:
+            condition = None
+        return {"candidates": candidates, "total": total, "condition": condition}
+
+    def get_categories(self) -> Dict[str, List[str]]:
+        """Допустимые значения категориальных колонок из справочников, по возрастанию ранга"""
+        categories: Dict[str, List[str]] = {}
+        with self.connection() as conn:
+            for column, (_, lookup, _) in CATEGORY_LOOKUPS.items():
+                rows = conn.execute(f"SELECT value FROM {lookup} ORDER BY rank, id")
+                categories[column] = [row["value"] for row in rows]
+        return categories
+
+    def get_values_at_least(self, kind: str, threshold: str) -> List[str]:
+        """Значения категории kind с рангом не ниже, чем у threshold (как фильтры min_danger/min_frequency)"""
+        if kind not in CATEGORY_LOOKUPS:
+            raise ValueError(f"Unknown category '{kind}', expected one of: {', '.join(CATEGORY_LOOKUPS)}")
+        lookup = CATEGORY_LOOKUPS[kind][1]
+        with self.connection() as conn:
+            rows = conn.execute(f"SELECT value FROM {lookup} WHERE rank >= (SELECT rank FROM {lookup} WHERE value = ?) "
+                                f"ORDER BY rank, id", (threshold,))
+            return [row["value"] for row in rows]
+
+    def add_lookup_value(self, kind: str, value: str, rank: Optional[int] = None) -> Dict[str, Any]:
+        """Новое значение категории kind (frequency, danger, attack_type, protocol).
+
+        rank - место в порядке значений (1 - самое низкое); значения с
+        рангом не ниже сдвигаются вверх. Без rank значение становится последним.
+        """
+        if kind not in CATEGORY_LOOKUPS:
+            return {"success": False, "error": f"Unknown category '{kind}', expected one of {', '.join(CATEGORY_LOOKUPS)}"}
+        value = (value or "").strip()
+        if not value:
+            return {"success": False, "error": "Value must not be empty"}
+        if rank is not None and rank < 1:
+            return {"success": False, "error": "Rank must be a positive integer"}
+
+        lookup = CATEGORY_LOOKUPS[kind][1]
+        conn = None
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT 1 FROM {lookup} WHERE value = ?", (value,))
+            if cursor.fetchone():
+                return {"success": False, "error": f"{kind} value '{value}' already exists"}
+
+            if rank is None:
+                rank = cursor.execute(f"SELECT COALESCE(MAX(rank), 0) + 1 FROM {lookup}").fetchone()[0]
+            else:
+                cursor.execute(f"UPDATE {lookup} SET rank = rank + 1 WHERE rank >= ?", (rank,))
+            cursor.execute(f"INSERT INTO {lookup} (value, rank) VALUES (?, ?)", (value, rank))
+            lookup_id = cursor.lastrowid
+            conn.commit()
+            self.invalidate_cache((lookup,), conn)
+
+            return {
+                "success": True,
+                "data": {"id": lookup_id, "value": value, "rank": rank},
+                "message": f"{kind} value '{value}' added"
+            }
+
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Failed to add {kind} value: {e}"
+            }
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Сводная статистика из attack_stats (без сканирования attacks).
+
+        total - число атак; danger, frequency, attack_type - число атак по
+        значениям; protocol - число целей по протоколам.
+        """
+        stats: Dict[str, Any] = {"total": 0, "danger": {}, "frequency": {}, "attack_type": {}, "protocol": {}}
+        conn = None
+        try:
+            conn = self.get_connection()
+            for row in conn.execute("SELECT dimension, value, count FROM attack_stats WHERE count != 0"):
+                if row["dimension"] == "total":
+                    stats["total"] = row["count"]
+                else:
+                    stats.setdefault(row["dimension"], {})[row["value"]] = row["count"]
+            return stats
+
+        except Exception as e:
+            logger.error("Error fetching stats: %s", e)
+            return stats
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def rebuild_stats(self) -> Dict[str, Any]:
+        """Пересчёт attack_stats по данным таблиц (восстановление после ручных правок схемы)"""
+        conn = None
+        try:
+            conn = self.get_connection()
+            conn.execute("BEGIN IMMEDIATE")
+            for statement in stats_rebuild_statements():
+                conn.execute(statement)
+            conn.commit()
+            self.invalidate_cache(("attack_stats",), conn)
+            return {"success": True, "message": "Statistics rebuilt successfully"}
+
+        except Exception as e:
+            return {"success": False, "error": f"Statistics rebuild failed: {e}"}
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def rebuild_rollups(self) -> Dict[str, Any]:
+        """Пересчёт attack_rollups/target_rollups по данным таблиц (после массовых правок мимо триггеров)"""
+        conn = None
+        try:
+            conn = self.get_connection()
+            conn.execute("BEGIN IMMEDIATE")
+            for statement in rollup_rebuild_statements():
+                conn.execute(statement)
+            buckets = conn.execute("SELECT COUNT(*) FROM attack_rollups").fetchone()[0]
+            conn.commit()
+            self.invalidate_cache(("attack_rollups", "target_rollups"), conn)
+            return {"success": True, "data": {"buckets": buckets}, "message": f"Rollups rebuilt: {buckets} buckets"}
+
+        except Exception as e:
+            return {"success": False, "error": f"Rollup rebuild failed: {e}"}
+        finally:
+            if conn is not None:
+                conn.close()
+
+    @staticmethod
+    def _source_range_rows(attack_rows) -> Iterator[Tuple[str, int, bytes, bytes]]:
+        """Строки source_ip_ranges по парам (id атаки, source_ips); не IP и не сети пропускаются"""
+        for attack_id, source_ips in attack_rows:
+            values = parse_json_list(source_ips)
+            if not isinstance(values, list):
+                continue
+            for position, ip in enumerate(values):
+                bounds = ip_bounds(ip)
+                if bounds is not None:
+                    yield attack_id, position, bounds[0], bounds[1]
+
+    @staticmethod
+    def _target_range_rows(target_rows) -> Iterator[Tuple[int, str, bytes, bytes]]:
+        """Строки target_ip_ranges по тройкам (id цели, id атаки, target_ip)"""
+        for target_id, attack_id, target_ip in target_rows:
+            bounds = ip_bounds(target_ip)
+            if bounds is not None:
+                yield target_id, attack_id, bounds[0], bounds[1]
+
+    def _index_ip_ranges(self, conn, attack_ids: List[str]):
+        """Пересчёт диапазонов IP атак attack_ids (источники и цели) в текущей транзакции"""
+        for start in range(0, len(attack_ids), 500):
+            chunk = attack_ids[start:start + 500]
+            placeholders = ",".join(["?"] * len(chunk))
+            conn.execute(f"DELETE FROM source_ip_ranges WHERE attack_id IN ({placeholders})", chunk)
+            conn.execute(f"DELETE FROM target_ip_ranges WHERE attack_id IN ({placeholders})", chunk)
+            attack_rows = conn.execute(f"SELECT id, source_ips FROM attacks WHERE id IN ({placeholders})",
+                                       chunk).fetchall()
+            conn.executemany("INSERT INTO source_ip_ranges (attack_id, position, ip_start, ip_end) VALUES (?, ?, ?, ?)",
+                             self._source_range_rows(attack_rows))
+            target_rows = conn.execute(f"SELECT id, attack_id, target_ip FROM targets WHERE attack_id IN ({placeholders})",
+                                       chunk).fetchall()
+            conn.executemany("INSERT INTO target_ip_ranges (target_id, attack_id, ip_start, ip_end) VALUES (?, ?, ?, ?)",
+                             self._target_range_rows(target_rows))
+
+    def flush_index_queue(self, conn) -> int:
+        """Пересчёт производных индексов атак из очереди attack_index_queue (в транзакции вызывающего).
+
+        Диапазоны IP и документ полнотекстового поиска пересобираются один
+        раз на атаку, сколько бы её строк ни изменилось. Триггеры ставят в
+        очередь атаки, записанные любым соединением; методы записи
+        DatabaseManager и исполнитель запросов разбирают её перед commit.
+        Возвращает число пересчитанных атак.
+        """
+        attack_ids = [row[0] for row in conn.execute("SELECT attack_id FROM attack_index_queue")]
+        if not attack_ids:
+            return 0
+        self._index_ip_ranges(conn, attack_ids)
+        for statement in search_refresh_statements():
+            conn.execute(statement)
+        conn.execute("DELETE FROM attack_index_queue")
+        return len(attack_ids)
+
+    def _rebuild_ip_ranges(self, conn):
+        """Пересчёт всех диапазонов IP в текущей транзакции"""
+        conn.execute("DELETE FROM source_ip_ranges")
+        conn.execute("DELETE FROM target_ip_ranges")
+        conn.executemany("INSERT INTO source_ip_ranges (attack_id, position, ip_start, ip_end) VALUES (?, ?, ?, ?)",
+                         self._source_range_rows(conn.execute("SELECT id, source_ips FROM attacks")))
+        conn.executemany("INSERT INTO target_ip_ranges (target_id, attack_id, ip_start, ip_end) VALUES (?, ?, ?, ?)",
+                         self._target_range_rows(conn.execute("SELECT id, attack_id, target_ip FROM targets")))
+        conn.execute("DELETE FROM attack_index_queue")
+
+    def rebuild_ip_ranges(self) -> Dict[str, Any]:
+        """Пересчёт source_ip_ranges/target_ip_ranges по всем атакам и целям"""
+        conn = None
+        try:
+            conn = self.get_connection()
+            conn.execute("BEGIN IMMEDIATE")
+            self._rebuild_ip_ranges(conn)
+            ranges = conn.execute("SELECT (SELECT COUNT(*) FROM source_ip_ranges) + "
+                                  "(SELECT COUNT(*) FROM target_ip_ranges)").fetchone()[0]
+            conn.commit()
+            self.invalidate_cache(("source_ip_ranges", "target_ip_ranges"), conn)
+            return {"success": True, "data": {"ranges": ranges}, "message": f"IP ranges rebuilt: {ranges} ranges"}
+
+        except Exception as e:
+            return {"success": False, "error": f"IP range rebuild failed: {e}"}
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def rebuild_search_index(self) -> Dict[str, Any]:
+        """Пересборка attacks_fts и триграммных индексов по данным таблиц"""
+        conn = None
+        try:
+            conn = self.get_connection()
+            conn.execute("BEGIN IMMEDIATE")
+            for statement in search_rebuild_statements():
+                conn.execute(statement)
+            documents = conn.execute("SELECT COUNT(*) FROM attack_search_docs").fetchone()[0]
+            conn.commit()
+            self.invalidate_cache(("attacks_fts",) + tuple(TRIGRAM_INDEXES.values()), conn)
+            return {"success": True, "data": {"documents": documents},
+                    "message": f"Search index rebuilt: {documents} documents"}
+
+        except Exception as e:
+            return {"success": False, "error": f"Search index rebuild failed: {e}"}
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def analytics_available(self) -> bool:
+        """Доступен ли колоночный снимок (установлен ли NumPy)"""
+        return ColumnarSnapshot is not None
+
+    def get_analytics_snapshot(self):
+        """Колоночный снимок attacks/targets, догруженный до текущей версии журнала.
+
+        None, если NumPy не установлен - тогда аналитика считается через SQL.
+        Снимок создаётся при первом вызове и дальше обновляется по change_log.
+        """
+        if ColumnarSnapshot is None:
+            return None
+        with self._cache_lock:
+            if self._snapshot is None:
+                self._snapshot = ColumnarSnapshot(self)
+        self._snapshot.refresh()
+        return self._snapshot
+
+    def get_attack_trend(self, period: str = "month", dimension: Optional[str] = None,
+                         date_from: Optional[str] = None, date_to: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Число атак (целей - для dimension="protocol") по периодам из сводок.
+
+        period - hour/day/month/year, dimension - разбивка по danger,
+        attack_type, frequency или protocol. Время ответа зависит от числа
+        корзин за период, а не от размера attacks.
+        """
+        sql, params = trend_query(period, dimension, date_from, date_to)
+        with self.connection() as conn:
+            return [dict(row) for row in conn.execute(sql, params)]
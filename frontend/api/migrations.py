@@ -0,0 +1,1164 @@
+"""Версионные миграции схемы SQLite.
+
+Каждая миграция применяется один раз в отдельной транзакции, номер
+применённой версии записывается в schema_migrations. Миграции должны быть
+идемпотентными (IF NOT EXISTS и т.п.): reset_database очищает журнал
+версий и прогоняет их заново поверх частично сохранившейся схемы.
+"""
+import re
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, List, Optional
+
+
+@dataclass
+class Migration:
+    version: int
+    description: str
+    statements: List[str] = field(default_factory=list)
+    # Для шагов, которые нельзя выразить статическим SQL
+    apply: Optional[Callable] = None
+    # False - шаг перестраивает таблицы: внешние ключи выключаются на время
+    # миграции, иначе DROP TABLE attacks каскадно удалил бы цели
+    foreign_keys: bool = True
+
+
+# Измерения сводной статистики attack_stats по колонкам attacks
+STATS_DIMENSIONS = ("danger", "frequency", "attack_type")
+
+
+def _category_column(column: str, encoded: bool) -> str:
+    """Колонка категории в attacks/targets: текст до миграции 17, id справочника - после"""
+    return f"{column}_id" if encoded else column
+
+
+def _category_value(column: str, row: str, encoded: bool) -> str:
+    """SQL текстового значения категории строки row (алиас таблицы или NEW/OLD)"""
+    if not encoded:
+        return f"{row}.{column}"
+    return f"(SELECT value FROM {CATEGORY_LOOKUPS[column][1]} WHERE id = {row}.{column}_id)"
+
+
+def _protocol_key(row: str, encoded: bool) -> str:
+    """Протокол цели как ключ статистики и сводок (NULL хранится как '')"""
+    return f"COALESCE({_category_value('protocol', row, encoded)}, '')"
+
+
+def stats_rebuild_statements(encoded: bool = True) -> List[str]:
+    """Пересчёт attack_stats по данным таблиц (миграция и rebuild_stats)"""
+    return [
+        "DELETE FROM attack_stats",
+        "INSERT INTO attack_stats (dimension, value, count) SELECT 'total', '', COUNT(*) FROM attacks",
+    ] + [
+        f"""INSERT INTO attack_stats (dimension, value, count)
+            SELECT '{column}', {_category_value(column, "a", encoded)}, COUNT(*) FROM attacks a
+            GROUP BY a.{_category_column(column, encoded)}"""
+        for column in STATS_DIMENSIONS
+    ] + [
+        f"""INSERT INTO attack_stats (dimension, value, count)
+           SELECT 'protocol', {_protocol_key("t", encoded)}, COUNT(*) FROM targets t GROUP BY 2""",
+    ]
+
+
+def _stats_bump(dimension: str, value_sql: str, delta: int) -> str:
+    """Изменение счётчика attack_stats на delta (для тела триггера)"""
+    return f"""
+            INSERT INTO attack_stats (dimension, value, count) VALUES ('{dimension}', {value_sql}, {delta})
+            ON CONFLICT (dimension, value) DO UPDATE SET count = count + excluded.count;"""
+
+
+def _stats_triggers(encoded: bool) -> List[str]:
+    """Триггеры attack_stats на attacks и targets"""
+    columns = ", ".join(_category_column(column, encoded) for column in STATS_DIMENSIONS)
+    protocol = _category_column("protocol", encoded)
+    return [
+        _stats_trigger("trg_attacks_stats_insert", "INSERT", "attacks",
+                       [_stats_bump("total", "''", 1)] +
+                       [_stats_bump(column, _category_value(column, "NEW", encoded), 1)
+                        for column in STATS_DIMENSIONS]),
+        _stats_trigger("trg_attacks_stats_delete", "DELETE", "attacks",
+                       [_stats_bump("total", "''", -1)] +
+                       [_stats_bump(column, _category_value(column, "OLD", encoded), -1)
+                        for column in STATS_DIMENSIONS]),
+        _stats_trigger("trg_attacks_stats_update", f"UPDATE OF {columns}", "attacks",
+                       [bump for column in STATS_DIMENSIONS
+                        for bump in (_stats_bump(column, _category_value(column, "OLD", encoded), -1),
+                                     _stats_bump(column, _category_value(column, "NEW", encoded), 1))]),
+        _stats_trigger("trg_targets_stats_insert", "INSERT", "targets",
+                       [_stats_bump("protocol", _protocol_key("NEW", encoded), 1)]),
+        _stats_trigger("trg_targets_stats_delete", "DELETE", "targets",
+                       [_stats_bump("protocol", _protocol_key("OLD", encoded), -1)]),
+        _stats_trigger("trg_targets_stats_update", f"UPDATE OF {protocol}", "targets",
+                       [_stats_bump("protocol", _protocol_key("OLD", encoded), -1),
+                        _stats_bump("protocol", _protocol_key("NEW", encoded), 1)]),
+    ]
+
+
+# Списки attacks в дочерних таблицах: колонка JSON -> (таблица, колонка значения, тип)
+LIST_TABLES = {
+    "source_ips": ("attack_source_ips", "ip", "TEXT"),
+    "affected_ports": ("attack_ports", "port", "INTEGER"),
+    "mitigation_strategies": ("attack_mitigations", "strategy", "TEXT"),
+}
+
+
+def _json_array(value_sql: str) -> str:
+    """JSON-массив из колонки; некорректное значение читается как пустой список (как _parse_json_field)"""
+    return f"CASE WHEN json_valid({value_sql}) AND json_type({value_sql}) = 'array' THEN {value_sql} ELSE '[]' END"
+
+
+def _list_triggers(column: str, table: str, value_column: str) -> List[str]:
+    """Триггеры синхронизации дочерней таблицы списка; элементы null в неё не попадают"""
+    elements = f"json_each({_json_array(f'NEW.{column}')}) WHERE value IS NOT NULL"
+    return [
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_insert AFTER INSERT ON attacks
+        BEGIN
+            INSERT INTO {table} (attack_id, position, {value_column})
+            SELECT NEW.id, key, value FROM {elements};
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_update AFTER UPDATE OF {column} ON attacks
+        WHEN OLD.{column} IS NOT NEW.{column}
+        BEGIN
+            DELETE FROM {table} WHERE attack_id = OLD.id;
+            INSERT INTO {table} (attack_id, position, {value_column})
+            SELECT NEW.id, key, value FROM {elements};
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_delete AFTER DELETE ON attacks
+        BEGIN
+            DELETE FROM {table} WHERE attack_id = OLD.id;
+        END
+        """,
+    ]
+
+
+def _list_statements() -> List[str]:
+    """Дочерние таблицы списков, их индексы, триггеры синхронизации и заполнение"""
+    statements = []
+    for column, (table, value_column, value_type) in LIST_TABLES.items():
+        statements += [
+            f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                attack_id TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                {value_column} {value_type} NOT NULL,
+                PRIMARY KEY (attack_id, position)
+            ) WITHOUT ROWID
+            """,
+            # Поиск атак по значению: attack_id берётся прямо из индекса
+            f"CREATE INDEX IF NOT EXISTS idx_{table}_{value_column} ON {table} ({value_column}, attack_id)",
+        ] + _list_triggers(column, table, value_column)
+    # Заполнение по уже существующим данным
+    return statements + list_rebuild_statements()
+
+
+def list_rebuild_statements() -> List[str]:
+    """Заполнение дочерних таблиц списков по JSON-колонкам attacks"""
+    statements = []
+    for column, (table, value_column, _) in LIST_TABLES.items():
+        statements += [
+            f"DELETE FROM {table}",
+            f"""
+            INSERT INTO {table} (attack_id, position, {value_column})
+            SELECT a.id, j.key, j.value FROM attacks a, json_each({_json_array(f"a.{column}")}) j
+            WHERE j.value IS NOT NULL
+            """,
+        ]
+    return statements
+
+
+def _list_null_fix_statements() -> List[str]:
+    """Пересоздание триггеров списков, которые вставляли элементы null в колонку NOT NULL"""
+    statements = []
+    for column, (table, value_column, _) in LIST_TABLES.items():
+        statements += [f"DROP TRIGGER IF EXISTS trg_{table}_insert", f"DROP TRIGGER IF EXISTS trg_{table}_update"]
+        statements += _list_triggers(column, table, value_column)[:2]
+    return statements
+
+
+# Поля полнотекстового индекса attacks_fts (одна строка на атаку)
+SEARCH_COLUMNS = ("name", "mitigation_strategies", "target_domains", "tags")
+
+
+def _search_documents() -> str:
+    """Вставка строк attacks_fts по attacks (алиас a); условие WHERE добавляет вызывающий"""
+    return f"""
+            INSERT INTO attacks_fts (rowid, {", ".join(SEARCH_COLUMNS)})
+            SELECT d.docid, a.name,
+                   (SELECT group_concat(value, ' ') FROM json_each({_json_array("a.mitigation_strategies")})),
+                   (SELECT group_concat(t.target_domain, ' ') FROM targets t WHERE t.attack_id = a.id),
+                   (SELECT group_concat(j.value, ' ') FROM targets t, json_each({_json_array("t.tags")}) j
+                    WHERE t.attack_id = a.id)
+            FROM attacks a JOIN attack_search_docs d ON d.attack_id = a.id"""
+
+
+def _search_refresh(attack_id_sql: str) -> str:
+    """Пересборка строки attacks_fts для атаки (для тела триггера)"""
+    return f"""
+            DELETE FROM attacks_fts
+            WHERE rowid = (SELECT docid FROM attack_search_docs WHERE attack_id = {attack_id_sql});{_search_documents()}
+            WHERE a.id = {attack_id_sql};"""
+
+
+def search_refresh_statements() -> List[str]:
+    """Пересборка документов attacks_fts для атак из очереди attack_index_queue (один раз на атаку)"""
+    return [
+        """
+        DELETE FROM attacks_fts WHERE rowid IN (
+            SELECT d.docid FROM attack_index_queue q JOIN attack_search_docs d ON d.attack_id = q.attack_id)
+        """,
+        f"{_search_documents()}\n            WHERE a.id IN (SELECT attack_id FROM attack_index_queue)",
+    ]
+
+
+def search_rebuild_statements() -> List[str]:
+    """Полная пересборка attacks_fts и триграммных индексов по данным таблиц"""
+    return [
+        "INSERT OR IGNORE INTO attack_search_docs (attack_id) SELECT id FROM attacks",
+        "DELETE FROM attack_search_docs WHERE attack_id NOT IN (SELECT id FROM attacks)",
+        "DELETE FROM attacks_fts",
+        _search_documents(),
+        "DELETE FROM attacks_name_trigram",
+        """
+        INSERT INTO attacks_name_trigram (rowid, name)
+        SELECT d.docid, a.name FROM attacks a JOIN attack_search_docs d ON d.attack_id = a.id
+        """,
+        "DELETE FROM targets_domain_trigram",
+        "INSERT INTO targets_domain_trigram (rowid, target_domain) SELECT id, target_domain FROM targets",
+    ]
+
+
+# Триграммные индексы для поиска подстрок и regex: (таблица, столбец) -> таблица FTS5.
+# rowid строки индекса: attack_search_docs.docid для attacks, targets.id для targets
+TRIGRAM_INDEXES = {
+    ("attacks", "name"): "attacks_name_trigram",
+    ("targets", "target_domain"): "targets_domain_trigram",
+}
+
+
+# Сводки по времени: гранулярность -> длина префикса created_at ('YYYY-MM-DDTHH' / 'YYYY-MM-DD')
+ROLLUP_GRANULARITIES = {"hour": 13, "day": 10}
+# Измерения attack_rollups (колонки attacks); target_rollups - по protocol целей
+ROLLUP_DIMENSIONS = ("danger", "attack_type", "frequency")
+
+
+def _rollup_bump(row: str, delta: int, encoded: bool) -> str:
+    """Изменение attack_rollups для строки attacks row (NEW/OLD) на delta (для тела триггера)"""
+    dimensions = ", ".join(ROLLUP_DIMENSIONS)
+    values = ", ".join(_category_value(column, row, encoded) for column in ROLLUP_DIMENSIONS)
+    return "".join(f"""
+            INSERT INTO attack_rollups (granularity, bucket, {dimensions}, count)
+            VALUES ('{granularity}', substr({row}.created_at, 1, {length}), {values}, {delta})
+            ON CONFLICT (granularity, bucket, {dimensions}) DO UPDATE SET count = count + excluded.count;"""
+                   for granularity, length in ROLLUP_GRANULARITIES.items())
+
+
+def _target_rollup_bump(row: str, delta: int, encoded: bool) -> str:
+    """Изменение target_rollups для строки targets row (NEW/OLD) на delta.
+
+    Корзина берётся из created_at атаки; без атаки (каскадное удаление
+    вслед за ней, цель-сирота) счётчик не меняется.
+    """
+    return "".join(f"""
+            INSERT INTO target_rollups (granularity, bucket, protocol, count)
+            SELECT '{granularity}', substr(a.created_at, 1, {length}), {_protocol_key(row, encoded)}, {delta}
+            FROM attacks a WHERE a.id = {row}.attack_id
+            ON CONFLICT (granularity, bucket, protocol) DO UPDATE SET count = count + excluded.count;"""
+                   for granularity, length in ROLLUP_GRANULARITIES.items())
+
+
+def _attack_targets_rollup_bump(row: str, sign: str, encoded: bool) -> str:
+    """Изменение target_rollups для всех целей атаки row (NEW/OLD) в её корзине, sign - '' или '-'"""
+    return "".join(f"""
+            INSERT INTO target_rollups (granularity, bucket, protocol, count)
+            SELECT '{granularity}', substr({row}.created_at, 1, {length}), {_protocol_key("targets", encoded)},
+                   {sign}COUNT(*)
+            FROM targets WHERE attack_id = {row}.id GROUP BY 3
+            ON CONFLICT (granularity, bucket, protocol) DO UPDATE SET count = count + excluded.count;"""
+                   for granularity, length in ROLLUP_GRANULARITIES.items())
+
+
+def _rollup_triggers(encoded: bool) -> List[str]:
+    """Триггеры attack_rollups и target_rollups на attacks и targets"""
+    columns = ("created_at",) + tuple(_category_column(column, encoded) for column in ROLLUP_DIMENSIONS)
+    prefix = max(ROLLUP_GRANULARITIES.values())
+    return [
+        _stats_trigger("trg_attacks_rollup_insert", "INSERT", "attacks", [_rollup_bump("NEW", 1, encoded)]),
+        # BEFORE: цели ещё на месте - при каскадном удалении их триггеры атаку уже не видят
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_attacks_rollup_delete BEFORE DELETE ON attacks
+        BEGIN{_rollup_bump("OLD", -1, encoded)}{_attack_targets_rollup_bump("OLD", "-", encoded)}
+        END
+        """,
+        # update_attack перезаписывает все колонки - без изменений сводки не трогаются
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_attacks_rollup_update
+        AFTER UPDATE OF {", ".join(columns)} ON attacks
+        WHEN {" OR ".join(f"OLD.{column} IS NOT NEW.{column}" for column in columns)}
+        BEGIN{_rollup_bump("OLD", -1, encoded)}{_rollup_bump("NEW", 1, encoded)}
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_attacks_rollup_move AFTER UPDATE OF created_at ON attacks
+        WHEN substr(OLD.created_at, 1, {prefix}) IS NOT substr(NEW.created_at, 1, {prefix})
+        BEGIN{_attack_targets_rollup_bump("OLD", "-", encoded)}{_attack_targets_rollup_bump("NEW", "", encoded)}
+        END
+        """,
+        _stats_trigger("trg_targets_rollup_insert", "INSERT", "targets", [_target_rollup_bump("NEW", 1, encoded)]),
+        _stats_trigger("trg_targets_rollup_delete", "DELETE", "targets", [_target_rollup_bump("OLD", -1, encoded)]),
+        _stats_trigger("trg_targets_rollup_update", f"UPDATE OF {_category_column('protocol', encoded)}, attack_id",
+                       "targets", [_target_rollup_bump("OLD", -1, encoded), _target_rollup_bump("NEW", 1, encoded)]),
+    ]
+
+
+def rollup_rebuild_statements(encoded: bool = True) -> List[str]:
+    """Пересчёт attack_rollups и target_rollups по данным таблиц (миграция и rebuild_rollups)"""
+    dimensions = ", ".join(ROLLUP_DIMENSIONS)
+    values = ", ".join(_category_value(column, "a", encoded) for column in ROLLUP_DIMENSIONS)
+    # Группы - по колонкам строк: значение справочника ищется раз на группу
+    keys = ", ".join(f"a.{_category_column(column, encoded)}" for column in ROLLUP_DIMENSIONS)
+    statements = ["DELETE FROM attack_rollups", "DELETE FROM target_rollups"]
+    for granularity, length in ROLLUP_GRANULARITIES.items():
+        statements += [
+            f"""
+            INSERT INTO attack_rollups (granularity, bucket, {dimensions}, count)
+            SELECT '{granularity}', substr(a.created_at, 1, {length}), {values}, COUNT(*)
+            FROM attacks a GROUP BY 2, {keys}
+            """,
+            f"""
+            INSERT INTO target_rollups (granularity, bucket, protocol, count)
+            SELECT '{granularity}', substr(a.created_at, 1, {length}), {_protocol_key("t", encoded)}, COUNT(*)
+            FROM targets t JOIN attacks a ON a.id = t.attack_id GROUP BY 2, 3
+            """,
+        ]
+    return statements
+
+
+# Время создания атаки в секундах эпохи (created_at без пояса читается как UTC);
+# Python-аналог - sql_functions.epoch_seconds
+CREATED_TS_SQL = "CAST(strftime('%s', created_at) AS INTEGER)"
+
+
+def _add_created_ts(conn):
+    """Вычисляемая колонка attacks.created_ts и её индекс (ADD COLUMN не поддерживает IF NOT EXISTS)"""
+    columns = [row[1] for row in conn.execute("PRAGMA table_xinfo(attacks)")]
+    if "created_ts" not in columns:
+        conn.execute(f"ALTER TABLE attacks ADD COLUMN created_ts INTEGER GENERATED ALWAYS AS ({CREATED_TS_SQL}) VIRTUAL")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_attacks_created_ts ON attacks (created_ts)")
+
+
+# Категориальные колонки -> (таблица, колонка, справочник, значения по умолчанию по возрастанию ранга)
+CATEGORY_LOOKUPS = {
+    "frequency": ("attacks", "frequency_levels", ("low", "medium", "high", "very_high", "continuous")),
+    "danger": ("attacks", "danger_levels", ("low", "medium", "high", "critical")),
+    "attack_type": ("attacks", "attack_types", ("volumetric", "protocol", "application", "amplification")),
+    "protocol": ("targets", "protocols", ("tcp", "udp", "dns", "http", "https", "icmp")),
+}
+
+
+def _category_lookup_statements() -> List[str]:
+    """Справочники категориальных колонок и триггеры, проверяющие ссылки на них"""
+    statements = []
+    for column, (table, lookup, defaults) in CATEGORY_LOOKUPS.items():
+        values = ", ".join(f"('{value}', {rank})" for rank, value in enumerate(defaults, 1))
+        statements += [
+            f"""
+            CREATE TABLE IF NOT EXISTS {lookup} (
+                id INTEGER PRIMARY KEY,
+                value TEXT NOT NULL UNIQUE,
+                rank INTEGER NOT NULL
+            )
+            """,
+            f"INSERT OR IGNORE INTO {lookup} (value, rank) VALUES {values}",
+            # Значения, уже встречающиеся в данных, - после значений по умолчанию
+            f"""
+            INSERT OR IGNORE INTO {lookup} (value, rank)
+            SELECT DISTINCT {column}, (SELECT MAX(rank) FROM {lookup}) + 1 FROM {table}
+            WHERE {column} IS NOT NULL ORDER BY {column}
+            """,
+        ]
+        # Ссылка на справочник проверяется как внешний ключ (NULL допустим)
+        for event in ("INSERT", f"UPDATE OF {column}"):
+            statements.append(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_{column}_lookup_{event.split()[0].lower()}
+            BEFORE {event} ON {table}
+            WHEN NEW.{column} IS NOT NULL AND NOT EXISTS (SELECT 1 FROM {lookup} WHERE value = NEW.{column})
+            BEGIN
+                SELECT RAISE(ABORT, 'Unknown {column}: not in {lookup}');
+            END
+            """)
+    return statements + _lookup_restrict_triggers(encoded=False)
+
+
+def _lookup_restrict_triggers(encoded: bool) -> List[str]:
+    """Значение справочника, на которое ссылаются строки, нельзя удалить или переименовать.
+
+    После миграции 17 строки ссылаются на id: переименование значения
+    разрешено, запрещены удаление и смена id.
+    """
+    statements = []
+    for column, (table, lookup, _defaults) in CATEGORY_LOOKUPS.items():
+        if encoded:
+            events = (("DELETE", ""), ("UPDATE OF id", "NEW.id IS NOT OLD.id AND "))
+            reference = f"{column}_id = OLD.id"
+        else:
+            events = (("DELETE", ""), ("UPDATE OF value", "NEW.value IS NOT OLD.value AND "))
+            reference = f"{column} = OLD.value"
+        for event, condition in events:
+            statements.append(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{lookup}_restrict_{event.split()[0].lower()}
+            BEFORE {event} ON {lookup}
+            WHEN {condition}EXISTS (SELECT 1 FROM {table} WHERE {reference})
+            BEGIN
+                SELECT RAISE(ABORT, '{column} value is in use');
+            END
+            """)
+    return statements
+
+
+# Представления с текстовыми значениями категорий: через них читают
+# загрузчики, снимок и инструменты SQL
+DETAIL_VIEWS = {"attacks": "attack_details", "targets": "target_details"}
+
+# Служебные таблицы миграций (производные индексы, журналы, сводки, очереди):
+# инструменты SQL не показывают их в списках таблиц
+SERVICE_TABLES = frozenset({
+    "schema_migrations", "attack_index_queue", "deferred_triggers", "change_log", "change_log_state",
+    "attack_stats", "attack_rollups", "target_rollups", "attack_search_docs", "source_ip_ranges",
+    "target_ip_ranges", *(table for table, _, _ in LIST_TABLES.values()),
+})
+
+# Индексы по категориям: (имя, таблица, колонки после перевода на id)
+CATEGORY_INDEXES = (
+    ("idx_attacks_frequency_created", "attacks", "frequency_id, created_at, id"),
+    ("idx_attacks_danger_created", "attacks", "danger_id, created_at, id"),
+    ("idx_attacks_attack_type_created", "attacks", "attack_type_id, created_at, id"),
+    ("idx_targets_protocol", "targets", "protocol_id, attack_id"),
+)
+
+
+def _detail_view_statements() -> List[str]:
+    """Представления attack_details и target_details"""
+    statements = []
+    for table, view in DETAIL_VIEWS.items():
+        columns = [(column, lookup) for column, (source, lookup, _) in CATEGORY_LOOKUPS.items() if source == table]
+        values = ", ".join(f"{lookup}.value AS {column}" for column, lookup in columns)
+        joins = " ".join(f"LEFT JOIN {lookup} ON {lookup}.id = {table}.{column}_id" for column, lookup in columns)
+        statements.append(f"CREATE VIEW IF NOT EXISTS {view} AS SELECT {table}.*, {values} FROM {table} {joins}")
+    return statements
+
+
+def _category_definition(column: str, lookup: str, constraints: str, conn) -> str:
+    """Определение колонки {column}_id вместо текстовой column с теми же ограничениями.
+
+    DEFAULT может быть только константой, поэтому текстовое значение по
+    умолчанию заменяется id этого значения в справочнике.
+    """
+    def default_id(match):
+        row = conn.execute(f"SELECT id FROM {lookup} WHERE value = ?", (match.group(1),)).fetchone()
+        return f"DEFAULT {row[0]}" if row else ""
+    constraints = re.sub(r"DEFAULT\s+'([^']*)'", default_id, constraints, flags=re.IGNORECASE)
+    return f"{column}_id INTEGER{constraints.rstrip()} REFERENCES {lookup} (id)"
+
+
+def _rebuild_with_category_ids(conn, table: str):
+    """Пересоздание table с колонками {column}_id (создать новую, скопировать, удалить, переименовать).
+
+    ALTER TABLE ADD/DROP COLUMN теряет NOT NULL и DEFAULT исходных колонок,
+    поэтому определение берётся из CREATE TABLE таблицы, меняются только
+    категориальные колонки; остальные колонки (в т.ч. добавленные через
+    ALTER TABLE), ключи, индексы и счётчик AUTOINCREMENT сохраняются.
+    Триггеры к этому моменту сняты, внешние ключи выключены (foreign_keys).
+    """
+    sql = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()[0]
+    categories = {column: lookup for column, (source, lookup, _) in CATEGORY_LOOKUPS.items() if source == table}
+    copied = []
+    for name, hidden in conn.execute(f"SELECT name, hidden FROM pragma_table_xinfo('{table}')").fetchall():
+        if hidden:
+            continue
+        if name in categories:
+            lookup = categories[name]
+            copied.append((f"{name}_id", f"(SELECT id FROM {lookup} WHERE value = {table}.{name})"))
+            pattern = re.compile(rf"\b{name}\s+TEXT\b([^,]*?)(?=,|\)\s*$)", re.IGNORECASE)
+            sql, found = pattern.subn(lambda m, c=name, l=lookup: _category_definition(c, l, m.group(1), conn), sql)
+            if found != 1:
+                raise ValueError(f"Cannot find definition of {table}.{name} in its CREATE TABLE")
+        else:
+            copied.append((name, name))
+    sql = re.sub(rf"^CREATE TABLE\s+(IF NOT EXISTS\s+)?[\"`]?{table}[\"`]?", f"CREATE TABLE {table}_new", sql,
+                 flags=re.IGNORECASE)
+
+    indexes = [row[0] for row in conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL", (table,))]
+    sequence = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,)).fetchone() \
+        if "AUTOINCREMENT" in sql.upper() else None
+
+    conn.execute(sql)
+    conn.execute(f"INSERT INTO {table}_new ({', '.join(name for name, _ in copied)}) "
+                 f"SELECT {', '.join(value for _, value in copied)} FROM {table}")
+    conn.execute(f"DROP TABLE {table}")
+    # Ссылки на {table}_new в схеме переписывать не нужно: их нет, а
+    # представления над таблицей в этот момент проверялись бы зря
+    conn.execute("PRAGMA legacy_alter_table = ON")
+    try:
+        conn.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+    finally:
+        conn.execute("PRAGMA legacy_alter_table = OFF")
+    if sequence is not None:
+        conn.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = ?", (sequence[0], table))
+    for statement in indexes:
+        conn.execute(statement)
+
+
+def _encode_categories(conn):
+    """Перевод категориальных колонок attacks/targets на id справочников.
+
+    Таблицы перестраиваются целиком (_rebuild_with_category_ids), поэтому
+    все триггеры снимаются и пересоздаются: производные индексы и
+    ограничения справочников - в новой форме, остальные - как были.
+    Проверочные триггеры справочников больше не нужны: ссылку задаёт
+    внешний ключ, а неизвестные значения добавляет в справочник запись.
+    """
+    triggers = conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger'").fetchall()
+    for name, _ in triggers:
+        conn.execute(f"DROP TRIGGER {name}")
+    for name, _, _ in CATEGORY_INDEXES:
+        conn.execute(f"DROP INDEX IF EXISTS {name}")
+    for view in DETAIL_VIEWS.values():
+        conn.execute(f"DROP VIEW IF EXISTS {view}")
+
+    for table in DETAIL_VIEWS:
+        columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        pending = [column for column, (source, _, _) in CATEGORY_LOOKUPS.items()
+                   if source == table and column in columns]
+        if not pending:
+            continue
+        for column in pending:
+            lookup = CATEGORY_LOOKUPS[column][1]
+            conn.execute(f"""
+                INSERT OR IGNORE INTO {lookup} (value, rank)
+                SELECT DISTINCT {column}, (SELECT MAX(rank) FROM {lookup}) + 1 FROM {table}
+                WHERE {column} IS NOT NULL ORDER BY {column}
+            """)
+        _rebuild_with_category_ids(conn, table)
+
+    lookups = {lookup for _, lookup, _ in CATEGORY_LOOKUPS.values()}
+    broken = [row for row in conn.execute("PRAGMA foreign_key_check") if row[2] in lookups]
+    if broken:
+        raise ValueError(f"{len(broken)} rows reference missing lookup values, e.g. {tuple(broken[0])}")
+
+    for name, table, columns in CATEGORY_INDEXES:
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})")
+    encoded = _stats_triggers(encoded=True) + _rollup_triggers(encoded=True) + _lookup_restrict_triggers(encoded=True)
+    for statement in encoded + _detail_view_statements():
+        conn.execute(statement)
+
+    obsolete = {f"trg_{table}_{column}_lookup_{event}"
+                for column, (table, _, _) in CATEGORY_LOOKUPS.items() for event in ("insert", "update")}
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+    for name, sql in triggers:
+        if name not in existing and name not in obsolete:
+            conn.execute(sql)
+
+    # Снятые массовым импортом триггеры вернёт restore_deferred_indexes -
+    # в deferred_triggers должна лежать уже новая форма
+    for name, sql in conn.execute("""
+        SELECT d.name, m.sql FROM deferred_triggers d JOIN sqlite_master m ON m.type = 'trigger' AND m.name = d.name
+    """).fetchall():
+        conn.execute("UPDATE deferred_triggers SET sql = ? WHERE name = ?", (sql, name))
+        conn.execute(f"DROP TRIGGER {name}")
+
+
+def _stats_trigger(name: str, event: str, table: str, bumps: List[str]) -> str:
+    return f"""
+        CREATE TRIGGER IF NOT EXISTS {name} AFTER {event} ON {table}
+        BEGIN{"".join(bumps)}
+        END
+        """
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "Base schema: attacks, targets, custom_types", [
+        """
+        CREATE TABLE IF NOT EXISTS attacks (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            frequency TEXT NOT NULL,
+            danger TEXT NOT NULL,
+            attack_type TEXT NOT NULL,
+            source_ips TEXT NOT NULL,
+            affected_ports TEXT NOT NULL,
+            mitigation_strategies TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS targets (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            attack_id TEXT NOT NULL,
+            target_ip TEXT,
+            target_domain TEXT,
+            port INTEGER DEFAULT 80,
+            protocol TEXT DEFAULT 'tcp',
+            tags TEXT,
+            FOREIGN KEY (attack_id) REFERENCES attacks (id) ON DELETE CASCADE
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS custom_types (
+            id TEXT PRIMARY KEY,
+            name TEXT UNIQUE,
+            type TEXT,
+            enum_values TEXT,
+            created_at TEXT
+        )
+        """,
+    ]),
+    Migration(2, "Secondary indexes for filters, ordering and target lookups", [
+        # Сортировка created_at DESC (id - для стабильного порядка)
+        "CREATE INDEX IF NOT EXISTS idx_attacks_created_at ON attacks (created_at, id)",
+        # Фильтры filter_attacks; created_at во втором поле отдаёт строки почти в нужном порядке
+        "CREATE INDEX IF NOT EXISTS idx_attacks_frequency ON attacks (frequency, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_attacks_danger ON attacks (danger, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_attacks_attack_type ON attacks (attack_type, created_at)",
+        # Загрузка целей атаки
+        "CREATE INDEX IF NOT EXISTS idx_targets_attack_id ON targets (attack_id)",
+        # Покрывающий индекс для фильтра по протоколу: attack_id берётся прямо из индекса
+        "CREATE INDEX IF NOT EXISTS idx_targets_protocol ON targets (protocol, attack_id)",
+    ]),
+    Migration(3, "Extend filter indexes with id for keyset pagination", [
+        # Порядок страниц - (created_at, id) DESC: с id в индексе фильтр по одному
+        # значению отдаёт строки уже отсортированными, без temp b-tree
+        "DROP INDEX IF EXISTS idx_attacks_frequency",
+        "DROP INDEX IF EXISTS idx_attacks_danger",
+        "DROP INDEX IF EXISTS idx_attacks_attack_type",
+        "CREATE INDEX IF NOT EXISTS idx_attacks_frequency_created ON attacks (frequency, created_at, id)",
+        "CREATE INDEX IF NOT EXISTS idx_attacks_danger_created ON attacks (danger, created_at, id)",
+        "CREATE INDEX IF NOT EXISTS idx_attacks_attack_type_created ON attacks (attack_type, created_at, id)",
+    ]),
+    Migration(4, "Change log for attacks and targets maintained by triggers", [
+        # AUTOINCREMENT: версии строго растут и не переиспользуются после очистки журнала
+        """
+        CREATE TABLE IF NOT EXISTS change_log (
+            version INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            operation TEXT NOT NULL,
+            row_id TEXT NOT NULL,
+            attack_id TEXT,
+            changed_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+        )
+        """,
+        # Граница очистки: изменения с версией <= compacted_through удалены
+        """
+        CREATE TABLE IF NOT EXISTS change_log_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            compacted_through INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+        "INSERT OR IGNORE INTO change_log_state (id, compacted_through) VALUES (1, 0)",
+        "CREATE INDEX IF NOT EXISTS idx_change_log_changed_at ON change_log (changed_at)",
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_attacks_log_insert AFTER INSERT ON attacks
+        BEGIN
+            INSERT INTO change_log (table_name, operation, row_id, attack_id)
+            VALUES ('attacks', 'insert', NEW.id, NEW.id);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_attacks_log_update AFTER UPDATE ON attacks
+        BEGIN
+            INSERT INTO change_log (table_name, operation, row_id, attack_id)
+            VALUES ('attacks', 'update', NEW.id, NEW.id);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_attacks_log_delete AFTER DELETE ON attacks
+        BEGIN
+            INSERT INTO change_log (table_name, operation, row_id, attack_id)
+            VALUES ('attacks', 'delete', OLD.id, OLD.id);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_targets_log_insert AFTER INSERT ON targets
+        BEGIN
+            INSERT INTO change_log (table_name, operation, row_id, attack_id)
+            VALUES ('targets', 'insert', NEW.id, NEW.attack_id);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_targets_log_update AFTER UPDATE ON targets
+        BEGIN
+            INSERT INTO change_log (table_name, operation, row_id, attack_id)
+            VALUES ('targets', 'update', NEW.id, NEW.attack_id);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_targets_log_delete AFTER DELETE ON targets
+        BEGIN
+            INSERT INTO change_log (table_name, operation, row_id, attack_id)
+            VALUES ('targets', 'delete', OLD.id, OLD.attack_id);
+        END
+        """,
+    ]),
+    Migration(5, "Attack statistics summary table maintained by triggers", [
+        # Счётчики по измерениям: total (value=''), danger, frequency, attack_type
+        # (атаки) и protocol (цели). Триггеры меняют их в той же транзакции,
+        # что и запись в attacks/targets
+        """
+        CREATE TABLE IF NOT EXISTS attack_stats (
+            dimension TEXT NOT NULL,
+            value TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (dimension, value)
+        )
+        """,
+    ] + _stats_triggers(encoded=False)
+    # Заполнение по уже существующим данным
+    + stats_rebuild_statements(encoded=False)),
+    # JSON-колонки остаются основным хранилищем записи; дочерние таблицы
+    # повторяют их через триггеры и дают индексированный поиск по значению
+    Migration(6, "Child tables for source_ips, affected_ports and mitigation_strategies", _list_statements()),
+    # Диапазоны IP как 128-битные ключи (BLOB 16 байт, см. sql_functions.ip_bounds):
+    # запрос по CIDR - это диапазон ip_start по индексу. Значения, не являющиеся
+    # IP или сетью, в диапазоны не попадают
+    Migration(7, "IP range index for source IPs and target IPs", [
+        """
+        CREATE TABLE IF NOT EXISTS source_ip_ranges (
+            attack_id TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            ip_start BLOB NOT NULL,
+            ip_end BLOB NOT NULL,
+            PRIMARY KEY (attack_id, position)
+        ) WITHOUT ROWID
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS target_ip_ranges (
+            target_id INTEGER PRIMARY KEY,
+            attack_id TEXT NOT NULL,
+            ip_start BLOB NOT NULL,
+            ip_end BLOB NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_source_ip_ranges_start ON source_ip_ranges (ip_start, ip_end, attack_id)",
+        "CREATE INDEX IF NOT EXISTS idx_target_ip_ranges_start ON target_ip_ranges (ip_start, ip_end, attack_id)",
+        # Проверка EXISTS по атаке для широких сетей (у source_ip_ranges это первичный ключ)
+        "CREATE INDEX IF NOT EXISTS idx_target_ip_ranges_attack_id ON target_ip_ranges (attack_id)",
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_source_ip_ranges_insert AFTER INSERT ON attack_source_ips
+        WHEN ip_range_start(NEW.ip) IS NOT NULL
+        BEGIN
+            INSERT INTO source_ip_ranges (attack_id, position, ip_start, ip_end)
+            VALUES (NEW.attack_id, NEW.position, ip_range_start(NEW.ip), ip_range_end(NEW.ip));
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_source_ip_ranges_update AFTER UPDATE ON attack_source_ips
+        BEGIN
+            DELETE FROM source_ip_ranges WHERE attack_id = OLD.attack_id AND position = OLD.position;
+            INSERT INTO source_ip_ranges (attack_id, position, ip_start, ip_end)
+            SELECT NEW.attack_id, NEW.position, ip_range_start(NEW.ip), ip_range_end(NEW.ip)
+            WHERE ip_range_start(NEW.ip) IS NOT NULL;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_source_ip_ranges_delete AFTER DELETE ON attack_source_ips
+        BEGIN
+            DELETE FROM source_ip_ranges WHERE attack_id = OLD.attack_id AND position = OLD.position;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_target_ip_ranges_insert AFTER INSERT ON targets
+        WHEN ip_range_start(NEW.target_ip) IS NOT NULL
+        BEGIN
+            INSERT INTO target_ip_ranges (target_id, attack_id, ip_start, ip_end)
+            VALUES (NEW.id, NEW.attack_id, ip_range_start(NEW.target_ip), ip_range_end(NEW.target_ip));
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_target_ip_ranges_update AFTER UPDATE OF target_ip, attack_id ON targets
+        BEGIN
+            DELETE FROM target_ip_ranges WHERE target_id = OLD.id;
+            INSERT INTO target_ip_ranges (target_id, attack_id, ip_start, ip_end)
+            SELECT NEW.id, NEW.attack_id, ip_range_start(NEW.target_ip), ip_range_end(NEW.target_ip)
+            WHERE ip_range_start(NEW.target_ip) IS NOT NULL;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_target_ip_ranges_delete AFTER DELETE ON targets
+        BEGIN
+            DELETE FROM target_ip_ranges WHERE target_id = OLD.id;
+        END
+        """,
+        # Заполнение по уже существующим данным
+        "DELETE FROM source_ip_ranges",
+        """
+        INSERT INTO source_ip_ranges (attack_id, position, ip_start, ip_end)
+        SELECT attack_id, position, ip_range_start(ip), ip_range_end(ip) FROM attack_source_ips
+        WHERE ip_range_start(ip) IS NOT NULL
+        """,
+        "DELETE FROM target_ip_ranges",
+        """
+        INSERT INTO target_ip_ranges (target_id, attack_id, ip_start, ip_end)
+        SELECT id, attack_id, ip_range_start(target_ip), ip_range_end(target_ip) FROM targets
+        WHERE ip_range_start(target_ip) IS NOT NULL
+        """,
+    ]),
+    # Полнотекстовый поиск: строка FTS5 на атаку с её названием, стратегиями,
+    # доменами и тегами целей. rowid строки - постоянный docid из
+    # attack_search_docs (rowid самой attacks может меняться при VACUUM)
+    Migration(8, "FTS5 full-text index over attacks and their targets", [
+        """
+        CREATE TABLE IF NOT EXISTS attack_search_docs (
+            docid INTEGER PRIMARY KEY AUTOINCREMENT,
+            attack_id TEXT NOT NULL UNIQUE
+        )
+        """,
+        f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS attacks_fts USING fts5(
+            {", ".join(SEARCH_COLUMNS)},
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3'
+        )
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_attacks_fts_insert AFTER INSERT ON attacks
+        BEGIN
+            INSERT OR IGNORE INTO attack_search_docs (attack_id) VALUES (NEW.id);{_search_refresh("NEW.id")}
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_attacks_fts_update AFTER UPDATE OF name, mitigation_strategies ON attacks
+        BEGIN{_search_refresh("NEW.id")}
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_attacks_fts_delete AFTER DELETE ON attacks
+        BEGIN
+            DELETE FROM attacks_fts WHERE rowid = (SELECT docid FROM attack_search_docs WHERE attack_id = OLD.id);
+            DELETE FROM attack_search_docs WHERE attack_id = OLD.id;
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_targets_fts_insert AFTER INSERT ON targets
+        BEGIN{_search_refresh("NEW.attack_id")}
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_targets_fts_update AFTER UPDATE OF target_domain, tags, attack_id ON targets
+        BEGIN{_search_refresh("OLD.attack_id")}{_search_refresh("NEW.attack_id")}
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_targets_fts_delete AFTER DELETE ON targets
+        BEGIN{_search_refresh("OLD.attack_id")}
+        END
+        """,
+        # Заполнение по уже существующим данным
+        "INSERT OR IGNORE INTO attack_search_docs (attack_id) SELECT id FROM attacks",
+        "DELETE FROM attacks_fts",
+        _search_documents(),
+    ]),
+    # Триграммы названий атак и доменов целей: подстрока из 3+ символов
+    # находится как фраза из её триграмм, точная проверка LIKE/REGEXP
+    # выполняется только по найденным кандидатам
+    Migration(9, "Trigram indexes over attack names and target domains", [
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS attacks_name_trigram USING fts5(name, tokenize = 'trigram')
+        """,
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS targets_domain_trigram USING fts5(target_domain, tokenize = 'trigram')
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_attacks_trigram_insert AFTER INSERT ON attacks
+        BEGIN
+            INSERT OR IGNORE INTO attack_search_docs (attack_id) VALUES (NEW.id);
+            INSERT INTO attacks_name_trigram (rowid, name)
+            SELECT docid, NEW.name FROM attack_search_docs WHERE attack_id = NEW.id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_attacks_trigram_update AFTER UPDATE OF name ON attacks
+        BEGIN
+            DELETE FROM attacks_name_trigram
+            WHERE rowid = (SELECT docid FROM attack_search_docs WHERE attack_id = NEW.id);
+            INSERT INTO attacks_name_trigram (rowid, name)
+            SELECT docid, NEW.name FROM attack_search_docs WHERE attack_id = NEW.id;
+        END
+        """,
+        # docid нужен до удаления строки attack_search_docs, а порядок срабатывания
+        # триггеров не определён - удаление из обоих индексов в одном триггере
+        "DROP TRIGGER IF EXISTS trg_attacks_fts_delete",
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_attacks_fts_delete AFTER DELETE ON attacks
+        BEGIN
+            DELETE FROM attacks_fts WHERE rowid = (SELECT docid FROM attack_search_docs WHERE attack_id = OLD.id);
+            DELETE FROM attacks_name_trigram WHERE rowid = (SELECT docid FROM attack_search_docs WHERE attack_id = OLD.id);
+            DELETE FROM attack_search_docs WHERE attack_id = OLD.id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_targets_trigram_insert AFTER INSERT ON targets
+        BEGIN
+            INSERT INTO targets_domain_trigram (rowid, target_domain) VALUES (NEW.id, NEW.target_domain);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_targets_trigram_update AFTER UPDATE OF target_domain ON targets
+        BEGIN
+            DELETE FROM targets_domain_trigram WHERE rowid = OLD.id;
+            INSERT INTO targets_domain_trigram (rowid, target_domain) VALUES (NEW.id, NEW.target_domain);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_targets_trigram_delete AFTER DELETE ON targets
+        BEGIN
+            DELETE FROM targets_domain_trigram WHERE rowid = OLD.id;
+        END
+        """,
+        # Заполнение по уже существующим данным
+        "INSERT OR IGNORE INTO attack_search_docs (attack_id) SELECT id FROM attacks",
+        "DELETE FROM attacks_name_trigram",
+        """
+        INSERT INTO attacks_name_trigram (rowid, name)
+        SELECT d.docid, a.name FROM attacks a JOIN attack_search_docs d ON d.attack_id = a.id
+        """,
+        "DELETE FROM targets_domain_trigram",
+        "INSERT INTO targets_domain_trigram (rowid, target_domain) SELECT id, target_domain FROM targets",
+    ]),
+    Migration(10, "Hourly and daily rollups of attack and target counts", [
+        # Счётчики атак по корзине времени и измерениям и целей по протоколу.
+        # Поддерживаются триггерами в транзакции записи, как attack_stats;
+        # строки с нулевым count остаются до rebuild_rollups
+        f"""
+        CREATE TABLE IF NOT EXISTS attack_rollups (
+            granularity TEXT NOT NULL,
+            bucket TEXT NOT NULL,
+            {" ".join(f"{column} TEXT NOT NULL," for column in ROLLUP_DIMENSIONS)}
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (granularity, bucket, {", ".join(ROLLUP_DIMENSIONS)})
+        ) WITHOUT ROWID
+        """,
+        # protocol NULL хранится как '' (ключ не может быть NULL)
+        """
+        CREATE TABLE IF NOT EXISTS target_rollups (
+            granularity TEXT NOT NULL,
+            bucket TEXT NOT NULL,
+            protocol TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (granularity, bucket, protocol)
+        ) WITHOUT ROWID
+        """,
+        # Выборки по периоду без разбивки по измерениям
+        "CREATE INDEX IF NOT EXISTS idx_attack_rollups_bucket ON attack_rollups (granularity, bucket)",
+    ] + _rollup_triggers(encoded=False) + rollup_rebuild_statements(encoded=False)),
+    # Диапазоны по времени: created_at - ISO-строка, формат которой у
+    # импортированных данных может отличаться; created_ts - целые секунды
+    # эпохи. Колонка VIRTUAL вычисляется из created_at и хранится только в
+    # индексе, поэтому запись в attacks и триггеры не меняются
+    Migration(11, "Epoch created_ts column with an index for date range filters", apply=_add_created_ts),
+    # Допустимые значения frequency/danger/attack_type/protocol и их порядок
+    # (ранг для сравнений вроде "danger не ниже high") хранятся в справочниках.
+    # Здесь колонки ещё текстовые и проверяются триггерами по справочникам;
+    # миграция 17 заменяет их на id справочника
+    Migration(12, "Lookup tables for categorical columns with ordinal ranks", _category_lookup_statements()),
+    # Элемент null в JSON-списке (source_ips: [None]) нарушал NOT NULL
+    # дочерней таблицы и отменял всю запись атаки; такие элементы в дочерние
+    # таблицы не попадают (в JSON-колонке они остаются)
+    Migration(13, "Skip null list elements in child list tables", _list_null_fix_statements()),
+    # Диапазоны IP считаются в Python (DatabaseManager.flush_index_queue), а не
+    # функциями ip_range_* в триггерах: запись в attacks/targets доступна любому
+    # соединению (sqlite3, скрипты), импорт не вызывает Python на каждую строку.
+    # Триггеры только удаляют устаревшие диапазоны и ставят атаку в очередь
+    # attack_index_queue; очередь разбирается в транзакции записи DatabaseManager
+    Migration(14, "Compute IP ranges in Python from a queue of changed attacks", [
+        "CREATE TABLE IF NOT EXISTS attack_index_queue (attack_id TEXT PRIMARY KEY) WITHOUT ROWID",
+        "DROP TRIGGER IF EXISTS trg_source_ip_ranges_insert",
+        "DROP TRIGGER IF EXISTS trg_source_ip_ranges_update",
+        "DROP TRIGGER IF EXISTS trg_source_ip_ranges_delete",
+        "DROP TRIGGER IF EXISTS trg_target_ip_ranges_insert",
+        "DROP TRIGGER IF EXISTS trg_target_ip_ranges_update",
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_attacks_index_queue_insert AFTER INSERT ON attacks
+        BEGIN
+            INSERT OR IGNORE INTO attack_index_queue (attack_id) VALUES (NEW.id);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_attacks_index_queue_update AFTER UPDATE OF source_ips ON attacks
+        WHEN OLD.source_ips IS NOT NEW.source_ips
+        BEGIN
+            INSERT OR IGNORE INTO attack_index_queue (attack_id) VALUES (NEW.id);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_attacks_ip_ranges_delete AFTER DELETE ON attacks
+        BEGIN
+            DELETE FROM source_ip_ranges WHERE attack_id = OLD.id;
+            DELETE FROM target_ip_ranges WHERE attack_id = OLD.id;
+            DELETE FROM attack_index_queue WHERE attack_id = OLD.id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_targets_index_queue_insert AFTER INSERT ON targets
+        BEGIN
+            INSERT OR IGNORE INTO attack_index_queue (attack_id) VALUES (NEW.attack_id);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_targets_index_queue_update AFTER UPDATE OF target_ip, attack_id ON targets
+        BEGIN
+            DELETE FROM target_ip_ranges WHERE target_id = OLD.id;
+            INSERT OR IGNORE INTO attack_index_queue (attack_id) VALUES (NEW.attack_id);
+        END
+        """,
+    ]),
+    # Триггеры целей пересобирали документ attacks_fts всей атаки на каждую
+    # строку - k целей стоили O(k^2). Теперь триггеры только ставят атаку в
+    # attack_index_queue, документ пересобирается один раз при её разборе
+    # (search_refresh_statements)
+    Migration(15, "Rebuild full-text documents once per queued attack", [
+        "DROP TRIGGER IF EXISTS trg_attacks_fts_insert",
+        "DROP TRIGGER IF EXISTS trg_attacks_fts_update",
+        "DROP TRIGGER IF EXISTS trg_targets_fts_insert",
+        "DROP TRIGGER IF EXISTS trg_targets_fts_update",
+        "DROP TRIGGER IF EXISTS trg_targets_fts_delete",
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_attacks_fts_insert AFTER INSERT ON attacks
+        BEGIN
+            INSERT OR IGNORE INTO attack_search_docs (attack_id) VALUES (NEW.id);
+            INSERT OR IGNORE INTO attack_index_queue (attack_id) VALUES (NEW.id);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_attacks_fts_update AFTER UPDATE OF name, mitigation_strategies ON attacks
+        WHEN OLD.name IS NOT NEW.name OR OLD.mitigation_strategies IS NOT NEW.mitigation_strategies
+        BEGIN
+            INSERT OR IGNORE INTO attack_index_queue (attack_id) VALUES (NEW.id);
+        END
+        """,
+        # Вставку цели ставит в очередь trg_targets_index_queue_insert
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_targets_fts_update AFTER UPDATE OF target_domain, tags, attack_id ON targets
+        BEGIN
+            INSERT OR IGNORE INTO attack_index_queue (attack_id) VALUES (OLD.attack_id), (NEW.attack_id);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_targets_fts_delete AFTER DELETE ON targets
+        BEGIN
+            INSERT OR IGNORE INTO attack_index_queue (attack_id) VALUES (OLD.attack_id);
+        END
+        """,
+    ]),
+    # Массовый импорт снимает триггеры производных индексов на вставку
+    # (DEFERRED_INSERT_TRIGGERS) и пересобирает индексы один раз в конце;
+    # SQL снятых триггеров хранится здесь до их возврата
+    Migration(16, "Saved SQL of triggers deferred by bulk import", [
+        """
+        CREATE TABLE IF NOT EXISTS deferred_triggers (
+            name TEXT PRIMARY KEY,
+            sql TEXT NOT NULL
+        )
+        """,
+    ]),
+    # frequency/danger/attack_type/protocol хранились строками в каждой
+    # строке. Теперь это целые {column}_id со ссылкой на справочник: строки и
+    # индексы по категориям меньше, сравнение - целых чисел. Текстовые
+    # значения дают представления attack_details и target_details
+    Migration(17, "Store categorical columns as lookup ids", apply=_encode_categories, foreign_keys=False),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+# Триггеры на вставку в attacks/targets, которые поддерживают производные
+# индексы (списки, статистику, сводки, поиск, очередь диапазонов IP). Их
+# результат полностью восстанавливается пересборкой, поэтому массовый импорт
+# может снять их на время загрузки. Журнал изменений и ограничения
+# справочников остаются
+DEFERRED_INSERT_TRIGGERS = tuple(
+    [f"trg_{table}_insert" for table, _, _ in LIST_TABLES.values()] +
+    [f"trg_attacks_{kind}_insert" for kind in ("stats", "rollup", "fts", "trigram", "index_queue")] +
+    [f"trg_targets_{kind}_insert" for kind in ("stats", "rollup", "trigram", "index_queue")]
+)
+
+
+class MigrationError(RuntimeError):
+    """Миграция не применилась; схема осталась на версии before"""
+
+    def __init__(self, migration: Migration, before: int, error: Exception):
+        super().__init__(f"Schema migration {migration.version} ({migration.description}) failed, "
+                         f"schema stays at version {before}: {error}")
+        self.version = migration.version
+        self.before = before
+
+
+def _ensure_version_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TEXT NOT NULL
+        )
+    """)
+
+
+def get_schema_version(conn) -> int:
+    """Текущая версия схемы (0 - миграции не применялись)"""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='schema_migrations'"
+    ).fetchone()
+    if not exists:
+        return 0
+    row = conn.execute("SELECT MAX(version) FROM schema_migrations").fetchone()
+    return row[0] or 0
+
+
+def apply_migrations(conn, target_version: Optional[int] = None) -> List[int]:
+    """Применение недостающих миграций; возвращает список применённых версий"""
+    target_version = target_version or LATEST_VERSION
+    _ensure_version_table(conn)
+    conn.commit()
+
+    applied = []
+    for migration in MIGRATIONS:
+        if migration.version > target_version:
+            break
+
+        # PRAGMA foreign_keys не меняется внутри транзакции
+        restore_foreign_keys = not migration.foreign_keys and conn.execute("PRAGMA foreign_keys").fetchone()[0]
+        if restore_foreign_keys:
+            conn.execute("PRAGMA foreign_keys = OFF")
+
+        # BEGIN IMMEDIATE сериализует миграции между соединениями,
+        # версию перепроверяем уже под блокировкой
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute("SELECT 1 FROM schema_migrations WHERE version = ?",
+                            (migration.version,)).fetchone():
+                conn.rollback()
+                continue
+
+            for statement in migration.statements:
+                conn.execute(statement)
+            if migration.apply is not None:
+                migration.apply(conn)
+
+            conn.execute(
+                "INSERT INTO schema_migrations (version, description, applied_at) VALUES (?, ?, ?)",
+                (migration.version, migration.description, datetime.now().isoformat())
+            )
+            conn.commit()
+            applied.append(migration.version)
+        except Exception as e:
+            conn.rollback()
+            raise MigrationError(migration, get_schema_version(conn), e) from e
+        finally:
+            if restore_foreign_keys:
+                conn.execute("PRAGMA foreign_keys = ON")
+
+    return applied
@@ -0,0 +1,224 @@
+"""Выполнение произвольного SQL в рабочих потоках с отменой, таймаутом и лимитом строк.
+
+Запрос выполняется на соединении из пула DatabaseManager. Пока он идёт,
+на соединении стоит progress handler: SQLite вызывает его каждые
+PROGRESS_STEPS инструкций VM, и он прерывает запрос (OperationalError
+"interrupted"), если запрос отменён или вышло время. Connection.interrupt
+не используется: соединение возвращается в пул, и запоздавший interrupt
+прервал бы уже чужой запрос.
+
+Результаты читающих запросов берутся из кэша результатов DatabaseManager
+(api/result_cache.py); пишущие запросы сбрасывают зависящие от них записи.
+"""
+import sqlite3
+import threading
+import time
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from .result_cache import is_schema_change
+
+
+# Частота вызова progress handler в инструкциях VM
+PROGRESS_STEPS = 1000
+
+
+class QueryCancelledError(Exception):
+    """Запрос отменён"""
+
+
+class QueryTimeoutError(Exception):
+    """Запрос выполнялся дольше допустимого времени"""
+
+
+@dataclass
+class QueryResult:
+    columns: List[str]
+    rows: List[Tuple]
+    # Строк было больше max_rows, возвращены только первые max_rows
+    truncated: bool = False
+    # Для пишущих запросов (INSERT, UPDATE, ..., в том числе с RETURNING)
+    rows_affected: int = -1
+    elapsed: float = 0.0
+    # Выполненные инструкции VM SQLite (с точностью до PROGRESS_STEPS) - объём проделанной работы
+    vm_steps: int = 0
+    # Результат взят из кэша результатов, запрос не выполнялся
+    cached: bool = False
+
+    def as_dicts(self) -> List[Dict[str, Any]]:
+        return [dict(zip(self.columns, row)) for row in self.rows]
+
+    def summary(self) -> str:
+        """Строка статуса для инструментов: строки, время, объём работы"""
+        if not self.columns:
+            rows = f"{self.rows_affected} rows affected"
+        else:
+            rows = f"{len(self.rows)} rows" + (" (row limit reached)" if self.truncated else "")
+        if self.cached:
+            return f"{rows} from cache in {self.elapsed * 1000:.0f} ms"
+        work = f"~{self.vm_steps:,}" if self.vm_steps else f"<{PROGRESS_STEPS:,}"
+        return f"{rows} in {self.elapsed * 1000:.0f} ms, {work} VM steps"
+
+
+class QueryHandle:
+    """Запущенный запрос: future с QueryResult и отмена"""
+
+    def __init__(self, sql: str, params: Tuple, timeout: Optional[float], max_rows: Optional[int]):
+        self.sql = sql
+        self.params = params
+        self.timeout = timeout
+        self.max_rows = max_rows
+        self.future: Optional[Future] = None
+        self.submitted = time.perf_counter()
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        """Отмена: ожидающий запрос не запустится, выполняющийся прервётся на ближайшей проверке"""
+        self._cancelled.set()
+        if self.future is not None:
+            self.future.cancel()
+
+    def done(self) -> bool:
+        return self.future is not None and self.future.done()
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.submitted
+
+    def result(self) -> QueryResult:
+        """QueryResult или исключение запроса (QueryCancelledError, QueryTimeoutError, sqlite3.Error)"""
+        try:
+            return self.future.result()
+        except CancelledError:
+            raise QueryCancelledError("Query cancelled") from None
+
+
+class QueryExecutor:
+    """Пул рабочих потоков для произвольных запросов инструментов SQL"""
+
+    PROGRESS_STEPS = PROGRESS_STEPS
+    FETCH_SIZE = 500
+
+    def __init__(self, db, workers: int = 2, timeout: Optional[float] = 30.0, max_rows: Optional[int] = 10000):
+        self.db = db
+        self.timeout = timeout
+        self.max_rows = max_rows
+        self._workers = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="query")
+        self._lock = threading.Lock()
+        self._active: Set[QueryHandle] = set()
+
+    def submit(self, sql: str, params: Sequence = (), timeout: Optional[float] = None,
+               max_rows: Optional[int] = None,
+               on_done: Optional[Callable[[QueryHandle], None]] = None) -> QueryHandle:
+        """Запуск запроса в рабочем потоке.
+
+        timeout и max_rows по умолчанию берутся из настроек исполнителя.
+        on_done вызывается в рабочем потоке (или сразу, если запрос отменён
+        до запуска) - UI должен сам перейти в главный поток.
+        """
+        handle = QueryHandle(sql, tuple(params),
+                             self.timeout if timeout is None else timeout,
+                             self.max_rows if max_rows is None else max_rows)
+        with self._lock:
+            self._active.add(handle)
+        handle.future = self._workers.submit(self._run, handle)
+        handle.future.add_done_callback(lambda _: self._finish(handle, on_done))
+        return handle
+
+    def _finish(self, handle: QueryHandle, on_done: Optional[Callable[[QueryHandle], None]]):
+        with self._lock:
+            self._active.discard(handle)
+        if on_done is not None:
+            on_done(handle)
+
+    def cancel_all(self):
+        """Отмена всех ожидающих и выполняющихся запросов"""
+        with self._lock:
+            handles = list(self._active)
+        for handle in handles:
+            handle.cancel()
+
+    def shutdown(self):
+        self.cancel_all()
+        self._workers.shutdown(wait=False)
+
+    def _run(self, handle: QueryHandle) -> QueryResult:
+        if handle.cancelled:
+            raise QueryCancelledError("Query cancelled")
+
+        started = time.perf_counter()
+        deadline = time.monotonic() + handle.timeout if handle.timeout else None
+        steps = 0
+
+        def progress():
+            nonlocal steps
+            steps += 1
+            # Ненулевой результат прерывает выполнение запроса
+            return handle.cancelled or (deadline is not None and time.monotonic() > deadline)
+
+        with self.db.connection() as conn:
+
+            def execute() -> QueryResult:
+                in_transaction, changes = conn.in_transaction, conn.total_changes
+                cursor = conn.execute(handle.sql, handle.params)
+                try:
+                    # Запись (в том числе с RETURNING) открывает транзакцию или меняет строки
+                    # уже на первом шаге; DDL вне транзакции узнаётся по тексту
+                    writes = (conn.in_transaction and not in_transaction
+                              or conn.total_changes != changes or is_schema_change(handle.sql))
+                    if cursor.description is None:
+                        result = QueryResult(columns=[], rows=[], rows_affected=cursor.rowcount)
+                    else:
+                        result = self._fetch(cursor, handle.max_rows)
+                        if writes:
+                            # Строки RETURNING сверх лимита дочитываются до COMMIT
+                            cursor.fetchall()
+                            result.rows_affected = cursor.rowcount
+                finally:
+                    cursor.close()
+                if writes:
+                    # Диапазоны IP и т.п. для атак, записанных этим запросом
+                    self.db.flush_index_queue(conn)
+                    conn.commit()
+                    # Сброс меняет поколение кэша: cached_query не сохранит результат записи
+                    self.db.invalidate_cache_for(handle.sql, conn)
+                return result
+
+            conn.set_progress_handler(progress, self.PROGRESS_STEPS)
+            try:
+                # Лимит строк входит в ключ: обрезанный результат не подходит для другого лимита
+                result, cached = self.db.cached_query(conn, handle.sql, handle.params, execute,
+                                                      variant=("rows", handle.max_rows))
+                if cached:
+                    result = replace(result, rows=list(result.rows), cached=True)
+            except sqlite3.OperationalError as e:
+                if handle.cancelled:
+                    raise QueryCancelledError("Query cancelled") from e
+                if deadline is not None and time.monotonic() > deadline:
+                    raise QueryTimeoutError(f"Query exceeded the {handle.timeout:g} s time limit") from e
+                raise
+            finally:
+                conn.set_progress_handler(None, 0)
+
+        result.elapsed = time.perf_counter() - started
+        if not result.cached:
+            result.vm_steps = steps * self.PROGRESS_STEPS
+        return result
+
+    def _fetch(self, cursor, max_rows: Optional[int]) -> QueryResult:
+        """Чтение строк до max_rows; одна лишняя строка показывает, что результат обрезан"""
+        columns = [desc[0] for desc in cursor.description]
+        rows: List[Tuple] = []
+        while max_rows is None or len(rows) <= max_rows:
+            size = self.FETCH_SIZE if max_rows is None else min(self.FETCH_SIZE, max_rows + 1 - len(rows))
+            chunk = cursor.fetchmany(size)
+            if not chunk:
+                break
+            rows.extend(tuple(row) for row in chunk)
+
+        truncated = max_rows is not None and len(rows) > max_rows
+        return QueryResult(columns=columns, rows=rows[:max_rows] if truncated else rows, truncated=truncated)
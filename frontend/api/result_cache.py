@@ -0,0 +1,221 @@
+"""Кэш результатов произвольных запросов с инвалидацией по таблицам.
+
+Ключ - нормализованный SQL и параметры. Запись помнит таблицы, из которых
+читает запрос (представления раскрываются в их таблицы). Запись в таблицу
+сбрасывает все записи, зависящие от неё и от таблиц, которые обновляют
+её триггеры (attacks -> attack_stats, attacks_fts, ...). Зависимости
+выводятся из sqlite_master по именам в тексте SQL - с запасом: лишняя
+инвалидация безопасна, пропущенная - нет.
+
+Вытеснение - LRU в пределах бюджета байт (оценка размера строк).
+"""
+import re
+import sys
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import Any, Dict, FrozenSet, Hashable, Iterable, List, Optional, Set, Tuple
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_IDENTIFIER = re.compile(r'"((?:[^"]|"")+)"|`([^`]+)`|\[([^\]]+)\]|([A-Za-z_][A-Za-z0-9_$]*)')
+_WHITESPACE = re.compile(r"\s+")
+
+_READ_STATEMENTS = {"select", "with", "values"}
+_SCHEMA_STATEMENTS = {"create", "alter", "drop"}
+# WITH ... DELETE/UPDATE пишет, а эти функции дают разный результат при каждом вызове
+_WRITE_KEYWORDS = {"insert", "update", "delete", "replace"}
+_VOLATILE_FUNCTIONS = {"random", "randomblob", "changes", "total_changes", "last_insert_rowid",
+                       "current_timestamp", "current_date", "current_time"}
+# Функции даты без аргументов берут текущее время; аргумент-колонка тоже
+# может оказаться 'now', поэтому детерминированы только вызовы с литералами
+_TIME_CALL = re.compile(r"\b(?:date|time|datetime|julianday|unixepoch|strftime)\s*\(", re.IGNORECASE)
+_LITERAL = re.compile(r"^(?:''|[+-]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?|NULL)$", re.IGNORECASE)
+
+
+def normalize_sql(sql: str) -> str:
+    """SQL для ключа кэша: пробелы вне строковых литералов схлопнуты, без ';' в конце"""
+    parts, position = [], 0
+    for literal in _STRING_LITERAL.finditer(sql):
+        parts.append(_WHITESPACE.sub(" ", sql[position:literal.start()]))
+        parts.append(literal.group())
+        position = literal.end()
+    parts.append(_WHITESPACE.sub(" ", sql[position:]))
+    return "".join(parts).strip().rstrip(";").strip()
+
+
+def sql_identifiers(sql: str) -> Set[str]:
+    """Имена (в нижнем регистре), упомянутые в SQL вне строковых литералов"""
+    names = set()
+    for match in _IDENTIFIER.finditer(_STRING_LITERAL.sub("''", sql)):
+        name = next(group for group in match.groups() if group is not None)
+        names.add(name.replace('""', '"').lower())
+    return names
+
+
+def _call_arguments(text: str, start: int) -> Optional[List[str]]:
+    """Аргументы вызова, открытого скобкой перед start (строки уже заменены на ''); None - скобка не закрыта"""
+    arguments, depth, begin = [], 1, start
+    for position in range(start, len(text)):
+        char = text[position]
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+            if depth == 0:
+                arguments.append(text[begin:position].strip())
+                return [] if arguments == [""] else arguments
+        elif char == "," and depth == 1:
+            arguments.append(text[begin:position].strip())
+            begin = position + 1
+    return None
+
+
+def _reads_current_time(sql: str) -> bool:
+    """В запросе есть date/time/datetime/julianday/unixepoch/strftime не только от литералов"""
+    text = _STRING_LITERAL.sub("''", sql)
+    for call in _TIME_CALL.finditer(text):
+        arguments = _call_arguments(text, call.end())
+        if not arguments or not all(_LITERAL.match(argument) for argument in arguments):
+            return True
+    return False
+
+
+def is_cacheable(sql: str) -> bool:
+    """Запрос только читает и его результат зависит лишь от данных в таблицах"""
+    words = sql_identifiers(sql)
+    first = normalize_sql(sql).split(" ", 1)[0].lower()
+    return (first in _READ_STATEMENTS and not words & (_WRITE_KEYWORDS | _VOLATILE_FUNCTIONS)
+            and "'now'" not in sql.lower() and not _reads_current_time(sql))
+
+
+def is_schema_change(sql: str) -> bool:
+    """Запрос меняет схему (CREATE/ALTER/DROP)"""
+    return normalize_sql(sql).split(" ", 1)[0].lower() in _SCHEMA_STATEMENTS
+
+
+def estimate_size(value: Any) -> int:
+    """Примерный размер результата в байтах (строки и значения ячеек)"""
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value)
+    if isinstance(value, Mapping):
+        # Записи моделей (__slots__) считаются как словари их значений
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value.values())
+    if hasattr(value, "__dict__"):
+        return estimate_size(vars(value))
+    return sys.getsizeof(value)
+
+
+class TableDependencies:
+    """Таблицы, которые читает запрос и которые меняет запись (по sqlite_master)"""
+
+    def __init__(self, schema_rows: Iterable[Tuple[str, str, str, Optional[str]]]):
+        # Строки sqlite_master: (type, name, tbl_name, sql)
+        self.tables: Set[str] = set()
+        self.views: Dict[str, Set[str]] = {}
+        self.trigger_writes: Dict[str, Set[str]] = {}
+        for kind, name, table_name, sql in schema_rows:
+            if kind == "table":
+                self.tables.add(name.lower())
+            elif kind == "view":
+                self.views[name.lower()] = sql_identifiers(sql or "")
+            elif kind == "trigger":
+                self.trigger_writes.setdefault(table_name.lower(), set()).update(sql_identifiers(sql or ""))
+
+    def read_tables(self, sql: str) -> FrozenSet[str]:
+        """Таблицы, из которых может читать запрос"""
+        return self._closure(sql_identifiers(sql), self.views)
+
+    def written_tables(self, tables: Iterable[str]) -> FrozenSet[str]:
+        """Таблицы, которые меняются при записи в tables (с учётом триггеров)"""
+        return self._closure({table.lower() for table in tables}, self.trigger_writes)
+
+    def _closure(self, names: Set[str], references: Dict[str, Set[str]]) -> FrozenSet[str]:
+        """Транзитивное замыкание names по references, только существующие таблицы"""
+        seen, pending = set(), list(names)
+        while pending:
+            name = pending.pop()
+            if name not in seen:
+                seen.add(name)
+                pending.extend(references.get(name, ()))
+        return frozenset(seen & self.tables)
+
+
+class ResultCache:
+    """Потокобезопасный LRU-кэш результатов с бюджетом байт"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # key -> (value, size, tables)
+        self._entries: "OrderedDict[Hashable, Tuple[Any, int, FrozenSet[str]]]" = OrderedDict()
+        self._bytes = 0
+        # Растёт при каждой инвалидации: результат, посчитанный до неё, не сохраняется
+        self._generation = 0
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """(True, значение) при попадании, иначе (False, None)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return True, entry[0]
+
+    @property
+    def generation(self) -> int:
+        """Номер поколения: берётся до вычисления результата и передаётся в put"""
+        with self._lock:
+            return self._generation
+
+    def put(self, key: Hashable, value: Any, tables: FrozenSet[str], generation: Optional[int] = None):
+        """Сохранение результата; больше бюджета - не кэшируется.
+
+        Если с момента generation была инвалидация, результат мог быть
+        прочитан до записи, сбросившей кэш, и не сохраняется.
+        """
+        size = estimate_size(value)
+        if not self.enabled or size > self.max_bytes:
+            return
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (value, size, tables)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self._stats["evictions"] += 1
+
+    def invalidate(self, tables: Optional[Iterable[str]] = None) -> int:
+        """Удаление записей, читающих из tables (None - всех); возвращает их число"""
+        with self._lock:
+            self._generation += 1
+            if tables is None:
+                keys = list(self._entries)
+            else:
+                tables = frozenset(tables)
+                keys = [key for key, (_, _, read) in self._entries.items() if read & tables]
+            for key in keys:
+                self._bytes -= self._entries.pop(key)[1]
+            self._stats["invalidations"] += len(keys)
+            return len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._bytes
+            stats["max_bytes"] = self.max_bytes
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
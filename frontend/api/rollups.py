@@ -0,0 +1,137 @@
+"""Агрегатные запросы по сводкам attack_rollups/target_rollups (миграция 10).
+
+rollup_query переписывает COUNT по attacks или targets (их представлениям
+attack_details/target_details - при группировке по категориям) с группировкой по
+измерениям сводки и корзине времени в SUM(count) по сводке: объём работы
+зависит от числа корзин, а не от числа строк. Если сводка не может дать
+тот же результат (другие агрегаты, фильтр по прочим колонкам, CASE и т.п.),
+возвращается None - запрос выполняется по исходной таблице.
+"""
+import re
+from typing import Dict, List, Optional, Sequence
+
+from .migrations import ROLLUP_DIMENSIONS
+
+# Корзина времени -> (гранулярность сводки, длина префикса created_at)
+TIME_BUCKETS = {"hour": ("hour", 13), "day": ("day", 10), "month": ("day", 7), "year": ("day", 4)}
+
+# Колонки attacks, для которых COUNT(column) = COUNT(*)
+_ATTACK_COUNTABLE = {"*", "id", "name", "source_ips", "affected_ports", "mitigation_strategies",
+                     "created_at", "updated_at"}
+
+# Исходная таблица -> (сводка, её измерения, колонки, для которых COUNT(column) = COUNT(*)).
+# Таблицы хранят id справочников, текстовые измерения сводок есть у представлений
+ROLLUP_SOURCES = {
+    "attack_details": ("attack_rollups", ROLLUP_DIMENSIONS, _ATTACK_COUNTABLE | set(ROLLUP_DIMENSIONS)),
+    "target_details": ("target_rollups", ("protocol",), {"*", "id", "attack_id"}),
+    "attacks": ("attack_rollups", (), _ATTACK_COUNTABLE | {f"{column}_id" for column in ROLLUP_DIMENSIONS}),
+    "targets": ("target_rollups", (), {"*", "id", "attack_id"}),
+}
+
+# Условие WHERE инструмента агрегации: "<колонка> <оператор> <значение>"
+_CONDITION = re.compile(r"\s*(\w+)\s+(=|!=|<>|<=|>=|<|>|LIKE|IN|IS NULL|IS NOT NULL)(\s|$)", re.IGNORECASE)
+_AGGREGATE_CALL = re.compile(r"\b(COUNT|SUM|AVG|MIN|MAX|TOTAL|GROUP_CONCAT)\s*\(\s*([^)]*?)\s*\)", re.IGNORECASE)
+
+
+def bucket_expression(table: str, bucket: str) -> str:
+    """Корзина времени для строк исходной таблицы (запрос без сводки); у целей - время их атаки"""
+    created_at = ("created_at" if table in ("attacks", "attack_details")
+                  else f"(SELECT a.created_at FROM attacks a WHERE a.id = {table}.attack_id)")
+    return f"substr({created_at}, 1, {TIME_BUCKETS[bucket][1]})"
+
+
+def _rollup_condition(condition: str, dimensions: Sequence[str]) -> Optional[str]:
+    """Условие WHERE для сводки или None, если его нельзя проверить по ней"""
+    match = _CONDITION.match(condition)
+    if match is None or match.group(1).lower() not in dimensions:
+        return None
+    # В target_rollups отсутствующий протокол хранится как '': для любого оператора
+    # сравнивается NULL, как в target_details
+    if match.group(1).lower() == "protocol":
+        return f"NULLIF(protocol, ''){condition[match.end(1):]}"
+    return condition
+
+
+def _rollup_having(condition: str, countable: set) -> Optional[str]:
+    """HAVING с COUNT(...) -> SUM(count); None, если в нём другие агрегаты"""
+    calls = _AGGREGATE_CALL.findall(condition)
+    if any(function.upper() != "COUNT" or argument.lower() not in countable for function, argument in calls):
+        return None
+    return _AGGREGATE_CALL.sub("SUM(count)", condition)
+
+
+def rollup_query(table: str, aggregates: List[Dict[str, str]], group_by: Sequence[str] = (),
+                 where: Sequence[str] = (), having: Sequence[str] = (),
+                 bucket: Optional[str] = None) -> Optional[str]:
+    """SQL по сводке с теми же столбцами, что у запроса инструмента агрегации, или None.
+
+    aggregates - [{"function", "column", "alias"}], group_by - колонки
+    таблицы, bucket - ключ TIME_BUCKETS (столбец с тем же именем, по нему
+    сортировка).
+    """
+    if table not in ROLLUP_SOURCES or not aggregates:
+        return None
+    rollup_table, dimensions, countable = ROLLUP_SOURCES[table]
+    if any(agg["function"].upper() != "COUNT" or agg["column"].lower() not in countable for agg in aggregates):
+        return None
+    if any(column.lower() not in dimensions for column in group_by):
+        return None
+
+    conditions = [_rollup_condition(condition, dimensions) for condition in where]
+    having_conditions = [_rollup_having(condition, countable) for condition in having]
+    if None in conditions or None in having_conditions:
+        return None
+
+    granularity, length = TIME_BUCKETS[bucket] if bucket else ("day", None)
+    group_columns = [f"NULLIF(protocol, '') AS protocol" if column.lower() == "protocol" else column
+                     for column in group_by]
+    select_parts = ([f"COALESCE(SUM(count), 0) AS {agg['alias']}" for agg in aggregates] + group_columns)
+    group_parts = list(group_by)
+    if bucket:
+        select_parts.append(f"substr(bucket, 1, {length}) AS {bucket}")
+        group_parts.append(bucket)
+
+    sql = f"SELECT {', '.join(select_parts)} FROM {rollup_table} WHERE granularity = '{granularity}'"
+    for condition in conditions:
+        sql += f" AND {condition}"
+    if group_parts:
+        sql += f" GROUP BY {', '.join(group_parts)}"
+        # Группы, в которых после удалений не осталось строк, исходный запрос не вернул бы
+        having_conditions = ["SUM(count) > 0"] + having_conditions
+    if having_conditions:
+        sql += f" HAVING {' AND '.join(having_conditions)}"
+    if bucket:
+        sql += f" ORDER BY {bucket}"
+    return sql
+
+
+def trend_query(period: str, dimension: Optional[str] = None,
+                date_from: Optional[str] = None, date_to: Optional[str] = None):
+    """SQL и параметры ряда по периодам: (bucket[, dimension], count), по возрастанию bucket.
+
+    date_from/date_to - ISO дата или время, границы включительно с точностью до корзины.
+    """
+    if period not in TIME_BUCKETS:
+        raise ValueError(f"Unknown period '{period}', expected one of: {', '.join(TIME_BUCKETS)}")
+    if dimension is None or dimension in ROLLUP_DIMENSIONS:
+        table = "attack_rollups"
+    elif dimension == "protocol":
+        table = "target_rollups"
+    else:
+        raise ValueError(f"Unknown dimension '{dimension}', "
+                         f"expected one of: {', '.join(ROLLUP_DIMENSIONS + ('protocol',))}")
+
+    granularity, length = TIME_BUCKETS[period]
+    columns = [f"substr(bucket, 1, {length}) AS bucket"] + ([dimension] if dimension else [])
+    sql = f"SELECT {', '.join(columns)}, SUM(count) AS count FROM {table} WHERE granularity = ?"
+    params: list = [granularity]
+    # Корзины хранятся как префикс created_at - границы сравниваются по такому же префиксу
+    if date_from:
+        sql += f" AND bucket >= substr(?, 1, {length})"
+        params.append(date_from)
+    if date_to:
+        sql += f" AND substr(bucket, 1, {length}) <= substr(?, 1, {length})"
+        params.append(date_to)
+    group_by = ", ".join(["1"] + ([dimension] if dimension else []))
+    sql += f" GROUP BY {group_by} HAVING SUM(count) > 0 ORDER BY {group_by}"
+    return sql, params
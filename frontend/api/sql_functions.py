@@ -0,0 +1,115 @@
+"""Пользовательские функции SQLite, регистрируемые на каждом соединении пула.
+
+Функции доступны запросам приложения (REGEXP, фильтры, пользовательский
+SQL); триггеры схемы их не вызывают, поэтому писать в attacks/targets
+может любое соединение. DatabaseManager регистрирует их в
+_configure_connection.
+"""
+import calendar
+import ipaddress
+import re
+import socket
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Optional, Pattern, Tuple, Union
+
+# IPv4 хранится как IPv4-mapped IPv6 (::ffff:a.b.c.d), чтобы оба семейства
+# лежали в одном 128-битном пространстве ключей
+IPV4_MAPPED_PREFIX = 0xFFFF << 32
+
+
+def _address_key(address) -> bytes:
+    """128-битное число адреса в виде 16 байт big-endian (порядок байт = порядок чисел)"""
+    if address.version == 4:
+        return (IPV4_MAPPED_PREFIX | int(address)).to_bytes(16, "big")
+    return address.packed
+
+
+IPV4_MAPPED_BYTES = IPV4_MAPPED_PREFIX.to_bytes(16, "big")[:12]
+
+
+@lru_cache(maxsize=65536)
+def ip_bounds(value) -> Optional[Tuple[bytes, bytes]]:
+    """Первый и последний адрес адреса или сети (CIDR); None - если это не IP"""
+    if not isinstance(value, str) or not value.strip():
+        return None
+    value = value.strip()
+    # Одиночный адрес - без разбора через ipaddress (в десятки раз быстрее, важно для импорта)
+    try:
+        key = IPV4_MAPPED_BYTES + socket.inet_pton(socket.AF_INET, value)
+        return key, key
+    except OSError:
+        pass
+    try:
+        key = socket.inet_pton(socket.AF_INET6, value)
+        return key, key
+    except OSError:
+        pass
+    try:
+        network = ipaddress.ip_network(value, strict=False)
+    except ValueError:
+        return None
+    return _address_key(network.network_address), _address_key(network.broadcast_address)
+
+
+def ip_range_start(value) -> Optional[bytes]:
+    bounds = ip_bounds(value)
+    return bounds[0] if bounds else None
+
+
+def ip_range_end(value) -> Optional[bytes]:
+    bounds = ip_bounds(value)
+    return bounds[1] if bounds else None
+
+
+@lru_cache(maxsize=256)
+def compile_pattern(pattern: str, flags: int = 0) -> Pattern:
+    """Скомпилированное регулярное выражение из кэша (re.error - если оно некорректно)"""
+    return re.compile(pattern, flags)
+
+
+def regexp(pattern, value) -> Optional[bool]:
+    """value REGEXP pattern: поиск совпадения в любом месте строки, как ~ в PostgreSQL"""
+    if pattern is None or value is None:
+        return None
+    return compile_pattern(pattern).search(str(value)) is not None
+
+
+def regexp_i(pattern, value) -> Optional[bool]:
+    """regexp_i(pattern, value): REGEXP без учёта регистра, как ~* в PostgreSQL"""
+    if pattern is None or value is None:
+        return None
+    return compile_pattern(pattern, re.IGNORECASE).search(str(value)) is not None
+
+
+def epoch_seconds(value: Union[str, int, float, date, datetime, None]) -> Optional[int]:
+    """Секунды эпохи, как у attacks.created_ts (CAST(strftime('%s', created_at) AS INTEGER)).
+
+    Время без часового пояса считается UTC - так же его читает strftime,
+    поэтому границы из datetime.now() сравниваются с created_at,
+    записанным тем же datetime.now(). Число - уже секунды эпохи.
+    Некорректная строка вызывает ValueError.
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str):
+        value = value.strip()
+        if value.lstrip("-").isdigit():
+            return int(value)
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day)
+    if value.tzinfo is not None:
+        return int(value.timestamp())
+    return calendar.timegm(value.timetuple())
+
+
+def register_functions(conn):
+    """Регистрация функций на соединении"""
+    conn.create_function("ip_range_start", 1, ip_range_start, deterministic=True)
+    conn.create_function("ip_range_end", 1, ip_range_end, deterministic=True)
+    # Оператор X REGEXP Y SQLite вызывает как regexp(Y, X)
+    conn.create_function("regexp", 2, regexp, deterministic=True)
+    conn.create_function("regexp_i", 2, regexp_i, deterministic=True)
@@ -0,0 +1,100 @@
+"""Запросы к триграммным индексам (миграция 9) для поиска подстрок и regex.
+
+Из подстроки LIKE или из обязательных литералов регулярного выражения
+строится выражение MATCH для FTS5 с токенизатором trigram: каждый литерал
+из 3+ символов - фраза из его триграмм. Индекс не различает регистр,
+поэтому найденные строки - надмножество совпадений (кандидаты), точная
+проверка остаётся за LIKE/REGEXP.
+"""
+import re
+from typing import List, Optional, Union
+
+try:
+    from re import _constants as sre_constants, _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_constants
+    import sre_parse
+
+# Триграммный индекс находит только подстроки из 3 и более символов
+MIN_LITERAL_LENGTH = 3
+
+_REPEATS = {sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT}
+if hasattr(sre_constants, "POSSESSIVE_REPEAT"):
+    _REPEATS.add(sre_constants.POSSESSIVE_REPEAT)
+
+# Обязательные части паттерна: литерал или альтернативы (список таких же последовательностей)
+Term = Union[str, List[List["Term"]]]
+
+
+def _phrase(literal: str) -> str:
+    return '"' + literal.replace('"', '""') + '"'
+
+
+def like_query(substring: str) -> Optional[str]:
+    """MATCH для поиска подстроки; None - если она короче 3 символов"""
+    if len(substring) < MIN_LITERAL_LENGTH:
+        return None
+    return _phrase(substring)
+
+
+def _required_terms(parsed, ignore_case: bool) -> List[Term]:
+    """Литералы, которые обязательно есть в любой строке, совпавшей с parsed"""
+    terms: List[Term] = []
+    run: List[str] = []
+
+    def flush():
+        if run:
+            terms.append("".join(run))
+            run.clear()
+
+    for op, av in parsed:
+        # Без учёта регистра у не-ASCII символов бывают неочевидные пары
+        # (k и знак Кельвина), такие символы в литерал не берутся
+        if op is sre_constants.LITERAL and (not ignore_case or av < 128):
+            run.append(chr(av))
+            continue
+        flush()
+        if op is sre_constants.SUBPATTERN:
+            _, add_flags, del_flags, sub = av
+            group_ignore_case = (ignore_case or bool(add_flags & re.IGNORECASE)) and not del_flags & re.IGNORECASE
+            terms += _required_terms(sub, group_ignore_case)
+        elif op in _REPEATS and av[0] >= 1:
+            terms += _required_terms(av[2], ignore_case)
+        elif op is sre_constants.BRANCH:
+            terms.append([_required_terms(branch, ignore_case) for branch in av[1]])
+    flush()
+    return terms
+
+
+def _expression(terms: List[Term]) -> Optional[str]:
+    parts = []
+    for term in terms:
+        if isinstance(term, str):
+            if len(term) >= MIN_LITERAL_LENGTH:
+                parts.append(_phrase(term))
+        else:
+            # Альтернатива сужает поиск, только если у каждой ветви есть литерал
+            alternatives = [_expression(branch) for branch in term]
+            if alternatives and all(alternatives):
+                parts.append("(" + " OR ".join(alternatives) + ")")
+    return " AND ".join(parts) or None
+
+
+def regex_query(pattern: str, flags: int = 0) -> Optional[str]:
+    """MATCH по обязательным литералам regex; None - если их нет (нужен полный скан).
+
+    Некорректный паттерн даёт re.error, как и compile_pattern.
+    """
+    parsed = sre_parse.parse(pattern, flags)
+    return _expression(_required_terms(parsed, bool(parsed.state.flags & re.IGNORECASE)))
+
+
+def describe_prefilter(prefilter: Optional[dict]) -> str:
+    """Строка статуса для результата DatabaseManager.trigram_prefilter ("" - индекс не использовался)"""
+    if not prefilter:
+        return ""
+    candidates, total = prefilter["candidates"], prefilter["total"]
+    if prefilter["condition"] is None:
+        return f"trigram prefilter skipped: {candidates} of {total} rows are candidates"
+    ratio = f"{total / candidates:.0f}x reduction" if candidates else "no candidates"
+    return f"trigram prefilter: {candidates} of {total} rows checked, {ratio}"
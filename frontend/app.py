@@ -5,14 +5,23 @@ from ui.forms import AttackForm
 from ui.table import AttackTable
 from ui.dashboard import Dashboard
 from api.client import DDOSDatabaseClient
+from api.migrations import MigrationError
+from ui.jobs import JobRunner
+import logging
 import threading
 from tkinter import messagebox
 import uuid
 import json
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
 
 class DDoSAttackApp:
+    # Опрос журнала изменений БД и его периодическая очистка
+    CHANGE_POLL_INTERVAL_MS = 2000
+    CHANGE_LOG_COMPACT_INTERVAL_MS = 10 * 60 * 1000
+
     def __init__(self):
         self.window = ctk.CTk()
         self.window.title("DDoS Attack Manager")
@@ -20,11 +29,22 @@ class DDoSAttackApp:
         self.window.minsize(1200, 700)
 
         # Инициализация клиента БД вместо API клиента
-        self.api_client = DDOSDatabaseClient()
+        try:
+            self.api_client = DDOSDatabaseClient()
+        except MigrationError as e:
+            # Со схемой старой версии приложение работать не может
+            messagebox.showerror("Ошибка обновления БД", str(e))
+            raise
+        # Фоновые задачи инструментов с доставкой результата в главный поток
+        self.jobs = JobRunner(self.window, self.api_client)
 
         # Загрузка данных с сервера
         self.attacks = []
 
+        # Подписчики на изменения из журнала: callback(attack_ids или None)
+        self.change_listeners = []
+        self.change_version = self.api_client.get_change_version()
+
         # Цветовая схема
         self.colors = {
             "primary": "#2b5876",
@@ -39,15 +59,16 @@ class DDoSAttackApp:
             "text_muted": "#b0b0b0"
         }
 
-        # Enum значения для формы (только разрешенные типы)
-        self.frequency_levels = ["low", "medium", "high", "very_high", "continuous"]
-        self.danger_levels = ["low", "medium", "high", "critical"]
-        self.attack_types = ["volumetric", "protocol", "application", "amplification"]
-        self.protocols = ["tcp", "udp", "dns", "http", "https", "icmp"]
+        # Допустимые значения для форм и фильтров - из справочников БД, по возрастанию ранга
+        self.refresh_categories()
 
         self.current_edit_id = None
         self.setup_ui()
 
+        self.update_stats()
+        self.window.after(self.CHANGE_POLL_INTERVAL_MS, self.poll_changes)
+        self.window.after(0, self.compact_change_log)
+
     def setup_ui(self):
         """Создание интерфейса с тремя вкладками"""
         # Основной фрейм
@@ -79,6 +100,8 @@ class DDoSAttackApp:
 
     def clear_content(self):
         """Очистить контентную область"""
+        # Задачи закрываемого инструмента больше некому показывать
+        self.jobs.cancel_all()
         for widget in self.content_frame.winfo_children():
             widget.destroy()
 
@@ -202,6 +225,24 @@ class DDoSAttackApp:
         """Выполнение произвольного SQL запроса через API клиент"""
         return self.api_client.execute_custom_query(query, params)
 
+    def refresh_categories(self):
+        """Перечитывание значений категорий из справочников.
+
+        Справочники пополняются и при записи атак с новыми значениями.
+        """
+        categories = self.api_client.get_categories()
+        self.frequency_levels = categories["frequency"]
+        self.danger_levels = categories["danger"]
+        self.attack_types = categories["attack_type"]
+        self.protocols = categories["protocol"]
+
+    def add_lookup_value(self, kind, value, rank=None):
+        """Новое значение справочника категории через API клиент"""
+        result = self.api_client.add_lookup_value(kind, value, rank)
+        if result["success"]:
+            self.refresh_categories()
+        return result
+
     def refresh_attacks(self):
         """Обновление списка атак с сервера"""
         def refresh_thread():
@@ -220,6 +261,68 @@ class DDoSAttackApp:
         self.attacks = attacks
         self.update_stats()
 
+    def add_change_listener(self, listener):
+        """Подписка на изменения атак из журнала БД"""
+        if listener not in self.change_listeners:
+            self.change_listeners.append(listener)
+
+    def remove_change_listener(self, listener):
+        """Отписка от изменений"""
+        if listener in self.change_listeners:
+            self.change_listeners.remove(listener)
+
+    def poll_changes(self):
+        """Опрос журнала изменений (дешёвый запрос по версии, в фоновом потоке)"""
+        version = self.change_version
+
+        def poll_thread():
+            result = self.api_client.get_changes_since(version)
+            self.window.after(0, lambda: self.on_changes_polled(result))
+
+        thread = threading.Thread(target=poll_thread)
+        thread.daemon = True
+        thread.start()
+
+    def on_changes_polled(self, result):
+        """Рассылка изменений подписчикам и планирование следующего опроса"""
+        try:
+            if not result["success"]:
+                logger.error("Change polling failed: %s", result["error"])
+                return
+
+            data = result["data"]
+            if data["reset"] or data["has_more"]:
+                # Журнал очищен или изменений слишком много - перечитываем всё
+                self.change_version = data["latest_version"]
+                self.notify_changes(None)
+            elif data["changes"]:
+                self.change_version = data["version"]
+                self.notify_changes({change["attack_id"] for change in data["changes"]})
+        finally:
+            self.window.after(self.CHANGE_POLL_INTERVAL_MS, self.poll_changes)
+
+    def notify_changes(self, attack_ids):
+        """Обновление статистики и уведомление подписчиков"""
+        # Счётчики боковой панели и заголовка читаются из attack_stats
+        self.update_stats()
+        for listener in list(self.change_listeners):
+            try:
+                listener(attack_ids)
+            except Exception as e:
+                logger.exception("Error in change listener: %s", e)
+
+    def compact_change_log(self):
+        """Периодическая очистка журнала изменений по политике хранения"""
+        def compact_thread():
+            result = self.api_client.compact_change_log()
+            if not result["success"]:
+                logger.error("Change log compaction failed: %s", result["error"])
+
+        thread = threading.Thread(target=compact_thread)
+        thread.daemon = True
+        thread.start()
+        self.window.after(self.CHANGE_LOG_COMPACT_INTERVAL_MS, self.compact_change_log)
+
     def update_stats(self):
         """Обновление статистики"""
         if hasattr(self, 'sidebar'):
@@ -261,4 +364,6 @@ class DDoSAttackApp:
 
     def run(self):
         """Запуск приложения"""
-        self.window.mainloop()
\ No newline at end of file
+        self.window.mainloop()
+        self.jobs.shutdown()
+        self.api_client.queries.shutdown()
\ No newline at end of file
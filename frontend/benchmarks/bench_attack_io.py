@@ -0,0 +1,51 @@
+"""Замер потокового импорта и экспорта: скорость и пик памяти Python.
+
+Пик памяти (tracemalloc) не должен расти с числом атак. Запуск из папки frontend:
+    python -m benchmarks.bench_attack_io --attacks 10000 100000 --format ndjson csv
+"""
+import argparse
+import os
+import tempfile
+import tracemalloc
+
+from benchmarks.common import seed_attacks, temp_database, timed
+from utils.attack_io import export_attacks, import_attacks
+
+
+def traced(func, *args, **kwargs):
+    """Время выполнения и пик выделенной памяти, МБ"""
+    tracemalloc.start()
+    try:
+        elapsed, result = timed(func, *args, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert result["success"], result.get("error")
+    return elapsed, peak / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--attacks", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--format", nargs="+", default=["ndjson", "csv"], choices=["ndjson", "csv"])
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    print(f"{'attacks':>8} {'format':>7} {'file, MB':>9} {'export/s':>9} {'export peak, MB':>16} "
+          f"{'import/s':>9} {'import peak, MB':>16}")
+    for attack_count in args.attacks:
+        with temp_database() as source, tempfile.TemporaryDirectory() as tmp_dir:
+            seed_attacks(source, attack_count)
+            for fmt in args.format:
+                path = os.path.join(tmp_dir, f"attacks.{fmt}")
+                export_time, export_peak = traced(export_attacks, source, path)
+                with temp_database() as target:
+                    import_time, import_peak = traced(import_attacks, target, path, batch_size=args.batch_size)
+                    assert target.get_stats()["total"] == attack_count
+                print(f"{attack_count:>8} {fmt:>7} {os.path.getsize(path) / 1024 / 1024:>9.1f} "
+                      f"{attack_count / export_time:>9.0f} {export_peak:>16.1f} "
+                      f"{attack_count / import_time:>9.0f} {import_peak:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Замер массового импорта: bulk_create_attacks против create_attack в цикле.
+
+Построчный путь на больших объёмах слишком долгий, поэтому он замеряется
+на выборке --legacy-sample записей, а его время на полный объём
+экстраполируется. Импорт медленнее --min-rate записей/с (вместе с пересборкой
+отложенных индексов) считается регрессией. Запуск из папки frontend:
+    python -m benchmarks.bench_bulk_import --records 10000 100000 1000000 --batch-size 5000 --profile wal
+"""
+import argparse
+
+from benchmarks.common import generate_attacks, temp_database, timed
+
+
+def create_one_by_one(manager, attacks):
+    for attack in attacks:
+        result = manager.create_attack(attack)
+        assert result["success"], result.get("error")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--targets", type=int, default=2)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--profile", default="wal", help="профиль PRAGMA (см. db_config.PRAGMA_PROFILES)")
+    parser.add_argument("--legacy-sample", type=int, default=2000)
+    parser.add_argument("--min-rate", type=float, default=3000,
+                        help="минимальная скорость импорта, записей/с (на пустую БД, 2 цели на атаку)")
+    args = parser.parse_args()
+
+    print(f"profile: {args.profile}, batch size: {args.batch_size}")
+    with temp_database(profile=args.profile) as manager:
+        sample = list(generate_attacks(args.legacy_sample, args.targets, seed=7))
+        legacy_time, _ = timed(create_one_by_one, manager, sample)
+    legacy_rate = args.legacy_sample / legacy_time
+    print(f"create_attack loop: {legacy_rate:.0f} records/s on {args.legacy_sample} records")
+
+    print(f"{'records':>9} {'bulk, s':>8} {'records/s':>10} {'loop (est.), s':>15} {'speedup':>8}")
+    for record_count in args.records:
+        with temp_database(profile=args.profile) as manager:
+            bulk_time, result = timed(manager.bulk_create_attacks,
+                                      generate_attacks(record_count, args.targets, seed=11),
+                                      batch_size=args.batch_size)
+            assert result["success"], result.get("error") or result["data"]["errors"]
+            assert result["data"]["inserted"] == manager.get_stats()["total"] == record_count
+            estimated = record_count / legacy_rate
+            print(f"{record_count:>9} {bulk_time:>8.2f} {record_count / bulk_time:>10.0f} "
+                  f"{estimated:>15.0f} {estimated / bulk_time:>7.0f}x")
+            assert result["data"]["deferred_indexes"], "import into an empty database must defer index triggers"
+            assert record_count / bulk_time >= args.min_rate, \
+                f"bulk import regressed: {record_count / bulk_time:.0f} < {args.min_rate:.0f} records/s"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Замер журнала изменений: стоимость опроса, накладные расходы триггеров и очистка.
+
+Запуск из папки frontend:
+    python -m benchmarks.bench_change_log --attacks 10000 50000 --writes 1000
+"""
+import argparse
+
+from benchmarks.common import generate_attacks, seed_attacks, temp_database, timed
+
+LOG_TRIGGERS = [
+    "trg_attacks_log_insert", "trg_attacks_log_update", "trg_attacks_log_delete",
+    "trg_targets_log_insert", "trg_targets_log_update", "trg_targets_log_delete",
+]
+
+
+def create_attacks(manager, count, seed):
+    for attack in generate_attacks(count, seed=seed):
+        attack.pop("created_at")
+        result = manager.create_attack(attack)
+        assert result["success"], result.get("error")
+
+
+def poll_cost(manager, repeats=200):
+    """Среднее время опроса без новых изменений, мс"""
+    version = manager.get_change_version()
+    elapsed, _ = timed(lambda: [manager.get_changes_since(version) for _ in range(repeats)])
+    return elapsed / repeats * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--attacks", type=int, nargs="+", default=[10000, 50000])
+    parser.add_argument("--writes", type=int, default=1000)
+    args = parser.parse_args()
+
+    print(f"{'attacks':>8} {'poll, ms':>9} {'full reload, ms':>16} {'writes/s':>9} {'writes/s no log':>16} "
+          f"{'log rows':>9} {'compact, ms':>12}")
+    for attack_count in args.attacks:
+        with temp_database() as manager:
+            seed_attacks(manager, attack_count)
+            poll_ms = poll_cost(manager)
+            reload_time, _ = timed(manager.get_all_attacks)
+
+            logged_time, _ = timed(create_attacks, manager, args.writes, 1)
+
+            # Те же записи без триггеров журнала
+            with manager.connection() as conn:
+                for trigger in LOG_TRIGGERS:
+                    conn.execute(f"DROP TRIGGER {trigger}")
+                conn.commit()
+            plain_time, _ = timed(create_attacks, manager, args.writes, 2)
+
+            log_rows = manager.get_change_version()
+            compact_time, result = timed(manager.compact_change_log, retention=1000, max_age_days=None)
+            assert result["success"], result.get("error")
+
+            print(f"{attack_count:>8} {poll_ms:>9.3f} {reload_time * 1000:>16.1f} "
+                  f"{args.writes / logged_time:>9.0f} {args.writes / plain_time:>16.0f} "
+                  f"{log_rows:>9} {compact_time * 1000:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Замер поиска по сетям (CIDR): индекс диапазонов IP против перебора в Python.
+
+Для сетей разного размера замеряются count_attacks и первая страница с
+фильтром source_cidrs/target_cidrs, а также find_attacks_by_cidr; для
+сравнения - загрузка всех атак и проверка адресов через ipaddress
+(только до --scan-limit атак). Запуск из папки frontend:
+    python -m benchmarks.bench_cidr --attacks 100000 1000000
+"""
+import argparse
+import ipaddress
+
+from benchmarks.common import seed_attacks, temp_database, timed
+
+QUERIES = [
+    ("source", "10.0.0.0/8"),
+    ("source", "10.1.0.0/16"),
+    ("source", "10.1.2.0/24"),
+    ("target", "192.168.0.0/16"),
+    ("target", "192.168.3.0/24"),
+]
+
+
+def scan_cidr(manager, cidr, side):
+    """Прежний способ: все атаки и проверка каждого адреса"""
+    network = ipaddress.ip_network(cidr)
+
+    def inside(ip):
+        try:
+            return ipaddress.ip_address(ip) in network
+        except ValueError:
+            return False
+
+    matches = []
+    for attack in manager.get_all_attacks():
+        ips = attack["source_ips"] if side == "source" else [target["target_ip"] for target in attack["targets"]]
+        if any(inside(ip) for ip in ips):
+            matches.append(attack)
+    return matches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--attacks", type=int, nargs="+", default=[100000, 1000000])
+    parser.add_argument("--scan-limit", type=int, default=100000)
+    args = parser.parse_args()
+
+    print(f"{'attacks':>8} {'side':>6} {'cidr':>15} {'matches':>8} {'count, ms':>10} {'page, ms':>9} "
+          f"{'find, ms':>9} {'scan, ms':>9}")
+    for attack_count in args.attacks:
+        with temp_database() as manager:
+            seed_attacks(manager, attack_count)
+            for side, cidr in QUERIES:
+                filters = {f"{side}_cidrs": [cidr]}
+                count_time, count = timed(manager.count_attacks, filters)
+                page_time, _ = timed(manager.get_attacks_page, filters, 100)
+                find, scan = "-", "-"
+                # Полная выборка имеет смысл только для узких сетей
+                if count <= 10000:
+                    find_time, found = timed(manager.find_attacks_by_cidr, cidr, side)
+                    find = f"{find_time * 1000:.1f}"
+                    if attack_count <= args.scan_limit:
+                        scan_time, scanned = timed(scan_cidr, manager, cidr, side)
+                        assert found == scanned, "CIDR index diverged from a full scan"
+                        scan = f"{scan_time * 1000:.0f}"
+                print(f"{attack_count:>8} {side:>6} {cidr:>15} {count:>8} {count_time * 1000:>10.2f} "
+                      f"{page_time * 1000:>9.2f} {find:>9} {scan:>9}")
+
+
+if __name__ == "__main__":
+    main()
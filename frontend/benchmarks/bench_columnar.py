@@ -0,0 +1,88 @@
+"""Замер колоночного снимка (api/columnar.py) против тех же запросов в SQL.
+
+Подсчёт с фильтрами, группировки и гистограммы по времени выполняются
+GROUP BY по исходным таблицам и векторно по снимку; результаты обоих
+способов должны совпасть. Отдельно замеряются полная загрузка снимка и
+догрузка по журналу после пачки изменений. Требует NumPy. Запуск из папки
+frontend:
+    python -m benchmarks.bench_columnar --attacks 1000000
+"""
+import argparse
+from datetime import datetime, timedelta
+
+from benchmarks.common import seed_attacks, temp_database, timed
+
+DATE_FROM = (datetime.now() - timedelta(days=30)).date().isoformat()
+
+# Имя -> (SQL, параметры, запрос к снимку)
+QUERIES = {
+    "count critical+tcp": (
+        """SELECT COUNT(*) AS count FROM attacks a WHERE a.danger_id = (SELECT id FROM danger_levels WHERE value = 'critical')
+           AND a.id IN (SELECT attack_id FROM targets WHERE protocol_id = (SELECT id FROM protocols WHERE value = 'tcp'))""", (),
+        lambda s: [{"count": s.count(danger_levels=["critical"], protocols=["tcp"])}]),
+    "by danger": (
+        "SELECT danger, COUNT(*) AS count FROM attack_details GROUP BY 1 ORDER BY 1", (),
+        lambda s: s.group_by("attacks", ["danger"])),
+    "by type/frequency": (
+        """SELECT attack_type, frequency, COUNT(*) AS count FROM attack_details
+           WHERE danger IN ('high', 'critical') GROUP BY 1, 2 ORDER BY 1, 2""", (),
+        lambda s: s.group_by("attacks", ["attack_type", "frequency"], danger_levels=["high", "critical"])),
+    "targets danger/proto": (
+        """SELECT a.danger, t.protocol, COUNT(*) AS count FROM target_details t JOIN attack_details a ON a.id = t.attack_id
+           GROUP BY 1, 2 ORDER BY 1, 2""", (),
+        lambda s: s.group_by("targets", ["danger", "protocol"])),
+    "daily by danger": (
+        """SELECT substr(created_at, 1, 10) AS bucket, danger, COUNT(*) AS count FROM attack_details
+           WHERE created_at >= ? GROUP BY 1, 2 ORDER BY 1, 2""", (DATE_FROM,),
+        lambda s: s.histogram("day", "danger", date_from=DATE_FROM)),
+    "hourly, all time": (
+        "SELECT substr(created_at, 1, 13) AS bucket, COUNT(*) AS count FROM attacks GROUP BY 1 ORDER BY 1", (),
+        lambda s: s.histogram("hour")),
+}
+
+
+def sql_rows(manager, sql, params):
+    with manager.connection() as conn:
+        return [dict(row) for row in conn.execute(sql, params)]
+
+
+def touch_attacks(manager, count):
+    """Изменение danger у count атак - записи в журнале для догрузки"""
+    with manager.connection() as conn:
+        conn.execute("UPDATE attacks SET danger_id = (SELECT id FROM danger_levels WHERE value = 'critical') "
+                     "WHERE id IN (SELECT id FROM attacks LIMIT ?)", (count,))
+        conn.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--attacks", type=int, nargs="+", default=[1000000])
+    parser.add_argument("--changes", type=int, default=1000)
+    args = parser.parse_args()
+
+    for attack_count in args.attacks:
+        with temp_database() as manager:
+            seed_attacks(manager, attack_count)
+            if not manager.analytics_available():
+                raise SystemExit("NumPy is not installed")
+            load_time, snapshot = timed(manager.get_analytics_snapshot)
+            stats = snapshot.stats()
+            print(f"{attack_count} attacks: snapshot loaded in {load_time * 1000:.0f} ms, "
+                  f"{stats['bytes'] / 1048576:.1f} MB")
+
+            print(f"{'query':>22} {'groups':>7} {'sql, ms':>9} {'snapshot, ms':>13}")
+            for name, (sql, params, query) in QUERIES.items():
+                sql_time, expected = timed(sql_rows, manager, sql, params)
+                snapshot_time, result = timed(query, snapshot)
+                assert result == expected, f"snapshot differs from SQL for '{name}'"
+                print(f"{name:>22} {len(result):>7} {sql_time * 1000:>9.1f} {snapshot_time * 1000:>13.2f}")
+
+            touch_attacks(manager, args.changes)
+            refresh_time, result = timed(snapshot.refresh)
+            print(f"refresh after {result['changed']} changed attacks: {refresh_time * 1000:.0f} ms")
+            sql, params, query = QUERIES["by danger"]
+            assert query(snapshot) == sql_rows(manager, sql, params), "snapshot is stale after refresh"
+
+
+if __name__ == "__main__":
+    main()
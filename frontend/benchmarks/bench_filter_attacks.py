@@ -0,0 +1,54 @@
+"""Замер filter_attacks: построчная догрузка get_attack против пакетной загрузки.
+
+Запуск из папки frontend:
+    python -m benchmarks.bench_filter_attacks --attacks 20000
+"""
+import argparse
+
+from benchmarks.common import seed_attacks, temp_database, timed
+
+# Фильтры от широких к узким (доля строк зависит от равномерного распределения значений)
+SELECTIVITIES = [
+    ("all protocols", {"protocols": ["tcp", "udp", "dns", "http", "https", "icmp"]}),
+    ("danger=high|critical", {"danger_levels": ["high", "critical"]}),
+    ("danger=critical", {"danger_levels": ["critical"]}),
+    ("critical + volumetric", {"danger_levels": ["critical"], "attack_types": ["volumetric"]}),
+    ("critical + volumetric + continuous",
+     {"danger_levels": ["critical"], "attack_types": ["volumetric"], "frequencies": ["continuous"]}),
+]
+
+
+def filter_attacks_per_row(manager, **filters):
+    """Прежний алгоритм: выбор id, затем get_attack для каждой атаки"""
+    conn = manager.get_connection()
+    try:
+        attack_filter, params = manager._build_attack_filter(**filters)
+        rows = conn.execute(
+            f"SELECT a.id FROM attacks a WHERE {attack_filter} ORDER BY a.created_at DESC", params
+        ).fetchall()
+    finally:
+        conn.close()
+    return [manager.get_attack(row["id"]) for row in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--attacks", type=int, default=20000)
+    parser.add_argument("--targets", type=int, default=2)
+    args = parser.parse_args()
+
+    with temp_database() as manager:
+        seed_attacks(manager, args.attacks, args.targets)
+        manager.get_all_attacks()  # прогрев кэша страниц, чтобы первый замер не был в худших условиях
+        print(f"{'filter':<36} {'rows':>7} {'share':>6} {'set-based, s':>13} {'per-row, s':>11} {'speedup':>8}")
+        for label, filters in SELECTIVITIES:
+            new_time, new_rows = timed(manager.filter_attacks, **filters)
+            old_time, old_rows = timed(filter_attacks_per_row, manager, **filters)
+            assert new_rows == old_rows, f"results differ for {label}"
+            share = len(new_rows) / args.attacks
+            print(f"{label:<36} {len(new_rows):>7} {share:>6.1%} {new_time:>13.3f} {old_time:>11.3f} "
+                  f"{old_time / new_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
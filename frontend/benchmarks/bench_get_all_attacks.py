@@ -0,0 +1,52 @@
+"""Замер загрузки всех атак: построчная загрузка целей (N+1) против пакетной.
+
+Запуск из папки frontend:
+    python -m benchmarks.bench_get_all_attacks --attacks 1000 10000 50000 --targets 1 5
+"""
+import argparse
+
+from benchmarks.common import seed_attacks, temp_database, timed
+
+
+def load_attacks_n_plus_one(manager):
+    """Прежний алгоритм: отдельный запрос целей для каждой атаки"""
+    conn = manager.get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM attacks ORDER BY created_at DESC")
+        attacks = []
+        for attack_row in cursor.fetchall():
+            attack = manager._attack_from_row(attack_row)
+            cursor.execute("SELECT * FROM targets WHERE attack_id = ?", (attack["id"],))
+            attack["targets"] = [manager._target_from_row(row) for row in cursor.fetchall()]
+            attacks.append(attack)
+        return attacks
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--attacks", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--targets", type=int, nargs="+", default=[1, 5])
+    parser.add_argument("--skip-legacy-above", type=int, default=20000,
+                        help="не запускать N+1 загрузку на больших объёмах")
+    args = parser.parse_args()
+
+    print(f"{'attacks':>8} {'targets/a':>9} {'batched, s':>11} {'n+1, s':>9} {'speedup':>8}")
+    for targets_per_attack in args.targets:
+        for attack_count in args.attacks:
+            with temp_database() as manager:
+                seed_attacks(manager, attack_count, targets_per_attack)
+                batched_time, batched = timed(manager.get_all_attacks)
+                legacy_cell, speedup_cell = "-", "-"
+                if attack_count <= args.skip_legacy_above:
+                    legacy_time, legacy = timed(load_attacks_n_plus_one, manager)
+                    assert legacy == batched, "batched loader diverged from N+1 loader"
+                    legacy_cell = f"{legacy_time:.3f}"
+                    speedup_cell = f"{legacy_time / batched_time:.1f}x"
+                print(f"{attack_count:>8} {targets_per_attack:>9} {batched_time:>11.3f} {legacy_cell:>9} {speedup_cell:>8}")
+
+
+if __name__ == "__main__":
+    main()
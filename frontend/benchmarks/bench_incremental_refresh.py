@@ -0,0 +1,69 @@
+"""Замер инкрементального обновления: сравнение версий против полной перезагрузки.
+
+После изменения небольшой доли атак сравнивается время
+get_attack_versions + diff_versions + get_attacks_by_ids (путь
+AttackTable.refresh_changes) с полным get_all_attacks. Запуск из папки frontend:
+    python -m benchmarks.bench_incremental_refresh --attacks 10000 50000 --changes 3 30 300
+"""
+import argparse
+import random
+from datetime import datetime
+
+from benchmarks.common import generate_attacks, seed_attacks, temp_database, timed
+from utils.helpers import diff_versions
+
+
+def apply_changes(manager, attack_ids, count, rng):
+    """Удаление, изменение и добавление примерно по трети от count атак"""
+    victims = rng.sample(attack_ids, count)
+    deleted = victims[:count // 3]
+    updated = victims[count // 3:]
+    with manager.connection() as conn:
+        conn.executemany("DELETE FROM targets WHERE attack_id = ?", [(i,) for i in deleted])
+        conn.executemany("DELETE FROM attacks WHERE id = ?", [(i,) for i in deleted])
+        conn.executemany("UPDATE attacks SET name = name || ' (edited)', updated_at = ? WHERE id = ?",
+                         [(datetime.now().isoformat(), i) for i in updated])
+        conn.commit()
+    for attack in generate_attacks(count // 3, seed=rng.randrange(10 ** 6)):
+        attack.pop("created_at")
+        result = manager.create_attack(attack)
+        assert result["success"], result.get("error")
+
+
+def incremental_refresh(manager, old_versions, old_attacks):
+    """Путь refresh_changes без Tk: версии, разница, догрузка изменённых"""
+    versions = manager.get_attack_versions()
+    inserted, updated, deleted = diff_versions(old_versions, versions)
+    changed = manager.get_attacks_by_ids(inserted + updated)
+    attacks_by_id = {attack["id"]: attack for attack in old_attacks}
+    attacks_by_id.update(changed)
+    attacks = [attacks_by_id[attack_id] for attack_id, _ in versions if attack_id in attacks_by_id]
+    return attacks, len(inserted) + len(updated) + len(deleted)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--attacks", type=int, nargs="+", default=[10000, 50000])
+    parser.add_argument("--changes", type=int, nargs="+", default=[3, 30, 300])
+    args = parser.parse_args()
+
+    print(f"{'attacks':>8} {'changes':>8} {'diffed':>7} {'incremental, s':>15} {'full reload, s':>15} {'speedup':>8}")
+    for attack_count in args.attacks:
+        for change_count in args.changes:
+            with temp_database() as manager:
+                seed_attacks(manager, attack_count)
+                rng = random.Random(change_count)
+                attacks = manager.get_all_attacks()
+                versions = {attack["id"]: attack["updated_at"] for attack in attacks}
+
+                apply_changes(manager, list(versions), change_count, rng)
+
+                incremental_time, (refreshed, diffed) = timed(incremental_refresh, manager, versions, attacks)
+                full_time, reloaded = timed(manager.get_all_attacks)
+                assert refreshed == reloaded, "incremental refresh diverged from full reload"
+                print(f"{attack_count:>8} {change_count:>8} {diffed:>7} {incremental_time:>15.3f} "
+                      f"{full_time:>15.3f} {full_time / incremental_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Замер потоковой загрузки атак: время до первой страницы и пиковая память.
+
+Сравнивает get_all_attacks (весь список в памяти) с iter_attack_pages
+(keyset-пагинация). Запуск из папки frontend:
+    python -m benchmarks.bench_iter_attacks --attacks 10000 50000 100000 --page-size 500
+"""
+import argparse
+import time
+import tracemalloc
+
+from benchmarks.common import seed_attacks, temp_database, timed
+
+
+def peak_memory(func, *args, **kwargs):
+    """Пиковый объём выделенной памяти Python (МБ) при выполнении функции"""
+    tracemalloc.start()
+    try:
+        func(*args, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / (1024 * 1024)
+
+
+def stream_all(manager, page_size):
+    """Полный обход без накопления: считаем атаки постранично"""
+    return sum(len(page) for page in manager.iter_attack_pages(page_size=page_size))
+
+
+def first_page_time(manager, page_size, filters=None):
+    started = time.perf_counter()
+    next(manager.iter_attack_pages(filters, page_size=page_size))
+    return time.perf_counter() - started
+
+
+def last_page_time(manager, page_size):
+    """Время чтения самой дальней страницы по готовому ключу"""
+    with manager.connection() as conn:
+        row = conn.execute("""
+            SELECT created_at, id FROM attacks ORDER BY created_at, id LIMIT 1 OFFSET ?
+        """, (page_size,)).fetchone()
+    started = time.perf_counter()
+    manager.get_attacks_page(page_size=page_size, after=(row["created_at"], row["id"]))
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--attacks", type=int, nargs="+", default=[10000, 50000, 100000])
+    parser.add_argument("--targets", type=int, default=2)
+    parser.add_argument("--page-size", type=int, default=500)
+    args = parser.parse_args()
+
+    print(f"{'attacks':>8} {'first page, ms':>15} {'last page, ms':>14} {'filtered first, ms':>19} "
+          f"{'full list, s':>13} {'streamed, s':>12} {'list MB':>8} {'stream MB':>10}")
+    for attack_count in args.attacks:
+        with temp_database() as manager:
+            seed_attacks(manager, attack_count, args.targets)
+            manager.get_attacks_page(page_size=args.page_size)  # прогрев кэша страниц
+
+            first_ms = first_page_time(manager, args.page_size) * 1000
+            last_ms = last_page_time(manager, args.page_size) * 1000
+            filtered_ms = first_page_time(manager, args.page_size, {"danger_levels": ["critical"]}) * 1000
+
+            list_time, attacks = timed(manager.get_all_attacks)
+            stream_time, streamed = timed(stream_all, manager, args.page_size)
+            assert streamed == len(attacks) == attack_count, "streamed count diverged from full list"
+            del attacks
+
+            list_mb = peak_memory(manager.get_all_attacks)
+            stream_mb = peak_memory(stream_all, manager, args.page_size)
+            print(f"{attack_count:>8} {first_ms:>15.1f} {last_ms:>14.1f} {filtered_ms:>19.1f} "
+                  f"{list_time:>13.3f} {stream_time:>12.3f} {list_mb:>8.1f} {stream_mb:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
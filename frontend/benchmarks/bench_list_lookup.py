@@ -0,0 +1,55 @@
+"""Замер поиска по элементам списков: дочерние таблицы против JSON-колонок.
+
+Поиск атак по IP источника и по порту через индексы attack_source_ips /
+attack_ports сравнивается с прежним способом - загрузкой всех атак и
+проверкой списков в Python. Дополнительно - чтение страницы в режимах
+list_storage json и normalized. Запуск из папки frontend:
+    python -m benchmarks.bench_list_lookup --attacks 10000 100000
+"""
+import argparse
+import dataclasses
+
+from api.db_manager import DatabaseManager
+from benchmarks.common import seed_attacks, temp_database, timed
+
+
+def scan_lookup(manager, column, value):
+    """Прежний способ: все атаки и перебор списков в Python"""
+    return [attack for attack in manager.get_all_attacks() if value in attack[column]]
+
+
+def page_cost(manager, repeats=20):
+    """Среднее время чтения страницы из 500 атак, мс"""
+    elapsed, _ = timed(lambda: [manager.get_attacks_page(page_size=500) for _ in range(repeats)])
+    return elapsed / repeats * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--attacks", type=int, nargs="+", default=[10000, 100000])
+    args = parser.parse_args()
+
+    print(f"{'attacks':>8} {'lookup':>7} {'found':>6} {'indexed, ms':>12} {'scan, ms':>9} "
+          f"{'page json, ms':>14} {'page normalized, ms':>20}")
+    for attack_count in args.attacks:
+        with temp_database() as manager:
+            seed_attacks(manager, attack_count)
+            normalized = DatabaseManager(dataclasses.replace(manager.config, list_storage="normalized"))
+            json_page, normalized_page = page_cost(manager), page_cost(normalized)
+            assert manager.get_attacks_page(page_size=500) == normalized.get_attacks_page(page_size=500)
+
+            sample = manager.get_attacks_page(page_size=1)[0]
+            lookups = [
+                ("ip", manager.find_attacks_by_source_ip, "source_ips", sample["source_ips"][0]),
+                ("port", manager.find_attacks_by_port, "affected_ports", sample["affected_ports"][-1]),
+            ]
+            for label, find, column, value in lookups:
+                indexed_time, found = timed(find, value)
+                scan_time, scanned = timed(scan_lookup, manager, column, value)
+                assert found == scanned, "indexed lookup diverged from a full scan"
+                print(f"{attack_count:>8} {label:>7} {len(found):>6} {indexed_time * 1000:>12.2f} "
+                      f"{scan_time * 1000:>9.1f} {json_page:>14.2f} {normalized_page:>20.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Замер записей Attack/Target (models/attack.py) против словарей из sqlite3.Row.
+
+Все атаки с целями загружаются прежним способом (dict(row) и json.loads
+списков сразу) и через get_all_attacks (записи со __slots__ из row_factory,
+списки декодируются при первом обращении). Для каждого способа выводится
+время загрузки и память на атаку (tracemalloc, вместе с целями); затем -
+время первого обхода списков у записей. Результаты обоих способов должны
+совпасть. Запуск из папки frontend:
+    python -m benchmarks.bench_models --attacks 1000000
+"""
+import argparse
+import gc
+import json
+import tracemalloc
+
+from benchmarks.common import seed_attacks, temp_database, timed
+
+LIST_COLUMNS = ("source_ips", "affected_ports", "mitigation_strategies")
+
+
+def load_dicts(manager):
+    """Прежний алгоритм: словари из sqlite3.Row, JSON-списки разбираются при загрузке"""
+    with manager.connection() as conn:
+        targets_by_attack = {}
+        for row in conn.execute("SELECT * FROM targets ORDER BY id"):
+            target = dict(row)
+            target["tags"] = json.loads(target["tags"] or "[]")
+            target.pop("id")
+            targets_by_attack.setdefault(target.pop("attack_id"), []).append(target)
+        attacks = []
+        for row in conn.execute("SELECT * FROM attacks ORDER BY created_at DESC, id DESC"):
+            attack = dict(row)
+            attack.pop("created_ts", None)
+            for column in LIST_COLUMNS:
+                attack[column] = json.loads(attack[column] or "[]")
+            attack["targets"] = targets_by_attack.get(attack["id"], [])
+            attacks.append(attack)
+        return attacks
+
+
+def measure(loader, manager):
+    """(время загрузки, байт на атаку, результат)"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        load_time, attacks = timed(loader, manager)
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return load_time, size / max(len(attacks), 1), attacks
+
+
+def touch_lists(attacks):
+    """Первое обращение ко всем спискам (для записей - декодирование JSON)"""
+    return sum(len(attack[column]) for attack in attacks for column in LIST_COLUMNS) + \
+        sum(len(target["tags"]) for attack in attacks for target in attack["targets"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--attacks", type=int, nargs="+", default=[1000000])
+    parser.add_argument("--targets", type=int, default=2)
+    args = parser.parse_args()
+
+    print(f"{'attacks':>8} {'loader':>8} {'load, s':>8} {'bytes/attack':>13}")
+    for attack_count in args.attacks:
+        with temp_database() as manager:
+            seed_attacks(manager, attack_count, args.targets)
+            # Прогрев кэша страниц SQLite, чтобы первый способ не платил за чтение с диска
+            load_dicts(manager)
+
+            dict_time, dict_size, dicts = measure(load_dicts, manager)
+            print(f"{attack_count:>8} {'dict':>8} {dict_time:>8.2f} {dict_size:>13.0f}")
+            del dicts
+            record_time, record_size, records = measure(lambda m: m.get_all_attacks(), manager)
+            print(f"{attack_count:>8} {'slots':>8} {record_time:>8.2f} {record_size:>13.0f}")
+
+            decode_time, _ = timed(touch_lists, records)
+            print(f"{attack_count:>8} first access to all lists: {decode_time:.2f} s; "
+                  f"memory {dict_size / record_size:.1f}x less before decoding")
+            assert records == load_dicts(manager), "records differ from dict rows"
+
+
+if __name__ == "__main__":
+    main()
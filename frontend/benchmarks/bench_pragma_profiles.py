@@ -0,0 +1,97 @@
+"""Конкурентная нагрузка (читатели + писатели) для каждого PRAGMA профиля.
+
+Запуск из папки frontend:
+    python -m benchmarks.bench_pragma_profiles --readers 4 --writers 2 --seconds 5
+"""
+import argparse
+import random
+import sqlite3
+import statistics
+import threading
+import time
+
+from api.db_config import PRAGMA_PROFILES
+from benchmarks.common import generate_attacks, seed_attacks, temp_database
+
+
+def run_profile(profile: str, readers: int, writers: int, seconds: float, seed_count: int) -> dict:
+    with temp_database(profile=profile, pool_size=readers + writers) as manager:
+        seed_attacks(manager, seed_count)
+        with manager.connection() as conn:
+            attack_ids = [row["id"] for row in conn.execute("SELECT id FROM attacks")]
+
+        stop_at = time.perf_counter() + seconds
+        read_latencies, write_latencies = [], []
+        errors = {"read": 0, "write": 0}
+        lock = threading.Lock()
+
+        def reader(worker_id: int):
+            rng = random.Random(worker_id)
+            local = []
+            while time.perf_counter() < stop_at:
+                started = time.perf_counter()
+                try:
+                    with manager.connection() as conn:
+                        conn.execute("SELECT COUNT(*) FROM attacks WHERE danger_id = "
+                                     "(SELECT id FROM danger_levels WHERE value = ?)", ("critical",)).fetchone()
+                    manager.get_attack(rng.choice(attack_ids))
+                    local.append(time.perf_counter() - started)
+                except sqlite3.Error:
+                    with lock:
+                        errors["read"] += 1
+            with lock:
+                read_latencies.extend(local)
+
+        def writer(worker_id: int):
+            attacks = generate_attacks(10 ** 6, seed=1000 + worker_id)
+            local = []
+            while time.perf_counter() < stop_at:
+                started = time.perf_counter()
+                result = manager.create_attack(next(attacks))
+                if result["success"]:
+                    local.append(time.perf_counter() - started)
+                else:
+                    with lock:
+                        errors["write"] += 1
+            with lock:
+                write_latencies.extend(local)
+
+        threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+        threads += [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def p95(values):
+        return statistics.quantiles(values, n=20)[18] * 1000 if len(values) >= 20 else float("nan")
+
+    return {
+        "reads_per_s": len(read_latencies) / seconds,
+        "writes_per_s": len(write_latencies) / seconds,
+        "read_p95_ms": p95(read_latencies),
+        "write_p95_ms": p95(write_latencies),
+        "read_errors": errors["read"],
+        "write_errors": errors["write"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profiles", nargs="+", default=list(PRAGMA_PROFILES))
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--seed-attacks", type=int, default=5000)
+    args = parser.parse_args()
+
+    print(f"{'profile':>8} {'reads/s':>9} {'writes/s':>9} {'read p95':>9} {'write p95':>10} {'errors r/w':>11}")
+    for profile in args.profiles:
+        result = run_profile(profile, args.readers, args.writers, args.seconds, args.seed_attacks)
+        print(f"{profile:>8} {result['reads_per_s']:>9.0f} {result['writes_per_s']:>9.0f} "
+              f"{result['read_p95_ms']:>7.1f}ms {result['write_p95_ms']:>8.1f}ms "
+              f"{result['read_errors']:>5}/{result['write_errors']}")
+
+
+if __name__ == "__main__":
+    main()
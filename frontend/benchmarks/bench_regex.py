@@ -0,0 +1,85 @@
+"""Замер поиска по регулярным выражениям: REGEXP с кэшем паттернов и без него.
+
+Для нескольких паттернов считается COUNT(*) по attacks.name через
+зарегистрированные regexp/regexp_i (кэш compile_pattern) и через функции
+без этого кэша: re.search на каждой строке (только внутренний кэш модуля
+re) и компиляция паттерна заново на каждой строке. Запуск из папки frontend:
+    python -m benchmarks.bench_regex --attacks 1000000
+"""
+import argparse
+import re
+
+from benchmarks.common import seed_attacks, temp_database, timed
+
+try:
+    from re import _compiler as sre_compiler
+except ImportError:  # Python < 3.11
+    import sre_compile as sre_compiler
+
+QUERIES = [
+    # (паттерн, без учёта регистра)
+    ("flood 9[0-9]{4}$", False),
+    ("^AMPL", True),
+    (r"(volumetric|protocol) flood \d*7$", False),
+]
+
+
+def regexp_re_search(pattern, value):
+    """Без кэша compile_pattern: re.search с поиском в кэше модуля re на каждой строке"""
+    return re.search(pattern, value) is not None
+
+
+def regexp_i_re_search(pattern, value):
+    return re.search(pattern, value, re.IGNORECASE) is not None
+
+
+def regexp_recompile(pattern, value):
+    """Без кэшей: паттерн компилируется заново на каждой строке"""
+    return sre_compiler.compile(pattern, 0).search(value) is not None
+
+
+def regexp_i_recompile(pattern, value):
+    return sre_compiler.compile(pattern, re.IGNORECASE).search(value) is not None
+
+
+VARIANTS = [
+    # (название, функция, функция без учёта регистра)
+    ("cached", "regexp", "regexp_i"),
+    ("re.search", "regexp_re_search", "regexp_i_re_search"),
+    ("recompile", "regexp_recompile", "regexp_i_recompile"),
+]
+
+
+def count_matches(conn, function, pattern):
+    return conn.execute(f"SELECT COUNT(*) FROM attacks WHERE {function}(?, name)", (pattern,)).fetchone()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--attacks", type=int, nargs="+", default=[1000000])
+    args = parser.parse_args()
+
+    print(f"{'attacks':>8} {'pattern':>36} {'matches':>8} " + " ".join(f"{name + ', ms':>15}" for name, _, _ in VARIANTS))
+    for attack_count in args.attacks:
+        with temp_database() as manager:
+            seed_attacks(manager, attack_count, targets_per_attack=1)
+            with manager.connection() as conn:
+                for function in (regexp_re_search, regexp_i_re_search, regexp_recompile, regexp_i_recompile):
+                    conn.create_function(function.__name__, 2, function, deterministic=True)
+                # Прогрев: первое чтение таблицы не должно попасть в замер первого варианта
+                conn.execute("SELECT COUNT(name) FROM attacks").fetchone()
+
+                for pattern, ignore_case in QUERIES:
+                    timings, matches = [], set()
+                    for _, function, function_i in VARIANTS:
+                        elapsed, count = timed(count_matches, conn, function_i if ignore_case else function, pattern)
+                        timings.append(elapsed)
+                        matches.add(count)
+                    assert len(matches) == 1, "variants disagree on match count"
+                    label = pattern + (" (i)" if ignore_case else "")
+                    print(f"{attack_count:>8} {label:>36} {matches.pop():>8} "
+                          + " ".join(f"{elapsed * 1000:>15.0f}" for elapsed in timings))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Замер кэша результатов для повторяющихся аналитических запросов.
+
+Набор запросов инструментов SQL выполняется несколько раундов через
+QueryExecutor: первый раунд заполняет кэш, следующие должны отвечать из
+него. Затем одна атака удаляется - зависящие от attacks результаты
+сбрасываются, и раунд снова выполняет запросы. Запуск из папки frontend:
+    python -m benchmarks.bench_result_cache --attacks 100000 --rounds 5
+"""
+import argparse
+
+from api.query_executor import QueryExecutor
+from benchmarks.common import seed_attacks, temp_database, timed
+
+QUERIES = [
+    "SELECT danger, COUNT(*) AS attacks FROM attack_details GROUP BY danger",
+    "SELECT attack_type, frequency, COUNT(*) FROM attack_details GROUP BY attack_type, frequency",
+    "SELECT protocol, COUNT(DISTINCT attack_id) FROM target_details GROUP BY protocol",
+    "SELECT a.danger, COUNT(t.id) FROM attack_details a JOIN targets t ON t.attack_id = a.id GROUP BY a.danger",
+    "SELECT name, created_at FROM attacks WHERE name LIKE '%flood 12%' ORDER BY created_at DESC LIMIT 100",
+]
+
+
+def run_round(executor):
+    return [executor.submit(sql).result() for sql in QUERIES]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--attacks", type=int, default=100000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    with temp_database() as manager:
+        seed_attacks(manager, args.attacks)
+        executor = QueryExecutor(manager)
+        try:
+            print(f"{'round':>14} {'time, ms':>9} {'cached':>7}")
+            first = None
+            for number in range(args.rounds):
+                elapsed, results = timed(run_round, executor)
+                first = first or results
+                assert [r.rows for r in results] == [r.rows for r in first], "cached rows differ"
+                print(f"{number + 1:>14} {elapsed * 1000:>9.1f} {sum(r.cached for r in results):>7}")
+
+            attack_id = manager.get_attacks_page(page_size=1)[0]["id"]
+            manager.delete_attack(attack_id)
+            elapsed, results = timed(run_round, executor)
+            print(f"{'after delete':>14} {elapsed * 1000:>9.1f} {sum(r.cached for r in results):>7}")
+        finally:
+            executor.shutdown()
+        print(manager.get_cache_stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Замер сводок attack_rollups/target_rollups для рядов по времени.
+
+Помесячный ряд за 12 месяцев (всего и по danger) и разбивка целей по
+протоколу считаются GROUP BY по исходным таблицам и по сводкам
+(get_attack_trend); результаты обоих способов должны совпасть. Отдельно
+замеряется rebuild_rollups. Запуск из папки frontend:
+    python -m benchmarks.bench_rollups --attacks 100000 1000000
+"""
+import argparse
+from datetime import datetime, timedelta
+
+from benchmarks.common import seed_attacks, temp_database, timed
+
+RAW_QUERIES = {
+    # (период, измерение) -> ряд по исходным таблицам
+    ("month", None): """
+        SELECT substr(created_at, 1, 7) AS bucket, COUNT(*) AS count FROM attacks
+        WHERE created_at >= ? GROUP BY 1 ORDER BY 1""",
+    ("month", "danger"): """
+        SELECT substr(created_at, 1, 7) AS bucket, danger, COUNT(*) AS count FROM attack_details
+        WHERE created_at >= ? GROUP BY 1, 2 ORDER BY 1, 2""",
+    ("day", "protocol"): """
+        SELECT substr(a.created_at, 1, 10) AS bucket, COALESCE(t.protocol, '') AS protocol, COUNT(*) AS count
+        FROM target_details t JOIN attacks a ON a.id = t.attack_id
+        WHERE a.created_at >= ? GROUP BY 1, 2 ORDER BY 1, 2""",
+}
+
+
+def raw_trend(manager, sql, date_from):
+    with manager.connection() as conn:
+        return [dict(row) for row in conn.execute(sql, (date_from,))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--attacks", type=int, nargs="+", default=[100000, 1000000])
+    args = parser.parse_args()
+
+    date_from = (datetime.now() - timedelta(days=365)).strftime("%Y-%m")
+    print(f"{'attacks':>8} {'series':>16} {'points':>7} {'raw, ms':>9} {'rollup, ms':>11}")
+    for attack_count in args.attacks:
+        with temp_database() as manager:
+            seed_attacks(manager, attack_count)
+            raw_trend(manager, "SELECT COUNT(*) FROM attacks WHERE created_at >= ?", date_from)
+            for (period, dimension), sql in RAW_QUERIES.items():
+                raw_time, raw = timed(raw_trend, manager, sql, date_from)
+                rollup_time, rollup = timed(manager.get_attack_trend, period, dimension, date_from)
+                assert raw == rollup, f"rollups differ from raw data for {period}/{dimension}"
+                print(f"{attack_count:>8} {period + '/' + str(dimension):>16} {len(rollup):>7} "
+                      f"{raw_time * 1000:>9.1f} {rollup_time * 1000:>11.2f}")
+
+            rebuild_time, result = timed(manager.rebuild_rollups)
+            print(f"{attack_count:>8} rebuild_rollups: {result['data']['buckets']} buckets "
+                  f"in {rebuild_time * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
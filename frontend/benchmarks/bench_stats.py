@@ -0,0 +1,41 @@
+"""Замер статистики: get_stats из attack_stats против подсчёта по списку атак.
+
+Запуск из папки frontend:
+    python -m benchmarks.bench_stats --attacks 1000 10000 100000
+"""
+import argparse
+from collections import Counter
+
+from benchmarks.common import seed_attacks, temp_database, timed
+
+
+def scan_stats(attacks):
+    """Прежний способ виджетов: перебор всего списка атак"""
+    return {
+        "total": len(attacks),
+        "danger": dict(Counter(attack["danger"] for attack in attacks)),
+        "frequency": dict(Counter(attack["frequency"] for attack in attacks)),
+        "attack_type": dict(Counter(attack["attack_type"] for attack in attacks)),
+        "protocol": dict(Counter(target["protocol"] for attack in attacks for target in attack["targets"])),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--attacks", type=int, nargs="+", default=[1000, 10000, 100000])
+    args = parser.parse_args()
+
+    print(f"{'attacks':>8} {'get_stats, ms':>14} {'load + scan, ms':>16} {'scan only, ms':>14}")
+    for attack_count in args.attacks:
+        with temp_database() as manager:
+            seed_attacks(manager, attack_count)
+            stats_time, stats = timed(manager.get_stats)
+            load_time, attacks = timed(manager.get_all_attacks)
+            scan_time, scanned = timed(scan_stats, attacks)
+            assert stats == scanned, "attack_stats diverged from a full scan"
+            print(f"{attack_count:>8} {stats_time * 1000:>14.2f} {(load_time + scan_time) * 1000:>16.1f} "
+                  f"{scan_time * 1000:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
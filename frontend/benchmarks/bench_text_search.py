@@ -0,0 +1,51 @@
+"""Замер полнотекстового поиска: индекс attacks_fts против LIKE '%...%'.
+
+Для нескольких запросов замеряются count_search, первая страница
+iter_search_pages и полный обход результатов; для сравнения - LIKE по
+названию атаки (полный скан). Запуск из папки frontend:
+    python -m benchmarks.bench_text_search --attacks 100000 1000000
+"""
+import argparse
+
+from benchmarks.common import seed_attacks, temp_database, timed
+
+QUERIES = [
+    # (запрос, prefix, подстрока для LIKE по названию)
+    ("amplification", False, "amplification"),
+    ("flood 3278", False, "flood 3278"),
+    ("ampl", True, "ampl"),
+]
+
+
+def like_scan(manager, substring):
+    with manager.connection() as conn:
+        return conn.execute("SELECT COUNT(*) FROM attacks WHERE name LIKE ?", (f"%{substring}%",)).fetchone()[0]
+
+
+def read_all(manager, text, prefix):
+    return sum(len(page) for page in manager.iter_search_pages(text, prefix, page_size=500))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--attacks", type=int, nargs="+", default=[100000, 1000000])
+    args = parser.parse_args()
+
+    print(f"{'attacks':>8} {'query':>14} {'matches':>8} {'count, ms':>10} {'first page, ms':>15} "
+          f"{'all pages, ms':>14} {'LIKE scan, ms':>14}")
+    for attack_count in args.attacks:
+        with temp_database() as manager:
+            seed_attacks(manager, attack_count)
+            for text, prefix, substring in QUERIES:
+                count_time, count = timed(manager.count_search, text, prefix)
+                page_time, _ = timed(lambda: next(manager.iter_search_pages(text, prefix, page_size=200), []))
+                all_time, total = timed(read_all, manager, text, prefix)
+                assert total == count, "paged search diverged from count_search"
+                like_time, _ = timed(like_scan, manager, substring)
+                label = text + ("*" if prefix else "")
+                print(f"{attack_count:>8} {label:>14} {count:>8} {count_time * 1000:>10.1f} {page_time * 1000:>15.1f} "
+                      f"{all_time * 1000:>14.0f} {like_time * 1000:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Замер триграммного префильтра для поиска подстрок и regex.
+
+Для подстрок (instr) и регулярных выражений (REGEXP) по attacks.name и
+targets.target_domain сравнивается полный скан с проверкой только
+кандидатов из триграммного индекса, как в TextSearchTool и
+RegexSearchTool; число совпадений обоих способов должно совпасть.
+Запуск из папки frontend:
+    python -m benchmarks.bench_trigram --attacks 100000 1000000
+"""
+import argparse
+
+from api.trigram import like_query, regex_query
+from benchmarks.common import seed_attacks, temp_database, timed
+
+QUERIES = [
+    # (таблица, столбец, условие, паттерн, MATCH для индекса)
+    ("attacks", "name", "instr(name, ?) > 0", "flood 4242", like_query("flood 4242")),
+    ("attacks", "name", "name REGEXP ?", r"^volumetric flood 99\d\d$", regex_query(r"^volumetric flood 99\d\d$")),
+    ("attacks", "name", "name REGEXP ?", r"(protocol|application) flood 1234", regex_query(r"(protocol|application) flood 1234")),
+    ("attacks", "name", "name REGEXP ?", "flood", regex_query("flood")),
+    ("targets", "target_domain", "instr(target_domain, ?) > 0", "host777.", like_query("host777.")),
+    ("targets", "target_domain", "target_domain REGEXP ?", r"host12\d\.example", regex_query(r"host12\d\.example")),
+]
+
+
+def count(manager, table, condition, params):
+    with manager.connection() as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM {table} WHERE {condition}", params).fetchone()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--attacks", type=int, nargs="+", default=[100000, 1000000])
+    args = parser.parse_args()
+
+    print(f"{'attacks':>8} {'pattern':>38} {'matches':>8} {'candidates':>11} {'scan, ms':>9} {'prefilter, ms':>14}")
+    for attack_count in args.attacks:
+        with temp_database() as manager:
+            seed_attacks(manager, attack_count)
+            count(manager, "attacks", "1", [])
+            for table, column, condition, pattern, match_query in QUERIES:
+                scan_time, matches = timed(count, manager, table, condition, [pattern])
+                prefilter_time, prefilter = timed(manager.trigram_prefilter, table, column, match_query)
+                if prefilter["condition"]:
+                    elapsed, filtered = timed(count, manager, table, f"{prefilter['condition']} AND {condition}",
+                                              [match_query, pattern])
+                    prefilter_time += elapsed
+                else:
+                    elapsed, filtered = timed(count, manager, table, condition, [pattern])
+                    prefilter_time += elapsed
+                assert filtered == matches, f"prefilter changed the result for {pattern!r}"
+                print(f"{attack_count:>8} {pattern:>38} {matches:>8} {prefilter['candidates']:>11} "
+                      f"{scan_time * 1000:>9.1f} {prefilter_time * 1000:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Регрессионная проверка планов запросов: ни один путь фильтрации не делает полный скан.
+
+Для каждой комбинации фильтров EXPLAIN QUERY PLAN выполняется на БД с данными
+для тех же запросов, что строят загрузчики DatabaseManager (attacks_sql,
+page_sql и др.); строка плана "SCAN <таблица>" по attacks/targets считается
+ошибкой. Запуск из папки frontend (код возврата 1 при регрессии):
+    python -m benchmarks.check_query_plans
+"""
+import itertools
+import sys
+
+from api.db_manager import (ATTACK_BY_ID_SQL, TARGETS_BY_ATTACK_SQL, attacks_sql, count_sql, key_at_sql,
+                             list_values_sql, page_sql, targets_in_sql, targets_sql, versions_sql)
+from api.migrations import LIST_TABLES
+from benchmarks.common import seed_attacks, temp_database
+
+FILTER_SAMPLES = {
+    "frequencies": ["high", "very_high"],
+    "danger_levels": ["critical"],
+    "attack_types": ["volumetric"],
+    "protocols": ["udp", "dns"],
+    "source_ips": ["10.0.0.5"],
+    "ports": [53],
+    "mitigations": ["Rate Limiting"],
+    "source_cidrs": ["10.1.0.0/16"],
+    "target_cidrs": ["192.168.1.0/24", "2001:db8::/32"],
+    "date_from": "2024-01-01T00:00:00",
+    "min_danger": "high",
+}
+
+SCANNED_TABLES = ("attacks", "targets", "attack_source_ips", "attack_ports", "attack_mitigations",
+                  "source_ip_ranges", "target_ip_ranges", "a", "t", "l", "r")
+
+
+def full_scans(conn, query, params):
+    """Строки плана с полным сканированием таблиц attacks/targets"""
+    plan = conn.execute(f"EXPLAIN QUERY PLAN {query}", params).fetchall()
+    details = [row["detail"] for row in plan]
+    scans = [detail for detail in details
+             if detail.startswith("SCAN ") and detail.split()[1] in SCANNED_TABLES]
+    return scans, details
+
+
+def filter_queries(attack_filter, params):
+    """Запросы загрузчиков DatabaseManager для условия фильтра (те же построители SQL)"""
+    params = list(params)
+    yield attacks_sql(attack_filter), params
+    yield targets_sql(attack_filter), params
+    yield count_sql(attack_filter), params
+    yield key_at_sql(attack_filter), params + [0]
+    yield versions_sql(attack_filter), params
+    yield from page_queries(attack_filter, params)
+
+
+def page_queries(attack_filter, params):
+    """Запросы первой и следующей страниц get_attacks_page"""
+    params = list(params)
+    yield page_sql(attack_filter), params + [100]
+    yield page_sql(attack_filter, after=True), params + ["2000-01-01", "x", 100]
+
+
+def lookup_queries():
+    """Запросы по ID: get_attack, цели страницы, списки режима normalized"""
+    yield ATTACK_BY_ID_SQL, ["x"]
+    yield TARGETS_BY_ATTACK_SQL, ["x"]
+    yield targets_in_sql(2), ["x", "y"]
+    for table, value_column, _ in LIST_TABLES.values():
+        yield list_values_sql(table, value_column, 2), ["x", "y"]
+
+
+def report(conn, query, params, label) -> int:
+    """1, если в плане запроса есть полный скан (с выводом плана)"""
+    scans, details = full_scans(conn, query, params)
+    if not scans:
+        return 0
+    print(f"FULL SCAN for {label}:\n  {' '.join(query.split())}")
+    for detail in details:
+        print(f"    {detail}")
+    return 1
+
+
+def main() -> int:
+    failures = 0
+    with temp_database() as manager:
+        seed_attacks(manager, 2000)
+        with manager.connection() as conn:
+            names = list(FILTER_SAMPLES)
+            for size in range(1, len(names) + 1):
+                for combo in itertools.combinations(names, size):
+                    filters = {name: FILTER_SAMPLES[name] for name in combo}
+                    attack_filter, params = manager._build_attack_filter(**filters)
+                    for query, query_params in filter_queries(attack_filter, params):
+                        failures += report(conn, query, query_params, ", ".join(combo))
+            for query, params in lookup_queries():
+                failures += report(conn, query, params, "lookup by id")
+
+            # Без фильтров и с фильтром по одному значению строки идут из индекса
+            # уже в порядке (created_at, id) - страница не требует сортировки
+            ordered_queries = [(attacks_sql(), [])]
+            for name in ("frequencies", "danger_levels", "attack_types"):
+                attack_filter, params = manager._build_attack_filter(**{name: FILTER_SAMPLES[name][:1]})
+                ordered_queries.extend(page_queries(attack_filter, params))
+            ordered_queries.extend(page_queries("", []))
+            for query, params in ordered_queries:
+                _, details = full_scans(conn, query, params)
+                if any("TEMP B-TREE" in detail for detail in details):
+                    failures += 1
+                    print(f"Listing sorts in a temp b-tree:\n  {' '.join(query.split())}\n    {details}")
+
+    print("OK: no full scans on filter paths" if not failures else f"{failures} query plan regressions")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
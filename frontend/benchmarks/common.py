@@ -0,0 +1,74 @@
+import os
+import random
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from api.db_config import DatabaseConfig
+from api.db_manager import DatabaseManager
+
+FREQUENCIES = ["low", "medium", "high", "very_high", "continuous"]
+DANGER_LEVELS = ["low", "medium", "high", "critical"]
+ATTACK_TYPES = ["volumetric", "protocol", "application", "amplification"]
+PROTOCOLS = ["tcp", "udp", "dns", "http", "https", "icmp"]
+
+
+@contextmanager
+def temp_database(**config_overrides):
+    """Временная БД с созданной схемой для замеров"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        config = DatabaseConfig(database=os.path.join(tmp_dir, "bench.db"), **config_overrides)
+        manager = DatabaseManager(config)
+        result = manager.initialize_database()
+        if not result["success"]:
+            raise RuntimeError(result["error"])
+        yield manager
+
+
+def make_attack(rng: random.Random, targets_per_attack: int, created_at: datetime) -> dict:
+    """Генерация одной атаки в формате create_attack"""
+    return {
+        "id": str(uuid.uuid4()),
+        "name": f"{rng.choice(ATTACK_TYPES)} flood {rng.randrange(100000)}",
+        "frequency": rng.choice(FREQUENCIES),
+        "danger": rng.choice(DANGER_LEVELS),
+        "attack_type": rng.choice(ATTACK_TYPES),
+        "source_ips": [f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(256)}" for _ in range(3)],
+        "affected_ports": [53, 80, 443][:rng.randrange(1, 4)],
+        "mitigation_strategies": ["Rate Limiting", "Traffic Filtering"],
+        "created_at": created_at.isoformat(),
+        "targets": [
+            {
+                "target_ip": f"192.168.{rng.randrange(256)}.{rng.randrange(256)}",
+                "target_domain": f"host{rng.randrange(1000)}.example.com",
+                "port": rng.choice([53, 80, 443]),
+                "protocol": rng.choice(PROTOCOLS),
+                "tags": ["bench"],
+            }
+            for _ in range(targets_per_attack)
+        ],
+    }
+
+
+def generate_attacks(count: int, targets_per_attack: int = 2, seed: int = 42):
+    """Поток синтетических атак, от новых к старым"""
+    rng = random.Random(seed)
+    now = datetime.now()
+    for i in range(count):
+        yield make_attack(rng, targets_per_attack, now - timedelta(seconds=i * 37))
+
+
+def seed_attacks(manager: DatabaseManager, count: int, targets_per_attack: int = 2, seed: int = 42):
+    """Заполнение БД синтетическими атаками через bulk_create_attacks"""
+    result = manager.bulk_create_attacks(generate_attacks(count, targets_per_attack, seed))
+    if not result["success"]:
+        raise RuntimeError(result.get("error") or result["data"]["errors"][:3])
+
+
+def timed(func, *args, **kwargs):
+    """Время выполнения функции в секундах и её результат"""
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - started, result
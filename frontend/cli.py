@@ -0,0 +1,92 @@
+"""Консольный импорт и экспорт атак без GUI.
+
+Запуск из папки frontend:
+    python cli.py export attacks.ndjson --danger critical high
+    python cli.py export week.csv --date-from 2025-01-01 --date-to 2025-01-07
+    python cli.py import attacks.csv --batch-size 5000
+    python cli.py rebuild-rollups
+Прерванная операция при повторном запуске продолжается с контрольной точки
+(--no-resume - начать заново).
+"""
+import argparse
+import sys
+import time
+
+from api.db_config import DatabaseConfig
+from api.db_manager import DatabaseManager
+from utils.attack_io import FORMATS, export_attacks, import_attacks
+
+
+def make_progress(label: str, key: str):
+    """Вывод прогресса в stderr: количество записей и скорость"""
+    started = time.perf_counter()
+
+    def progress(counters):
+        elapsed = time.perf_counter() - started
+        rate = counters[key] / elapsed if elapsed > 0 else 0
+        print(f"\r{label}: {counters[key]} ({rate:.0f}/s)", end="", file=sys.stderr, flush=True)
+
+    return progress
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database", help="файл БД (по умолчанию из DB_NAME)")
+    parser.add_argument("--profile", help="профиль PRAGMA (см. db_config.PRAGMA_PROFILES)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="выгрузить атаки в файл")
+    export_parser.add_argument("path")
+    export_parser.add_argument("--page-size", type=int, default=1000)
+    export_parser.add_argument("--frequency", nargs="+", dest="frequencies")
+    export_parser.add_argument("--danger", nargs="+", dest="danger_levels")
+    export_parser.add_argument("--attack-type", nargs="+", dest="attack_types")
+    export_parser.add_argument("--protocol", nargs="+", dest="protocols")
+    export_parser.add_argument("--date-from", help="ISO дата или время, включительно")
+    export_parser.add_argument("--date-to", help="ISO дата (весь день) или время, включительно")
+
+    import_parser = commands.add_parser("import", help="загрузить атаки из файла")
+    import_parser.add_argument("path")
+    import_parser.add_argument("--batch-size", type=int, default=5000)
+
+    commands.add_parser("rebuild-rollups", help="пересчитать почасовые и посуточные сводки")
+
+    for command_parser in (export_parser, import_parser):
+        command_parser.add_argument("--format", choices=FORMATS, help="по умолчанию по расширению файла")
+        command_parser.add_argument("--no-resume", dest="resume", action="store_false",
+                                    help="не продолжать с контрольной точки")
+
+    args = parser.parse_args(argv)
+
+    overrides = {key: value for key, value in (("database", args.database), ("profile", args.profile)) if value}
+    db = DatabaseManager(DatabaseConfig(**overrides))
+    init_result = db.initialize_database()
+    if not init_result["success"]:
+        print(f"Error: {init_result['error']}", file=sys.stderr)
+        return 1
+
+    if args.command == "rebuild-rollups":
+        result = db.rebuild_rollups()
+    elif args.command == "export":
+        filters = {key: getattr(args, key) for key in ("frequencies", "danger_levels", "attack_types", "protocols",
+                                                        "date_from", "date_to")
+                   if getattr(args, key)}
+        result = export_attacks(db, args.path, args.format, filters=filters or None, page_size=args.page_size,
+                                resume=args.resume, progress=make_progress("Exported", "exported"))
+    elif args.command == "import":
+        result = import_attacks(db, args.path, args.format, batch_size=args.batch_size, resume=args.resume,
+                                progress=make_progress("Imported", "records"))
+    print(file=sys.stderr)
+
+    if "error" in result:
+        print(f"Error: {result['error']}", file=sys.stderr)
+        return 1
+
+    print(result["message"])
+    for error in result["data"].get("errors", []):
+        print(f"  record {error['index']} ({error['id']}): {error['error']}", file=sys.stderr)
+    return 0 if result["success"] else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
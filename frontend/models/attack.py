@@ -1,73 +1,246 @@
-from dataclasses import dataclass, field
-from typing import List, Dict, Any
-from datetime import datetime
+"""Компактные записи атак и целей.
+
+Attack и Target - классы со __slots__ (без __dict__ у каждого экземпляра),
+которые читаются как словари (Mapping: attack["name"], attack.get(...),
+dict(attack)) - так с ними работают UI, экспорт и кэш. Колонки, которых
+нет среди полей (добавленные через ALTER TABLE), хранятся в extra.
+Для JSON - to_dict() или json.dumps(..., default=json_default).
+
+Списки (source_ips, affected_ports, mitigation_strategies, tags) хранятся
+строкой JSON из БД и декодируются при первом обращении. row_factory()
+строит записи прямо из кортежей курсора sqlite3, без промежуточных
+словарей.
+"""
+import json
+from abc import abstractmethod
+from collections.abc import Mapping
+from operator import itemgetter
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
 from utils.helpers import generate_id, get_current_timestamp
 
+# Служебные колонки таблиц, которые в запись не попадают: вычисляемые и
+# ссылки на справочники (их значения дают представления attack_details/target_details)
+SKIPPED_COLUMNS = {"created_ts", "frequency_id", "danger_id", "attack_type_id", "protocol_id"}
+
+
+def parse_json_list(value: Any) -> Any:
+    """Значение JSON из колонки; пустое или некорректное читается как пустой список"""
+    if isinstance(value, (list, dict)):
+        return value
+    if not value:
+        return []
+    try:
+        return json.loads(value)
+    except (json.JSONDecodeError, TypeError):
+        return []
+
+
+def json_default(value: Any) -> Any:
+    """default для json.dump(s): записи сериализуются как обычные словари"""
+    if isinstance(value, Record):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class LazyJSON:
+    """Поле-список: строка JSON из БД декодируется при первом чтении и заменяется результатом"""
+
+    def __set_name__(self, owner, name):
+        self.slot = f"_{name}"
+
+    def __get__(self, record, owner=None):
+        if record is None:
+            return self
+        value = getattr(record, self.slot)
+        if not isinstance(value, (list, dict)):
+            value = parse_json_list(value)
+            setattr(record, self.slot, value)
+        return value
+
+    def __set__(self, record, value):
+        setattr(record, self.slot, value)
+
 
-@dataclass
-class Target:
-    target_ip: str = ""
-    target_domain: str = ""
-    port: int = 80
-    protocol: str = "tcp"
-    tags: List[str] = field(default_factory=list)
-
-
-@dataclass
-class Attack:
-    name: str
-    frequency: str = "high"
-    danger: str = "high"
-    attack_type: str = "amplification"
-    source_ips: List[str] = field(default_factory=list)
-    affected_ports: List[int] = field(default_factory=list)
-    mitigation_strategies: List[str] = field(default_factory=list)
-    targets: List[Target] = field(default_factory=list)
-    id: str = field(default_factory=generate_id)
-    created_at: str = field(default_factory=get_current_timestamp)
-    updated_at: str = field(default_factory=get_current_timestamp)
+class Record(Mapping):
+    """Запись со __slots__, доступная как словарь с ключами FIELDS и extra"""
+
+    __slots__ = ("extra",)
+
+    # Ключи записи по порядку; колонки строки БД, которые читает row_factory, - COLUMNS
+    FIELDS: Sequence[str] = ()
+    COLUMNS: Sequence[str] = ()
+    # Колонки строки БД, которые не попадают ни в поля, ни в extra
+    _SKIPPED: frozenset = frozenset()
+    _FIELD_SET: frozenset = frozenset()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._FIELD_SET = frozenset(cls.FIELDS)
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._FIELD_SET:
+            return getattr(self, key)
+        if self.extra is not None and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value: Any):
+        if key in self._FIELD_SET:
+            setattr(self, key, value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def __contains__(self, key) -> bool:
+        return key in self._FIELD_SET or (self.extra is not None and key in self.extra)
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self.FIELDS
+        if self.extra:
+            yield from self.extra
+
+    def __len__(self) -> int:
+        return len(self.FIELDS) + (len(self.extra) if self.extra else 0)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({', '.join(f'{key}={self[key]!r}' for key in self)})"
 
     def to_dict(self) -> Dict[str, Any]:
-        """Конвертация в словарь для сохранения"""
-        return {
-            "id": self.id,
-            "name": self.name,
-            "frequency": self.frequency,
-            "danger": self.danger,
-            "attack_type": self.attack_type,
-            "source_ips": self.source_ips,
-            "affected_ports": self.affected_ports,
-            "mitigation_strategies": self.mitigation_strategies,
-            "targets": [target.__dict__ for target in self.targets],
-            "created_at": self.created_at,
-            "updated_at": self.updated_at
-        }
+        """Обычный словарь (вложенные записи - тоже словари)"""
+        return {key: [item.to_dict() if isinstance(item, Record) else item for item in value]
+                if isinstance(value, list) else value for key, value in self.items()}
+
+    @classmethod
+    @abstractmethod
+    def _build(cls, values: Sequence[Any]) -> "Record":
+        """Запись из значений COLUMNS по порядку (без вызова __init__)"""
+
+    @classmethod
+    def from_row(cls, row) -> "Record":
+        """Запись из строки sqlite3.Row"""
+        return cls.row_factory()(_RowCursor(row.keys()), tuple(row))
+
+    @classmethod
+    def row_factory(cls) -> Callable[[Any, tuple], "Record"]:
+        """row_factory для курсора sqlite3: записи прямо из кортежей строк.
+
+        Позиции колонок вычисляются один раз на запрос (по cursor.description);
+        колонки вне COLUMNS попадают в extra.
+        """
+        layout = {"description": None}
+
+        def factory(cursor, row):
+            if cursor.description is not layout["description"]:
+                names = [column[0] for column in cursor.description]
+                positions = [names.index(column) for column in cls.COLUMNS]
+                layout.update(description=cursor.description, getter=itemgetter(*positions),
+                              extra=[(i, name) for i, name in enumerate(names)
+                                     if name not in cls.COLUMNS and name not in SKIPPED_COLUMNS
+                                     and name not in cls._SKIPPED])
+            record = cls._build(layout["getter"](row))
+            if layout["extra"]:
+                record.extra = {name: row[i] for i, name in layout["extra"]}
+            return record
+
+        return factory
+
+
+class _RowCursor:
+    """Описание колонок для row_factory при сборке из готовой строки"""
+
+    def __init__(self, names):
+        self.description = tuple((name,) for name in names)
+
+
+class Target(Record):
+    """Цель атаки"""
+
+    __slots__ = ("attack_id", "target_ip", "target_domain", "port", "protocol", "_tags")
+
+    FIELDS = ("target_ip", "target_domain", "port", "protocol", "tags")
+    COLUMNS = ("attack_id", "target_ip", "target_domain", "port", "protocol", "tags")
+    # Внутренний ID цели наружу не отдаётся
+    _SKIPPED = frozenset({"id"})
+
+    tags = LazyJSON()
+
+    def __init__(self, target_ip: str = "", target_domain: str = "", port: int = 80, protocol: str = "tcp",
+                 tags: Optional[List[str]] = None, attack_id: Optional[str] = None):
+        self.attack_id = attack_id
+        self.target_ip = target_ip
+        self.target_domain = target_domain
+        self.port = port
+        self.protocol = protocol
+        self.tags = [] if tags is None else tags
+        self.extra = None
+
+    @classmethod
+    def _build(cls, values):
+        target = cls.__new__(cls)
+        (target.attack_id, target.target_ip, target.target_domain, target.port, target.protocol,
+         target._tags) = values
+        target.extra = None
+        return target
+
+    @classmethod
+    def from_dict(cls, data: Mapping) -> "Target":
+        """Цель из словаря (формы, импорт)"""
+        return cls(target_ip=data.get("target_ip", ""), target_domain=data.get("target_domain", ""),
+                   port=data.get("port", 80), protocol=data.get("protocol", "tcp"), tags=data.get("tags", []))
+
+
+class Attack(Record):
+    """Атака с целями"""
+
+    __slots__ = ("id", "name", "frequency", "danger", "attack_type", "_source_ips", "_affected_ports",
+                 "_mitigation_strategies", "created_at", "updated_at", "targets")
+
+    FIELDS = ("id", "name", "frequency", "danger", "attack_type", "source_ips", "affected_ports",
+              "mitigation_strategies", "created_at", "updated_at", "targets")
+    COLUMNS = FIELDS[:-1]
+
+    source_ips = LazyJSON()
+    affected_ports = LazyJSON()
+    mitigation_strategies = LazyJSON()
+
+    def __init__(self, name: str, frequency: str = "high", danger: str = "high",
+                 attack_type: str = "amplification", source_ips: Optional[List[str]] = None,
+                 affected_ports: Optional[List[int]] = None, mitigation_strategies: Optional[List[str]] = None,
+                 targets: Optional[List[Target]] = None, id: Optional[str] = None,
+                 created_at: Optional[str] = None, updated_at: Optional[str] = None):
+        self.id = id or generate_id()
+        self.name = name
+        self.frequency = frequency
+        self.danger = danger
+        self.attack_type = attack_type
+        self.source_ips = [] if source_ips is None else source_ips
+        self.affected_ports = [] if affected_ports is None else affected_ports
+        self.mitigation_strategies = [] if mitigation_strategies is None else mitigation_strategies
+        self.targets = [] if targets is None else targets
+        self.created_at = created_at or get_current_timestamp()
+        self.updated_at = updated_at or self.created_at
+        self.extra = None
+
+    @classmethod
+    def _build(cls, values):
+        attack = cls.__new__(cls)
+        (attack.id, attack.name, attack.frequency, attack.danger, attack.attack_type, attack._source_ips,
+         attack._affected_ports, attack._mitigation_strategies, attack.created_at, attack.updated_at) = values
+        attack.targets = []
+        attack.extra = None
+        return attack
 
     @classmethod
-    def from_dict(cls, data: Dict[str, Any]) -> 'Attack':
-        """Создание объекта из словаря"""
-        attack = cls(
-            name=data["name"],
-            frequency=data["frequency"],
-            danger=data["danger"],
-            attack_type=data["attack_type"],
-            source_ips=data["source_ips"],
-            affected_ports=data["affected_ports"],
-            mitigation_strategies=data["mitigation_strategies"],
-            id=data["id"],
-            created_at=data["created_at"],
-            updated_at=data["updated_at"]
-        )
-
-        # Конвертация targets
-        attack.targets = [
-            Target(
-                target_ip=target_data.get("target_ip", ""),
-                target_domain=target_data.get("target_domain", ""),
-                port=target_data.get("port", 80),
-                protocol=target_data.get("protocol", "tcp"),
-                tags=target_data.get("tags", [])
-            ) for target_data in data.get("targets", [])
-        ]
-
-        return attack
\ No newline at end of file
+    def from_dict(cls, data: Mapping) -> "Attack":
+        """Атака из словаря (формы, импорт)"""
+        attack = cls(name=data["name"], frequency=data["frequency"], danger=data["danger"],
+                     attack_type=data["attack_type"], source_ips=data["source_ips"],
+                     affected_ports=data["affected_ports"], mitigation_strategies=data["mitigation_strategies"],
+                     targets=[Target.from_dict(target) for target in data.get("targets", [])],
+                     id=data["id"], created_at=data["created_at"], updated_at=data["updated_at"])
+        # Дополнительные колонки
+        for key in data.keys() - cls._FIELD_SET:
+            attack[key] = data[key]
+        return attack
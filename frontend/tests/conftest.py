@@ -0,0 +1,17 @@
+"""Общие фикстуры тестов. Запуск из папки frontend: python -m pytest -q"""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.common import temp_database  # noqa: E402
+
+
+@pytest.fixture
+def manager():
+    """DatabaseManager на временной БД с созданной схемой"""
+    with temp_database() as db:
+        yield db
+        db.pool.close_all()
@@ -0,0 +1,117 @@
+import json
+import os
+
+import pytest
+
+from benchmarks.common import generate_attacks, temp_database
+from utils.attack_io import checkpoint_path, export_attacks, import_attacks, iter_csv_attacks
+
+FORMATS = ["ndjson", "csv"]
+
+
+class Interrupted(Exception):
+    pass
+
+
+def interrupt_after(calls):
+    """progress, прерывающий операцию на вызове номер calls (после контрольной точки)"""
+    seen = []
+
+    def progress(state):
+        seen.append(state)
+        if len(seen) == calls:
+            raise Interrupted()
+    return progress
+
+
+def read_ids(path, fmt):
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if fmt == "csv":
+            return [attack["id"] for attack in iter_csv_attacks(f)]
+        return [json.loads(line)["id"] for line in f if line.strip()]
+
+
+def stored_ids(manager):
+    with manager.connection() as conn:
+        return sorted(row[0] for row in conn.execute("SELECT id FROM attacks"))
+
+
+@pytest.fixture
+def seeded(manager):
+    attacks = list(generate_attacks(25, 2))
+    # Атака без целей - одна строка CSV с пустыми полями цели
+    attacks[7]["targets"] = []
+    assert manager.bulk_create_attacks(attacks)["success"]
+    return manager
+
+
+@pytest.fixture
+def target():
+    """Вторая БД - в неё импортируется экспорт seeded"""
+    with temp_database() as db:
+        yield db
+        db.pool.close_all()
+
+
+def ordered_ids(manager):
+    return [attack["id"] for attack in manager.iter_attacks()]
+
+
+@pytest.mark.parametrize("fmt", FORMATS)
+def test_export_resumes_from_part_file(seeded, tmp_path, fmt):
+    path = str(tmp_path / f"attacks.{fmt}")
+    failed = export_attacks(seeded, path, page_size=4, progress=interrupt_after(3))
+    assert not failed["success"] and failed["data"]["exported"] == 12
+    assert not os.path.exists(path)
+
+    # Недописанная страница после контрольной точки отбрасывается
+    with open(path + ".part", "ab") as f:
+        f.write(b'{"id": "half a page')
+    result = export_attacks(seeded, path, page_size=4)
+    assert result["success"] and result["data"]["exported"] == 25
+    assert read_ids(path, fmt) == ordered_ids(seeded)
+    assert not os.path.exists(path + ".part")
+    assert not os.path.exists(checkpoint_path(path, "export"))
+
+
+def export_file(manager, tmp_path, fmt):
+    path = str(tmp_path / f"attacks.{fmt}")
+    assert export_attacks(manager, path)["success"]
+    return path, sorted(read_ids(path, fmt))
+
+
+@pytest.mark.parametrize("fmt", FORMATS)
+def test_import_resumes_after_last_committed_batch(seeded, tmp_path, target, fmt):
+    path, expected = export_file(seeded, tmp_path, fmt)
+
+    failed = import_attacks(target, path, batch_size=10, progress=interrupt_after(2))
+    assert not failed["success"]
+    assert len(stored_ids(target)) == 20
+    with open(checkpoint_path(path, "import"), encoding="utf-8") as f:
+        checkpoint = json.load(f)
+    assert checkpoint["records"] == 20
+    if fmt == "ndjson":
+        # Смещение - конец 20-й строки файла
+        with open(path, "rb") as f:
+            assert checkpoint["offset"] == sum(len(f.readline()) for _ in range(20))
+
+    result = import_attacks(target, path, batch_size=10)
+    assert result["success"], result
+    assert result["data"]["resumed_from"] == 20
+    assert (result["data"]["records"], result["data"]["inserted"], result["data"]["failed"]) == (25, 25, 0)
+    assert stored_ids(target) == expected
+    assert not os.path.exists(checkpoint_path(path, "import"))
+
+
+@pytest.mark.parametrize("fmt", FORMATS)
+def test_import_checkpoint_is_discarded_when_file_changes(seeded, tmp_path, target, fmt):
+    path, expected = export_file(seeded, tmp_path, fmt)
+    assert not import_attacks(target, path, batch_size=10, progress=interrupt_after(1))["success"]
+
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("\n")
+    result = import_attacks(target, path, batch_size=10)
+    # Импорт начат заново: уже загруженные атаки не вставляются повторно
+    assert result["data"]["resumed_from"] == 0
+    assert (result["data"]["inserted"], result["data"]["failed"]) == (15, 10)
+    assert stored_ids(target) == expected
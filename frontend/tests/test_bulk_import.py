@@ -0,0 +1,79 @@
+from api.db_config import DatabaseConfig
+from api.db_manager import DatabaseManager
+from api.migrations import DEFERRED_INSERT_TRIGGERS
+from benchmarks.common import generate_attacks
+
+DERIVED_TABLES = ("attack_source_ips", "attack_ports", "attack_mitigations", "attack_stats", "attack_rollups",
+                  "target_rollups", "source_ip_ranges", "target_ip_ranges", "attack_search_docs")
+
+
+def snapshot(manager):
+    """Содержимое производных таблиц и документов поиска (без служебных docid)"""
+    with manager.connection() as conn:
+        tables = {table: sorted(tuple(row) for row in conn.execute(f"SELECT * FROM {table}"))
+                  for table in DERIVED_TABLES if table != "attack_search_docs"}
+        tables["attacks_fts"] = sorted(tuple(row) for row in conn.execute(
+            "SELECT d.attack_id, f.name, f.mitigation_strategies, f.target_domains, f.tags "
+            "FROM attacks_fts f JOIN attack_search_docs d ON d.docid = f.rowid"))
+        tables["attacks_name_trigram"] = sorted(tuple(row) for row in conn.execute(
+            "SELECT d.attack_id, t.name FROM attacks_name_trigram t JOIN attack_search_docs d ON d.docid = t.rowid"))
+        tables["targets_domain_trigram"] = sorted(tuple(row) for row in conn.execute(
+            "SELECT rowid, target_domain FROM targets_domain_trigram"))
+        triggers = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+    return tables, triggers
+
+
+def import_twice(manager, imports, defer_indexes):
+    for attacks in imports:
+        result = manager.bulk_create_attacks(attacks, batch_size=150, defer_indexes=defer_indexes)
+        assert result["success"], result.get("error")
+    return result
+
+
+def test_deferred_import_builds_the_same_indexes(tmp_path):
+    managers = [DatabaseManager(DatabaseConfig(database=str(tmp_path / f"{name}.db"))) for name in ("a", "b")]
+    for manager in managers:
+        manager.initialize_database()
+    imports = [list(generate_attacks(400, 3, seed=seed)) for seed in (1, 2)]
+    assert import_twice(managers[0], imports, defer_indexes=False)["data"]["deferred_indexes"] is False
+    assert import_twice(managers[1], imports, defer_indexes=True)["data"]["deferred_indexes"] is True
+
+    immediate, deferred = snapshot(managers[0]), snapshot(managers[1])
+    assert deferred == immediate
+    assert set(DEFERRED_INSERT_TRIGGERS) <= deferred[1]
+    for manager in managers:
+        manager.pool.close_all()
+
+
+def test_auto_mode_defers_only_large_imports(manager):
+    assert manager.bulk_create_attacks(generate_attacks(1000, 1, seed=1))["data"]["deferred_indexes"]
+    small = manager.bulk_create_attacks(generate_attacks(10, 1, seed=2))
+    assert small["data"]["deferred_indexes"] is False
+    large = manager.bulk_create_attacks(generate_attacks(300, 1, seed=3), batch_size=100)
+    assert large["data"]["deferred_indexes"] is True
+    assert manager.get_stats()["total"] == 1310
+
+
+def test_interrupted_import_is_restored_on_startup(manager):
+    manager.bulk_create_attacks(generate_attacks(50, 2, seed=1))
+    expected = snapshot(manager)
+    with manager.connection() as conn:
+        manager._defer_index_triggers(conn)
+        conn.execute("DELETE FROM attacks_fts")
+        conn.execute("DELETE FROM attack_stats")
+        conn.commit()
+
+    restarted = DatabaseManager(manager.config)
+    assert snapshot(restarted) == expected
+    with restarted.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM deferred_triggers").fetchone()[0] == 0
+    restarted.pool.close_all()
+
+
+def test_every_derived_insert_trigger_is_deferred(manager):
+    with manager.connection() as conn:
+        rows = conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger' "
+                            "AND tbl_name IN ('attacks', 'targets')").fetchall()
+    insert_triggers = {name for name, sql in rows if " INSERT ON " in " ".join(sql.split())}
+    kept = {name for name in insert_triggers if "_log_" in name or "_lookup_" in name}
+    assert insert_triggers - kept == set(DEFERRED_INSERT_TRIGGERS)
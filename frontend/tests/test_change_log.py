@@ -0,0 +1,65 @@
+from benchmarks.common import generate_attacks
+
+
+def changes_since(manager, version, limit=1000):
+    result = manager.get_changes_since(version, limit)
+    assert result["success"], result.get("error")
+    return result["data"]
+
+
+def operations(data):
+    return [(change["table_name"], change["operation"], change["attack_id"]) for change in data["changes"]]
+
+
+def test_changes_follow_create_update_delete(manager):
+    attack = next(generate_attacks(1, 2))
+    assert manager.create_attack(attack)["success"]
+    created = changes_since(manager, 0)
+    assert operations(created) == [("attacks", "insert", attack["id"]),
+                                   ("targets", "insert", attack["id"]), ("targets", "insert", attack["id"])]
+    assert created["version"] == created["latest_version"] == 3
+    assert not created["reset"] and not created["has_more"]
+
+    assert manager.update_attack(attack["id"], {**attack, "name": "renamed"})["success"]
+    updated = changes_since(manager, created["version"])
+    # Цели не менялись - в журнале только сама атака
+    assert operations(updated) == [("attacks", "update", attack["id"])]
+
+    assert manager.delete_attack(attack["id"])["success"]
+    deleted = changes_since(manager, updated["version"])
+    assert sorted(operations(deleted)) == [("attacks", "delete", attack["id"]),
+                                           ("targets", "delete", attack["id"]), ("targets", "delete", attack["id"])]
+    assert changes_since(manager, deleted["version"])["changes"] == []
+
+
+def test_changes_are_paged_by_version(manager):
+    assert manager.bulk_create_attacks(generate_attacks(5, 1))["success"]
+    versions, version = [], 0
+    while True:
+        data = changes_since(manager, version, limit=3)
+        versions += [change["version"] for change in data["changes"]]
+        version = data["version"]
+        if not data["has_more"]:
+            break
+    assert versions == list(range(1, 11))
+    assert version == 10
+
+
+def test_compaction_forces_reset_for_stale_consumers(manager):
+    assert manager.bulk_create_attacks(generate_attacks(4, 1))["success"]
+    result = manager.compact_change_log(retention=3)
+    assert result["success"]
+    assert result["data"] == {"removed": 5, "compacted_through": 5}
+
+    stale = changes_since(manager, 2)
+    assert stale["reset"] and stale["changes"] == []
+    assert stale["version"] == stale["latest_version"] == 8
+    current = changes_since(manager, 5)
+    assert not current["reset"]
+    assert [change["version"] for change in current["changes"]] == [6, 7, 8]
+    # Версия из будущего (например, после reset_database) - тоже reset
+    assert changes_since(manager, 100)["reset"]
+
+    # Версии не переиспользуются после очистки
+    assert manager.create_attack(next(generate_attacks(1, 0, seed=7)))["success"]
+    assert [change["version"] for change in changes_since(manager, 8)["changes"]] == [9]
@@ -0,0 +1,114 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from benchmarks.bench_columnar import DATE_FROM, QUERIES, sql_rows  # noqa: E402
+from benchmarks.common import generate_attacks  # noqa: E402
+
+
+def assert_matches_sql(manager, snapshot):
+    for name, (sql, params, query) in QUERIES.items():
+        assert query(snapshot) == sql_rows(manager, sql, params), name
+
+
+@pytest.fixture
+def seeded(manager):
+    assert manager.bulk_create_attacks(generate_attacks(300, 2))["success"]
+    return manager
+
+
+def test_snapshot_matches_sql(seeded):
+    snapshot = seeded.get_analytics_snapshot()
+    assert snapshot.stats()["attacks"] == 300
+    assert snapshot.stats()["targets"] == 600
+    assert_matches_sql(seeded, snapshot)
+
+
+@pytest.mark.parametrize("filters", [
+    {"danger_levels": ["high", "critical"]},
+    {"frequencies": ["low"], "attack_types": ["volumetric", "protocol"]},
+    {"protocols": ["udp", "dns"]},
+    {"min_danger": "high", "min_frequency": "medium"},
+    {"date_from": DATE_FROM},
+    {"danger_levels": ["no_such_level"]},
+])
+def test_count_matches_filter_attacks(seeded, filters):
+    snapshot = seeded.get_analytics_snapshot()
+    assert snapshot.count(**filters) == len(seeded.filter_attacks(**filters))
+
+
+def test_count_matches_date_range(seeded):
+    snapshot = seeded.get_analytics_snapshot()
+    created = sorted(attack["created_at"] for attack in seeded.get_all_attacks())
+    date_from, date_to = created[50], created[200]
+    expected = len(seeded.filter_attacks(date_from=date_from, date_to=date_to))
+    assert snapshot.count(date_from=date_from, date_to=date_to) == expected == 151
+
+
+def test_targets_group_by_filters_protocol(seeded):
+    snapshot = seeded.get_analytics_snapshot()
+    expected = sql_rows(seeded, """
+        SELECT a.attack_type, COUNT(*) AS count FROM target_details t JOIN attack_details a ON a.id = t.attack_id
+        WHERE t.protocol = 'tcp' AND a.danger = 'critical' GROUP BY 1 ORDER BY 1""", ())
+    assert snapshot.group_by("targets", ["attack_type"], protocols=["tcp"], danger_levels=["critical"]) == expected
+
+
+def test_histogram_matches_sql(seeded):
+    snapshot = seeded.get_analytics_snapshot()
+    for period, length in (("hour", 13), ("day", 10)):
+        expected = sql_rows(seeded, f"""
+            SELECT substr(t.created_at, 1, {length}) AS bucket, t.protocol, COUNT(*) AS count
+            FROM (SELECT a.created_at, t.protocol FROM target_details t JOIN attacks a ON a.id = t.attack_id) t
+            GROUP BY 1, 2 ORDER BY 1, 2""", ())
+        assert snapshot.histogram(period, "protocol") == expected
+    with pytest.raises(ValueError):
+        snapshot.histogram("week")
+
+
+def test_refresh_applies_inserts_updates_and_deletes(seeded):
+    snapshot = seeded.get_analytics_snapshot()
+    attacks = seeded.get_all_attacks()
+
+    assert seeded.bulk_create_attacks(generate_attacks(20, 3, seed=7))["success"]
+    updated = attacks[0].to_dict()
+    updated.update(danger="critical", attack_type="amplification",
+                   targets=[{"target_ip": "192.0.2.1", "port": 53, "protocol": "dns"}])
+    assert seeded.update_attack(updated["id"], updated)["success"]
+    for attack in attacks[1:11]:
+        assert seeded.delete_attack(attack["id"])["success"]
+
+    result = snapshot.refresh()
+    assert not result["reloaded"]
+    assert result["changed"] == 31
+    assert snapshot.stats()["attacks"] == 310
+    assert_matches_sql(seeded, snapshot)
+
+
+def test_refresh_compacts_after_many_deletes(seeded):
+    snapshot = seeded.get_analytics_snapshot()
+    for attack in seeded.get_all_attacks()[:150]:
+        assert seeded.delete_attack(attack["id"])["success"]
+    snapshot.refresh()
+    stats = snapshot.stats()
+    assert (stats["attacks"], stats["targets"]) == (150, 300)
+    # После уплотнения в массивах не остаётся мёртвых строк
+    assert len(snapshot.attack_ts) == 150
+    assert_matches_sql(seeded, snapshot)
+
+
+def test_unparseable_created_at_is_counted_without_a_time(seeded):
+    # strftime не разбирает такой created_at - created_ts у атаки NULL
+    undated = next(generate_attacks(1, seed=9))
+    undated["created_at"] = "12/05/2024 10:00"
+    snapshot = seeded.get_analytics_snapshot()
+    assert seeded.bulk_create_attacks([undated])["success"]
+
+    last = max(attack["created_at"] for attack in seeded.get_all_attacks() if attack["id"] != undated["id"])
+    by_danger = sql_rows(seeded, "SELECT danger, COUNT(*) AS count FROM attack_details GROUP BY 1 ORDER BY 1", ())
+    # Изменения по журналу, затем полная перезагрузка
+    for load in (snapshot.refresh, snapshot._reload):
+        load()
+        assert snapshot.count() == 301
+        assert snapshot.group_by("attacks", ["danger"]) == by_danger
+        assert snapshot.count(date_to=last) == len(seeded.filter_attacks(date_to=last)) == 300
+        assert sum(row["count"] for row in snapshot.histogram("day")) == 300
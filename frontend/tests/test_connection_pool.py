@@ -0,0 +1,114 @@
+import threading
+import time
+
+import pytest
+
+from api.connection_pool import ConnectionPool, PoolTimeoutError
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.db"), max_size=2, timeout=0.2)
+    with pool.connection() as conn:
+        conn.execute("CREATE TABLE items (value INTEGER)")
+        conn.commit()
+    yield pool
+    pool.close_all()
+
+
+def in_thread(func):
+    """Результат func() из другого потока"""
+    result = []
+    thread = threading.Thread(target=lambda: result.append(func()))
+    thread.start()
+    thread.join()
+    return result[0]
+
+
+def used_connection(pool):
+    with pool.connection() as conn:
+        return conn
+
+
+def test_nested_acquire_reuses_thread_connection(pool):
+    with pool.connection() as outer:
+        with pool.connection() as inner:
+            assert inner is outer
+            # Другой поток получает своё соединение
+            assert in_thread(lambda: used_connection(pool)) is not outer
+        # Вложенный release не возвращает соединение в пул
+        assert pool.stats()["idle"] == 1
+    stats = pool.stats()
+    assert stats["reused_in_thread"] == 1
+    assert (stats["idle"], stats["open"]) == (2, 2)
+
+
+def test_wrapper_close_returns_connection(pool):
+    wrapped = pool.get()
+    raw = wrapped.raw
+    wrapped.close()
+    wrapped.close()
+    assert pool.stats()["idle"] == 1
+    with pool.connection() as conn:
+        assert conn is raw
+
+
+def test_hits_and_misses(pool):
+    stats = pool.stats()
+    assert (stats["hits"], stats["misses"], stats["open"]) == (0, 1, 1)
+    for _ in range(3):
+        with pool.connection():
+            pass
+    stats = pool.stats()
+    assert (stats["hits"], stats["misses"], stats["open"]) == (3, 1, 1)
+    assert stats["hit_ratio"] == 0.75
+
+
+def acquire_or_error(pool):
+    try:
+        return pool.acquire()
+    except PoolTimeoutError as e:
+        return e
+
+
+def test_size_bound_and_timeout(pool):
+    held = [pool.acquire(), in_thread(pool.acquire)]
+    assert pool.stats()["open"] == 2
+
+    started = time.monotonic()
+    assert isinstance(in_thread(lambda: acquire_or_error(pool)), PoolTimeoutError)
+    assert time.monotonic() - started >= 0.2
+    assert pool.stats()["timeouts"] == 1
+    assert pool.stats()["open"] == 2
+
+    # Освобождённое соединение достаётся ожидающему потоку
+    waiter = threading.Thread(target=lambda: pool.release(pool.acquire()))
+    waiter.start()
+    time.sleep(0.05)
+    pool.release(held[1])
+    waiter.join()
+    pool.release(held[0])
+    stats = pool.stats()
+    assert stats["waits"] >= 2
+    assert (stats["open"], stats["idle"], stats["timeouts"]) == (2, 2, 1)
+
+
+def test_broken_connection_is_replaced(pool):
+    with pool.connection() as conn:
+        broken = conn
+    broken.close()
+    with pool.connection() as conn:
+        assert conn is not broken
+        assert conn.execute("SELECT 1").fetchone()[0] == 1
+    stats = pool.stats()
+    assert stats["health_check_failures"] == 1
+    assert stats["open"] == 1
+
+
+def test_release_rolls_back_open_transaction(pool):
+    with pool.connection() as conn:
+        conn.execute("INSERT INTO items VALUES (1)")
+        assert conn.in_transaction
+    with pool.connection() as conn:
+        assert not conn.in_transaction
+        assert conn.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 0
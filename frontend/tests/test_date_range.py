@@ -0,0 +1,65 @@
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+from benchmarks.common import generate_attacks
+
+CREATED = {
+    "before": "2024-03-10T23:59:59",
+    "midnight": "2024-03-11T00:00:00",
+    "offset": "2024-03-11T05:00:00+03:00",  # 02:00 UTC
+    "noon": "2024-03-11T12:30:00",
+    "last": "2024-03-11T23:59:59.500000",
+    "next_day": "2024-03-12T00:00:00",
+}
+
+
+@pytest.fixture
+def dated(manager):
+    attacks = list(generate_attacks(len(CREATED), seed=3))
+    for (name, created_at), attack in zip(CREATED.items(), attacks):
+        attack.update(name=name, created_at=created_at)
+    # create_attack ставит текущее время, импорт сохраняет created_at
+    assert manager.bulk_create_attacks(attacks)["success"]
+    return manager
+
+
+def names(manager, **filters):
+    found = sorted(attack["name"] for attack in manager.filter_attacks(**filters))
+    assert manager.count_attacks(filters) == len(found)
+    return found
+
+
+def test_date_only_bounds_cover_whole_days(dated):
+    day = ["last", "midnight", "noon", "offset"]
+    assert names(dated, date_from="2024-03-11", date_to="2024-03-11") == day
+    assert names(dated, date_from=date(2024, 3, 11), date_to=date(2024, 3, 11)) == day
+    assert names(dated, date_to="2024-03-10") == ["before"]
+    assert names(dated, date_from="2024-03-12") == ["next_day"]
+
+
+def test_datetime_bounds_are_inclusive(dated):
+    assert names(dated, date_from="2024-03-11T00:00:00", date_to="2024-03-11T12:30:00") == \
+        ["midnight", "noon", "offset"]
+    # Конец включает всю указанную секунду
+    assert names(dated, date_from="2024-03-11T23:59:59", date_to="2024-03-11T23:59:59") == ["last"]
+    assert names(dated, date_from="2024-03-11T12:30:01", date_to="2024-03-11T23:59:58") == []
+
+
+def test_naive_bounds_are_utc_and_aware_bounds_are_converted(dated):
+    naive = names(dated, date_from=datetime(2024, 3, 11, 2, 0), date_to=datetime(2024, 3, 11, 2, 0))
+    assert naive == ["offset"]
+    aware = datetime(2024, 3, 11, 5, 0, tzinfo=timezone(timedelta(hours=3)))
+    assert names(dated, date_from=aware, date_to=aware) == ["offset"]
+    assert names(dated, date_from="2024-03-11T02:00:00Z", date_to="2024-03-11T01:00:00-01:00") == ["offset"]
+    assert names(dated, date_from="2024-03-11T02:00:01Z", date_to="2024-03-11T03:00:00Z") == []
+    epoch = int(datetime(2024, 3, 11, 2, 0, tzinfo=timezone.utc).timestamp())
+    assert names(dated, date_from=epoch, date_to=str(epoch)) == ["offset"]
+
+
+def test_date_range_pages_agree_and_invalid_dates_fail(dated):
+    filters = {"date_from": "2024-03-11", "date_to": "2024-03-11"}
+    paged = [attack["name"] for attack in dated.iter_attacks(filters, page_size=2)]
+    assert sorted(paged) == names(dated, **filters)
+    with pytest.raises(ValueError):
+        dated._date_bounds("yesterday", None)
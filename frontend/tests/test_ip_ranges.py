@@ -0,0 +1,62 @@
+import sqlite3
+
+from benchmarks.common import generate_attacks
+
+
+def ranges(manager):
+    with manager.connection() as conn:
+        source = conn.execute("SELECT attack_id, position, ip_start, ip_end FROM source_ip_ranges "
+                              "ORDER BY attack_id, position").fetchall()
+        target = conn.execute("SELECT target_id, attack_id, ip_start, ip_end FROM target_ip_ranges "
+                              "ORDER BY target_id").fetchall()
+    return [tuple(row) for row in source], [tuple(row) for row in target]
+
+
+def test_write_paths_maintain_ip_ranges(manager):
+    attack = next(generate_attacks(1))
+    attack["source_ips"] = ["10.9.0.1", "not an ip", "2001:db8::/48"]
+    attack["targets"][0]["target_ip"] = "172.16.5.5"
+    assert manager.create_attack(attack)["success"]
+
+    assert [a["id"] for a in manager.filter_attacks(source_cidrs=["10.9.0.0/16"])] == [attack["id"]]
+    assert [a["id"] for a in manager.filter_attacks(source_cidrs=["2001:db8::/32"])] == [attack["id"]]
+    assert [a["id"] for a in manager.filter_attacks(target_cidrs=["172.16.0.0/12"])] == [attack["id"]]
+
+    attack["source_ips"] = ["10.8.0.1"]
+    attack["targets"] = [{"target_ip": "192.0.2.7", "target_domain": "x.example", "port": 80,
+                          "protocol": "tcp", "tags": []}]
+    assert manager.update_attack_with_targets(attack["id"], attack)["success"]
+    assert manager.filter_attacks(source_cidrs=["10.9.0.0/16"]) == []
+    assert manager.filter_attacks(target_cidrs=["172.16.0.0/12"]) == []
+    assert [a["id"] for a in manager.filter_attacks(target_cidrs=["192.0.2.0/24"])] == [attack["id"]]
+
+    assert manager.delete_attack(attack["id"])["success"]
+    assert ranges(manager) == ([], [])
+
+
+def test_plain_sqlite_connection_can_write(manager):
+    attack = next(generate_attacks(1))
+    conn = sqlite3.connect(manager.db_path)
+    try:
+        conn.execute("INSERT INTO attacks (id, name, frequency_id, danger_id, attack_type_id, source_ips, affected_ports, "
+                     "mitigation_strategies, created_at, updated_at) VALUES (?, 'n', 3, 3, 1, "
+                     "'[\"10.7.0.1\"]', '[]', '[]', '2024-01-01T00:00:00', '2024-01-01T00:00:00')", (attack["id"],))
+        conn.execute("INSERT INTO targets (attack_id, target_ip, target_domain, port, protocol_id, tags) "
+                     "VALUES (?, '198.51.100.1', 'd', 80, 1, '[]')", (attack["id"],))
+        conn.commit()
+    finally:
+        conn.close()
+
+    with manager.connection() as conn:
+        assert manager.flush_index_queue(conn) == 1
+        conn.commit()
+    assert [a["id"] for a in manager.filter_attacks(source_cidrs=["10.7.0.0/16"])] == [attack["id"]]
+    assert [a["id"] for a in manager.filter_attacks(target_cidrs=["198.51.100.0/24"])] == [attack["id"]]
+
+
+def test_rebuild_matches_incremental_ranges(manager):
+    assert manager.bulk_create_attacks(generate_attacks(300, 3))["success"]
+    incremental = ranges(manager)
+    assert incremental[0] and incremental[1]
+    assert manager.rebuild_ip_ranges()["success"]
+    assert ranges(manager) == incremental
@@ -0,0 +1,83 @@
+from api.migrations import apply_migrations
+from benchmarks.common import generate_attacks
+from tests.test_migrations import open_manager
+
+
+def test_unknown_values_are_added_on_write(manager):
+    attack = next(generate_attacks(1))
+    attack["danger"] = "apocalyptic"
+    attack["targets"][0]["protocol"] = "quic"
+    result = manager.create_attack(attack)
+    assert result["success"], result.get("error")
+    assert result["data"]["danger"] == "apocalyptic"
+
+    categories = manager.get_categories()
+    assert categories["danger"][-1] == "apocalyptic"
+    assert categories["protocol"][-1] == "quic"
+    assert manager.get_stats()["danger"] == {"apocalyptic": 1}
+    assert [a["id"] for a in manager.filter_attacks(danger_levels=["apocalyptic"])] == [attack["id"]]
+    assert [a["id"] for a in manager.filter_attacks(protocols=["quic"])] == [attack["id"]]
+
+    update = {**attack, "danger": "low", "attack_type": "reflection"}
+    assert manager.update_attack(attack["id"], update)["success"]
+    assert manager.get_attack(attack["id"])["attack_type"] == "reflection"
+    assert manager.get_stats()["danger"] == {"low": 1}
+
+
+def test_rows_store_lookup_ids(manager):
+    assert manager.bulk_create_attacks(generate_attacks(20))["success"]
+    with manager.connection() as conn:
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(attacks)")}
+        assert {"frequency_id", "danger_id", "attack_type_id"} <= columns
+        assert not {"frequency", "danger", "attack_type"} & columns
+        types = conn.execute("SELECT DISTINCT typeof(danger_id) FROM attacks").fetchall()
+        assert [row[0] for row in types] == ["integer"]
+        assert conn.execute("SELECT DISTINCT typeof(protocol_id) FROM targets").fetchone()[0] == "integer"
+
+
+def test_add_lookup_value_with_rank(manager):
+    result = manager.add_lookup_value("danger", "severe", rank=4)
+    assert result["success"], result.get("error")
+    assert manager.get_categories()["danger"] == ["low", "medium", "high", "severe", "critical"]
+    assert not manager.add_lookup_value("danger", "severe")["success"]
+    assert not manager.add_lookup_value("color", "red")["success"]
+    assert manager.add_lookup_value("protocol", "quic")["data"]["rank"] == 7
+
+    for danger in ("high", "severe", "critical"):
+        attack = next(generate_attacks(1))
+        attack["danger"] = danger
+        assert manager.create_attack(attack)["success"]
+    assert sorted(a["danger"] for a in manager.filter_attacks(min_danger="severe")) == ["critical", "severe"]
+
+
+def test_upgrade_encodes_existing_rows(tmp_path):
+    path = tmp_path / "v16.db"
+    old = open_manager(path)
+    with old.connection() as conn:
+        apply_migrations(conn, target_version=16)
+        conn.execute("INSERT INTO attacks (id, name, frequency, danger, attack_type, source_ips, affected_ports, "
+                     "mitigation_strategies, created_at, updated_at) VALUES "
+                     "('a1', 'n', 'high', 'critical', 'volumetric', '[]', '[]', '[]', "
+                     "'2024-01-01T00:00:00', '2024-01-01T00:00:00')")
+        conn.execute("INSERT INTO targets (attack_id, target_ip, target_domain, port, protocol, tags) "
+                     "VALUES ('a1', '192.0.2.1', 'd', 53, 'dns', '[]')")
+        conn.commit()
+        # Прерванный импорт: сохранённый SQL триггеров - ещё по текстовым колонкам
+        old._defer_index_triggers(conn)
+    old.pool.close_all()
+
+    upgraded = open_manager(path)
+    attack = upgraded.get_attack("a1")
+    assert (attack["frequency"], attack["danger"], attack["attack_type"]) == ("high", "critical", "volumetric")
+    assert attack["targets"][0]["protocol"] == "dns"
+    assert [a["id"] for a in upgraded.filter_attacks(danger_levels=["critical"], protocols=["dns"])] == ["a1"]
+
+    created = next(generate_attacks(1))
+    created["danger"] = "critical"
+    assert upgraded.create_attack(created)["success"]
+    stats = upgraded.get_stats()
+    assert stats["total"] == 2
+    assert stats["danger"]["critical"] == 2
+    with upgraded.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM deferred_triggers").fetchone()[0] == 0
+    upgraded.pool.close_all()
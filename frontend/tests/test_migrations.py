@@ -0,0 +1,126 @@
+import pytest
+
+from api import migrations
+from api.db_config import DatabaseConfig
+from api.db_manager import DatabaseManager
+from api.migrations import Migration, MigrationError, apply_migrations, get_schema_version
+from benchmarks.common import generate_attacks
+
+
+def open_manager(path):
+    return DatabaseManager(DatabaseConfig(database=str(path)))
+
+
+def test_null_list_elements_are_skipped_in_child_tables(manager):
+    attack = next(generate_attacks(1))
+    attack["source_ips"] = [None, "10.0.0.1"]
+    result = manager.create_attack(attack)
+    assert result["success"], result.get("error")
+
+    with manager.connection() as conn:
+        rows = conn.execute("SELECT position, ip FROM attack_source_ips WHERE attack_id = ?",
+                            (attack["id"],)).fetchall()
+    assert [tuple(row) for row in rows] == [(1, "10.0.0.1")]
+    assert manager.filter_attacks(source_ips=["10.0.0.1"])[0]["id"] == attack["id"]
+
+
+def test_upgrade_backfills_lists_with_null_elements(tmp_path):
+    path = tmp_path / "old.db"
+    old = open_manager(path)
+    with old.connection() as conn:
+        apply_migrations(conn, target_version=5)
+        conn.execute("INSERT INTO attacks (id, name, frequency, danger, attack_type, source_ips, affected_ports, "
+                     "mitigation_strategies, created_at, updated_at) VALUES "
+                     "('a1', 'n', 'high', 'high', 'volumetric', '[null, \"10.0.0.1\"]', '[null]', '[]', "
+                     "'2024-01-01T00:00:00', '2024-01-01T00:00:00')")
+        conn.commit()
+    old.pool.close_all()
+
+    upgraded = open_manager(path)
+    with upgraded.connection() as conn:
+        assert get_schema_version(conn) == migrations.LATEST_VERSION
+        assert conn.execute("SELECT ip FROM attack_source_ips").fetchall()[0][0] == "10.0.0.1"
+        assert conn.execute("SELECT COUNT(*) FROM attack_ports").fetchone()[0] == 0
+    upgraded.pool.close_all()
+
+
+def test_failed_migration_is_raised(tmp_path, monkeypatch):
+    path = tmp_path / "broken.db"
+    open_manager(path).initialize_database()
+    broken = Migration(migrations.LATEST_VERSION + 1, "broken", ["SELECT * FROM no_such_table"])
+    monkeypatch.setattr(migrations, "MIGRATIONS", migrations.MIGRATIONS + [broken])
+    monkeypatch.setattr(migrations, "LATEST_VERSION", broken.version)
+
+    with pytest.raises(MigrationError) as error:
+        open_manager(path)
+    assert error.value.version == broken.version
+    assert error.value.before == broken.version - 1
+
+
+def test_encoded_columns_keep_constraints(manager):
+    with manager.connection() as conn:
+        attacks = {row["name"]: row for row in conn.execute("PRAGMA table_info(attacks)")}
+        targets = {row["name"]: row for row in conn.execute("PRAGMA table_info(targets)")}
+        tcp_id = conn.execute("SELECT id FROM protocols WHERE value = 'tcp'").fetchone()[0]
+        references = {(row["table"], row["from"]) for row in conn.execute("PRAGMA foreign_key_list(attacks)")}
+    for column in ("frequency_id", "danger_id", "attack_type_id"):
+        assert (attacks[column]["type"], attacks[column]["notnull"]) == ("INTEGER", 1)
+    assert ("danger_levels", "danger_id") in references
+    assert (targets["protocol_id"]["notnull"], targets["protocol_id"]["dflt_value"]) == (0, str(tcp_id))
+    assert targets["port"]["dflt_value"] == "80"
+
+    attack = next(generate_attacks(1))
+    attack["danger"] = None
+    result = manager.create_attack(attack)
+    assert not result["success"]
+    assert "attacks.danger_id" in result["error"]
+
+    attack["danger"] = "high"
+    assert manager.create_attack(attack)["success"]
+    with manager.connection() as conn:
+        conn.execute("INSERT INTO targets (attack_id, target_ip) VALUES (?, '192.0.2.7')", (attack["id"],))
+        conn.commit()
+    protocols = [target["protocol"] for target in manager.get_attack(attack["id"])["targets"]]
+    assert protocols[-1] == "tcp"
+
+
+def test_upgrade_rebuild_keeps_rows_and_target_ids(tmp_path):
+    path = tmp_path / "v16.db"
+    old = open_manager(path)
+    with old.connection() as conn:
+        apply_migrations(conn, target_version=16)
+        conn.execute("INSERT INTO attacks (id, name, frequency, danger, attack_type, source_ips, affected_ports, "
+                     "mitigation_strategies, created_at, updated_at) VALUES "
+                     "('a1', 'n', 'high', 'low', 'volumetric', '[]', '[]', '[]', "
+                     "'2024-01-01T00:00:00', '2024-01-01T00:00:00')")
+        for protocol in ("udp", "tcp", "udp"):
+            conn.execute("INSERT INTO targets (attack_id, protocol) VALUES ('a1', ?)", (protocol,))
+        conn.execute("DELETE FROM targets WHERE id = 3")
+        conn.commit()
+    old.pool.close_all()
+
+    upgraded = open_manager(path)
+    with upgraded.connection() as conn:
+        assert conn.execute("PRAGMA foreign_keys").fetchone()[0] == 1
+        rows = conn.execute("SELECT id, protocol FROM target_details ORDER BY id").fetchall()
+        assert [tuple(row) for row in rows] == [(1, "udp"), (2, "tcp")]
+        conn.execute("INSERT INTO targets (attack_id) VALUES ('a1')")
+        assert conn.execute("SELECT MAX(id) FROM targets").fetchone()[0] == 4
+        indexes = {row[1] for row in conn.execute("PRAGMA index_list(targets)")}
+        assert {"idx_targets_attack_id", "idx_targets_protocol"} <= indexes
+        conn.rollback()
+        # Каскадное удаление целей работает и после перестройки таблиц
+        conn.execute("DELETE FROM attacks WHERE id = 'a1'")
+        assert conn.execute("SELECT COUNT(*) FROM targets").fetchone()[0] == 0
+        conn.rollback()
+    upgraded.pool.close_all()
+
+
+def test_user_tables_hide_internal_tables(manager):
+    with manager.connection() as conn:
+        conn.execute("CREATE TABLE notes (id INTEGER PRIMARY KEY, text TEXT)")
+        conn.commit()
+    assert manager.get_user_tables() == [
+        "attack_details", "attack_types", "attacks", "custom_types", "danger_levels", "frequency_levels",
+        "notes", "protocols", "target_details", "targets",
+    ]
@@ -0,0 +1,38 @@
+import json
+from collections.abc import Mapping
+
+import pytest
+
+from api.result_cache import estimate_size
+from benchmarks.common import generate_attacks
+from models.attack import Attack, Record, json_default
+
+
+def test_record_requires_build():
+    class Incomplete(Record):
+        __slots__ = ()
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_public_results_are_json_serializable(manager):
+    attack = next(generate_attacks(1))
+    created = manager.create_attack(attack)
+    assert created["success"], created.get("error")
+    assert json.loads(json.dumps(created))["data"]["targets"][0]["target_ip"] == attack["targets"][0]["target_ip"]
+
+    update = {**attack, "name": "renamed"}
+    assert json.loads(json.dumps(manager.update_attack(attack["id"], update)))["data"]["name"] == "renamed"
+    assert type(manager.get_attack(attack["id"])) is dict
+
+
+def test_loaded_records_are_mappings(manager):
+    assert manager.bulk_create_attacks(generate_attacks(3))["success"]
+    attacks = manager.get_all_attacks()
+    assert all(isinstance(attack, Attack) and isinstance(attack, Mapping) for attack in attacks)
+    with pytest.raises(TypeError):
+        json.dumps(attacks)
+    decoded = json.loads(json.dumps(attacks, default=json_default))
+    assert decoded == [attack.to_dict() for attack in attacks]
+    assert estimate_size(attacks[0]) > estimate_size(attacks[0]["name"]) + estimate_size(attacks[0]["id"])
@@ -0,0 +1,63 @@
+import pytest
+
+from benchmarks.common import generate_attacks
+
+# Пачки атак с одинаковым created_at: порядок внутри пачки задаёт только id
+TIMESTAMPS = ["2024-03-11T10:00:00", "2024-03-11T09:00:00", "2024-03-11T08:00:00"]
+
+
+@pytest.fixture
+def seeded(manager):
+    attacks = list(generate_attacks(30, 1, seed=4))
+    for index, attack in enumerate(attacks):
+        attack["created_at"] = TIMESTAMPS[index % len(TIMESTAMPS)]
+    assert manager.bulk_create_attacks(attacks)["success"]
+    return manager
+
+
+def expected_keys(manager, **filters):
+    """Ключи (created_at, id) в порядке страниц: created_at DESC, id DESC"""
+    attacks = manager.filter_attacks(**filters)
+    return sorted(((attack["created_at"], attack["id"]) for attack in attacks), reverse=True)
+
+
+def keys(attacks):
+    return [(attack["created_at"], attack["id"]) for attack in attacks]
+
+
+@pytest.mark.parametrize("page_size", [1, 4, 10, 30, 31])
+def test_pages_cover_duplicate_timestamps_in_order(seeded, page_size):
+    pages = list(seeded.iter_attack_pages(page_size=page_size))
+    assert all(len(page) == page_size for page in pages[:-1])
+    assert keys(attack for page in pages for attack in page) == expected_keys(seeded)
+
+
+def test_get_attacks_page_continues_after_key(seeded):
+    expected = expected_keys(seeded)
+    collected, after = [], None
+    while True:
+        page = seeded.get_attacks_page(page_size=7, after=after)
+        collected += keys(page)
+        if len(page) < 7:
+            break
+        after = collected[-1]
+    assert collected == expected
+
+    # Продолжение с середины пачки одинаковых created_at
+    middle = expected[13]
+    assert keys(seeded.iter_attacks(after=middle, page_size=4)) == expected[14:]
+    assert seeded.get_attack_key_at(position=13) == middle
+
+
+@pytest.mark.parametrize("filters", [
+    {"danger_levels": ["high", "critical"]},
+    {"date_from": "2024-03-11T09:00:00", "date_to": "2024-03-11T09:00:00"},
+    {"min_danger": "medium", "date_to": "2024-03-11T09:00:00"},
+])
+def test_keyset_pages_with_filters(seeded, filters):
+    expected = expected_keys(seeded, **filters)
+    assert expected
+    assert keys(seeded.iter_attacks(filters, page_size=3)) == expected
+    assert seeded.count_attacks(filters) == len(expected)
+    after = expected[len(expected) // 2]
+    assert keys(seeded.get_attacks_page(filters, page_size=100, after=after)) == expected[len(expected) // 2 + 1:]
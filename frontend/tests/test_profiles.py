@@ -0,0 +1,19 @@
+import pytest
+
+from api.db_config import PRAGMA_PROFILES
+from benchmarks.common import generate_attacks, temp_database
+
+
+@pytest.mark.parametrize("profile", list(PRAGMA_PROFILES))
+def test_delete_attack_cascades_to_targets(profile):
+    with temp_database(profile=profile) as manager:
+        attacks = list(generate_attacks(2, 3, seed=8))
+        assert manager.bulk_create_attacks(attacks)["success"]
+        assert manager.delete_attack(attacks[0]["id"])["success"]
+        with manager.connection() as conn:
+            assert conn.execute("PRAGMA foreign_keys").fetchone()[0] == 1
+            assert conn.execute("SELECT COUNT(*) FROM targets WHERE attack_id = ?",
+                                (attacks[0]["id"],)).fetchone()[0] == 0
+            assert conn.execute("SELECT COUNT(*) FROM targets").fetchone()[0] == 3
+        assert manager.get_stats()["total"] == 1
+        manager.pool.close_all()
@@ -0,0 +1,79 @@
+import time
+
+import pytest
+
+from api.query_executor import QueryCancelledError, QueryExecutor, QueryTimeoutError
+from benchmarks.common import generate_attacks
+
+
+@pytest.fixture
+def executor(manager):
+    executor = QueryExecutor(manager, workers=1, timeout=None, max_rows=None)
+    yield executor
+    executor.shutdown()
+
+
+@pytest.fixture
+def attack_id(manager):
+    attack = next(generate_attacks(1, seed=5))
+    attack["name"] = "x"
+    return manager.create_attack(attack)["data"]["id"]
+
+
+def test_write_with_returning_is_committed_and_not_cached(manager, executor, attack_id):
+    select = ("SELECT name FROM attacks WHERE id = ?", (attack_id,))
+    assert executor.submit(*select).result().rows == [("x",)]
+
+    result = executor.submit("UPDATE attacks SET name = 'renamed' WHERE id = ? RETURNING name",
+                             (attack_id,)).result()
+    assert result.rows == [("renamed",)]
+    assert result.rows_affected == 1
+
+    # Запись закоммичена и сбросила кэш: повторный SELECT видит новое имя
+    after = executor.submit(*select).result()
+    assert after.rows == [("renamed",)] and not after.cached
+    with manager.connection() as conn:
+        assert conn.execute(*select).fetchone()[0] == "renamed"
+
+
+def test_returning_rows_beyond_limit_are_written(manager, executor):
+    manager.bulk_create_attacks(generate_attacks(5, seed=6))
+    result = executor.submit("UPDATE attacks SET name = 'bulk' RETURNING id", max_rows=2).result()
+    assert len(result.rows) == 2 and result.truncated
+    assert result.rows_affected == 5
+    with manager.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM attacks WHERE name = 'bulk'").fetchone()[0] == 5
+
+
+# Бесконечный рекурсивный CTE: завершается только через progress handler
+ENDLESS = "WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n) SELECT COUNT(*) FROM n"
+
+
+def test_running_query_is_cancelled(executor):
+    handle = executor.submit(ENDLESS)
+    deadline = time.monotonic() + 5
+    while not handle.future.running():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    handle.cancel()
+    with pytest.raises(QueryCancelledError):
+        handle.result()
+    # Соединение вернулось в пул без progress handler
+    assert executor.submit("SELECT 1").result().rows == [(1,)]
+
+
+def test_query_past_timeout_is_interrupted(executor):
+    started = time.monotonic()
+    with pytest.raises(QueryTimeoutError):
+        executor.submit(ENDLESS, timeout=0.2).result()
+    assert time.monotonic() - started < 5
+
+
+def test_rows_are_limited(executor):
+    sql = "WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n WHERE x < 25) SELECT x FROM n"
+    limited = executor.submit(sql, max_rows=10).result()
+    assert limited.rows == [(x,) for x in range(1, 11)] and limited.truncated
+    exact = executor.submit(sql, max_rows=25).result()
+    assert len(exact.rows) == 25 and not exact.truncated
+    # Лимит входит в ключ кэша: другой лимит не получает обрезанный результат
+    assert len(executor.submit(sql, max_rows=None).result().rows) == 25
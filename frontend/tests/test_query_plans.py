@@ -0,0 +1,5 @@
+from benchmarks import check_query_plans
+
+
+def test_filter_paths_have_no_full_scans(capsys):
+    assert check_query_plans.main() == 0, capsys.readouterr().out
@@ -0,0 +1,70 @@
+import pytest
+
+from api.result_cache import ResultCache, is_cacheable
+from benchmarks.common import generate_attacks
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT * FROM attacks WHERE created_at > datetime()",
+    "SELECT date()",
+    "SELECT julianday()",
+    "SELECT unixepoch ( )",
+    "SELECT strftime('%Y', created_at) FROM attacks",
+    "SELECT * FROM attacks WHERE created_at > datetime(updated_at, '-1 hour')",
+    "SELECT time('now')",
+    "SELECT datetime(",
+])
+def test_current_time_queries_are_not_cached(sql):
+    assert not is_cacheable(sql)
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT * FROM attacks WHERE created_at > datetime('2024-01-01', '-1 day')",
+    "SELECT julianday('2024-01-01') - julianday('2023-01-01')",
+    "SELECT unixepoch(1700000000, 'unixepoch')",
+    "SELECT date, time FROM events",
+])
+def test_literal_time_queries_are_cached(sql):
+    assert is_cacheable(sql)
+
+
+def test_put_after_invalidation_is_skipped():
+    cache = ResultCache(1 << 20)
+    generation = cache.generation
+    cache.invalidate({"attacks"})
+    cache.put("key", [1], frozenset({"attacks"}), generation)
+    assert cache.get("key") == (False, None)
+
+    cache.put("key", [1], frozenset({"attacks"}), cache.generation)
+    assert cache.get("key") == (True, [1])
+
+
+def test_write_during_compute_is_not_cached(manager):
+    # custom_types не попадает в журнал изменений - кэш сбрасывает только invalidate_cache
+    sql = "SELECT COUNT(*) FROM custom_types"
+    with manager.connection() as conn:
+        def stale_count():
+            count = conn.execute(sql).fetchone()[0]
+            # Запись другого соединения коммитится и сбрасывает кэш между чтением и put
+            with manager.connection() as writer:
+                writer.execute("INSERT INTO custom_types (id, name, type) VALUES ('t1', 'level', 'enum')")
+                writer.commit()
+                manager.invalidate_cache(("custom_types",), writer)
+            return count
+
+        assert manager.cached_query(conn, sql, (), stale_count) == (0, False)
+        fresh = lambda: conn.execute(sql).fetchone()[0]
+        assert manager.cached_query(conn, sql, (), fresh) == (1, False)
+        assert manager.cached_query(conn, sql, (), fresh) == (1, True)
+
+
+def test_writes_invalidate_dependent_results(manager):
+    assert manager.bulk_create_attacks(generate_attacks(3))["success"]
+    sql = "SELECT count FROM attack_stats WHERE dimension = 'total'"
+    with manager.connection() as conn:
+        read = lambda: conn.execute(sql).fetchone()[0]
+        assert manager.cached_query(conn, sql, (), read) == (3, False)
+        assert manager.cached_query(conn, sql, (), read) == (3, True)
+    assert manager.delete_attack(manager.get_all_attacks()[0]["id"])["success"]
+    with manager.connection() as conn:
+        assert manager.cached_query(conn, sql, (), lambda: conn.execute(sql).fetchone()[0]) == (2, False)
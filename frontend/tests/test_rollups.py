@@ -0,0 +1,114 @@
+import pytest
+
+from api.rollups import bucket_expression, rollup_query, trend_query
+from benchmarks.common import generate_attacks
+
+COUNT = [{"function": "COUNT", "column": "*", "alias": "count"}]
+
+# (таблица, группировка, корзина)
+QUERIES = [
+    ("attack_details", [], None),
+    ("attack_details", ["danger"], None),
+    ("attack_details", ["attack_type", "frequency"], "day"),
+    ("attack_details", ["danger"], "hour"),
+    ("attack_details", [], "month"),
+    ("target_details", ["protocol"], "day"),
+    ("targets", [], "hour"),
+]
+
+
+def rows(manager, sql, params=()):
+    with manager.connection() as conn:
+        return sorted(tuple(row) for row in conn.execute(sql, params))
+
+
+def direct_query(table, group_by, bucket):
+    """Тот же запрос по исходной таблице, как его строит инструмент агрегации без сводок"""
+    columns = ["COUNT(*) AS count"] + list(group_by)
+    groups = list(group_by)
+    if bucket:
+        columns.append(f"{bucket_expression(table, bucket)} AS {bucket}")
+        groups.append(bucket)
+    sql = f"SELECT {', '.join(columns)} FROM {table}"
+    return sql + (f" GROUP BY {', '.join(groups)}" if groups else "")
+
+
+def assert_rollups_match(manager):
+    for table, group_by, bucket in QUERIES:
+        rollup_sql = rollup_query(table, COUNT, group_by, bucket=bucket)
+        assert rollup_sql is not None
+        assert rows(manager, rollup_sql) == rows(manager, direct_query(table, group_by, bucket)), \
+            (table, group_by, bucket)
+
+
+@pytest.fixture
+def seeded(manager):
+    # Шаг 37 с на 2000 атак - около 20 часовых корзин
+    assert manager.bulk_create_attacks(generate_attacks(2000, 2))["success"]
+    return manager
+
+
+def test_rollups_match_group_by(seeded):
+    assert_rollups_match(seeded)
+
+
+def test_rollups_follow_updates_and_deletes(seeded):
+    attacks = seeded.get_all_attacks()
+    moved = attacks[0].to_dict()
+    moved.update(created_at="2020-01-01T12:00:00", danger="critical",
+                 targets=[{"target_ip": "192.0.2.1", "protocol": "icmp"}])
+    assert seeded.update_attack(moved["id"], moved)["success"]
+    # Все атаки одного значения удалены: группы с нулевыми счётчиками не возвращаются
+    for attack in attacks:
+        if attack["danger"] == "low" and attack["id"] != moved["id"]:
+            assert seeded.delete_attack(attack["id"])["success"]
+    with seeded.connection() as conn:
+        zero_rows = conn.execute("SELECT COUNT(*) FROM attack_rollups WHERE danger = 'low' AND count = 0").fetchone()[0]
+    assert zero_rows > 0
+    assert_rollups_match(seeded)
+
+    assert seeded.rebuild_rollups()["success"]
+    assert_rollups_match(seeded)
+
+
+def test_rollup_conditions_and_fallbacks(seeded):
+    sql = rollup_query("attack_details", COUNT, ["danger"], where=["attack_type = 'volumetric'"],
+                       having=["COUNT(*) > 100"])
+    expected = rows(seeded, "SELECT COUNT(*) AS count, danger FROM attack_details WHERE attack_type = 'volumetric' "
+                            "GROUP BY danger HAVING COUNT(*) > 100")
+    assert rows(seeded, sql) == expected
+    # Сводка не может ответить - запрос идёт по таблице
+    assert rollup_query("attack_details", COUNT, ["name"]) is None
+    assert rollup_query("attack_details", [{"function": "AVG", "column": "id", "alias": "a"}]) is None
+    assert rollup_query("attack_details", COUNT, where=["name LIKE 'x%'"]) is None
+
+
+def test_trend_matches_group_by(seeded):
+    created = sorted(attack["created_at"] for attack in seeded.get_all_attacks())
+    date_from, date_to = created[500], created[1500]
+    for period, length in (("hour", 13), ("day", 10)):
+        trend = seeded.get_attack_trend(period, "danger", date_from, date_to)
+        expected = rows(seeded, f"""
+            SELECT substr(created_at, 1, {length}) AS bucket, danger, COUNT(*) AS count FROM attack_details
+            WHERE substr(created_at, 1, {length}) BETWEEN substr(?, 1, {length}) AND substr(?, 1, {length})
+            GROUP BY 1, 2""", (date_from, date_to))
+        assert sorted(tuple(row.values()) for row in trend) == expected
+    protocols = seeded.get_attack_trend("day", "protocol")
+    assert sum(row["count"] for row in protocols) == 4000
+    with pytest.raises(ValueError):
+        trend_query("week")
+
+
+@pytest.mark.parametrize("condition", [
+    "protocol = 'udp'", "protocol != 'tcp'", "protocol <> 'tcp'", "protocol < 'tcp'", "protocol <= 'udp'",
+    "protocol >= ''", "protocol LIKE '%'", "protocol IN ('udp', '')", "protocol IS NULL", "protocol IS NOT NULL",
+])
+def test_protocol_conditions_skip_missing_protocol(manager, condition):
+    attack = next(generate_attacks(1, 0))
+    attack["targets"] = [{"target_ip": "192.0.2.1"}, {"target_ip": "192.0.2.2", "protocol": "udp"}]
+    assert manager.create_attack(attack)["success"]
+    with manager.connection() as conn:
+        conn.execute("UPDATE targets SET protocol_id = NULL WHERE target_ip = '192.0.2.1'")
+        conn.commit()
+    sql = rollup_query("target_details", COUNT, where=[condition])
+    assert rows(manager, sql) == rows(manager, f"SELECT COUNT(*) AS count FROM target_details WHERE {condition}")
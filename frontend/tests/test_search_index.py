@@ -0,0 +1,112 @@
+import queue
+import sqlite3
+
+from benchmarks.common import generate_attacks
+from ui.jobs import JobRunner
+
+
+def fts_rows(manager):
+    with manager.connection() as conn:
+        return [tuple(row) for row in conn.execute("SELECT rowid, * FROM attacks_fts ORDER BY rowid")]
+
+
+def test_documents_follow_writes(manager):
+    attack = next(generate_attacks(1))
+    attack["targets"][0]["target_domain"] = "alpha.example.com"
+    assert manager.create_attack(attack)["success"]
+    assert manager.count_search("alpha") == 1
+
+    attack["targets"] = [{"target_ip": "192.0.2.1", "target_domain": "beta.example.com", "port": 80,
+                          "protocol": "tcp", "tags": ["gamma"]}]
+    assert manager.update_attack_with_targets(attack["id"], attack)["success"]
+    assert manager.count_search("alpha") == 0
+    assert manager.count_search("beta") == 1
+    assert manager.count_search("gamma") == 1
+
+    assert manager.delete_attack(attack["id"])["success"]
+    assert manager.count_search("beta") == 0
+    assert fts_rows(manager) == []
+
+
+def test_targets_queue_their_attack_once(manager):
+    attack = next(generate_attacks(1))
+    assert manager.create_attack(attack)["success"]
+    conn = sqlite3.connect(manager.db_path)
+    try:
+        conn.executemany("INSERT INTO targets (attack_id, target_ip, target_domain, port, protocol_id, tags) "
+                         "VALUES (?, '192.0.2.1', ?, 80, 1, '[]')",
+                         [(attack["id"], f"host{i}.delta.example") for i in range(50)])
+        conn.commit()
+        assert conn.execute("SELECT attack_id FROM attack_index_queue").fetchall() == [(attack["id"],)]
+    finally:
+        conn.close()
+
+    with manager.connection() as conn:
+        assert manager.flush_index_queue(conn) == 1
+        conn.commit()
+    assert manager.count_search("host49") == 1
+
+
+def test_rebuild_matches_incremental_documents(manager):
+    assert manager.bulk_create_attacks(generate_attacks(200, 3))["success"]
+    incremental = fts_rows(manager)
+    assert len(incremental) == 200
+    assert manager.rebuild_search_index()["success"]
+    assert fts_rows(manager) == incremental
+
+
+def test_search_pages_are_ranked_and_complete(manager):
+    assert manager.bulk_create_attacks(generate_attacks(50, 2))["success"]
+    name = manager.get_all_attacks()[0]["name"].split()[0]
+    pages = list(manager.iter_search_pages(name, page_size=7))
+    rows = [row for page in pages for row in page]
+    assert all(len(page) == 7 for page in pages[:-1])
+    assert len(rows) == manager.count_search(name) > 7
+    assert [row["score"] for row in rows] == sorted(row["score"] for row in rows)
+
+
+def test_search_pages_stop_when_cancelled(manager):
+    assert manager.bulk_create_attacks(generate_attacks(200, 2))["success"]
+    name = manager.get_all_attacks()[0]["name"].split()[0]
+    # Отмена во время запроса: progress handler прерывает его до первой страницы
+    assert list(manager.iter_search_pages(name, should_stop=lambda: True)) == []
+
+    stopped = []
+    pages = []
+    for page in manager.iter_search_pages(name, page_size=5, should_stop=lambda: bool(stopped)):
+        pages.append(page)
+        stopped.append(True)
+    assert len(pages) == 1
+    with manager.connection() as conn:
+        # Соединение вернулось в пул без progress handler
+        assert conn.execute("SELECT COUNT(*) FROM attacks").fetchone()[0] == 200
+
+
+class QueuedWindow:
+    """Замена окна Tk: колбэки after выполняются в потоке теста"""
+
+    def __init__(self):
+        self.callbacks = queue.Queue()
+
+    def after(self, _delay, callback):
+        self.callbacks.put(callback)
+
+    def run_until(self, condition):
+        while not condition():
+            self.callbacks.get(timeout=10)()
+
+
+def test_job_runner_streams_search_pages(manager):
+    assert manager.bulk_create_attacks(generate_attacks(50, 2))["success"]
+    name = manager.get_all_attacks()[0]["name"].split()[0]
+    window = QueuedWindow()
+    jobs = JobRunner(window, None)
+    pages, done = [], []
+    try:
+        jobs.submit_pages("search", manager.iter_search_pages, name, False, 3,
+                          on_page=pages.append, on_success=done.append)
+        window.run_until(lambda: done)
+    finally:
+        jobs.shutdown()
+    assert done == [sum(len(page) for page in pages)] == [manager.count_search(name)]
+    assert len(pages) > 1
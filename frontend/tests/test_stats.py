@@ -0,0 +1,63 @@
+from benchmarks.common import generate_attacks
+
+
+def recount(manager):
+    """Статистика в формате get_stats, посчитанная заново по таблицам"""
+    stats = {"total": 0, "danger": {}, "frequency": {}, "attack_type": {}, "protocol": {}}
+    with manager.connection() as conn:
+        stats["total"] = conn.execute("SELECT COUNT(*) FROM attacks").fetchone()[0]
+        for column in ("danger", "frequency", "attack_type"):
+            rows = conn.execute(f"SELECT {column}, COUNT(*) FROM attack_details GROUP BY 1")
+            stats[column] = {row[0]: row[1] for row in rows}
+        rows = conn.execute("SELECT COALESCE(protocol, ''), COUNT(*) FROM target_details GROUP BY 1")
+        stats["protocol"] = {row[0]: row[1] for row in rows}
+    return stats
+
+
+def test_stats_match_recount_after_mixed_writes(manager):
+    assert manager.bulk_create_attacks(generate_attacks(40, 2))["success"]
+    assert manager.get_stats() == recount(manager)
+
+    attacks = manager.get_all_attacks()
+    created = next(generate_attacks(1, 3, seed=7))
+    created["danger"] = "critical"
+    assert manager.create_attack(created)["success"]
+
+    updated = attacks[0].to_dict()
+    updated.update(danger="low", frequency="continuous", targets=[{"target_ip": "192.0.2.1", "protocol": "icmp"}])
+    assert manager.update_attack(updated["id"], updated)["success"]
+    for attack in attacks[1:6]:
+        assert manager.delete_attack(attack["id"])["success"]
+
+    # Запись мимо DatabaseManager тоже учитывается триггерами
+    with manager.connection() as conn:
+        conn.execute("UPDATE attacks SET attack_type_id = (SELECT id FROM attack_types WHERE value = 'protocol') "
+                     "WHERE id = ?", (attacks[6]["id"],))
+        conn.execute("INSERT INTO targets (attack_id, target_ip, protocol_id) VALUES (?, '192.0.2.2', NULL)",
+                     (attacks[7]["id"],))
+        conn.commit()
+
+    stats = manager.get_stats()
+    assert stats == recount(manager)
+    assert stats["total"] == 36
+    assert stats["protocol"][""] == 1
+    assert manager.rebuild_stats()["success"]
+    assert manager.get_stats() == stats
+
+
+def test_high_frequency_follows_lookup_ranks(manager):
+    assert manager.add_lookup_value("frequency", "bursty", rank=3)["success"]
+    assert manager.get_values_at_least("frequency", "high") == ["high", "very_high", "continuous"]
+    assert manager.get_values_at_least("frequency", "bursty") == ["bursty", "high", "very_high", "continuous"]
+    assert manager.add_lookup_value("frequency", "relentless")["success"]
+    high_levels = manager.get_values_at_least("frequency", "high")
+    assert high_levels[-1] == "relentless"
+
+    for frequency in ("low", "bursty", "high", "continuous", "relentless"):
+        attack = next(generate_attacks(1, seed=len(frequency)))
+        attack["frequency"] = frequency
+        assert manager.create_attack(attack)["success"]
+    stats = manager.get_stats()
+    # Сводка без фильтров и COUNT с порогом дают одно и то же число
+    assert sum(stats["frequency"].get(level, 0) for level in high_levels) == 3
+    assert manager.count_attacks({"min_frequency": "high"}) == 3
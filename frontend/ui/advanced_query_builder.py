@@ -1,10 +1,12 @@
 import customtkinter as ctk
-from tkinter import ttk
-import threading
+from tkinter import ttk, messagebox
 from api.client import DDOSDatabaseClient
 
 
 class AdvancedQueryBuilder:
+    # Ключ задачи в app.jobs
+    JOB_KEY = "query_builder"
+
     def __init__(self, parent, app):
         self.app = app
         self.setup_ui(parent)
@@ -47,7 +49,7 @@ class AdvancedQueryBuilder:
         ctk.CTkLabel(table_frame, text="Tables:", font=ctk.CTkFont(weight="bold")).pack(anchor="w")
         self.table_listbox = ctk.CTkTextbox(table_frame, height=60)
         self.table_listbox.pack(fill="x", pady=5)
-        self.table_listbox.insert("1.0", "attacks, targets")
+        self.table_listbox.insert("1.0", "attack_details, target_details")
 
         # Выбор столбцов
         columns_frame = ctk.CTkFrame(parent, fg_color="transparent")
@@ -133,6 +135,15 @@ class AdvancedQueryBuilder:
             fg_color=self.app.colors["primary"]
         ).pack(fill="x", pady=2)
 
+        self.cancel_button = ctk.CTkButton(
+            button_frame,
+            text="Cancel Query",
+            command=self.cancel_query,
+            fg_color=self.app.colors["danger"],
+            state="disabled"
+        )
+        self.cancel_button.pack(fill="x", pady=2)
+
     def create_results_section(self, parent):
         """Создание панели результатов"""
         # SQL preview
@@ -214,28 +225,35 @@ class AdvancedQueryBuilder:
             return None
 
     def execute_custom_query(self, sql):
-        """Выполнение пользовательского SQL запроса"""
-
-        def execute_thread():
-            try:
-                conn = self.app.api_client.db.get_connection()
-                cursor = conn.cursor()
-
-                cursor.execute(sql)
-                results = cursor.fetchall()
-                columns = [desc[0] for desc in cursor.description]
-
-                conn.close()
-
-                # Обновляем UI в основном потоке
-                self.app.window.after(0, lambda: self.display_results(columns, results))
-
-            except Exception as e:
-                self.app.window.after(0, lambda: messagebox.showerror("Error", f"Query failed: {e}"))
-
-        thread = threading.Thread(target=execute_thread)
-        thread.daemon = True
-        thread.start()
+        """Выполнение пользовательского SQL запроса в фоне (с таймаутом и лимитом строк)"""
+        self.sql_preview.delete("1.0", "end")
+        self.sql_preview.insert("1.0", sql)
+        self.app.jobs.submit_query(self.JOB_KEY, sql,
+                                   on_success=self.on_query_done,
+                                   on_error=self.on_query_failed,
+                                   on_cancel=self.on_query_cancelled,
+                                   on_state=self.set_running)
+
+    def cancel_query(self):
+        """Отмена выполняющегося запроса"""
+        self.app.jobs.cancel(self.JOB_KEY)
+
+    def set_running(self, running):
+        """Состояние выполнения запроса"""
+        self.cancel_button.configure(state="normal" if running else "disabled")
+        if running:
+            self.results_count.configure(text="Running...")
+
+    def on_query_done(self, result):
+        self.display_results(result.columns, result.rows)
+        self.results_count.configure(text=result.summary())
+
+    def on_query_failed(self, error):
+        self.results_count.configure(text="Query failed")
+        messagebox.showerror("Error", f"Query failed: {error}")
+
+    def on_query_cancelled(self, job):
+        self.results_count.configure(text=f"Cancelled after {job.elapsed() * 1000:.0f} ms")
 
     def display_results(self, columns, results):
         """Отображение результатов запроса"""
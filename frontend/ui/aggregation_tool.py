@@ -1,8 +1,26 @@
+import re
+import time
+
 import customtkinter as ctk
 from tkinter import ttk, messagebox
 
+from api.migrations import DETAIL_VIEWS
+from api.rollups import ROLLUP_SOURCES, TIME_BUCKETS, bucket_expression, rollup_query
+
 
 class AggregationTool:
+    # Ключ задачи в app.jobs
+    JOB_KEY = "aggregation"
+    # Колонки, которые колоночный снимок хранит словарно закодированными -> аргумент фильтра
+    SNAPSHOT_COLUMNS = {
+        "attack_details": {"danger": "danger_levels", "frequency": "frequencies", "attack_type": "attack_types"},
+        "target_details": {"protocol": "protocols"},
+    }
+    # Представление -> таблица снимка
+    SNAPSHOT_TABLES = {view: table for table, view in DETAIL_VIEWS.items()}
+    # Условие WHERE, проверяемое снимком: "<колонка> = <значение>" или "<колонка> IN (<значения>)"
+    SNAPSHOT_CONDITION = re.compile(r"^\s*(\w+)\s*(?:=\s*(.+?)|\s+IN\s*\((.*)\))\s*$", re.IGNORECASE)
+
     def __init__(self, parent, app):
         self.app = app
         self.parent = parent
@@ -45,8 +63,8 @@ class AggregationTool:
     def load_initial_data(self):
         try:
             if self.table_combo:
-                self.table_combo.set("attacks")
-                self.on_table_selected("attacks")
+                self.table_combo.set("attack_details")
+                self.on_table_selected("attack_details")
         except Exception as e:
             print(f"Error loading initial data: {e}")
     
@@ -324,6 +342,12 @@ class AggregationTool:
         ctk.CTkButton(controls_frame, text="Add Grouping",
                       command=self.add_group_column).pack(side="left", padx=(10, 0))
 
+        # Группировка по периоду created_at (у целей - их атаки)
+        ctk.CTkLabel(controls_frame, text="Time bucket:").pack(side="left", padx=(20, 0))
+        self.bucket_combo = ctk.CTkComboBox(controls_frame, values=["none"] + list(TIME_BUCKETS), width=100)
+        self.bucket_combo.pack(side="left", padx=(10, 5))
+        self.bucket_combo.set("none")
+
         self.group_list_frame = ctk.CTkScrollableFrame(group_frame, height=80)
         self.group_list_frame.pack(fill="x", padx=15, pady=(0, 10))
 
@@ -377,12 +401,38 @@ class AggregationTool:
             width=120
         ).pack(side="left", padx=5)
 
+        self.cancel_button = ctk.CTkButton(
+            button_frame,
+            text="⏹ Cancel",
+            command=self.cancel_query,
+            fg_color=self.app.colors["warning"],
+            width=100,
+            state="disabled"
+        )
+        self.cancel_button.pack(side="left", padx=5)
+
+        # COUNT по измерениям и периодам считается по сводкам attack_rollups/target_rollups
+        self.use_rollups_var = ctk.BooleanVar(value=True)
+        ctk.CTkCheckBox(button_frame, text="Use rollups", variable=self.use_rollups_var).pack(side="left", padx=10)
+
+        # Такие же запросы без обращения к БД - векторно по колоночному снимку (нужен NumPy)
+        snapshot_available = self.app.api_client.analytics_available()
+        self.use_snapshot_var = ctk.BooleanVar(value=snapshot_available)
+        ctk.CTkCheckBox(button_frame, text="In-memory engine", variable=self.use_snapshot_var,
+                        state="normal" if snapshot_available else "disabled").pack(side="left", padx=10)
+
     def create_results_section(self, parent):
         results_frame = ctk.CTkFrame(parent)
         results_frame.pack(fill="both", expand=True, pady=10)
 
-        ctk.CTkLabel(results_frame, text="Aggregation Results",
-                     font=ctk.CTkFont(weight="bold")).pack(anchor="w", padx=15, pady=10)
+        header = ctk.CTkFrame(results_frame, fg_color="transparent")
+        header.pack(fill="x", padx=15, pady=10)
+
+        ctk.CTkLabel(header, text="Aggregation Results",
+                     font=ctk.CTkFont(weight="bold")).pack(side="left")
+
+        self.status_label = ctk.CTkLabel(header, text="", text_color=self.app.colors["text_muted"])
+        self.status_label.pack(side="right")
 
         # Create a frame for treeview with scrollbars
         tree_frame = ctk.CTkFrame(results_frame)
@@ -402,7 +452,7 @@ class AggregationTool:
         try:
             return self.app.api_client.get_all_tables()
         except:
-            return ["attacks", "targets"]
+            return ["attack_details", "target_details", "attacks", "targets"]
 
     def on_table_selected(self, choice):
         try:
@@ -782,6 +832,10 @@ class AggregationTool:
         for col in self.group_by_columns:
             select_parts.append(col)
 
+        bucket = self.get_time_bucket()
+        if bucket:
+            select_parts.append(f"{bucket_expression(table, bucket)} AS {bucket}")
+
         select_clause = ", ".join(select_parts) if select_parts else "*"
 
         # WHERE clause - ДОБАВЛЕНО
@@ -790,8 +844,9 @@ class AggregationTool:
             where_clause = f"WHERE {' AND '.join(self.where_conditions)}"
 
         group_clause = ""
-        if self.group_by_columns:
-            group_clause = f"GROUP BY {', '.join(self.group_by_columns)}"
+        group_parts = self.group_by_columns + ([bucket] if bucket else [])
+        if group_parts:
+            group_clause = f"GROUP BY {', '.join(group_parts)}"
 
         having_clause = ""
         if self.having_conditions:
@@ -806,25 +861,132 @@ class AggregationTool:
             sql += f" {group_clause}"
         if having_clause:
             sql += f" {having_clause}"
+        if bucket:
+            sql += f" ORDER BY {bucket}"
 
         return sql
 
+    def get_time_bucket(self):
+        bucket = self.bucket_combo.get()
+        return bucket if bucket in TIME_BUCKETS else None
+
+    def build_rollup_query(self):
+        """Тот же запрос по сводкам или None, если сводки его не покрывают"""
+        if not self.use_rollups_var.get() or self.case_expressions or self.null_functions:
+            return None
+        return rollup_query(self.table_combo.get(), self.aggregate_functions, self.group_by_columns,
+                            self.where_conditions, self.having_conditions, self.get_time_bucket())
+
+    def parse_snapshot_condition(self, table, condition):
+        """(аргумент фильтра снимка, значения) для условия WHERE или None"""
+        match = self.SNAPSHOT_CONDITION.match(condition)
+        if match is None or match.group(1).lower() not in self.SNAPSHOT_COLUMNS[table]:
+            return None
+        raw_values = [match.group(2)] if match.group(2) is not None else match.group(3).split(",")
+        values = [value.strip().strip("'\"") for value in raw_values]
+        if not all(values):
+            return None
+        return self.SNAPSHOT_COLUMNS[table][match.group(1).lower()], values
+
+    def build_snapshot_query(self):
+        """Параметры group_by колоночного снимка для запроса или None, если снимок его не покрывает"""
+        table = self.table_combo.get()
+        if (not self.use_snapshot_var.get() or table not in self.SNAPSHOT_COLUMNS or not self.aggregate_functions
+                or self.case_expressions or self.null_functions or self.having_conditions):
+            return None
+        countable = ROLLUP_SOURCES[table][2]
+        if any(agg["function"].upper() != "COUNT" or agg["column"].lower() not in countable
+               for agg in self.aggregate_functions):
+            return None
+        if any(column.lower() not in self.SNAPSHOT_COLUMNS[table] for column in self.group_by_columns):
+            return None
+
+        filters = {}
+        for condition in self.where_conditions:
+            parsed = self.parse_snapshot_condition(table, condition)
+            if parsed is None or parsed[0] in filters:
+                return None
+            filters[parsed[0]] = parsed[1]
+
+        return {"table": self.SNAPSHOT_TABLES[table], "dimensions": [column.lower() for column in self.group_by_columns],
+                "bucket": self.get_time_bucket(), "filters": filters,
+                "aliases": [agg["alias"] for agg in self.aggregate_functions],
+                "columns": list(self.group_by_columns)}
+
+    def run_snapshot_query(self, spec):
+        """Запрос по снимку (в потоке задачи): строки в формате SQL-запроса и время в мс"""
+        started = time.perf_counter()
+        snapshot = self.app.api_client.get_analytics_snapshot()
+        groups = snapshot.group_by(spec["table"], spec["dimensions"], spec["bucket"], **spec["filters"])
+        rows = []
+        for group in groups:
+            row = {alias: group["count"] for alias in spec["aliases"]}
+            row.update((column, group[dimension]) for column, dimension in zip(spec["columns"], spec["dimensions"]))
+            if spec["bucket"]:
+                row[spec["bucket"]] = group["bucket"]
+            rows.append(row)
+        return rows, (time.perf_counter() - started) * 1000
+
+    def build_query(self):
+        """(SQL для выполнения, из сводок ли он)"""
+        rollup_sql = self.build_rollup_query()
+        if rollup_sql:
+            return rollup_sql, True
+        return self.build_sql_query(), False
+
     def execute_aggregation(self):
-        sql = self.build_sql_query()
+        if self.get_time_bucket() and self.table_combo.get() not in ROLLUP_SOURCES:
+            messagebox.showwarning("Warning", "Time buckets are available for attacks and targets only")
+            return
+
+        spec = self.build_snapshot_query()
+        if spec is not None:
+            self.app.jobs.submit(self.JOB_KEY, self.run_snapshot_query, spec,
+                                 on_success=self.on_snapshot_done,
+                                 on_error=self.on_query_failed,
+                                 on_cancel=self.on_query_cancelled,
+                                 on_state=self.set_running)
+            return
+
+        sql, from_rollups = self.build_query()
 
         if not sql:
             messagebox.showwarning("Warning", "Please add at least one function or expression")
             return
 
-        try:
-            results = self.app.api_client.execute_custom_query(sql)
-            self.display_results(results)
+        # Повторный клик с тем же запросом не запускает его второй раз
+        self.app.jobs.submit_query(self.JOB_KEY, sql,
+                                   on_success=lambda result: self.on_query_done(result, from_rollups),
+                                   on_error=self.on_query_failed,
+                                   on_cancel=self.on_query_cancelled,
+                                   on_state=self.set_running)
+
+    def cancel_query(self):
+        self.app.jobs.cancel(self.JOB_KEY)
+
+    def set_running(self, running):
+        self.cancel_button.configure(state="normal" if running else "disabled")
+        if running:
+            self.status_label.configure(text="Running...")
+
+    def on_query_done(self, result, from_rollups=False):
+        self.status_label.configure(text=result.summary() + (", from rollups" if from_rollups else ""))
+        self.display_results(result.as_dicts())
+
+    def on_snapshot_done(self, result):
+        rows, elapsed_ms = result
+        self.status_label.configure(text=f"{len(rows)} rows in {elapsed_ms:.0f} ms, in-memory")
+        self.display_results(rows)
+
+    def on_query_failed(self, error):
+        self.status_label.configure(text="Aggregation failed")
+        messagebox.showerror("Error", f"Aggregation failed: {error}")
+
+    def on_query_cancelled(self, job):
+        self.status_label.configure(text=f"Cancelled after {job.elapsed() * 1000:.0f} ms")
 
-        except Exception as e:
-            messagebox.showerror("Error", f"Aggregation failed: {e}")
-            
     def show_sql(self):
-        sql = self.build_sql_query()
+        sql, _ = self.build_query()
 
         if not sql:
             messagebox.showwarning("Warning", "No query to show")
@@ -849,6 +1011,7 @@ class AggregationTool:
         self.case_expressions = []
         self.null_functions = []
         self.where_conditions = []
+        self.bucket_combo.set("none")
 
         if hasattr(self, 'current_case_conditions'):
             self.current_case_conditions = []
@@ -287,16 +287,15 @@ class AlterTableManager:
     def get_table_columns(self, table_name):
         """Получение списка столбцов таблицы"""
         try:
-            conn = self.app.api_client.db.get_connection()
-            cursor = conn.cursor()
+            with self.app.api_client.db.connection() as conn:
+                cursor = conn.cursor()
 
-            cursor.execute("""
-                SELECT name FROM pragma_table_info(?)
-                ORDER BY cid
-            """, (table_name,))
+                cursor.execute("""
+                    SELECT name FROM pragma_table_info(?)
+                    ORDER BY cid
+                """, (table_name,))
 
-            columns = [row[0] for row in cursor.fetchall()]
-            conn.close()
+                columns = [row[0] for row in cursor.fetchall()]
             return columns
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load columns: {e}")
@@ -415,13 +414,14 @@ class AlterTableManager:
 
         def execute_thread():
             try:
-                conn = self.app.api_client.db.get_connection()
-                cursor = conn.cursor()
-
-                # Выполняем SQL
-                cursor.execute(sql)
-                conn.commit()
-                conn.close()
+                with self.app.api_client.db.connection() as conn:
+                    cursor = conn.cursor()
+
+                    # Выполняем SQL
+                    cursor.execute(sql)
+                    conn.commit()
+                # Изменение схемы: кэшированные результаты запросов устарели
+                self.app.api_client.db.invalidate_cache_for(sql)
 
                 self.app.window.after(0, lambda: messagebox.showinfo("Success", success_message))
 
@@ -1,7 +1,15 @@
 import customtkinter as ctk
+from datetime import datetime, timedelta
 
 
 class Dashboard:
+    # Ключ фоновой задачи обзора в app.jobs
+    OVERVIEW_JOB_KEY = "dashboard_overview"
+    # Период обзора активности, дней (включая сегодня)
+    OVERVIEW_DAYS = 7
+    # Ширина самой длинной полосы дневной гистограммы, символов
+    OVERVIEW_BAR_WIDTH = 30
+
     def __init__(self, parent, app):
         self.app = app
         self.setup_ui(parent)
@@ -22,6 +30,10 @@ class Dashboard:
                      font=ctk.CTkFont(size=16),
                      text_color=self.app.colors["text_muted"]).pack(pady=(10, 0))
 
+        # Обзор активности - векторно по колоночному снимку (только при наличии NumPy)
+        if self.app.api_client.analytics_available():
+            self.create_overview_section(dashboard_frame)
+
         # Карточки с действиями
         actions_frame = ctk.CTkFrame(dashboard_frame, fg_color="transparent")
         actions_frame.pack(fill="both", expand=True)
@@ -45,6 +57,38 @@ class Dashboard:
                                 "Browse and manage all registered attacks",
                                 self.app.show_attacks_list)
 
+    def create_overview_section(self, parent):
+        """Карточка с активностью за последние дни, считается в фоне"""
+        overview = ctk.CTkFrame(parent, fg_color=self.app.colors["card_bg"], corner_radius=12)
+        overview.pack(fill="x", pady=(0, 20))
+
+        ctk.CTkLabel(overview, text=f"Activity, last {self.OVERVIEW_DAYS} days",
+                     font=ctk.CTkFont(size=16, weight="bold")).pack(anchor="w", padx=20, pady=(15, 5))
+        self.overview_label = ctk.CTkLabel(overview, text="Loading...", justify="left",
+                                           font=ctk.CTkFont(family="Courier", size=12))
+        self.overview_label.pack(anchor="w", padx=20, pady=(0, 15))
+
+        self.app.jobs.submit(self.OVERVIEW_JOB_KEY, self.load_overview,
+                             on_success=self.show_overview,
+                             on_error=lambda e: self.overview_label.configure(text=f"Overview failed: {e}"))
+
+    def load_overview(self):
+        """Атаки по дням и по danger за OVERVIEW_DAYS (в потоке задачи)"""
+        snapshot = self.app.api_client.get_analytics_snapshot()
+        date_from = (datetime.now() - timedelta(days=self.OVERVIEW_DAYS - 1)).date()
+        return (snapshot.histogram("day", date_from=date_from),
+                snapshot.group_by("attacks", ["danger"], date_from=date_from))
+
+    def show_overview(self, result):
+        days, danger = result
+        total = sum(row["count"] for row in danger)
+        lines = [f"{total} attacks: " + ", ".join(f"{row['danger']} {row['count']}" for row in danger)]
+        peak = max((row["count"] for row in days), default=0)
+        for row in days:
+            bar = "█" * max(1, round(row["count"] * self.OVERVIEW_BAR_WIDTH / peak))
+            lines.append(f"{row['bucket']}  {bar} {row['count']}")
+        self.overview_label.configure(text="\n".join(lines))
+
     def create_action_card(self, parent, row, col, emoji, title, description, command):
         """Создание карточки действия"""
         card = ctk.CTkFrame(parent, fg_color=self.app.colors["card_bg"],
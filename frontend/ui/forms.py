@@ -1,18 +1,8 @@
 import customtkinter as ctk
 import threading
-from dataclasses import dataclass, field
-from typing import List
 import re
-
-
-# Временный класс Target прямо в forms.py
-@dataclass
-class Target:
-    target_ip: str = ""
-    target_domain: str = ""
-    port: int = 80
-    protocol: str = "tcp"
-    tags: List[str] = field(default_factory=list)
+from models.attack import Target
+from ui.modal_windows import LookupValueModal
 
 
 class AttackForm:
@@ -52,17 +42,17 @@ class AttackForm:
     def load_additional_columns(self):
         """Загрузка дополнительных колонок из структуры таблицы"""
         try:
-            conn = self.app.api_client.db.get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute("PRAGMA table_info(attacks)")
-            columns_info = cursor.fetchall()
-            conn.close()
+            with self.app.api_client.db.connection() as conn:
+                cursor = conn.cursor()
+
+                cursor.execute("PRAGMA table_info(attacks)")
+                columns_info = cursor.fetchall()
             
             base_columns_set = {
                 'id', 'name', 'frequency', 'danger', 'attack_type', 
                 'source_ips', 'affected_ports', 'targets', 'created_at',
-                'mitigation_strategies', "updated_at"
+                'mitigation_strategies', "updated_at",
+                'frequency_id', 'danger_id', 'attack_type_id'
             }
             
             # Ищем дополнительные колонки
@@ -189,6 +179,23 @@ class AttackForm:
         self.attack_type_combo.grid(row=1, column=3, padx=5, pady=8, sticky="w")
         self.attack_type_combo.set("amplification")  # Значение по умолчанию из разрешенных
 
+        # Новое значение можно ввести в поле (добавится при сохранении) или
+        # завести заранее с рангом
+        ctk.CTkButton(grid, text="➕ New Value", width=140, command=self.open_lookup_value_dialog,
+                      fg_color=self.app.colors["secondary"]).grid(row=2, column=3, padx=5, pady=8, sticky="w")
+
+    def open_lookup_value_dialog(self):
+        """Окно добавления значения в справочник категории"""
+        LookupValueModal(self.app.window, self.app, on_added=lambda kind, value: self.refresh_category_combos())
+
+    def refresh_category_combos(self):
+        """Списки значений категорий после пополнения справочников"""
+        self.frequency_combo.configure(values=self.app.frequency_levels)
+        self.danger_combo.configure(values=self.app.danger_levels)
+        self.attack_type_combo.configure(values=self.app.attack_types)
+        for target_data in self.target_fields:
+            target_data['protocol'].configure(values=self.app.protocols)
+
     def create_source_section(self, parent):
         """Секция источников"""
         card = self.create_card(parent, "🌐 Source Configuration")
@@ -573,7 +580,7 @@ class AttackForm:
                     "source_ips": source_ips,
                     "affected_ports": ports,
                     "mitigation_strategies": mitigation_strategies,
-                    "targets": [target.__dict__ for target in targets]
+                    "targets": [target.to_dict() for target in targets]
                 }
                 
                 # Добавляем данные из дополнительных полей
@@ -581,6 +588,9 @@ class AttackForm:
 
                 # Отправка на сервер
                 result = self.app.api_client.create_attack(attack_data)
+                if not result["success"]:
+                    self.app.window.after(0, lambda msg=result["error"]: self.app.show_error(msg))
+                    return
                 self.app.window.after(0, lambda attack_name=name: self.on_attack_created(attack_name))
 
             except ValueError as e:
@@ -597,8 +607,11 @@ class AttackForm:
     def on_attack_created(self, name):
         """Обработка успешного создания"""
         self.app.show_success(f"Attack '{name}' created successfully!")
+        # Введённые новые значения категорий уже в справочниках
+        self.app.refresh_categories()
+        self.refresh_category_combos()
         self.clear_form()
-        self.app.refresh_attacks()
+        self.app.update_stats()
 
     def clear_form(self):
         """Очистка формы"""
@@ -20,10 +20,17 @@ class Header:
                                         text_color=self.app.colors["text_light"])
         self.title_label.pack(side="left")
 
+        self.stats_label = ctk.CTkLabel(header_content, text="",
+                                        font=ctk.CTkFont(size=12),
+                                        text_color=self.app.colors["text_muted"])
+        self.stats_label.pack(side="right")
+
     def set_title(self, title):
         """Установка заголовка"""
         self.title_label.configure(text=title)
 
     def update_stats(self):
-        """Обновление статистики (упрощено)"""
-        pass
\ No newline at end of file
+        """Обновление статистики"""
+        stats = self.app.api_client.get_stats()
+        critical = stats["danger"].get("critical", 0)
+        self.stats_label.configure(text=f"📊 {stats['total']} attacks | 🔴 {critical} critical")
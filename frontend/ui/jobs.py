@@ -0,0 +1,186 @@
+"""Фоновые задачи инструментов: работа в потоках, результат - в главном потоке Tk.
+
+Инструмент отправляет задачу под своим ключом (например, "aggregation").
+На ключ приходится не больше одной задачи:
+- повторная отправка с той же сигнатурой (тот же SQL и параметры), пока
+  задача выполняется, не запускает вторую - повторные клики сливаются;
+- отправка с другой сигнатурой отменяет прежнюю задачу, её результат
+  отбрасывается.
+Колбэки on_success/on_error/on_cancel/on_state (и on_page у
+submit_pages) вызываются только в главном потоке (через window.after).
+"""
+import threading
+import time
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from api.query_executor import QueryCancelledError
+
+
+class Job:
+    """Задача под ключом: future и функции отмены"""
+
+    def __init__(self, key: Hashable, signature: Any, future: Future,
+                 cancel_hooks: Optional[List[Callable[[], None]]] = None):
+        self.key = key
+        self.signature = signature
+        self.future = future
+        self.started = time.perf_counter()
+        self.cancelled = False
+        self._cancel_hooks = cancel_hooks or []
+
+    def cancel(self):
+        self.cancelled = True
+        self.future.cancel()
+        for hook in self._cancel_hooks:
+            hook()
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+
+class JobRunner:
+    """Пул потоков для задач UI с одной задачей на ключ"""
+
+    def __init__(self, window, api_client, workers: int = 4):
+        self.window = window
+        self.api_client = api_client
+        self._workers = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ui-job")
+        self._jobs: Dict[Hashable, Job] = {}
+        self._callbacks: Dict[Job, Dict[str, Optional[Callable]]] = {}
+
+    def submit(self, key: Hashable, func: Callable, *args, signature: Any = None,
+               on_success: Optional[Callable[[Any], None]] = None,
+               on_error: Optional[Callable[[Exception], None]] = None,
+               on_cancel: Optional[Callable[[Job], None]] = None,
+               on_state: Optional[Callable[[bool], None]] = None) -> Job:
+        """Выполнение func(*args) в пуле потоков UI.
+
+        signature - то, по чему повторные отправки считаются одинаковыми
+        (по умолчанию args). on_state(True/False) сообщает о начале и
+        конце работы по ключу.
+        """
+        signature = args if signature is None else signature
+        running = self._coalesce(key, signature)
+        if running is not None:
+            return running
+        return self._start(Job(key, signature, self._workers.submit(func, *args)),
+                           on_success, on_error, on_cancel, on_state)
+
+    def submit_query(self, key: Hashable, sql: str, params: tuple = (), signature: Any = None,
+                     on_success: Optional[Callable[[Any], None]] = None,
+                     on_error: Optional[Callable[[Exception], None]] = None,
+                     on_cancel: Optional[Callable[[Job], None]] = None,
+                     on_state: Optional[Callable[[bool], None]] = None, **query_options) -> Job:
+        """SQL через исполнитель запросов клиента: on_success получает QueryResult.
+
+        Отмена задачи прерывает запрос в SQLite (QueryHandle.cancel);
+        query_options (timeout, max_rows) передаются в submit_query.
+        signature по умолчанию - SQL и параметры.
+        """
+        signature = (sql, tuple(params)) if signature is None else signature
+        running = self._coalesce(key, signature)
+        if running is not None:
+            return running
+        handle = self.api_client.submit_query(sql, tuple(params), **query_options)
+        return self._start(Job(key, signature, handle.future, [handle.cancel]),
+                           on_success, on_error, on_cancel, on_state)
+
+    def submit_pages(self, key: Hashable, func: Callable, *args, signature: Any = None,
+                     on_page: Optional[Callable[[Any], None]] = None,
+                     on_success: Optional[Callable[[int], None]] = None,
+                     on_error: Optional[Callable[[Exception], None]] = None,
+                     on_cancel: Optional[Callable[[Job], None]] = None,
+                     on_state: Optional[Callable[[bool], None]] = None) -> Job:
+        """Потоковая задача: func(*args, should_stop) - итератор страниц (списков строк).
+
+        Каждая страница передаётся on_page, как только прочитана; on_success
+        получает общее число строк. Отмена взводит should_stop - func должна
+        проверять его (например, в progress handler SQLite) и закончить обход;
+        страницы отменённой или заменённой задачи отбрасываются.
+        """
+        signature = args if signature is None else signature
+        running = self._coalesce(key, signature)
+        if running is not None:
+            return running
+        stop = threading.Event()
+
+        def run() -> int:
+            count = 0
+            for page in func(*args, stop.is_set):
+                if stop.is_set():
+                    break
+                self.window.after(0, lambda page=page: deliver(page))
+                count += len(page)
+            if stop.is_set():
+                raise QueryCancelledError("Job cancelled")
+            return count
+
+        def deliver(page):
+            if self._jobs.get(key) is job and not job.cancelled and on_page is not None:
+                on_page(page)
+
+        job = Job(key, signature, self._workers.submit(run), [stop.set])
+        return self._start(job, on_success, on_error, on_cancel, on_state)
+
+    def cancel(self, key: Hashable):
+        """Отмена задачи по ключу (on_cancel вызовется, когда она остановится)"""
+        job = self._jobs.get(key)
+        if job is not None:
+            job.cancel()
+
+    def cancel_all(self):
+        """Отмена всех задач без колбэков - для закрытия инструмента, чьих виджетов уже нет"""
+        jobs = list(self._jobs.values())
+        self._jobs.clear()
+        for job in jobs:
+            job.cancel()
+
+    def is_running(self, key: Hashable) -> bool:
+        return key in self._jobs
+
+    def shutdown(self):
+        self.cancel_all()
+        self._workers.shutdown(wait=False)
+
+    def _coalesce(self, key: Hashable, signature: Any) -> Optional[Job]:
+        """Выполняющаяся задача с той же сигнатурой; задача с другой сигнатурой отменяется"""
+        job = self._jobs.get(key)
+        if job is None:
+            return None
+        if job.signature == signature and not job.cancelled:
+            return job
+        job.cancel()
+        return None
+
+    def _start(self, job: Job, on_success, on_error, on_cancel, on_state) -> Job:
+        replaced = self._jobs.get(job.key)
+        self._jobs[job.key] = job
+        self._callbacks[job] = {"success": on_success, "error": on_error,
+                                "cancel": on_cancel, "state": on_state}
+        if replaced is None and on_state is not None:
+            on_state(True)
+        job.future.add_done_callback(lambda _: self.window.after(0, lambda: self._deliver(job)))
+        return job
+
+    def _deliver(self, job: Job):
+        """Итог задачи в главном потоке; итоги заменённых задач отбрасываются"""
+        callbacks = self._callbacks.pop(job)
+        if self._jobs.get(job.key) is not job:
+            return
+        del self._jobs[job.key]
+        if callbacks["state"] is not None:
+            callbacks["state"](False)
+
+        try:
+            result = job.future.result()
+        except (CancelledError, QueryCancelledError):
+            if callbacks["cancel"] is not None:
+                callbacks["cancel"](job)
+            return
+        except Exception as e:
+            if callbacks["error"] is not None:
+                callbacks["error"](e)
+            return
+        if callbacks["success"] is not None:
+            callbacks["success"](result)
@@ -1,5 +1,6 @@
 import customtkinter as ctk
 from tkinter import ttk
+from collections.abc import Mapping
 from typing import List, Dict, Any, Optional
 import threading
 from tkinter import messagebox
@@ -621,7 +622,7 @@ class DataViewModal(ModalWindow):
 
         # Заполняем данными
         for attack in attacks:
-            if isinstance(attack, dict):
+            if isinstance(attack, Mapping):
                 sources = attack.get("source_ips", [])
                 sources_preview = f"{len(sources)} IP" if len(sources) <= 3 else f"{len(sources)} IP"
 
@@ -658,4 +659,61 @@ class DataViewModal(ModalWindow):
 
         except Exception as e:
             self.app.logger.log_error(f"Ошибка применения фильтров: {e}")
-            messagebox.showerror("Ошибка", f"Ошибка применения фильтров: {e}")
\ No newline at end of file
+            messagebox.showerror("Ошибка", f"Ошибка применения фильтров: {e}")
+
+class LookupValueModal(ModalWindow):
+    """Модальное окно добавления значения в справочник категории"""
+
+    # Подпись -> категория (api add_lookup_value)
+    KINDS = {"Частота": "frequency", "Опасность": "danger", "Тип атаки": "attack_type", "Протокол": "protocol"}
+
+    def __init__(self, parent, app, on_added=None, kind: str = "danger"):
+        super().__init__(parent, "Новое значение категории", 420, 330)
+        self.app = app
+        self.on_added = on_added
+        self.setup_ui(kind)
+
+    def setup_ui(self, kind):
+        """Настройка интерфейса"""
+        ctk.CTkLabel(
+            self.main_frame,
+            text="Добавить значение в справочник",
+            font=ctk.CTkFont(size=16, weight="bold")
+        ).pack(pady=(0, 15))
+
+        labels = {value: label for label, value in self.KINDS.items()}
+        ctk.CTkLabel(self.main_frame, text="Категория:").pack(anchor="w", padx=10)
+        self.kind_combo = ctk.CTkComboBox(self.main_frame, values=list(self.KINDS), state="readonly", width=250)
+        self.kind_combo.pack(anchor="w", padx=10, pady=(0, 10))
+        self.kind_combo.set(labels.get(kind, "Опасность"))
+
+        ctk.CTkLabel(self.main_frame, text="Значение:").pack(anchor="w", padx=10)
+        self.value_entry = ctk.CTkEntry(self.main_frame, width=250, placeholder_text="например, severe")
+        self.value_entry.pack(anchor="w", padx=10, pady=(0, 10))
+
+        ctk.CTkLabel(self.main_frame, text="Ранг (пусто - последним):").pack(anchor="w", padx=10)
+        self.rank_entry = ctk.CTkEntry(self.main_frame, width=100, placeholder_text="1, 2, ...")
+        self.rank_entry.pack(anchor="w", padx=10, pady=(0, 15))
+
+        buttons = ctk.CTkFrame(self.main_frame, fg_color="transparent")
+        buttons.pack(fill="x", padx=10)
+        ctk.CTkButton(buttons, text="Добавить", command=self.add_value, width=120).pack(side="left")
+        ctk.CTkButton(buttons, text="Отмена", command=self.on_close, width=120,
+                      fg_color="gray").pack(side="right")
+
+    def add_value(self):
+        """Добавление значения через API"""
+        rank = self.rank_entry.get().strip()
+        if rank and not rank.isdigit():
+            messagebox.showerror("Ошибка", "Ранг должен быть положительным целым числом")
+            return
+
+        kind = self.KINDS[self.kind_combo.get()]
+        result = self.app.add_lookup_value(kind, self.value_entry.get(), int(rank) if rank else None)
+        if not result["success"]:
+            messagebox.showerror("Ошибка", result["error"])
+            return
+
+        self.on_close()
+        if self.on_added:
+            self.on_added(kind, result["data"]["value"])
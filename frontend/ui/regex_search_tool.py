@@ -1,8 +1,13 @@
 import customtkinter as ctk
 from tkinter import messagebox, ttk
 import re
+from api.sql_functions import compile_pattern
+from api.trigram import describe_prefilter, regex_query
 
 class RegexSearchTool:
+    # Ключ задачи в app.jobs
+    JOB_KEY = "regex_search"
+
     def __init__(self, parent, app):
         self.app = app
         self.parent = parent
@@ -16,7 +21,7 @@ class RegexSearchTool:
         # Заголовок
         title_label = ctk.CTkLabel(
             main_frame,
-            text="🔍 Advanced Text Search with SIMILAR TO",
+            text="🔍 Advanced Text Search with REGEXP",
             font=ctk.CTkFont(size=20, weight="bold")
         )
         title_label.pack(pady=(0, 20))
@@ -51,7 +56,7 @@ class RegexSearchTool:
                                          width=200,
                                          command=self.on_table_selected)
         self.table_combo.pack(side="left", padx=(10, 20))
-        self.table_combo.set("attacks")
+        self.table_combo.set("attack_details")
 
         # Выбор столбца
         ctk.CTkLabel(table_frame, text="Column:").pack(side="left")
@@ -59,7 +64,7 @@ class RegexSearchTool:
         self.column_combo.pack(side="left", padx=(10, 0))
 
         # Загружаем столбцы для выбранной таблицы
-        self.on_table_selected("attacks")
+        self.on_table_selected("attack_details")
 
     def create_regex_patterns(self, parent):
         """Паттерны регулярных выражений"""
@@ -75,15 +80,20 @@ class RegexSearchTool:
         
         ctk.CTkLabel(pattern_main_frame, text="Pattern:").pack(side="left")
         self.pattern_entry = ctk.CTkEntry(pattern_main_frame, 
-                                        placeholder_text="Enter SIMILAR TO pattern...",
+                                        placeholder_text="Enter regular expression...",
                                         width=300)
         self.pattern_entry.pack(side="left", padx=(10, 20), fill="x", expand=True)
 
         # Отрицание
         self.negation_var = ctk.BooleanVar()
-        ctk.CTkCheckBox(pattern_main_frame, text="NOT SIMILAR TO", 
+        ctk.CTkCheckBox(pattern_main_frame, text="NOT REGEXP", 
                        variable=self.negation_var).pack(side="left")
 
+        # Без учёта регистра
+        self.ignore_case_var = ctk.BooleanVar()
+        ctk.CTkCheckBox(pattern_main_frame, text="Ignore case", 
+                       variable=self.ignore_case_var).pack(side="left", padx=(10, 0))
+
         # Предопределенные паттерны
         self.create_predefined_patterns(patterns_frame)
 
@@ -98,14 +108,14 @@ class RegexSearchTool:
         patterns_subframe.pack(fill="x", pady=5)
 
         patterns = [
-            ("Starts with letter", "[A-Za-z]%"),
-            ("Ends with digit", "%[0-9]"),
-            ("Contains numbers", "%[0-9]%"),
-            ("Exactly 5 characters", "_____"),
-            ("IP address pattern", "[0-9]{1,3}.[0-9]{1,3}.[0-9]{1,3}.[0-9]{1,3}"),
-            ("Email pattern", "%@%.%"),
-            ("Only letters", "[A-Za-z]*"),
-            ("Mixed letters and numbers", "%[A-Za-z]%[0-9]%")
+            ("Starts with letter", "^[A-Za-z]"),
+            ("Ends with digit", "[0-9]$"),
+            ("Contains numbers", "[0-9]"),
+            ("Exactly 5 characters", "^.{5}$"),
+            ("IP address pattern", r"\b[0-9]{1,3}(\.[0-9]{1,3}){3}\b"),
+            ("Email pattern", r"[^@\s]+@[^@\s]+\.[^@\s]+"),
+            ("Only letters", "^[A-Za-z]+$"),
+            ("Mixed letters and numbers", "[A-Za-z].*[0-9]")
         ]
 
         for i, (desc, pattern) in enumerate(patterns):
@@ -147,6 +157,16 @@ class RegexSearchTool:
             width=120
         ).pack(side="left", padx=5)
 
+        self.cancel_button = ctk.CTkButton(
+            button_frame,
+            text="⏹ Cancel",
+            command=self.cancel_search,
+            fg_color=self.app.colors["warning"],
+            width=100,
+            state="disabled"
+        )
+        self.cancel_button.pack(side="left", padx=5)
+
     def create_results_section(self, parent):
         """Секция результатов"""
         results_frame = ctk.CTkFrame(parent)
@@ -176,7 +196,7 @@ class RegexSearchTool:
         try:
             return self.app.api_client.get_all_tables()
         except:
-            return ["attacks", "targets"]
+            return ["attack_details", "target_details", "attacks", "targets"]
 
     def on_table_selected(self, choice):
         """Обработка выбора таблицы"""
@@ -201,10 +221,14 @@ class RegexSearchTool:
             messagebox.showwarning("Warning", "Please enter a pattern to test")
             return
 
-        test_dialog = PatternTestDialog(self.parent, pattern)
+        test_dialog = PatternTestDialog(self.parent, pattern, self.pattern_flags())
         if test_dialog.result:
             messagebox.showinfo("Pattern Test", f"Test string: '{test_dialog.result}'\nPattern would match: {test_dialog.matched}")
 
+    def pattern_flags(self):
+        """Флаги re для выбранных настроек"""
+        return re.IGNORECASE if self.ignore_case_var.get() else 0
+
     def execute_search(self):
         """Выполнение поиска"""
         table = self.table_combo.get()
@@ -216,20 +240,73 @@ class RegexSearchTool:
             messagebox.showerror("Error", "Please enter a search pattern")
             return
 
+        if table not in self.table_combo.cget("values") or column not in self.column_combo.cget("values"):
+            messagebox.showerror("Error", f"Unknown column {table}.{column}")
+            return
+
+        flags = self.pattern_flags()
         try:
-            # Формируем SQL запрос
-            if negation:
-                sql = f"SELECT * FROM {table} WHERE {column} NOT SIMILAR TO ?"
-            else:
-                sql = f"SELECT * FROM {table} WHERE {column} SIMILAR TO ?"
-
-            results = self.app.api_client.execute_custom_query(sql, (pattern,))
-            
-            self.display_results(results)
-            self.status_label.configure(text=f"Found {len(results)} records")
-            
-        except Exception as e:
-            messagebox.showerror("Error", f"Search failed: {e}")
+            compile_pattern(pattern, flags)
+        except re.error as e:
+            messagebox.showerror("Error", f"Invalid regular expression: {e}")
+            return
+
+        # Обе фазы (подготовка с префильтром и сам запрос) идут в фоне под одним
+        # ключом и одной сигнатурой: повторный клик с теми же настройками не
+        # перезапускает поиск
+        signature = (table, column, pattern, flags, negation)
+        self.app.jobs.submit(self.JOB_KEY, self.prepare_search, table, column, pattern, flags, negation,
+                             signature=signature,
+                             on_success=lambda prepared: self.run_search(signature, *prepared),
+                             on_error=self.on_search_failed,
+                             on_cancel=self.on_search_cancelled,
+                             on_state=self.set_running)
+
+    def prepare_search(self, table, column, pattern, flags, negation):
+        """SQL поиска с префильтром по триграммному индексу (выполняется в фоне)"""
+        # regexp/regexp_i регистрируются на каждом соединении (api/sql_functions.py)
+        condition = f"regexp_i(?, {column})" if flags else f"{column} REGEXP ?"
+        params = (pattern,)
+        prefilter = None
+        if negation:
+            condition = f"NOT ({condition})"
+        else:
+            # Литералы паттерна сужают поиск по триграммному индексу, если он есть
+            match_query = regex_query(pattern, flags)
+            if match_query is not None:
+                prefilter = self.app.api_client.trigram_prefilter(table, column, match_query)
+            if prefilter and prefilter["condition"]:
+                condition = f"{prefilter['condition']} AND {condition}"
+                params = (match_query, pattern)
+        return f"SELECT * FROM {table} WHERE {condition}", params, prefilter
+
+    def run_search(self, signature, sql, params, prefilter):
+        """Выполнение подготовленного поиска"""
+        note = describe_prefilter(prefilter)
+        self.app.jobs.submit_query(self.JOB_KEY, sql, params, signature=signature,
+                                   on_success=lambda result: self.on_search_done(result, note),
+                                   on_error=self.on_search_failed,
+                                   on_cancel=self.on_search_cancelled,
+                                   on_state=self.set_running)
+
+    def cancel_search(self):
+        self.app.jobs.cancel(self.JOB_KEY)
+
+    def set_running(self, running):
+        self.cancel_button.configure(state="normal" if running else "disabled")
+        if running:
+            self.status_label.configure(text="Searching...")
+
+    def on_search_done(self, result, note):
+        self.display_results(result.as_dicts())
+        self.status_label.configure(text=f"Found {result.summary()}" + (f" ({note})" if note else ""))
+
+    def on_search_failed(self, error):
+        self.status_label.configure(text="Search failed")
+        messagebox.showerror("Error", f"Search failed: {error}")
+
+    def on_search_cancelled(self, job):
+        self.status_label.configure(text=f"Cancelled after {job.elapsed() * 1000:.0f} ms")
 
     def display_results(self, results):
         """Отображение результатов"""
@@ -263,9 +340,10 @@ class RegexSearchTool:
 
 class PatternTestDialog(ctk.CTkToplevel):
     """Диалог для тестирования паттернов"""
-    def __init__(self, parent, pattern):
+    def __init__(self, parent, pattern, flags=0):
         super().__init__(parent)
         self.pattern = pattern
+        self.flags = flags
         self.result = None
         self.matched = False
         
@@ -295,11 +373,9 @@ class PatternTestDialog(ctk.CTkToplevel):
         test_string = self.test_entry.get().strip()
         if test_string:
             self.result = test_string
-            # Эмуляция SIMILAR TO для демонстрации
+            # Та же проверка, что выполняет REGEXP в SQL
             try:
-                # Простая эмуляция - в реальности нужно использовать SQL
-                pattern = self.pattern.replace('%', '.*').replace('_', '.')
-                self.matched = bool(re.match(pattern, test_string))
-            except:
+                self.matched = compile_pattern(self.pattern, self.flags).search(test_string) is not None
+            except re.error:
                 self.matched = False
             self.destroy()
\ No newline at end of file
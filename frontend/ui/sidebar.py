@@ -1,8 +1,15 @@
 import customtkinter as ctk
-from datetime import datetime
+from datetime import datetime, timedelta
 
 
 class Sidebar:
+    # Ключ фоновой задачи счётчиков активности в app.jobs
+    ACTIVITY_JOB_KEY = "sidebar_activity"
+    # Окна счётчиков активности по created_at
+    ACTIVITY_WINDOWS = (("1h", timedelta(hours=1)), ("24h", timedelta(hours=24)), ("7d", timedelta(days=7)))
+    # High Frequency - частота не ниже этого значения по рангу справочника
+    HIGH_FREQUENCY = "high"
+
     def __init__(self, parent, app):
         self.app = app
         self.setup_ui(parent)
@@ -98,19 +105,44 @@ class Sidebar:
         self.stats_label = ctk.CTkLabel(stats_frame, text="Loading...", justify="left",
                                         font=ctk.CTkFont(size=12))
         self.stats_label.pack(anchor="w", padx=15, pady=(0, 10))
+
+        self.activity_label = ctk.CTkLabel(stats_frame, text="", justify="left",
+                                           font=ctk.CTkFont(size=12))
+        self.activity_label.pack(anchor="w", padx=15, pady=(0, 10))
         
     def update_stats(self):
         """Обновление статистики"""
-        total_attacks = len(self.app.attacks)
-        critical_attacks = len([a for a in self.app.attacks if str(a.get("danger", "")).lower() == "critical"])
-        high_freq_attacks = len(
-            [a for a in self.app.attacks if str(a.get("frequency", "")).lower() in ["high", "very_high", "continuous"]])
+        # Счётчики из сводной таблицы attack_stats - без перебора атак
+        stats = self.app.api_client.get_stats()
+        total_attacks = stats["total"]
+        critical_attacks = stats["danger"].get("critical", 0)
+        high_levels = self.app.api_client.get_values_at_least("frequency", self.HIGH_FREQUENCY)
+        high_freq_attacks = sum(stats["frequency"].get(level, 0) for level in high_levels)
+
+        cache = self.app.api_client.get_cache_stats()
 
         current_time = datetime.now().strftime("%H:%M")
 
         stats_text = f"""Total Attacks: {total_attacks}
 Critical: {critical_attacks}
 High Frequency: {high_freq_attacks}
+Query Cache: {cache['hits']} hits / {cache['misses']} misses ({cache['hit_ratio']:.0%})
+Evictions: {cache['evictions']}, {cache['entries']} cached, {cache['bytes'] / 1048576:.1f} MB
 Updated: {current_time}"""
 
-        self.stats_label.configure(text=stats_text)
\ No newline at end of file
+        self.stats_label.configure(text=stats_text)
+
+        # Счётчики по периодам - векторно по колоночному снимку, в фоне
+        if self.app.api_client.analytics_available():
+            self.app.jobs.submit(self.ACTIVITY_JOB_KEY, self.count_activity,
+                                 on_success=self.show_activity,
+                                 on_error=lambda e: print(f"Activity stats failed: {e}"))
+
+    def count_activity(self):
+        """Число атак за окна ACTIVITY_WINDOWS (в потоке задачи)"""
+        snapshot = self.app.api_client.get_analytics_snapshot()
+        now = datetime.now()
+        return [(label, snapshot.count(date_from=now - window)) for label, window in self.ACTIVITY_WINDOWS]
+
+    def show_activity(self, counts):
+        self.activity_label.configure(text="Last " + " | ".join(f"{label}: {count}" for label, count in counts))
\ No newline at end of file
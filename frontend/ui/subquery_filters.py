@@ -3,6 +3,9 @@ from tkinter import messagebox
 import json
 
 class SubqueryFilters:
+    # Ключ задачи в app.jobs
+    JOB_KEY = "subquery_filters"
+
     def __init__(self, parent, app):
         self.app = app
         self.parent = parent
@@ -151,6 +154,12 @@ class SubqueryFilters:
                      fg_color=self.app.colors["warning"],
                      height=40).pack(side="left", padx=5)
 
+        self.cancel_button = ctk.CTkButton(action_buttons, text="⏹ Cancel",
+                                           command=self.cancel_query,
+                                           fg_color=self.app.colors["danger"],
+                                           height=40, state="disabled")
+        self.cancel_button.pack(side="left", padx=5)
+
         # Подсказка
         help_label = ctk.CTkLabel(controls_frame, 
                                  text="💡 Tip: Start with main condition, add subqueries for complex searches",
@@ -241,24 +250,47 @@ class SubqueryFilters:
             for subquery in self.subqueries:
                 operator = self.subquery_operator.get()
                 if operator == "EXISTS":
-                    conditions.append(f"EXISTS (SELECT 1 FROM attacks WHERE {subquery['field']} {subquery['operator']} ?)")
+                    conditions.append(f"EXISTS (SELECT 1 FROM attack_details WHERE {subquery['field']} {subquery['operator']} ?)")
                 else:
-                    conditions.append(f"{subquery['field']} {operator} (SELECT {subquery['field']} FROM attacks WHERE {subquery['field']} {subquery['operator']} ?)")
+                    conditions.append(f"{subquery['field']} {operator} (SELECT {subquery['field']} FROM attack_details WHERE {subquery['field']} {subquery['operator']} ?)")
                 params.append(subquery['value'])
 
             # Формируем запрос
             where_clause = " AND ".join(conditions) if conditions else "1=1"
-            query = f"SELECT * FROM attacks WHERE {where_clause}"
+            query = f"SELECT * FROM attack_details WHERE {where_clause}"
 
-            # Выполняем запрос
-            results = self.app.api_client.execute_custom_query(query, params)
-            
-            # Показываем результаты
-            self.show_results(results, query)
+            # Выполняем запрос в фоне; результат показывается в главном потоке
+            self.app.jobs.submit_query(self.JOB_KEY, query, tuple(params),
+                                       on_success=lambda result: self.on_query_done(result, query),
+                                       on_error=self.on_query_failed,
+                                       on_cancel=self.on_query_cancelled,
+                                       on_state=self.set_running)
 
         except Exception as e:
             messagebox.showerror("Error", f"Search failed: {str(e)}")
 
+    def cancel_query(self):
+        """Отмена выполняющегося поиска"""
+        self.app.jobs.cancel(self.JOB_KEY)
+
+    def set_running(self, running):
+        """Состояние выполнения поиска"""
+        self.cancel_button.configure(state="normal" if running else "disabled")
+        if running:
+            self.results_count.configure(text="Searching...")
+
+    def on_query_done(self, result, query):
+        """Показ результатов поиска"""
+        self.show_results(result.as_dicts(), query)
+        self.results_count.configure(text=f"Found: {result.summary()}")
+
+    def on_query_failed(self, error):
+        self.results_count.configure(text="Search failed")
+        messagebox.showerror("Error", f"Search failed: {str(error)}")
+
+    def on_query_cancelled(self, job):
+        self.results_count.configure(text=f"Cancelled after {job.elapsed() * 1000:.0f} ms")
+
     def reset_filters(self):
         """Сброс фильтров"""
         self.main_field.set("name")
@@ -290,12 +322,12 @@ class SubqueryFilters:
         for subquery in self.subqueries:
             operator = self.subquery_operator.get()
             if operator == "EXISTS":
-                conditions.append(f"EXISTS (SELECT 1 FROM attacks WHERE {subquery['field']} {subquery['operator']} '{subquery['value']}')")
+                conditions.append(f"EXISTS (SELECT 1 FROM attack_details WHERE {subquery['field']} {subquery['operator']} '{subquery['value']}')")
             else:
-                conditions.append(f"{subquery['field']} {operator} (SELECT {subquery['field']} FROM attacks WHERE {subquery['field']} {subquery['operator']} '{subquery['value']}')")
+                conditions.append(f"{subquery['field']} {operator} (SELECT {subquery['field']} FROM attack_details WHERE {subquery['field']} {subquery['operator']} '{subquery['value']}')")
 
         where_clause = " AND ".join(conditions) if conditions else "1=1"
-        sql = f"SELECT * FROM attacks WHERE {where_clause}"
+        sql = f"SELECT * FROM attack_details WHERE {where_clause}"
 
         self.results_text.delete("1.0", "end")
         self.results_text.insert("1.0", f"📋 Generated SQL Query:\n\n{sql}\n\n💡 Copy this query to use in other tools")
@@ -1,27 +1,68 @@
 import customtkinter as ctk
 from tkinter import ttk
+import ipaddress
 import threading
-from datetime import datetime
+from collections.abc import Mapping
+from datetime import datetime, timedelta
+from ui.virtual_tree import VirtualTreeController
+from utils.helpers import diff_versions
 
 
 class AttackTable:
+    # Размер страницы при потоковой загрузке атак
+    PAGE_SIZE = 500
+    # Начиная с этого числа атак таблица работает в виртуальном режиме
+    VIRTUAL_THRESHOLD = 5000
+    VIRTUAL_PAGE_SIZE = 200
+    ROW_HEIGHT = 35
+    # Высокая частота в статистике - не ниже этого значения по рангу справочника
+    HIGH_FREQUENCY = "high"
+    # Готовые периоды фильтра по created_at (отсчёт от момента применения)
+    DATE_PRESETS = {
+        "All time": None,
+        "Last 1h": timedelta(hours=1),
+        "Last 24h": timedelta(hours=24),
+        "Last 7 days": timedelta(days=7),
+        "Last 30 days": timedelta(days=30),
+    }
+
     def __init__(self, parent, app):
         self.app = app
         self.tree = None
-        self.filtered_attacks = []
+        # Номер текущей загрузки: страницы устаревших загрузок отбрасываются
+        self._load_generation = 0
+        self.load_filters = None
+        self.virtual_filters = None
+        # Версии (updated_at) и ключи сортировки показанных строк; iid элемента дерева - id атаки
+        self.row_versions = {}
+        self.row_keys = {}
+        self.fully_loaded = False
         self.current_filters = {
             "frequency": [],
             "danger": [],
+            # Порог по рангу справочника danger_levels ("≥ high")
+            "min_danger": None,
             "attack_type": [],
-            "protocol": []
+            "protocol": [],
+            "source_cidr": [],
+            "target_cidr": [],
+            # Готовый период (timedelta) или свои границы (ISO-строки)
+            "period": None,
+            "date_from": None,
+            "date_to": None
         }
         self.setup_ui(parent)
         self.refresh_table()
 
+        # Изменения из журнала БД (в том числе сделанные вне этого окна)
+        self.app.add_change_listener(self.on_external_changes)
+
     def setup_ui(self, parent):
         """Создание улучшенной таблицы с фильтрами"""
         main_frame = ctk.CTkFrame(parent, fg_color="transparent")
         main_frame.pack(fill="both", expand=True, padx=15, pady=15)
+        main_frame.bind("<Destroy>", lambda e: self.app.remove_change_listener(self.on_external_changes)
+                        if e.widget is main_frame else None)
 
         # Заголовок и статистика
         header_frame = ctk.CTkFrame(main_frame, fg_color="transparent")
@@ -81,7 +122,7 @@ class AttackTable:
         # Фильтр по частоте
         ctk.CTkLabel(filters_frame, text="📊 Freq:", font=ctk.CTkFont(size=12)).pack(side="left", padx=(0, 5))
         self.frequency_filter = ctk.CTkComboBox(filters_frame,
-                                                values=["All", "low", "medium", "high", "very_high", "continuous"],
+                                                values=["All"] + self.app.frequency_levels,
                                                 width=120, height=36,
                                                 command=self.on_frequency_filter_change)
         self.frequency_filter.pack(side="left", padx=(0, 10))
@@ -90,7 +131,8 @@ class AttackTable:
         # Фильтр по опасности
         ctk.CTkLabel(filters_frame, text="🛡️ Danger:", font=ctk.CTkFont(size=12)).pack(side="left", padx=(0, 5))
         self.danger_filter = ctk.CTkComboBox(filters_frame,
-                                             values=["All", "low", "medium", "high", "critical"],
+                                             values=(["All"] + self.app.danger_levels
+                                                     + [f"≥ {level}" for level in self.app.danger_levels[1:-1]]),
                                              width=100, height=36,
                                              command=self.on_danger_filter_change)
         self.danger_filter.pack(side="left", padx=(0, 10))
@@ -99,8 +141,7 @@ class AttackTable:
         # Фильтр по типу атаки
         ctk.CTkLabel(filters_frame, text="🎯 Type:", font=ctk.CTkFont(size=12)).pack(side="left", padx=(0, 5))
         self.attack_type_filter = ctk.CTkComboBox(filters_frame,
-                                                  values=["All", "volumetric", "protocol", "application",
-                                                          "amplification"],
+                                                  values=["All"] + self.app.attack_types,
                                                   width=120, height=36,
                                                   command=self.on_attack_type_filter_change)
         self.attack_type_filter.pack(side="left", padx=(0, 10))
@@ -109,12 +150,39 @@ class AttackTable:
         # Фильтр по протоколу
         ctk.CTkLabel(filters_frame, text="🔗 Protocol:", font=ctk.CTkFont(size=12)).pack(side="left", padx=(0, 5))
         self.protocol_filter = ctk.CTkComboBox(filters_frame,
-                                               values=["All", "tcp", "udp", "dns", "http", "https", "icmp"],
+                                               values=["All"] + self.app.protocols,
                                                width=100, height=36,
                                                command=self.on_protocol_filter_change)
         self.protocol_filter.pack(side="left", padx=(0, 10))
         self.protocol_filter.set("All")
 
+        # Фильтр по сети источника или цели (применяется по Enter)
+        ctk.CTkLabel(filters_frame, text="🌐 CIDR:", font=ctk.CTkFont(size=12)).pack(side="left", padx=(0, 5))
+        self.cidr_side_filter = ctk.CTkComboBox(filters_frame,
+                                                values=["Source", "Target"],
+                                                width=90, height=36,
+                                                command=self.on_cidr_filter_change)
+        self.cidr_side_filter.pack(side="left", padx=(0, 5))
+        self.cidr_side_filter.set("Source")
+        self.cidr_filter = ctk.CTkEntry(filters_frame, placeholder_text="10.0.0.0/8", width=140, height=36)
+        self.cidr_filter.pack(side="left", padx=(0, 10))
+        self.cidr_filter.bind("<Return>", self.on_cidr_filter_change)
+
+        # Период по created_at: готовое окно или свои границы (применяются по Enter)
+        ctk.CTkLabel(filters_frame, text="🕒 Period:", font=ctk.CTkFont(size=12)).pack(side="left", padx=(0, 5))
+        self.period_filter = ctk.CTkComboBox(filters_frame,
+                                             values=list(self.DATE_PRESETS) + ["Custom"],
+                                             width=120, height=36,
+                                             command=self.on_period_filter_change)
+        self.period_filter.pack(side="left", padx=(0, 5))
+        self.period_filter.set("All time")
+        self.date_from_filter = ctk.CTkEntry(filters_frame, placeholder_text="from YYYY-MM-DD", width=130, height=36)
+        self.date_from_filter.pack(side="left", padx=(0, 5))
+        self.date_from_filter.bind("<Return>", self.on_date_range_change)
+        self.date_to_filter = ctk.CTkEntry(filters_frame, placeholder_text="to YYYY-MM-DD", width=130, height=36)
+        self.date_to_filter.pack(side="left", padx=(0, 10))
+        self.date_to_filter.bind("<Return>", self.on_date_range_change)
+
         # Контейнер для таблицы
         table_container = ctk.CTkFrame(main_frame, fg_color=self.app.colors["card_bg"], corner_radius=12)
         table_container.pack(fill="both", expand=True)
@@ -144,7 +212,7 @@ class AttackTable:
                         foreground=self.app.colors["text_light"],
                         fieldbackground=self.app.colors["card_bg"],
                         borderwidth=0,
-                        rowheight=35,
+                        rowheight=self.ROW_HEIGHT,
                         font=('Segoe UI', 10))
 
         # Стиль для заголовков
@@ -169,6 +237,7 @@ class AttackTable:
         # Объединяем все колонки
         all_columns = base_columns + additional_columns
         
+        self.columns = all_columns
         self.tree = ttk.Treeview(parent, columns=all_columns, show="headings", style="Custom.Treeview")
 
         # Настройка колонок с улучшенными заголовками
@@ -199,6 +268,12 @@ class AttackTable:
         self.tree.pack(side="left", fill="both", expand=True, padx=15, pady=15)
         scrollbar.pack(side="right", fill="y", padx=(0, 15), pady=15)
 
+        # Виртуальный режим для больших наборов: в дереве только видимые строки
+        self.virtual = VirtualTreeController(self.app.window, self.tree, scrollbar,
+                                             fetch_page=self.fetch_virtual_page,
+                                             row_height=self.ROW_HEIGHT,
+                                             page_size=self.VIRTUAL_PAGE_SIZE)
+
         # Привязка событий ТОЛЬКО для выбора строки
         self.tree.bind("<<TreeviewSelect>>", self.on_row_select)
 
@@ -206,17 +281,17 @@ class AttackTable:
         """Получение списка дополнительных колонок из структуры таблицы"""
         try:
             # Получаем структуру таблицы attacks
-            conn = self.app.api_client.db.get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute("PRAGMA table_info(attacks)")
-            columns_info = cursor.fetchall()
-            conn.close()
+            with self.app.api_client.db.connection() as conn:
+                cursor = conn.cursor()
+
+                cursor.execute("PRAGMA table_info(attacks)")
+                columns_info = cursor.fetchall()
             
             # Базовые колонки, которые уже отображаются
             base_columns_set = {
                 'id', 'name', 'frequency', 'danger', 'attack_type', 
-                'source_ips', 'affected_ports', 'targets', 'created_at'
+                'source_ips', 'affected_ports', 'targets', 'created_at',
+                'frequency_id', 'danger_id', 'attack_type_id'
             }
             
             # Ищем дополнительные колонки
@@ -243,9 +318,11 @@ class AttackTable:
 
     def on_danger_filter_change(self, choice):
         """Обработка изменения фильтра по опасности"""
-        if choice == "All":
-            self.current_filters["danger"] = []
-        else:
+        self.current_filters["danger"] = []
+        self.current_filters["min_danger"] = None
+        if choice.startswith("≥ "):
+            self.current_filters["min_danger"] = choice[2:]
+        elif choice != "All":
             self.current_filters["danger"] = [choice]
 
         self.apply_api_filters()
@@ -268,48 +345,88 @@ class AttackTable:
 
         self.apply_api_filters()
 
-    def apply_api_filters(self):
-        """Применение фильтров через API"""
-        self.status_label.configure(text="🔄 Applying filters...")
-
-        def filter_thread():
+    def on_cidr_filter_change(self, _event=None):
+        """Обработка изменения фильтра по сети (CIDR)"""
+        cidr = self.cidr_filter.get().strip()
+        if cidr:
             try:
-                # Получаем отфильтрованные данные с сервера
-                frequencies = self.current_filters["frequency"]
-                danger_levels = self.current_filters["danger"]
-                attack_types = self.current_filters["attack_type"]
-                protocols = self.current_filters["protocol"]
-
-                if frequencies or danger_levels or attack_types or protocols:
-                    # Используем API фильтрацию
-                    filtered_attacks = self.app.api_client.filter_attacks_by_multiple(
-                        frequencies=frequencies,
-                        danger_levels=danger_levels,
-                        attack_types=attack_types,
-                        protocols=protocols
-                    )
-                else:
-                    # Если фильтры пустые, загружаем все атаки
-                    filtered_attacks = self.app.api_client.get_all_attacks()
+                ipaddress.ip_network(cidr, strict=False)
+            except ValueError:
+                self.status_label.configure(text=f"❌ Invalid CIDR: {cidr}")
+                return
 
-                # Обновляем данные в основном потоке
-                self.app.window.after(0, lambda: self.on_filters_applied(filtered_attacks))
+        side = "target" if self.cidr_side_filter.get() == "Target" else "source"
+        self.current_filters["source_cidr"] = [cidr] if cidr and side == "source" else []
+        self.current_filters["target_cidr"] = [cidr] if cidr and side == "target" else []
 
-            except Exception as e:
-                self.app.window.after(0, lambda: self.show_error(f"Failed to apply filters: {e}"))
+        self.apply_api_filters()
 
-        thread = threading.Thread(target=filter_thread)
-        thread.daemon = True
-        thread.start()
+    def on_period_filter_change(self, choice):
+        """Выбор готового периода; Custom - границы из полей from/to"""
+        if choice == "Custom":
+            self.on_date_range_change()
+            return
+        self.date_from_filter.delete(0, "end")
+        self.date_to_filter.delete(0, "end")
+        self.current_filters["period"] = self.DATE_PRESETS.get(choice)
+        self.current_filters["date_from"] = None
+        self.current_filters["date_to"] = None
+
+        self.apply_api_filters()
+
+    def on_date_range_change(self, _event=None):
+        """Свой период: ISO дата или дата и время, пустое поле - без границы"""
+        bounds = {}
+        for name, entry in (("date_from", self.date_from_filter), ("date_to", self.date_to_filter)):
+            value = entry.get().strip()
+            if value:
+                try:
+                    datetime.fromisoformat(value)
+                except ValueError:
+                    self.status_label.configure(text=f"❌ Invalid date: {value}")
+                    return
+            bounds[name] = value or None
 
-    def on_filters_applied(self, filtered_attacks):
-        """Обработка применения фильтров"""
-        self.app.attacks = filtered_attacks
-        self.update_table_content()
-        self.status_label.configure(text=f"✅ Filters applied - {len(filtered_attacks)} attacks")
+        self.period_filter.set("Custom" if any(bounds.values()) else "All time")
+        self.current_filters["period"] = None
+        self.current_filters.update(bounds)
+
+        self.apply_api_filters()
+
+    def date_range(self):
+        """Границы периода для API; готовый период отсчитывается от текущего момента"""
+        if self.current_filters["period"] is not None:
+            return datetime.now() - self.current_filters["period"], None
+        return self.current_filters["date_from"], self.current_filters["date_to"]
+
+    def api_filters(self):
+        """Текущие фильтры в формате аргументов filter_attacks"""
+        date_from, date_to = self.date_range()
+        return {
+            "frequencies": self.current_filters["frequency"],
+            "danger_levels": self.current_filters["danger"],
+            "min_danger": self.current_filters["min_danger"],
+            "attack_types": self.current_filters["attack_type"],
+            "protocols": self.current_filters["protocol"],
+            "source_cidrs": self.current_filters["source_cidr"],
+            "target_cidrs": self.current_filters["target_cidr"],
+            "date_from": date_from,
+            "date_to": date_to
+        }
+
+    def apply_api_filters(self):
+        """Применение фильтров через API"""
+        self.status_label.configure(text="🔄 Applying filters...")
+        self.load_attacks(self.api_filters(), "✅ Filters applied - {count} attacks")
 
     def on_row_select(self, event):
         """Обработка выбора строки"""
+        if self.virtual.active:
+            # Выделение хранится по id атаки и переживает прокрутку
+            self.virtual.on_select()
+            self.delete_btn.configure(state="normal" if self.virtual.selected_id else "disabled")
+            return
+
         selection = self.tree.selection()
         if selection:
             self.delete_btn.configure(state="normal")
@@ -318,6 +435,13 @@ class AttackTable:
 
     def delete_selected_attack(self):
         """Удаление выбранной атаки"""
+        if self.virtual.active:
+            if not self.virtual.selected_id:
+                self.app.show_error("Please select an attack to delete!")
+                return
+            self.delete_attack(self.virtual.selected_id, self.virtual.selected_name)
+            return
+
         selection = self.tree.selection()
         if not selection:
             self.app.show_error("Please select an attack to delete!")
@@ -332,142 +456,426 @@ class AttackTable:
 
     def refresh_table(self):
         """Обновление таблицы"""
+        # Загружаем все атаки (игнорируем текущие фильтры)
         self.status_label.configure(text="🔄 Loading attacks...")
+        self.load_attacks(None, "✅ Loaded {count} attacks")
+
+    def load_attacks(self, filters, done_text):
+        """Загрузка атак в таблицу.
+
+        Небольшой набор загружается в дерево целиком, постранично: следующая
+        страница запрашивается только после отрисовки предыдущей. Набор
+        больше VIRTUAL_THRESHOLD показывается в виртуальном режиме - строки
+        читаются из БД по мере прокрутки.
+        """
+        self._load_generation += 1
+        generation = self._load_generation
+        self.load_filters = filters
+        self.fully_loaded = False
+
+        def count_thread():
+            try:
+                total = self.app.api_client.count_attacks(filters)
+                if total > self.VIRTUAL_THRESHOLD:
+                    stats = self.view_stats(filters)
+                    self.app.window.after(0, lambda: self.on_virtual_loaded(generation, total, stats, done_text))
+                else:
+                    self.app.window.after(0, lambda: self.start_full_load(generation, filters, done_text))
+            except Exception as e:
+                self.app.window.after(0, lambda: self.show_error(f"Failed to load attacks: {e}"))
+
+        thread = threading.Thread(target=count_thread)
+        thread.daemon = True
+        thread.start()
+
+    def start_full_load(self, generation, filters, done_text):
+        """Загрузка всего набора в дерево"""
+        if generation != self._load_generation or not self.tree.winfo_exists():
+            return
+        self.virtual.detach()
+        self.fetch_page(generation, filters, None, done_text)
+
+    def on_virtual_loaded(self, generation, total, stats, done_text):
+        """Переход в виртуальный режим для большого набора"""
+        if generation != self._load_generation or not self.tree.winfo_exists():
+            return
+        same_view = self.virtual.active and self.virtual_filters == self.load_filters
+        # Страницы читаются с фильтрами показанного набора
+        self.virtual_filters = self.load_filters
+        if same_view:
+            # Тот же набор (обновление после изменений): позиция прокрутки сохраняется
+            self.virtual.invalidate(total)
+        else:
+            self.virtual.clear_selection()
+            self.virtual.attach()
+            self.virtual.reset(total)
+        self.show_stats(*stats)
+        self.status_label.configure(text=done_text.format(count=total) + " (virtual mode)")
+        self.delete_btn.configure(state="disabled")
 
-        def refresh_thread():
+    def fetch_virtual_page(self, page_no, after):
+        """Строки страницы виртуальной таблицы (вызывается в фоновом потоке)"""
+        filters = self.virtual_filters
+        if after is None and page_no > 0:
+            # Переход к странице без соседней в кэше: ключ берётся по позиции
+            after = self.app.api_client.get_attack_key_at(filters, page_no * self.VIRTUAL_PAGE_SIZE - 1)
+            if after is None:
+                return []
+        attacks = self.app.api_client.get_attacks_page(filters, self.VIRTUAL_PAGE_SIZE, after)
+        return [{
+            "id": attack.get("id", ""),
+            "key": (attack["created_at"], attack["id"]),
+            "name": attack.get("name", "Unknown"),
+            "values": self.format_row(attack)
+        } for attack in attacks]
+
+    def view_stats(self, filters):
+        """Статистика показанного набора (вызывается в фоновом потоке).
+
+        Без фильтров берётся из сводной таблицы get_stats, для
+        отфильтрованного набора считается COUNT-запросами по индексам.
+        """
+        if not any((filters or {}).values()):
+            stats = self.app.api_client.get_stats()
+            high_levels = self.app.api_client.get_values_at_least("frequency", self.HIGH_FREQUENCY)
+            high_freq = sum(stats["frequency"].get(level, 0) for level in high_levels)
+            return stats["total"], stats["danger"].get("critical", 0), high_freq
+        return self.count_stats(filters, self.app.api_client.count_attacks(filters))
+
+    def count_stats(self, filters, total):
+        """Статистика набора запросами COUNT, без загрузки атак"""
+        filters = dict(filters or {})
+
+        def count_with(name, values):
+            selected = filters.get(name) or values
+            wanted = [value for value in values if value in selected]
+            if not wanted:
+                return 0
+            return self.app.api_client.count_attacks({**filters, name: wanted})
+
+        critical = count_with("danger_levels", ["critical"])
+        # Порог по рангу справочника: учитываются и значения, добавленные через add_lookup_value
+        high_freq = self.app.api_client.count_attacks({**filters, "min_frequency": self.HIGH_FREQUENCY})
+        return total, critical, high_freq
+
+    def fetch_page(self, generation, filters, after, done_text):
+        """Загрузка одной страницы в фоновом потоке"""
+        def page_thread():
             try:
-                # Загружаем все атаки (игнорируем текущие фильтры)
-                attacks = self.app.api_client.get_all_attacks()
-                self.app.window.after(0, lambda: self.on_data_loaded(attacks))
+                page = self.app.api_client.get_attacks_page(filters, self.PAGE_SIZE, after)
+                self.app.window.after(0, lambda: self.on_page_loaded(generation, filters, after, page, done_text))
+            except Exception as e:
+                self.app.window.after(0, lambda: self.show_error(f"Failed to load attacks: {e}"))
+
+        thread = threading.Thread(target=page_thread)
+        thread.daemon = True
+        thread.start()
+
+    def on_page_loaded(self, generation, filters, after, page, done_text):
+        """Обработка загруженной страницы"""
+        # Страница устаревшей загрузки или таблица уже закрыта
+        if generation != self._load_generation or not self.tree.winfo_exists():
+            return
+
+        if after is None:
+            self.clear_table()
+            self.app.attacks = []
+
+        self.app.attacks.extend(page)
+        self.append_rows(page)
+
+        if len(page) == self.PAGE_SIZE:
+            self.status_label.configure(text=f"🔄 Loaded {len(self.app.attacks)} attacks...")
+            last = page[-1]
+            self.fetch_page(generation, filters, (last["created_at"], last["id"]), done_text)
+        else:
+            self.fully_loaded = True
+            self.update_stats()
+            self.status_label.configure(text=done_text.format(count=len(self.app.attacks)))
+            self.delete_btn.configure(state="disabled")
+
+    def on_external_changes(self, attack_ids):
+        """Уведомление из журнала изменений: attack_ids - затронутые атаки или None (всё)"""
+        self.refresh_changes(attack_ids)
+
+    def refresh_changes(self, attack_ids=None):
+        """Инкрементальное обновление после изменений в БД.
+
+        Сравнивает (id, updated_at) показанных строк с БД и перечитывает
+        только добавленные и изменённые атаки; в дереве затрагиваются лишь
+        соответствующие элементы, неизменённые строки не перерисовываются.
+        Если известны затронутые атаки (из журнала изменений), читаются
+        только они.
+        """
+        if self.virtual.active or not self.fully_loaded:
+            # Виртуальный режим перечитывает только видимое окно, а
+            # незавершённую загрузку проще начать заново
+            self.load_attacks(self.load_filters, "✅ Loaded {count} attacks")
+            return
+
+        generation = self._load_generation
+        filters = self.load_filters
+
+        if attack_ids is not None:
+            def targeted_thread():
+                try:
+                    matching = self.app.api_client.get_attacks_by_ids(list(attack_ids), filters)
+                    self.app.window.after(0, lambda: self.apply_attack_changes(generation, attack_ids, matching))
+                except Exception as e:
+                    self.app.window.after(0, lambda: self.show_error(f"Failed to refresh: {e}"))
+
+            thread = threading.Thread(target=targeted_thread)
+            thread.daemon = True
+            thread.start()
+            return
+
+        old_versions = dict(self.row_versions)
+
+        def changes_thread():
+            try:
+                versions = self.app.api_client.get_attack_versions(filters)
+                inserted, updated, deleted = diff_versions(old_versions, versions)
+                changed = self.app.api_client.get_attacks_by_ids(inserted + updated)
+                self.app.window.after(0, lambda: self.apply_changes(
+                    generation, versions, inserted, updated, deleted, changed))
             except Exception as e:
                 self.app.window.after(0, lambda: self.show_error(f"Failed to refresh: {e}"))
 
-        thread = threading.Thread(target=refresh_thread)
+        thread = threading.Thread(target=changes_thread)
         thread.daemon = True
         thread.start()
 
-    def on_data_loaded(self, attacks):
-        """Обработка загруженных данных"""
-        self.app.attacks = attacks
-        self.update_table_content()
-        self.status_label.configure(text=f"✅ Loaded {len(attacks)} attacks")
+    def apply_changes(self, generation, versions, inserted, updated, deleted, changed):
+        """Применение разницы к дереву и app.attacks"""
+        if generation != self._load_generation or not self.tree.winfo_exists():
+            return
+
+        if len(versions) > self.VIRTUAL_THRESHOLD:
+            self.load_attacks(self.load_filters, "✅ Loaded {count} attacks")
+            return
+
+        for attack_id in deleted:
+            if self.tree.exists(attack_id):
+                self.tree.delete(attack_id)
+            self.row_versions.pop(attack_id, None)
+            self.row_keys.pop(attack_id, None)
+
+        for attack_id in updated:
+            attack = changed.get(attack_id)
+            if attack is not None and self.tree.exists(attack_id):
+                self.tree.item(attack_id, values=self.format_row(attack))
+                self.row_versions[attack_id] = attack["updated_at"]
+
+        # Порядок (created_at, id) у существующих строк не меняется, поэтому
+        # вставка по возрастанию позиции ставит новые строки на свои места
+        if inserted:
+            inserted_ids = set(inserted)
+            for index, (attack_id, _) in enumerate(versions):
+                if attack_id in inserted_ids and attack_id in changed:
+                    self.insert_attack_row(changed[attack_id], index)
+
+        attacks_by_id = {attack["id"]: attack for attack in self.app.attacks}
+        attacks_by_id.update(changed)
+        self.app.attacks = [attacks_by_id[attack_id] for attack_id, _ in versions if attack_id in attacks_by_id]
+
+        self.update_stats()
+        self.app.update_stats()
+        self.status_label.configure(
+            text=f"✅ {len(inserted)} added, {len(updated)} updated, {len(deleted)} removed - "
+                 f"{len(self.app.attacks)} attacks")
+        if not self.tree.selection():
+            self.delete_btn.configure(state="disabled")
+
+    def apply_attack_changes(self, generation, attack_ids, matching):
+        """Применение изменений по известному списку атак.
+
+        matching - те из attack_ids, что существуют и подходят под фильтры;
+        остальные убираются из таблицы.
+        """
+        if generation != self._load_generation or not self.tree.winfo_exists():
+            return
+
+        inserted = updated = deleted = 0
+        for attack_id in attack_ids:
+            attack = matching.get(attack_id)
+            if attack is None:
+                if self.tree.exists(attack_id):
+                    self.tree.delete(attack_id)
+                    deleted += 1
+                self.row_versions.pop(attack_id, None)
+                self.row_keys.pop(attack_id, None)
+            elif self.tree.exists(attack_id):
+                if self.row_versions.get(attack_id) != attack.get("updated_at"):
+                    self.tree.item(attack_id, values=self.format_row(attack))
+                    self.row_versions[attack_id] = attack.get("updated_at")
+                    updated += 1
+            else:
+                # Позиция в порядке created_at DESC, id DESC - число строк с большим ключом
+                key = (attack["created_at"], attack_id)
+                index = sum(1 for other in self.row_keys.values() if other > key)
+                self.insert_attack_row(attack, index)
+                inserted += 1
+
+        if not (inserted or updated or deleted):
+            return
+        if len(self.row_keys) > self.VIRTUAL_THRESHOLD:
+            self.load_attacks(self.load_filters, "✅ Loaded {count} attacks")
+            return
+
+        attacks_by_id = {attack["id"]: attack for attack in self.app.attacks if attack["id"] in self.row_keys}
+        attacks_by_id.update({attack_id: attack for attack_id, attack in matching.items()
+                              if attack_id in self.row_keys})
+        self.app.attacks = sorted(attacks_by_id.values(), key=lambda a: (a["created_at"], a["id"]), reverse=True)
+
+        self.update_stats()
+        self.app.update_stats()
+        self.status_label.configure(
+            text=f"✅ {inserted} added, {updated} updated, {deleted} removed - {len(self.app.attacks)} attacks")
+        if not self.tree.selection():
+            self.delete_btn.configure(state="disabled")
+
+    def clear_table(self):
+        """Очистка таблицы"""
+        self.virtual.detach()
+        self.tree.delete(*self.tree.get_children())
+        self.row_versions = {}
+        self.row_keys = {}
 
     def update_table_content(self):
         """Обновление содержимого таблицы с учетом всех колонок"""
         if not self.tree:
             return
 
-        # Очищаем таблицу
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-
-        self.filtered_attacks = self.app.attacks.copy()
+        self.clear_table()
+        self.append_rows(self.app.attacks)
 
-        # Получаем список всех колонок
-        all_columns = self.tree["columns"]
-        base_columns_count = 8  # Количество базовых колонок
+        self.update_stats()
+        self.status_label.configure(text=f"✅ Loaded {len(self.app.attacks)} attacks")
+        self.delete_btn.configure(state="disabled")
 
-        # Заполняем данными с проверкой структуры
-        for attack in self.filtered_attacks:
+    def append_rows(self, attacks):
+        """Добавление строк атак в конец таблицы"""
+        for attack in attacks:
             try:
-                # Проверяем что attack - это словарь
-                if not isinstance(attack, dict):
+                # Проверяем что attack - это словарь (dict или запись Attack)
+                if not isinstance(attack, Mapping):
                     print(f"Warning: Skipping non-dict attack: {attack}")
                     continue
 
-                # Базовые данные
-                name = attack.get("name", "Unknown")
-                frequency = attack.get("frequency", "unknown")
-                danger = attack.get("danger", "unknown")
-                attack_type = attack.get("attack_type", "unknown")
-
-                # Обработка source_ips - теперь это уже список из БД
-                source_ips = attack.get("source_ips", [])
-                if not isinstance(source_ips, list):
-                    source_ips = []
-                source_ips_preview = ", ".join(source_ips[:2])
-                if len(source_ips) > 2:
-                    source_ips_preview += "..."
-
-                # Обработка affected_ports - теперь это уже список из БД
-                affected_ports = attack.get("affected_ports", [])
-                if not isinstance(affected_ports, list):
-                    affected_ports = []
-                ports_preview = ", ".join(map(str, affected_ports[:3]))
-                if len(affected_ports) > 3:
-                    ports_preview += "..."
-
-                # Обработка targets
-                targets = attack.get("targets", [])
-                if not isinstance(targets, list):
-                    targets = []
-                targets_count = len(targets)
-
-                created_date = "Unknown"
-                created_at = attack.get("created_at", "")
-                if created_at:
-                    try:
-                        if isinstance(created_at, str):
-                            if "T" in created_at:
-                                dt = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
-                            else:
-                                dt = datetime.strptime(created_at, "%Y-%m-%d %H:%M:%S")
-                            created_date = dt.strftime("%m/%d/%Y")
-                        else:
-                            created_date = str(created_at)[:10] if created_at else "Unknown"
-                    except Exception as date_error:
-                        created_date = str(created_at)[:10] if created_at else "Unknown"
-
-                row_values = [
-                    name,
-                    frequency.title(),
-                    danger.title(),
-                    attack_type.title(),
-                    source_ips_preview,
-                    ports_preview,
-                    f"🎯 {targets_count}",
-                    created_date
-                ]
-
-                additional_columns = all_columns[base_columns_count:]
-                for col in additional_columns:
-                    value = attack.get(col, "")
-                    if isinstance(value, list):
-                        value = ", ".join(map(str, value[:2])) + ("..." if len(value) > 2 else "")
-                    elif isinstance(value, dict):
-                        value = str(value)
-                    elif value is None:
-                        value = ""
-                    row_values.append(str(value))
-
-                item = self.tree.insert("", "end", values=tuple(row_values), 
-                                      tags=(attack.get("id", ""),))
-
-                danger_lower = str(danger).lower()
-                if danger_lower == "critical":
-                    self.tree.set(item, "Danger", "🔴 Critical")
-                elif danger_lower == "high":
-                    self.tree.set(item, "Danger", "🟠 High")
-                elif danger_lower == "medium":
-                    self.tree.set(item, "Danger", "🟡 Medium")
-                elif danger_lower == "low":
-                    self.tree.set(item, "Danger", "🟢 Low")
+                self.insert_attack_row(attack)
 
             except Exception as e:
                 print(f"Error processing attack data: {e}")
                 print(f"Problematic attack data: {attack}")
                 continue
 
-        self.update_stats()
-        self.status_label.configure(text=f"✅ Loaded {len(self.filtered_attacks)} attacks")
-        self.delete_btn.configure(state="disabled")
+    def insert_attack_row(self, attack, index="end"):
+        """Вставка строки одной атаки"""
+        attack_id = attack.get("id", "")
+        self.tree.insert("", index, iid=attack_id, values=self.format_row(attack), tags=(attack_id,))
+        self.row_versions[attack_id] = attack.get("updated_at")
+        self.row_keys[attack_id] = (attack.get("created_at", ""), attack_id)
+
+    def format_row(self, attack):
+        """Значения колонок для атаки (без обращений к Tk - можно вызывать из фонового потока)"""
+        # Получаем список всех колонок
+        all_columns = self.columns
+        base_columns_count = 8  # Количество базовых колонок
+
+        # Базовые данные
+        name = attack.get("name", "Unknown")
+        frequency = attack.get("frequency", "unknown")
+        danger = attack.get("danger", "unknown")
+        attack_type = attack.get("attack_type", "unknown")
+
+        # Обработка source_ips - теперь это уже список из БД
+        source_ips = attack.get("source_ips", [])
+        if not isinstance(source_ips, list):
+            source_ips = []
+        source_ips_preview = ", ".join(source_ips[:2])
+        if len(source_ips) > 2:
+            source_ips_preview += "..."
+
+        # Обработка affected_ports - теперь это уже список из БД
+        affected_ports = attack.get("affected_ports", [])
+        if not isinstance(affected_ports, list):
+            affected_ports = []
+        ports_preview = ", ".join(map(str, affected_ports[:3]))
+        if len(affected_ports) > 3:
+            ports_preview += "..."
+
+        # Обработка targets
+        targets = attack.get("targets", [])
+        if not isinstance(targets, list):
+            targets = []
+        targets_count = len(targets)
+
+        created_date = "Unknown"
+        created_at = attack.get("created_at", "")
+        if created_at:
+            try:
+                if isinstance(created_at, str):
+                    if "T" in created_at:
+                        dt = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
+                    else:
+                        dt = datetime.strptime(created_at, "%Y-%m-%d %H:%M:%S")
+                    created_date = dt.strftime("%m/%d/%Y")
+                else:
+                    created_date = str(created_at)[:10] if created_at else "Unknown"
+            except Exception as date_error:
+                created_date = str(created_at)[:10] if created_at else "Unknown"
+
+        row_values = [
+            name,
+            frequency.title(),
+            danger.title(),
+            attack_type.title(),
+            source_ips_preview,
+            ports_preview,
+            f"🎯 {targets_count}",
+            created_date
+        ]
+
+        additional_columns = all_columns[base_columns_count:]
+        for col in additional_columns:
+            value = attack.get(col, "")
+            if isinstance(value, list):
+                value = ", ".join(map(str, value[:2])) + ("..." if len(value) > 2 else "")
+            elif isinstance(value, dict):
+                value = str(value)
+            elif value is None:
+                value = ""
+            row_values.append(str(value))
+
+        danger_labels = {
+            "critical": "🔴 Critical",
+            "high": "🟠 High",
+            "medium": "🟡 Medium",
+            "low": "🟢 Low"
+        }
+        row_values[2] = danger_labels.get(str(danger).lower(), row_values[2])
+
+        return tuple(row_values)
 
     def update_stats(self):
         """Обновление статистики"""
-        total = len(self.app.attacks)
-        critical = len([a for a in self.app.attacks if str(a.get("danger", "")).lower() == "critical"])
-        high_freq = len([a for a in self.app.attacks if str(a.get("frequency", "")).lower() in ["high", "very_high"]])
+        filters = self.load_filters
+
+        def stats_thread():
+            try:
+                stats = self.view_stats(filters)
+                self.app.window.after(0, lambda: self.show_stats(*stats))
+            except Exception as e:
+                print(f"Error updating table stats: {e}")
+
+        thread = threading.Thread(target=stats_thread)
+        thread.daemon = True
+        thread.start()
 
+    def show_stats(self, total, critical, high_freq):
+        """Вывод статистики в заголовке"""
+        if not self.stats_label.winfo_exists():
+            return
         self.stats_label.configure(text=f"📊 Total: {total} | 🔴 Critical: {critical} | 🚀 High Freq: {high_freq}")
 
     def delete_attack(self, attack_id, attack_name):
@@ -499,11 +907,12 @@ class AttackTable:
     def on_attack_deleted(self, attack_name):
         """Обработка успешного удаления"""
         self.app.show_success(f"Attack '{attack_name}' was successfully deleted!")
+        if self.virtual.active:
+            self.virtual.clear_selection()
 
-        # ОБНОВЛЯЕМ СТАТИСТИКУ В ДАШБОРДЕ И БОКОВОЙ ПАНЕЛИ
-        self.app.refresh_attacks()  # Это обновит данные во всем приложении
-
-        self.refresh_table()
+        # Удалённая строка убирается из дерева; статистика в боковой панели
+        # обновляется из того же app.attacks без повторной загрузки
+        self.refresh_changes()
 
     def show_error(self, message):
         """Показ ошибки"""
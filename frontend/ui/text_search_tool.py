@@ -1,13 +1,42 @@
 import customtkinter as ctk
-from tkinter import ttk
-import threading
+from tkinter import ttk, messagebox
 import re
+import time
 from api.client import DDOSDatabaseClient
+from api.migrations import DETAIL_VIEWS
+from api.sql_functions import compile_pattern
+from api.trigram import describe_prefilter, like_query, regex_query
 
 
 class TextSearchTool:
+    # Ключ задачи в app.jobs
+    JOB_KEY = "text_search"
+    # Результаты добавляются в таблицу страницами, не блокируя окно
+    PAGE_SIZE = 200
+    FULL_TEXT = "Full-text (FTS5)"
+    FULL_TEXT_PREFIX = "Full-text Prefix (FTS5)"
+    FULL_TEXT_COLUMNS = ["name", "attack_type", "danger", "match", "score", "created_at"]
+    # Столбцы, доступные для поиска по столбцу
+    SEARCH_COLUMNS = {
+        "attacks": ["name", "attack_type", "frequency", "danger"],
+        "targets": ["target_domain", "target_ip", "protocol", "tags"],
+    }
+    # Регулярные выражения через функции regexp/regexp_i (api/sql_functions.py):
+    # условие WHERE, флаги для проверки паттерна и возможность сузить поиск
+    # триграммным индексом (для отрицаний - нет)
+    REGEX_CONDITIONS = {
+        "POSIX Regex (~)": ("{column} REGEXP ?", 0, True),
+        "POSIX Regex Case Insensitive (~*)": ("regexp_i(?, {column})", re.IGNORECASE, True),
+        "POSIX Regex Not Match (!~)": ("NOT ({column} REGEXP ?)", 0, False),
+        "POSIX Regex Not Match Case Insensitive (!~*)": ("NOT regexp_i(?, {column})", re.IGNORECASE, False),
+    }
+
     def __init__(self, parent, app):
         self.app = app
+        # Номер текущего показа: страницы прежних поисков отбрасываются
+        self._search_generation = 0
+        self._search_started = 0.0
+        self._shown_matches = 0
         self.setup_ui(parent)
 
     def setup_ui(self, parent):
@@ -35,12 +64,13 @@ class TextSearchTool:
         row1.pack(fill="x", pady=5)
 
         ctk.CTkLabel(row1, text="Table:").pack(side="left")
-        self.search_table = ctk.CTkComboBox(row1, values=["attacks", "targets"], width=120)
+        self.search_table = ctk.CTkComboBox(row1, values=list(self.SEARCH_COLUMNS), width=120,
+                                            command=self.on_table_change)
         self.search_table.pack(side="left", padx=(10, 20))
         self.search_table.set("attacks")
 
         ctk.CTkLabel(row1, text="Column:").pack(side="left")
-        self.search_column = ctk.CTkComboBox(row1, values=["name", "attack_type", "frequency", "danger"], width=120)
+        self.search_column = ctk.CTkComboBox(row1, values=self.SEARCH_COLUMNS["attacks"], width=120)
         self.search_column.pack(side="left", padx=(10, 20))
         self.search_column.set("name")
 
@@ -54,6 +84,8 @@ class TextSearchTool:
 
         ctk.CTkLabel(row2, text="Search Type:").pack(side="left")
         self.search_type = ctk.CTkComboBox(row2, values=[
+            self.FULL_TEXT,
+            self.FULL_TEXT_PREFIX,
             "LIKE (Case Sensitive)",
             "ILIKE (Case Insensitive)",
             "POSIX Regex (~)",
@@ -62,7 +94,7 @@ class TextSearchTool:
             "POSIX Regex Not Match Case Insensitive (!~*)"
         ], width=200)
         self.search_type.pack(side="left", padx=(10, 0))
-        self.search_type.set("LIKE (Case Sensitive)")
+        self.search_type.set(self.FULL_TEXT)
 
         # Третья строка - кнопки
         row3 = ctk.CTkFrame(search_content, fg_color="transparent")
@@ -81,7 +113,17 @@ class TextSearchTool:
             text="Clear",
             command=self.clear_search,
             width=80
-        ).pack(side="left")
+        ).pack(side="left", padx=(0, 10))
+
+        self.cancel_button = ctk.CTkButton(
+            row3,
+            text="⏹ Cancel",
+            command=self.cancel_search,
+            fg_color=self.app.colors["warning"],
+            width=80,
+            state="disabled"
+        )
+        self.cancel_button.pack(side="left")
 
         # Справка по регулярным выражениям
         help_btn = ctk.CTkButton(
@@ -117,8 +159,15 @@ class TextSearchTool:
         self.results_tree.pack(side="left", fill="both", expand=True, padx=15, pady=(0, 15))
         scrollbar.pack(side="right", fill="y", padx=(0, 15), pady=(0, 15))
 
+    def on_table_change(self, table):
+        """Список столбцов выбранной таблицы"""
+        columns = self.SEARCH_COLUMNS.get(table, [])
+        self.search_column.configure(values=columns)
+        if columns:
+            self.search_column.set(columns[0])
+
     def execute_search(self):
-        """Выполнение поиска"""
+        """Выполнение поиска в фоне через app.jobs (отмена прерывает запрос в SQLite)"""
         pattern = self.search_pattern.get().strip()
         if not pattern:
             messagebox.showwarning("Warning", "Please enter search pattern")
@@ -127,69 +176,162 @@ class TextSearchTool:
         table = self.search_table.get()
         column = self.search_column.get()
         search_type = self.search_type.get()
+        self._search_started = time.perf_counter()
+
+        if search_type in (self.FULL_TEXT, self.FULL_TEXT_PREFIX):
+            # Сначала число совпадений, затем страницы от лучших совпадений
+            prefix = search_type == self.FULL_TEXT_PREFIX
+            signature = (search_type, pattern)
+            self.app.jobs.submit(self.JOB_KEY, self.app.api_client.count_search, pattern, prefix,
+                                 signature=signature,
+                                 on_success=lambda total: self.run_full_text(signature, pattern, prefix, total),
+                                 on_error=self.on_search_failed,
+                                 on_cancel=self.on_search_cancelled,
+                                 on_state=self.set_running)
+            return
+
+        try:
+            condition, params, match_query = self.build_column_query(table, column, search_type, pattern)
+        except ValueError as e:
+            messagebox.showerror("Error", f"Search failed: {e}")
+            return
 
-        def search_thread():
-            try:
-                conn = self.app.api_client.db.get_connection()
-                cursor = conn.cursor()
-
-                # Формируем SQL в зависимости от типа поиска
-                if search_type == "LIKE (Case Sensitive)":
-                    sql = f"SELECT * FROM {table} WHERE {column} LIKE %s"
-                    params = [f"%{pattern}%"]
-                elif search_type == "ILIKE (Case Insensitive)":
-                    sql = f"SELECT * FROM {table} WHERE {column} ILIKE %s"
-                    params = [f"%{pattern}%"]
-                elif search_type == "POSIX Regex (~)":
-                    sql = f"SELECT * FROM {table} WHERE {column} ~ %s"
-                    params = [pattern]
-                elif search_type == "POSIX Regex Case Insensitive (~*)":
-                    sql = f"SELECT * FROM {table} WHERE {column} ~* %s"
-                    params = [pattern]
-                elif search_type == "POSIX Regex Not Match (!~)":
-                    sql = f"SELECT * FROM {table} WHERE {column} !~ %s"
-                    params = [pattern]
-                elif search_type == "POSIX Regex Not Match Case Insensitive (!~*)":
-                    sql = f"SELECT * FROM {table} WHERE {column} !~* %s"
-                    params = [pattern]
-
-                cursor.execute(sql, params)
-                results = cursor.fetchall()
-                columns = [desc[0] for desc in cursor.description]
-
-                conn.close()
-
-                # Обновляем UI
-                self.app.window.after(0, lambda: self.display_search_results(columns, results, pattern))
-
-            except Exception as e:
-                self.app.window.after(0, lambda: messagebox.showerror("Error", f"Search failed: {e}"))
-
-        thread = threading.Thread(target=search_thread)
-        thread.daemon = True
-        thread.start()
-
-    def display_search_results(self, columns, results, pattern):
-        """Отображение результатов поиска"""
-        # Очищаем таблицу
+        # Префильтр по триграммному индексу и сам запрос идут в фоне под одним
+        # ключом и одной сигнатурой: повторный клик не перезапускает поиск
+        signature = (table, column, search_type, pattern)
+        self.app.jobs.submit(self.JOB_KEY, self.prepare_column_search, table, condition, params, column,
+                             match_query, signature=signature,
+                             on_success=lambda prepared: self.run_search(signature, *prepared, pattern),
+                             on_error=self.on_search_failed,
+                             on_cancel=self.on_search_cancelled,
+                             on_state=self.set_running)
+
+    def run_full_text(self, signature, pattern, prefix, total):
+        """Полнотекстовый поиск по attacks_fts: страницы показываются по мере чтения.
+
+        Ищет по названиям, стратегиям защиты, доменам и тегам целей; выбор
+        таблицы и столбца не используется.
+        """
+        self.app.jobs.submit_pages(self.JOB_KEY, self.app.api_client.iter_search_pages, pattern, prefix,
+                                   self.PAGE_SIZE, signature=signature,
+                                   on_page=lambda page: self.append_page(page, total),
+                                   on_success=lambda count: self.finish_full_text(count, pattern),
+                                   on_error=self.on_search_failed,
+                                   on_cancel=self.on_search_cancelled,
+                                   on_state=self.set_running)
+        self.start_results(self.FULL_TEXT_COLUMNS)
+        self._shown_matches = 0
+
+    def append_page(self, page, total):
+        """Добавление страницы полнотекстового поиска"""
+        for row in page:
+            self.results_tree.insert("", "end", values=(
+                row["name"], row["attack_type"], row["danger"], row["snippet"],
+                f"{-row['score']:.2f}", row["created_at"]))
+        self._shown_matches += len(page)
+        self.results_count.configure(text=f"Loading... {self._shown_matches} of {total} matches")
+
+    def finish_full_text(self, count, pattern):
+        elapsed_ms = (time.perf_counter() - self._search_started) * 1000
+        self.results_count.configure(text=f"{count} matches found for '{pattern}' ({elapsed_ms:.0f} ms)")
+
+    def build_column_query(self, table, column, search_type, pattern):
+        """Условие WHERE поиска по одному столбцу, его параметры и MATCH для триграммного индекса.
+
+        MATCH равен None, если индекс не может сузить поиск (короткая
+        подстрока, regex без литералов, отрицание).
+        """
+        if column not in self.SEARCH_COLUMNS.get(table, []):
+            raise ValueError(f"Unknown column {table}.{column}")
+
+        if search_type == "LIKE (Case Sensitive)":
+            # LIKE в SQLite не различает регистр ASCII - подстрока ищется через instr
+            return f"instr({column}, ?) > 0", [pattern], like_query(pattern)
+        if search_type == "ILIKE (Case Insensitive)":
+            escaped = pattern.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            return f"{column} LIKE ? ESCAPE '\\'", [f"%{escaped}%"], like_query(pattern)
+        if search_type not in self.REGEX_CONDITIONS:
+            raise ValueError(f"Unknown search type '{search_type}'")
+
+        condition, flags, prefilter = self.REGEX_CONDITIONS[search_type]
+        try:
+            compile_pattern(pattern, flags)
+        except re.error as e:
+            raise ValueError(f"Invalid regular expression: {e}")
+        match_query = regex_query(pattern, flags) if prefilter else None
+        return condition.format(column=column), [pattern], match_query
+
+    def prepare_column_search(self, table, condition, params, column, match_query):
+        """SQL поиска по столбцу с префильтром по триграммному индексу (выполняется в фоне)"""
+        prefilter = None
+        if match_query is not None:
+            prefilter = self.app.api_client.trigram_prefilter(table, column, match_query)
+            if prefilter and prefilter["condition"]:
+                # Точная проверка выполняется только для кандидатов индекса
+                condition = f"{prefilter['condition']} AND {condition}"
+                params = [match_query] + params
+        # Текстовые значения категорий - в представлении; алиас сохраняет имя таблицы в условиях
+        return f"SELECT * FROM {DETAIL_VIEWS[table]} AS {table} WHERE {condition}", params, prefilter
+
+    def run_search(self, signature, sql, params, prefilter, pattern):
+        """Выполнение подготовленного поиска через исполнитель запросов"""
+        note = describe_prefilter(prefilter)
+        self.app.jobs.submit_query(self.JOB_KEY, sql, tuple(params), signature=signature,
+                                   on_success=lambda result: self.on_search_done(result, pattern, note),
+                                   on_error=self.on_search_failed,
+                                   on_cancel=self.on_search_cancelled,
+                                   on_state=self.set_running)
+
+    def cancel_search(self):
+        self.app.jobs.cancel(self.JOB_KEY)
+
+    def set_running(self, running):
+        self.cancel_button.configure(state="normal" if running else "disabled")
+        if running:
+            self._search_generation += 1
+            self.results_count.configure(text="Searching...")
+
+    def on_search_done(self, result, pattern, note):
+        """Показ результата поиска по столбцу: все колонки строки"""
+        self._search_generation += 1
+        self.start_results(result.columns)
+        summary = f"Found {result.summary()} for '{pattern}'" + (f" ({note})" if note else "")
+        self.append_results(self._search_generation, result.rows, 0, summary)
+
+    def on_search_failed(self, error):
+        self.results_count.configure(text="Search failed")
+        messagebox.showerror("Error", f"Search failed: {error}")
+
+    def on_search_cancelled(self, job):
+        self.results_count.configure(text=f"Cancelled after {job.elapsed() * 1000:.0f} ms")
+
+    def start_results(self, columns):
+        """Очистка таблицы и настройка колонок для нового поиска"""
         for item in self.results_tree.get_children():
             self.results_tree.delete(item)
 
-        # Настраиваем колонки
         self.results_tree["columns"] = columns
         for col in columns:
             self.results_tree.heading(col, text=col)
-            self.results_tree.column(col, width=120)
+            self.results_tree.column(col, width=300 if col == "match" else 120)
 
-        # Заполняем данными с подсветкой совпадений
-        for row in results:
+    def append_results(self, generation, rows, start, summary):
+        """Добавление страницы результатов; следующая - в следующем проходе цикла Tk"""
+        if generation != self._search_generation:
+            return
+        end = start + self.PAGE_SIZE
+        for row in rows[start:end]:
             self.results_tree.insert("", "end", values=row)
-
-        # Обновляем счетчик
-        self.results_count.configure(text=f"{len(results)} matches found for '{pattern}'")
+        if end < len(rows):
+            self.results_count.configure(text=f"Loading... {end} of {len(rows)} matches")
+            self.app.window.after(1, lambda: self.append_results(generation, rows, end, summary))
+        else:
+            self.results_count.configure(text=summary)
 
     def clear_search(self):
         """Очистка результатов поиска"""
+        self.cancel_search()
+        self._search_generation += 1
         self.search_pattern.delete(0, "end")
         for item in self.results_tree.get_children():
             self.results_tree.delete(item)
@@ -0,0 +1,275 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+
+class PageCache:
+    """LRU-кэш страниц строк виртуальной таблицы"""
+
+    def __init__(self, max_pages: int):
+        self.max_pages = max_pages
+        self._pages: "OrderedDict[int, List[Dict[str, Any]]]" = OrderedDict()
+
+    def get(self, page_no: int) -> Optional[List[Dict[str, Any]]]:
+        page = self._pages.get(page_no)
+        if page is not None:
+            self._pages.move_to_end(page_no)
+        return page
+
+    def put(self, page_no: int, rows: List[Dict[str, Any]]):
+        self._pages[page_no] = rows
+        self._pages.move_to_end(page_no)
+        while len(self._pages) > self.max_pages:
+            self._pages.popitem(last=False)
+
+    def clear(self):
+        self._pages.clear()
+
+    def __len__(self):
+        return len(self._pages)
+
+
+class VirtualTreeController:
+    """Виртуальный режим ttk.Treeview.
+
+    В дереве существуют только элементы видимого окна; при прокрутке они
+    переиспользуются и получают новые значения. Строки читаются страницами
+    через fetch_page(page_no, after) в фоновых потоках (after - ключ
+    последней строки предыдущей страницы, если она в кэше) и хранятся в
+    ограниченном LRU-кэше. Страницы рядом с окном (overscan) запрашиваются
+    заранее. Строка - словарь с полями id, key, name и values.
+    """
+
+    def __init__(self, window, tree, scrollbar, fetch_page: Callable, row_height: int,
+                 page_size: int = 200, max_pages: int = 20, overscan: int = 100):
+        self.window = window
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.fetch_page = fetch_page
+        self.row_height = row_height
+        self.page_size = page_size
+        self.overscan = overscan
+
+        self.cache = PageCache(max_pages)
+        self.total = 0
+        self.offset = 0
+        self.visible_rows = 1
+        self.selected_id = None
+        self.selected_name = None
+
+        self._items: List[str] = []
+        self._pending = set()
+        self._generation = 0
+        self._active = False
+        self._bindings = []
+
+    # --- подключение к дереву ---
+
+    def attach(self):
+        """Перевод дерева в виртуальный режим"""
+        if self._active:
+            return
+        self._active = True
+        self.tree.delete(*self.tree.get_children())
+        self.tree.configure(yscrollcommand=lambda *args: None)
+        self.scrollbar.configure(command=self.on_scrollbar)
+        for sequence, handler in (("<Configure>", self.on_configure),
+                                  ("<MouseWheel>", self.on_mousewheel),
+                                  ("<Button-4>", lambda e: self.scroll_by(-3)),
+                                  ("<Button-5>", lambda e: self.scroll_by(3)),
+                                  ("<Up>", lambda e: self.move_selection(-1)),
+                                  ("<Down>", lambda e: self.move_selection(1)),
+                                  ("<Prior>", lambda e: self.scroll_by(-self.visible_rows)),
+                                  ("<Next>", lambda e: self.scroll_by(self.visible_rows))):
+            self._bindings.append((sequence, self.tree.bind(sequence, handler, add="+")))
+
+    def detach(self):
+        """Возврат дерева в обычный режим (все строки - элементы дерева)"""
+        if not self._active:
+            return
+        self._active = False
+        self._generation += 1
+        for sequence, funcid in self._bindings:
+            self.tree.unbind(sequence, funcid)
+        self._bindings = []
+        self.tree.delete(*self._items)
+        self._items = []
+        self.cache.clear()
+        self._pending.clear()
+        self.tree.configure(yscrollcommand=self.scrollbar.set)
+        self.scrollbar.configure(command=self.tree.yview)
+
+    @property
+    def active(self) -> bool:
+        return self._active
+
+    def reset(self, total: int):
+        """Новый набор данных: сброс кэша и прокрутки"""
+        self._generation += 1
+        self.cache.clear()
+        self._pending.clear()
+        self.total = total
+        self.offset = 0
+        self.render()
+
+    def invalidate(self, total: Optional[int] = None):
+        """Данные изменились: перечитать страницы, сохранив позицию прокрутки"""
+        self._generation += 1
+        self.cache.clear()
+        self._pending.clear()
+        if total is not None:
+            self.total = total
+        self.offset = self._clamp(self.offset)
+        self.render()
+
+    # --- прокрутка ---
+
+    def _clamp(self, offset: int) -> int:
+        return max(0, min(offset, self.total - self.visible_rows))
+
+    def scroll_to(self, offset: int):
+        offset = self._clamp(offset)
+        if offset != self.offset:
+            self.offset = offset
+            self.render()
+
+    def scroll_by(self, rows: int):
+        self.scroll_to(self.offset + rows)
+        return "break"
+
+    def on_scrollbar(self, action, *args):
+        """Команда скроллбара: moveto <доля> или scroll <n> units|pages"""
+        if action == "moveto":
+            self.scroll_to(int(float(args[0]) * self.total))
+        elif action == "scroll":
+            amount, unit = int(args[0]), args[1]
+            self.scroll_by(amount * (self.visible_rows if unit == "pages" else 1))
+
+    def on_mousewheel(self, event):
+        return self.scroll_by(-3 if event.delta > 0 else 3)
+
+    def on_configure(self, event):
+        """Изменение размера: пересчёт числа видимых строк"""
+        # Одна строка уходит на заголовок
+        visible_rows = max(1, event.height // self.row_height - 1)
+        if visible_rows != self.visible_rows:
+            self.visible_rows = visible_rows
+            self.offset = self._clamp(self.offset)
+            self.render()
+
+    def move_selection(self, step: int):
+        """Перемещение выделения клавишами с прокруткой окна"""
+        selection = self.tree.selection()
+        index = self._items.index(selection[0]) if selection and selection[0] in self._items else -1
+        target = index + step
+        if 0 <= target < len(self._items):
+            item = self._items[target]
+        else:
+            self.scroll_by(step)
+            item = self._items[0 if step < 0 else -1] if self._items else None
+        if item is not None:
+            self.tree.selection_set(item)
+            self.tree.focus(item)
+        return "break"
+
+    # --- данные ---
+
+    def row_at(self, index: int) -> Optional[Dict[str, Any]]:
+        page = self.cache.get(index // self.page_size)
+        if page is None:
+            return None
+        position = index % self.page_size
+        return page[position] if position < len(page) else None
+
+    def request_page(self, page_no: int):
+        """Фоновая загрузка страницы, если её нет в кэше и она ещё не запрошена"""
+        if page_no < 0 or page_no * self.page_size >= self.total:
+            return
+        if page_no in self._pending or self.cache.get(page_no) is not None:
+            return
+
+        self._pending.add(page_no)
+        generation = self._generation
+        previous = self.cache.get(page_no - 1) if page_no > 0 else None
+        after = previous[-1]["key"] if previous and len(previous) == self.page_size else None
+
+        def page_thread():
+            try:
+                rows = self.fetch_page(page_no, after)
+            except Exception as e:
+                print(f"Error loading page {page_no}: {e}")
+                rows = None
+            self.window.after(0, lambda: self.on_page_loaded(generation, page_no, rows))
+
+        thread = threading.Thread(target=page_thread)
+        thread.daemon = True
+        thread.start()
+
+    def on_page_loaded(self, generation: int, page_no: int, rows):
+        if generation != self._generation or not self._active:
+            return
+        self._pending.discard(page_no)
+        if rows is None or not self.tree.winfo_exists():
+            return
+        self.cache.put(page_no, rows)
+
+        first_page = self.offset // self.page_size
+        last_page = (self.offset + self.visible_rows - 1) // self.page_size
+        if first_page <= page_no <= last_page:
+            self.render()
+
+    # --- отрисовка ---
+
+    def render(self):
+        """Заполнение элементов видимого окна"""
+        if not self._active:
+            return
+
+        count = max(0, min(self.visible_rows, self.total - self.offset))
+        while len(self._items) < count:
+            self._items.append(self.tree.insert("", "end", values=()))
+        while len(self._items) > count:
+            self.tree.delete(self._items.pop())
+
+        selected_item = None
+        for i, item in enumerate(self._items):
+            row = self.row_at(self.offset + i)
+            if row is None:
+                self.tree.item(item, values=("Loading...",), tags=())
+                continue
+            self.tree.item(item, values=row["values"], tags=(row["id"],))
+            if row["id"] == self.selected_id:
+                selected_item = item
+
+        # Выделение привязано к id атаки, а не к элементу дерева
+        wanted = (selected_item,) if selected_item else ()
+        if tuple(self.tree.selection()) != wanted:
+            self.tree.selection_set(wanted)
+
+        # Окно плюс overscan: страницы вокруг окна загружаются заранее
+        first = max(0, self.offset - self.overscan)
+        last = min(self.total, self.offset + count + self.overscan)
+        for page_no in range(first // self.page_size, (max(first, last - 1)) // self.page_size + 1):
+            self.request_page(page_no)
+
+        if self.total:
+            self.scrollbar.set(self.offset / self.total, (self.offset + count) / self.total)
+        else:
+            self.scrollbar.set(0, 1)
+
+    def on_select(self):
+        """Обработка выбора строки пользователем; возвращает выбранный id"""
+        selection = self.tree.selection()
+        if selection:
+            tags = self.tree.item(selection[0])["tags"]
+            if tags:
+                self.selected_id = tags[0]
+                values = self.tree.item(selection[0])["values"]
+                self.selected_name = values[0] if values else "Unknown"
+        return self.selected_id
+
+    def clear_selection(self):
+        self.selected_id = None
+        self.selected_name = None
+        if self.tree.selection():
+            self.tree.selection_set(())
@@ -0,0 +1,252 @@
+"""Потоковый импорт и экспорт атак в NDJSON и CSV.
+
+NDJSON - одна атака с вложенными целями на строку. CSV - плоский формат:
+одна строка на цель (поля атаки повторяются), атака без целей - одна строка
+с пустыми полями цели; списки хранятся в ячейках как JSON.
+
+Память не зависит от размера набора: экспорт читает БД страницами
+(iter_attack_pages), импорт передаёт записи в bulk_create_attacks пачками.
+После каждой записанной страницы / закоммиченной пачки сохраняется файл
+контрольной точки, по которому прерванная операция продолжается с места
+остановки: для NDJSON - байтовое смещение, для CSV - число атак.
+"""
+import csv
+import io
+import json
+import os
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from models.attack import json_default
+
+ATTACK_FIELDS = ["id", "name", "frequency", "danger", "attack_type", "source_ips", "affected_ports",
+                 "mitigation_strategies", "created_at", "updated_at"]
+TARGET_FIELDS = ["target_ip", "target_domain", "port", "protocol", "tags"]
+CSV_FIELDS = ATTACK_FIELDS + TARGET_FIELDS
+JSON_FIELDS = {"source_ips", "affected_ports", "mitigation_strategies", "tags"}
+
+FORMATS = ("ndjson", "csv")
+
+
+def detect_format(path: str) -> str:
+    """Формат по расширению файла"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".ndjson", ".jsonl"):
+        return "ndjson"
+    if extension == ".csv":
+        return "csv"
+    raise ValueError(f"Cannot detect format of '{path}', expected one of: {', '.join(FORMATS)}")
+
+
+def checkpoint_path(path: str, operation: str) -> str:
+    return f"{path}.{operation}-checkpoint.json"
+
+
+def load_checkpoint(path: str, operation: str, fmt: str) -> Optional[Dict[str, Any]]:
+    """Контрольная точка прерванной операции (None - начинать сначала)"""
+    try:
+        with open(checkpoint_path(path, operation), "r", encoding="utf-8") as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return checkpoint if checkpoint.get("format") == fmt else None
+
+
+def save_checkpoint(path: str, operation: str, checkpoint: Dict[str, Any]):
+    """Атомарная запись контрольной точки"""
+    target = checkpoint_path(path, operation)
+    with open(target + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f)
+    os.replace(target + ".tmp", target)
+
+
+def clear_checkpoint(path: str, operation: str):
+    try:
+        os.remove(checkpoint_path(path, operation))
+    except FileNotFoundError:
+        pass
+
+
+# --- CSV ---
+
+def attack_to_csv_rows(attack: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Плоские строки CSV для атаки: по одной на цель"""
+    base = {field: json.dumps(attack.get(field, [])) if field in JSON_FIELDS else attack.get(field, "")
+            for field in ATTACK_FIELDS}
+    targets = attack.get("targets") or [None]
+    rows = []
+    for target in targets:
+        row = dict(base)
+        for field in TARGET_FIELDS:
+            if target is None:
+                row[field] = ""
+            elif field in JSON_FIELDS:
+                row[field] = json.dumps(target.get(field, []))
+            else:
+                row[field] = target.get(field, "")
+        rows.append(row)
+    return rows
+
+
+def _target_from_csv_row(row: Dict[str, str]) -> Optional[Dict[str, Any]]:
+    if not any(row.get(field) for field in TARGET_FIELDS):
+        return None
+    return {
+        "target_ip": row.get("target_ip", ""),
+        "target_domain": row.get("target_domain", ""),
+        "port": int(row["port"]) if row.get("port") else 80,
+        "protocol": row.get("protocol") or "tcp",
+        "tags": json.loads(row["tags"]) if row.get("tags") else [],
+    }
+
+
+def iter_csv_attacks(f) -> Iterator[Dict[str, Any]]:
+    """Атаки из CSV: подряд идущие строки с одним id собираются в одну атаку"""
+    current = None
+    for row in csv.DictReader(f):
+        if current is None or row["id"] != current["id"]:
+            if current is not None:
+                yield current
+            current = {field: json.loads(row[field]) if field in JSON_FIELDS else row[field]
+                       for field in ATTACK_FIELDS}
+            current["targets"] = []
+        target = _target_from_csv_row(row)
+        if target is not None:
+            current["targets"].append(target)
+    if current is not None:
+        yield current
+
+
+# --- Экспорт ---
+
+def export_attacks(db, path: str, fmt: Optional[str] = None, filters: Optional[Dict[str, List[str]]] = None,
+                   page_size: int = 1000, resume: bool = True,
+                   progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """Потоковый экспорт атак из DatabaseManager в файл.
+
+    Данные пишутся в path + ".part", который по завершении переименовывается
+    в path. При resume продолжает прерванный экспорт с ключа последней
+    записанной страницы.
+    """
+    fmt = fmt or detect_format(path)
+    part_path = path + ".part"
+    checkpoint = load_checkpoint(path, "export", fmt) if resume else None
+    if checkpoint and (checkpoint.get("filters") != filters or not os.path.exists(part_path)):
+        checkpoint = None
+
+    count = checkpoint["count"] if checkpoint else 0
+    after = tuple(checkpoint["after"]) if checkpoint and checkpoint.get("after") else None
+
+    try:
+        with open(part_path, "r+b" if checkpoint else "wb") as raw:
+            if checkpoint:
+                # Всё, что записано после контрольной точки, отбрасывается
+                raw.seek(checkpoint["offset"])
+                raw.truncate()
+            f = io.TextIOWrapper(raw, encoding="utf-8", newline="")
+            writer = None
+            if fmt == "csv":
+                writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+                if not checkpoint:
+                    writer.writeheader()
+
+            for page in db.iter_attack_pages(filters, page_size=page_size, after=after):
+                for attack in page:
+                    if writer is not None:
+                        writer.writerows(attack_to_csv_rows(attack))
+                    else:
+                        f.write(json.dumps(attack, ensure_ascii=False, default=json_default) + "\n")
+                f.flush()
+                count += len(page)
+                last = page[-1]
+                save_checkpoint(path, "export", {
+                    "format": fmt, "filters": filters, "offset": raw.tell(),
+                    "after": [last["created_at"], last["id"]], "count": count
+                })
+                if progress is not None:
+                    progress({"exported": count})
+            f.flush()
+            f.detach()
+
+        os.replace(part_path, path)
+        clear_checkpoint(path, "export")
+        return {"success": True, "data": {"exported": count, "path": path},
+                "message": f"Exported {count} attacks to {path}"}
+
+    except Exception as e:
+        return {"success": False, "data": {"exported": count},
+                "error": f"Export failed after {count} attacks: {e}"}
+
+
+# --- Импорт ---
+
+def _iter_ndjson(path: str, start_offset: int, offsets: List[int]) -> Iterator[Dict[str, Any]]:
+    """Атаки из NDJSON; в offsets добавляется смещение конца каждой выданной строки"""
+    with open(path, "rb") as f:
+        f.seek(start_offset)
+        for line in iter(f.readline, b""):
+            if not line.strip():
+                continue
+            offsets.append(f.tell())
+            yield json.loads(line)
+
+
+def _iter_csv(path: str, skip: int) -> Iterator[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        for index, attack in enumerate(iter_csv_attacks(f)):
+            if index >= skip:
+                yield attack
+
+
+def import_attacks(db, path: str, fmt: Optional[str] = None, batch_size: int = 5000, resume: bool = True,
+                   progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """Потоковый импорт атак из файла через DatabaseManager.bulk_create_attacks.
+
+    После каждой закоммиченной пачки сохраняется контрольная точка; при
+    resume импорт продолжается после последней закоммиченной записи.
+    """
+    fmt = fmt or detect_format(path)
+    checkpoint = load_checkpoint(path, "import", fmt) if resume else None
+    if checkpoint and checkpoint.get("size") != os.path.getsize(path):
+        # Файл изменился - контрольная точка к нему не относится
+        checkpoint = None
+
+    base = {"records": 0, "offset": 0, "inserted": 0, "failed": 0}
+    if checkpoint:
+        base.update({key: checkpoint[key] for key in base})
+    state = dict(base)
+
+    # Смещения концов прочитанных, но ещё не закоммиченных строк NDJSON
+    pending_offsets: List[int] = []
+    committed = [0]
+    if fmt == "ndjson":
+        records = _iter_ndjson(path, base["offset"], pending_offsets)
+    else:
+        records = _iter_csv(path, base["records"])
+
+    def on_batch(counters):
+        # Пачка закоммичена: запоминаем, докуда входной файл уже в БД
+        if fmt == "ndjson":
+            done = counters["processed"] - committed[0]
+            if done:
+                state["offset"] = pending_offsets[done - 1]
+                del pending_offsets[:done]
+        committed[0] = counters["processed"]
+        state["records"] = base["records"] + counters["processed"]
+        state["inserted"] = base["inserted"] + counters["inserted"]
+        state["failed"] = base["failed"] + counters["failed"]
+        save_checkpoint(path, "import", {"format": fmt, "size": os.path.getsize(path), **state})
+        if progress is not None:
+            progress(dict(state))
+
+    result = db.bulk_create_attacks(records, batch_size=batch_size, progress=on_batch)
+    summary = {key: state[key] for key in ("records", "inserted", "failed")}
+    summary["errors"] = result["data"]["errors"]
+    summary["resumed_from"] = base["records"]
+
+    if "error" in result:
+        # Загрузка прервана: контрольная точка остаётся для повторного запуска
+        return {"success": False, "data": summary, "error": result["error"]}
+
+    clear_checkpoint(path, "import")
+    return {"success": summary["failed"] == 0, "data": summary,
+            "message": f"Imported {summary['inserted']} of {summary['records']} attacks from {path}"}
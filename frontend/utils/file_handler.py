@@ -2,6 +2,8 @@ import json
 import os
 from typing import List, Dict, Any
 
+from models.attack import json_default
+
 class FileHandler:
     def __init__(self, filename: str):
         self.filename = filename
@@ -19,4 +21,4 @@ class FileHandler:
     def save_data(self, data: List[Dict[str, Any]]):
         """Сохранение данных в файл"""
         with open(self.filename, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
\ No newline at end of file
+            json.dump(data, f, ensure_ascii=False, indent=2, default=json_default)
\ No newline at end of file
@@ -1,5 +1,6 @@
 import uuid
 from datetime import datetime
+from typing import Dict, List, Tuple
 
 def generate_id() -> str:
     """Генерация UUID"""
@@ -18,4 +19,19 @@ def format_date_for_display(date_string: str) -> str:
             dt = datetime.strptime(date_string, "%Y-%m-%d %H:%M:%S")
         return dt.strftime("%Y-%m-%d %H:%M")
     except:
-        return date_string
\ No newline at end of file
+        return date_string
+
+def diff_versions(old_versions: Dict[str, str],
+                  new_versions: List[Tuple[str, str]]) -> Tuple[List[str], List[str], List[str]]:
+    """Сравнение версий записей (id -> updated_at): добавленные, изменённые и удалённые ID"""
+    new_ids = set()
+    inserted, updated = [], []
+    for record_id, version in new_versions:
+        new_ids.add(record_id)
+        old_version = old_versions.get(record_id)
+        if old_version is None:
+            inserted.append(record_id)
+        elif old_version != version:
+            updated.append(record_id)
+    deleted = [record_id for record_id in old_versions if record_id not in new_ids]
+    return inserted, updated, deleted